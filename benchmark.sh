@@ -0,0 +1,10 @@
+#!/bin/bash
+
+readonly args=(
+  python
+  parser_benchmark.py
+  "$@"
+)
+
+echo "${args[*]}"
+"${args[@]}"
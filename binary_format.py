@@ -0,0 +1,463 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Sequence
+import mmap
+import os
+import struct
+from typing import BinaryIO, overload
+
+import parser as parser_module
+import source_span as source_span_module
+
+# The binary format of a list of JoyFunction objects. All integers are little-endian and every
+# section starts at an offset that is a multiple of 8 bytes.
+#
+#   header                  see _HEADER
+#   string offsets          (string_count + 1) x u32, offsets into the string data
+#   string data             UTF-8 encoded names and annotations, each stored exactly once
+#   annotation set offsets  (annotation_set_count + 1) x u32, offsets into the annotation refs
+#   annotation refs         annotation_ref_count x u32, indices into the string table
+#   function records        function_count x (_FUNCTION_RECORD or _FUNCTION_RECORD_WITH_BODY),
+#                           each followed by a _SPAN_RECORD if _FLAG_HAS_SPANS is set
+#   annotation spans        annotation_span_count x _SPAN, present only if _FLAG_HAS_SPANS is set
+#   body data               the encoded function bodies, present only if _FLAG_HAS_BODIES is set
+#
+# Identical annotation tuples are stored once, in the annotation set table, and shared by all of
+# the functions that carry them; likewise, identical bodies are stored once in the body data. A body
+# is a u32 term count followed by the terms, each a one-byte tag and its contents:
+#
+#   w  u32 string index of the word's name
+#   i  u32 string index of the integer's decimal representation
+#   s  u32 string index of the string's value
+#   t  true
+#   f  false
+#   q  a quotation, encoded like a body
+
+MAGIC = b"JOYF"
+VERSION = 2
+
+_FLAG_HAS_SPANS = 0x0001
+_FLAG_HAS_BODIES = 0x0002
+
+# magic, version, flags, string_count, annotation_set_count, annotation_ref_count, function_count,
+# string_data_size, annotation_span_count, body_data_size
+_HEADER = struct.Struct("<4sHHIIIIQQQ")
+_U32 = struct.Struct("<I")
+# name string index, annotation set index
+_FUNCTION_RECORD = struct.Struct("<II")
+# name string index, annotation set index, offset of the body in the body data
+_FUNCTION_RECORD_WITH_BODY = struct.Struct("<III")
+# index of the first annotation span, span, body span (with a start of _NO_SPAN if there is none)
+_SPAN_RECORD = struct.Struct("<QQQQQQQQQ")
+# start, end, start_byte, end_byte
+_SPAN = struct.Struct("<QQQQ")
+
+_MAX_U32 = 0xFFFFFFFF
+_NO_SPAN = 0xFFFFFFFFFFFFFFFF
+
+
+def dumps(functions: Iterable[parser_module.JoyFunction], include_spans: bool = False) -> bytes:
+  functions = tuple(functions)
+  include_bodies = any(len(function.body) > 0 for function in functions)
+
+  string_indices: dict[str, int] = {}
+  annotation_set_indices: dict[tuple[str, ...], int] = {}
+  annotation_spans: list[source_span_module.SourceSpan] = []
+  body_offsets: dict[tuple[parser_module.Term, ...], int] = {}
+  body_data = bytearray()
+
+  def string_index(s: str) -> int:
+    return string_indices.setdefault(s, len(string_indices))
+
+  def encode_terms(terms: tuple[parser_module.Term, ...], depth: int = 0) -> None:
+    body_data.extend(_U32.pack(len(terms)))
+    for term in terms:
+      if isinstance(term, parser_module.Word):
+        body_data.extend(b"w" + _U32.pack(string_index(term.name)))
+      elif isinstance(term, parser_module.IntegerLiteral):
+        body_data.extend(b"i" + _U32.pack(string_index(str(term.value))))
+      elif isinstance(term, parser_module.StringLiteral):
+        body_data.extend(b"s" + _U32.pack(string_index(term.value)))
+      elif isinstance(term, parser_module.BooleanLiteral):
+        body_data.extend(b"t" if term.value else b"f")
+      else:
+        if depth >= parser_module.MAX_QUOTATION_DEPTH:
+          raise ValueError(
+              f"quotations nested more than {parser_module.MAX_QUOTATION_DEPTH} deep to serialize"
+          )
+        body_data.extend(b"q")
+        encode_terms(term.terms, depth + 1)
+
+  records = bytearray()
+  for function in functions:
+    name_index = string_index(function.name)
+    annotation_set_index = annotation_set_indices.get(function.annotations)
+    if annotation_set_index is None:
+      for annotation in function.annotations:
+        string_index(annotation)
+      annotation_set_index = len(annotation_set_indices)
+      annotation_set_indices[function.annotations] = annotation_set_index
+
+    if not include_bodies:
+      records += _FUNCTION_RECORD.pack(name_index, annotation_set_index)
+    else:
+      body_offset = body_offsets.get(function.body)
+      if body_offset is None:
+        body_offset = len(body_data)
+        body_offsets[function.body] = body_offset
+        encode_terms(function.body)
+      records += _FUNCTION_RECORD_WITH_BODY.pack(name_index, annotation_set_index, body_offset)
+
+    if not include_spans:
+      continue
+
+    span = function.span
+    if span is None or len(function.annotation_spans) != len(function.annotations):
+      raise ValueError(f"function has no span information: {function.name}")
+    body_span = function.body_span
+    records += _SPAN_RECORD.pack(
+        len(annotation_spans),
+        span.start,
+        span.end,
+        span.start_byte,
+        span.end_byte,
+        *(
+            (_NO_SPAN, 0, 0, 0)
+            if body_span is None
+            else (body_span.start, body_span.end, body_span.start_byte, body_span.end_byte)
+        ),
+    )
+    annotation_spans.extend(function.annotation_spans)
+
+  if len(string_indices) > _MAX_U32 or len(functions) > _MAX_U32:
+    raise ValueError("too many functions to serialize")
+  if len(body_data) > _MAX_U32:
+    raise ValueError("too much body data to serialize")
+
+  string_offsets = bytearray(_U32.pack(0))
+  string_data = bytearray()
+  for s in string_indices:
+    string_data += s.encode("utf-8", errors="surrogateescape")
+    if len(string_data) > _MAX_U32:
+      raise ValueError("too much string data to serialize")
+    string_offsets += _U32.pack(len(string_data))
+
+  annotation_set_offsets = bytearray(_U32.pack(0))
+  annotation_refs = bytearray()
+  annotation_ref_count = 0
+  for annotation_set in annotation_set_indices:
+    for annotation in annotation_set:
+      annotation_refs += _U32.pack(string_indices[annotation])
+    annotation_ref_count += len(annotation_set)
+    annotation_set_offsets += _U32.pack(annotation_ref_count)
+
+  result = bytearray(
+      _HEADER.pack(
+          MAGIC,
+          VERSION,
+          (_FLAG_HAS_SPANS if include_spans else 0) | (_FLAG_HAS_BODIES if include_bodies else 0),
+          len(string_indices),
+          len(annotation_set_indices),
+          annotation_ref_count,
+          len(functions),
+          len(string_data),
+          len(annotation_spans),
+          len(body_data),
+      )
+  )
+  for section in (string_offsets, string_data, annotation_set_offsets, annotation_refs, records):
+    result += section
+    result += bytes(_padding(len(result)))
+  for annotation_span in annotation_spans:
+    result += _SPAN.pack(
+        annotation_span.start,
+        annotation_span.end,
+        annotation_span.start_byte,
+        annotation_span.end_byte,
+    )
+  result += body_data
+
+  return bytes(result)
+
+
+def dump(
+    functions: Iterable[parser_module.JoyFunction], f: BinaryIO, include_spans: bool = False
+) -> None:
+  f.write(dumps(functions, include_spans=include_spans))
+
+
+def loads(data: bytes | bytearray | memoryview) -> FunctionTable:
+  return FunctionTable(data)
+
+
+def load(path: str | os.PathLike[str]) -> FunctionTable:
+  with open(path, "rb") as f:
+    # Empty files cannot be memory-mapped; let FunctionTable report them as truncated.
+    if os.fstat(f.fileno()).st_size == 0:
+      return FunctionTable(b"")
+    mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+  try:
+    return FunctionTable(mapped_file, mapped_file=mapped_file)
+  except BaseException:
+    mapped_file.close()
+    raise
+
+
+# A read-only, lazily-decoded view of serialized functions. Only the header is validated up front;
+# functions, strings, and annotation sets are decoded on first access and then cached, so opening a
+# large index is cheap regardless of its size.
+class FunctionTable(Sequence[parser_module.JoyFunction]):
+
+  def __init__(
+      self, data: bytes | bytearray | memoryview | mmap.mmap, mapped_file: mmap.mmap | None = None
+  ) -> None:
+    self._data = data
+    self._mapped_file = mapped_file
+
+    if len(data) < _HEADER.size:
+      raise InvalidFormatError("truncated header")
+    (
+        magic,
+        version,
+        flags,
+        self._string_count,
+        self._annotation_set_count,
+        self._annotation_ref_count,
+        self._function_count,
+        self._string_data_size,
+        self._annotation_span_count,
+        self._body_data_size,
+    ) = _HEADER.unpack_from(data, 0)
+
+    if magic != MAGIC:
+      raise InvalidFormatError(f"invalid magic number: {magic!r}")
+    if version != VERSION:
+      raise InvalidFormatError(f"unsupported version: {version} (expected {VERSION})")
+
+    self.has_spans = (flags & _FLAG_HAS_SPANS) != 0
+    self._has_bodies = (flags & _FLAG_HAS_BODIES) != 0
+    self._record = _FUNCTION_RECORD_WITH_BODY if self._has_bodies else _FUNCTION_RECORD
+    self._record_size = self._record.size + (_SPAN_RECORD.size if self.has_spans else 0)
+
+    offset = _HEADER.size
+    self._string_offsets_offset = offset
+    offset = _aligned(offset + (self._string_count + 1) * _U32.size)
+    self._string_data_offset = offset
+    offset = _aligned(offset + self._string_data_size)
+    self._annotation_set_offsets_offset = offset
+    offset = _aligned(offset + (self._annotation_set_count + 1) * _U32.size)
+    self._annotation_refs_offset = offset
+    offset = _aligned(offset + self._annotation_ref_count * _U32.size)
+    self._records_offset = offset
+    offset = _aligned(offset + self._function_count * self._record_size)
+    self._annotation_spans_offset = offset
+    offset += self._annotation_span_count * _SPAN.size
+    self._body_data_offset = offset
+    offset += self._body_data_size
+
+    if len(data) < offset:
+      raise InvalidFormatError(f"truncated data: expected {offset} bytes but got {len(data)}")
+
+    self._strings: list[str | None] = [None] * self._string_count
+    self._annotation_sets: list[tuple[str, ...] | None] = [None] * self._annotation_set_count
+    self._function_indices_by_name: dict[str, int] | None = None
+
+  def close(self) -> None:
+    if self._mapped_file is not None:
+      self._mapped_file.close()
+      self._mapped_file = None
+    self._data = b""
+
+  def __enter__(self) -> FunctionTable:
+    return self
+
+  def __exit__(self, *args: object) -> None:
+    self.close()
+
+  def __len__(self) -> int:
+    return self._function_count
+
+  @overload
+  def __getitem__(self, index: int) -> parser_module.JoyFunction:
+    ...
+
+  @overload
+  def __getitem__(self, index: slice) -> list[parser_module.JoyFunction]:
+    ...
+
+  def __getitem__(
+      self, index: int | slice
+  ) -> parser_module.JoyFunction | list[parser_module.JoyFunction]:
+    if isinstance(index, slice):
+      return [self._function(i) for i in range(*index.indices(self._function_count))]
+
+    if index < 0:
+      index += self._function_count
+    if not 0 <= index < self._function_count:
+      raise IndexError(f"function index out of range: {index}")
+    return self._function(index)
+
+  def __iter__(self) -> Iterator[parser_module.JoyFunction]:
+    for i in range(self._function_count):
+      yield self._function(i)
+
+  def name(self, index: int) -> str:
+    if not 0 <= index < self._function_count:
+      raise IndexError(f"function index out of range: {index}")
+    name_index = _U32.unpack_from(self._data, self._records_offset + index * self._record_size)[0]
+    return self._string(name_index)
+
+  def find(self, name: str) -> parser_module.JoyFunction | None:
+    # Build the name index on first use, decoding only the function names.
+    if self._function_indices_by_name is None:
+      self._function_indices_by_name = {
+          self.name(i): i for i in reversed(range(self._function_count))
+      }
+    index = self._function_indices_by_name.get(name)
+    return None if index is None else self._function(index)
+
+  def _function(self, index: int) -> parser_module.JoyFunction:
+    record_offset = self._records_offset + index * self._record_size
+    if self._has_bodies:
+      name_index, annotation_set_index, body_offset = _FUNCTION_RECORD_WITH_BODY.unpack_from(
+          self._data, record_offset
+      )
+      body, _ = self._terms(body_offset)
+    else:
+      name_index, annotation_set_index = _FUNCTION_RECORD.unpack_from(self._data, record_offset)
+      body = ()
+    annotations = self._annotation_set(annotation_set_index)
+    if not self.has_spans:
+      return parser_module.JoyFunction(
+          name=self._string(name_index), annotations=annotations, body=body
+      )
+
+    (
+        first_annotation_span_index,
+        start,
+        end,
+        start_byte,
+        end_byte,
+        body_start,
+        body_end,
+        body_start_byte,
+        body_end_byte,
+    ) = _SPAN_RECORD.unpack_from(self._data, record_offset + self._record.size)
+    if first_annotation_span_index + len(annotations) > self._annotation_span_count:
+      raise InvalidFormatError(f"invalid annotation span index: {first_annotation_span_index}")
+    annotation_spans = tuple(
+        self._annotation_span(first_annotation_span_index + i) for i in range(len(annotations))
+    )
+    return parser_module.JoyFunction(
+        name=self._string(name_index),
+        annotations=annotations,
+        body=body,
+        span=source_span_module.SourceSpan(
+            start=start, end=end, start_byte=start_byte, end_byte=end_byte
+        ),
+        annotation_spans=annotation_spans,
+        body_span=(
+            None
+            if body_start == _NO_SPAN
+            else source_span_module.SourceSpan(
+                start=body_start, end=body_end, start_byte=body_start_byte, end_byte=body_end_byte
+            )
+        ),
+    )
+
+  # Decodes the terms encoded at offset into the body data, nested in depth quotations, returning
+  # them and the offset just past them.
+  def _terms(self, offset: int, depth: int = 0) -> tuple[tuple[parser_module.Term, ...], int]:
+    term_count = self._body_u32(offset)
+    offset += _U32.size
+    terms: list[parser_module.Term] = []
+    for _ in range(term_count):
+      if offset >= self._body_data_size:
+        raise InvalidFormatError(f"truncated body data at offset {offset}")
+      tag = self._data[self._body_data_offset + offset : self._body_data_offset + offset + 1]
+      if tag == b"q":
+        if depth >= parser_module.MAX_QUOTATION_DEPTH:
+          raise InvalidFormatError(
+              f"quotations nested more than {parser_module.MAX_QUOTATION_DEPTH} deep at offset "
+              f"{offset} of the body data"
+          )
+        quotation_terms, offset = self._terms(offset + 1, depth + 1)
+        terms.append(parser_module.Quotation(terms=quotation_terms))
+      elif tag == b"t" or tag == b"f":
+        offset += 1
+        terms.append(parser_module.BooleanLiteral(value=tag == b"t"))
+      elif tag == b"w" or tag == b"i" or tag == b"s":
+        s = self._string(self._body_u32(offset + 1))
+        if tag == b"w":
+          terms.append(parser_module.Word(name=s))
+        elif tag == b"s":
+          terms.append(parser_module.StringLiteral(value=s))
+        else:
+          try:
+            terms.append(parser_module.IntegerLiteral(value=int(s)))
+          except ValueError as e:
+            raise InvalidFormatError(f"invalid integer at offset {offset} of the body data") from e
+        offset += 1 + _U32.size
+      else:
+        raise InvalidFormatError(f"invalid term tag at offset {offset}: {bytes(tag)!r}")
+    return tuple(terms), offset
+
+  def _body_u32(self, offset: int) -> int:
+    if offset + _U32.size > self._body_data_size:
+      raise InvalidFormatError(f"truncated body data at offset {offset}")
+    return _U32.unpack_from(self._data, self._body_data_offset + offset)[0]
+
+  def _string(self, index: int) -> str:
+    if index >= self._string_count:
+      raise InvalidFormatError(f"invalid string index: {index}")
+    s = self._strings[index]
+    if s is None:
+      offset = self._string_offsets_offset + index * _U32.size
+      start = _U32.unpack_from(self._data, offset)[0]
+      end = _U32.unpack_from(self._data, offset + _U32.size)[0]
+      if not start <= end <= self._string_data_size:
+        raise InvalidFormatError(f"invalid offsets of string {index}: {start}, {end}")
+      encoded = self._data[self._string_data_offset + start : self._string_data_offset + end]
+      s = bytes(encoded).decode("utf-8", errors="surrogateescape")
+      self._strings[index] = s
+    return s
+
+  def _annotation_set(self, index: int) -> tuple[str, ...]:
+    if index >= self._annotation_set_count:
+      raise InvalidFormatError(f"invalid annotation set index: {index}")
+    annotation_set = self._annotation_sets[index]
+    if annotation_set is None:
+      offset = self._annotation_set_offsets_offset + index * _U32.size
+      start = _U32.unpack_from(self._data, offset)[0]
+      end = _U32.unpack_from(self._data, offset + _U32.size)[0]
+      if not start <= end <= self._annotation_ref_count:
+        raise InvalidFormatError(f"invalid offsets of annotation set {index}: {start}, {end}")
+      annotation_set = tuple(
+          self._string(
+              _U32.unpack_from(self._data, self._annotation_refs_offset + i * _U32.size)[0]
+          )
+          for i in range(start, end)
+      )
+      self._annotation_sets[index] = annotation_set
+    return annotation_set
+
+  def _annotation_span(self, index: int) -> source_span_module.SourceSpan:
+    start, end, start_byte, end_byte = _SPAN.unpack_from(
+        self._data, self._annotation_spans_offset + index * _SPAN.size
+    )
+    return source_span_module.SourceSpan(
+        start=start, end=end, start_byte=start_byte, end_byte=end_byte
+    )
+
+
+class InvalidFormatError(ValueError):
+  pass
+
+
+def _aligned(offset: int) -> int:
+  return (offset + 7) & ~7
+
+
+def _padding(offset: int) -> int:
+  return _aligned(offset) - offset
@@ -0,0 +1,275 @@
+import io
+import os
+import pickle
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+import parameterized
+
+import binary_format as binary_format_module
+import parser as parser_module
+import source_reader as source_reader_module
+import source_span as source_span_module
+import tokenizer as tokenizer_module
+
+FunctionTable = binary_format_module.FunctionTable
+InvalidFormatError = binary_format_module.InvalidFormatError
+JoyFunction = parser_module.JoyFunction
+SourceSpan = source_span_module.SourceSpan
+Word = parser_module.Word
+
+
+class BinaryFormatTest(absltest.TestCase):
+
+  def test_round_trip_without_spans(self):
+    functions = [
+        JoyFunction(name="aaa", annotations=("main",)),
+        JoyFunction(name="bbb", annotations=()),
+        JoyFunction(name="ccc", annotations=("main", "test")),
+        JoyFunction(name="déf", annotations=("main",)),
+    ]
+
+    function_table = binary_format_module.loads(binary_format_module.dumps(functions))
+
+    self.assertFalse(function_table.has_spans)
+    self.assertEqual(functions, list(function_table))
+    self.assertIsNone(function_table[0].span)
+
+  def test_round_trip_with_spans(self):
+    functions = self.parse(
+        """
+          @main @test function aaa { 1 "é" dup }
+          function bbb
+          @test /* é */ function ccc { }
+        """
+    )
+
+    function_table = binary_format_module.loads(
+        binary_format_module.dumps(functions, include_spans=True)
+    )
+
+    self.assertTrue(function_table.has_spans)
+    self.assertEqual(functions, list(function_table))
+    for attribute in ("span", "annotation_spans", "body_span"):
+      self.assertEqual(
+          [getattr(function, attribute) for function in functions],
+          [getattr(function, attribute) for function in function_table],
+      )
+    self.assertIsNone(function_table[1].body_span)
+
+  @parameterized.parameterized.expand([
+      ("without_spans", False),
+      ("with_spans", True),
+  ])
+  def test_round_trip_of_bodies(self, _, include_spans: bool):
+    functions = self.parse(
+        """
+          function aaa { 1 -2 12345678901234567890 "a\\"b" "" true false dup + aaa }
+          function bbb { [] [1 [2 [bbb "c"]] true] [] }
+          function ccc
+          function ddd { }
+        """
+    )
+
+    function_table = binary_format_module.loads(
+        binary_format_module.dumps(functions, include_spans=include_spans)
+    )
+
+    self.assertEqual(functions, list(function_table))
+    self.assertEqual([function.body for function in functions], [f.body for f in function_table])
+
+  def test_identical_bodies_are_stored_once(self):
+    one_function = binary_format_module.dumps(self.parse("function a { 1 [dup] + }"))
+    two_functions = binary_format_module.dumps(
+        self.parse("function a { 1 [dup] + } function b { 1 [dup] + }")
+    )
+
+    # The second function adds only its record, its name, and its name's offset.
+    self.assertLessEqual(len(two_functions) - len(one_function), 24)
+
+  def test_round_trip_of_empty_list(self):
+    function_table = binary_format_module.loads(binary_format_module.dumps([]))
+
+    self.assertEqual(0, len(function_table))
+    self.assertEqual([], list(function_table))
+
+  def test_dumps_with_spans_raises_if_span_is_missing(self):
+    with self.assertRaises(ValueError):
+      binary_format_module.dumps([JoyFunction(name="aaa", annotations=())], include_spans=True)
+
+  def test_strings_and_annotation_sets_are_stored_once(self):
+    one_function = binary_format_module.dumps([JoyFunction(name="a", annotations=("main", "test"))])
+    two_functions = binary_format_module.dumps([
+        JoyFunction(name="a", annotations=("main", "test")),
+        JoyFunction(name="b", annotations=("main", "test")),
+    ])
+
+    # The second function adds only its record, its name, and its name's offset.
+    self.assertLessEqual(len(two_functions) - len(one_function), 16)
+
+  def test_is_not_larger_than_pickle(self):
+    functions = [
+        JoyFunction(name=f"function{i}", annotations=("main", "test") if i % 2 else ())
+        for i in range(1000)
+    ]
+
+    self.assertLess(len(binary_format_module.dumps(functions)), len(pickle.dumps(functions)))
+
+  def test_getitem(self):
+    functions = [JoyFunction(name=name, annotations=()) for name in ("aaa", "bbb", "ccc")]
+    function_table = binary_format_module.loads(binary_format_module.dumps(functions))
+
+    self.assertEqual(functions[1], function_table[1])
+    self.assertEqual(functions[2], function_table[-1])
+    self.assertEqual(functions[1:], function_table[1:])
+    with self.assertRaises(IndexError):
+      function_table[3]
+
+  def test_name(self):
+    functions = [JoyFunction(name=name, annotations=()) for name in ("aaa", "bbb")]
+    function_table = binary_format_module.loads(binary_format_module.dumps(functions))
+
+    self.assertEqual("bbb", function_table.name(1))
+    with self.assertRaises(IndexError):
+      function_table.name(2)
+
+  def test_find(self):
+    functions = [JoyFunction(name=name, annotations=("main",)) for name in ("aaa", "bbb")]
+    function_table = binary_format_module.loads(binary_format_module.dumps(functions))
+
+    self.assertEqual(functions[1], function_table.find("bbb"))
+    self.assertIsNone(function_table.find("ccc"))
+
+  def test_decoded_annotations_are_shared(self):
+    functions = [
+        JoyFunction(name="aaa", annotations=("main", "test")),
+        JoyFunction(name="bbb", annotations=("main", "test")),
+    ]
+    function_table = binary_format_module.loads(binary_format_module.dumps(functions))
+
+    self.assertIs(function_table[0].annotations, function_table[1].annotations)
+
+  @parameterized.parameterized.expand([
+      ("empty", b""),
+      ("truncated_header", b"JOYF\x01\x00"),
+  ])
+  def test_loads_raises_on_truncated_data(self, _, data: bytes):
+    with self.assertRaises(InvalidFormatError):
+      binary_format_module.loads(data)
+
+  def test_loads_raises_on_truncated_body(self):
+    data = binary_format_module.dumps([JoyFunction(name="aaa", annotations=())])
+
+    with self.assertRaises(InvalidFormatError):
+      binary_format_module.loads(data[:-1])
+
+  def test_loads_raises_on_invalid_term_tag(self):
+    data = binary_format_module.dumps([JoyFunction(name="aaa", annotations=(), body=(Word("b"),))])
+
+    # The body is the last section: a term count, then the tag and string index of the word.
+    function_table = binary_format_module.loads(data[:-5] + b"x" + data[-4:])
+
+    with self.assertRaises(InvalidFormatError):
+      function_table[0]
+
+  def test_dumps_raises_on_quotations_nested_too_deeply(self):
+    body: tuple[parser_module.Term, ...] = ()
+    for _ in range(parser_module.MAX_QUOTATION_DEPTH + 1):
+      body = (parser_module.Quotation(body),)
+
+    with self.assertRaises(ValueError):
+      binary_format_module.dumps([JoyFunction(name="aaa", annotations=(), body=body)])
+
+  def test_loads_raises_on_quotations_nested_too_deeply(self):
+    depth = parser_module.MAX_QUOTATION_DEPTH
+    body: tuple[parser_module.Term, ...] = ()
+    for _ in range(depth + 1):
+      body = (parser_module.Quotation(body),)
+    with mock.patch.object(parser_module, "MAX_QUOTATION_DEPTH", depth + 1):
+      data = binary_format_module.dumps([JoyFunction(name="aaa", annotations=(), body=body)])
+
+    function_table = binary_format_module.loads(data)
+
+    # The body is a term count, then a tag and a term count for each quotation.
+    with self.assertRaisesRegex(InvalidFormatError, f"at offset {4 + depth * 5} "):
+      function_table[0]
+
+  def test_loads_raises_on_invalid_magic(self):
+    data = binary_format_module.dumps([])
+
+    with self.assertRaises(InvalidFormatError) as assert_raises_context:
+      binary_format_module.loads(b"XXXX" + data[4:])
+
+    self.assertIn("magic", str(assert_raises_context.exception))
+
+  def test_loads_raises_on_unsupported_version(self):
+    data = binary_format_module.dumps([])
+
+    with self.assertRaises(InvalidFormatError) as assert_raises_context:
+      binary_format_module.loads(data[:4] + b"\x63\x00" + data[6:])
+
+    self.assertIn("version", str(assert_raises_context.exception))
+
+  def test_dump_and_load(self):
+    functions = self.parse("@main function aaa function bbb")
+    path = os.path.join(self.enter_context(tempfile.TemporaryDirectory()), "index.joyf")
+    with open(path, "wb") as f:
+      binary_format_module.dump(functions, f, include_spans=True)
+
+    with binary_format_module.load(path) as function_table:
+      self.assertEqual(functions, list(function_table))
+      self.assertEqual(functions[0].span, function_table[0].span)
+
+  def test_load_empty_file_raises(self):
+    path = os.path.join(self.enter_context(tempfile.TemporaryDirectory()), "index.joyf")
+    with open(path, "wb"):
+      pass
+
+    with self.assertRaises(InvalidFormatError):
+      binary_format_module.load(path)
+
+  def test_load_truncated_file_raises(self):
+    functions = self.parse('@main function aaa { 1 "b" [c] } function ddd { e }')
+    data = binary_format_module.dumps(functions, include_spans=True)
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+
+    for size in range(len(data)):
+      path = os.path.join(directory, f"index{size}.joyf")
+      with open(path, "wb") as f:
+        f.write(data[:size])
+
+      with self.subTest(size=size), self.assertRaises(InvalidFormatError):
+        binary_format_module.load(path)
+
+  @parameterized.parameterized.expand([
+      ("without_spans", False),
+      ("with_spans", True),
+  ])
+  def test_corrupt_data_raises_invalid_format_error(self, _, include_spans: bool):
+    functions = self.parse('@main @t function aaa { 1 "b" [c true] } function ddd @t function eee')
+    data = binary_format_module.dumps(functions, include_spans=include_spans)
+
+    for i in range(len(data)):
+      for value in (0x00, 0x01, 0x7F, 0xFF):
+        corrupt_data = data[:i] + bytes([value]) + data[i + 1 :]
+        with self.subTest(index=i, value=value):
+          try:
+            function_table = binary_format_module.loads(corrupt_data)
+            list(function_table)
+            for j in range(len(function_table)):
+              function_table.name(j)
+            function_table.find("aaa")
+          except InvalidFormatError:
+            pass
+
+  def parse(self, text: str) -> list[JoyFunction]:
+    parser = parser_module.Parser(
+        tokenizer_module.Tokenizer(source_reader_module.SourceReader(io.StringIO(text)))
+    )
+    parser.parse()
+    return parser.functions
+
+
+if __name__ == "__main__":
+  absltest.main()
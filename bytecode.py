@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import array
+from collections.abc import Iterable
+import dataclasses
+
+import function_annotations as function_annotations_module
+import joy_runtime as joy_runtime_module
+import parser as parser_module
+
+Quotation = joy_runtime_module.Quotation
+Value = joy_runtime_module.Value
+
+# Each instruction is a pair of integers, an opcode and an operand, stored consecutively in an
+# array. The meaning of the operand depends on the opcode.
+PUSH_CONSTANT = 0  # operand: index into Code.constants
+CALL_BUILTIN = 1  # operand: index into joy_runtime.BUILTINS
+CALL_FUNCTION = 2  # operand: index into Program.codes
+CALL_CACHED_FUNCTION = 3  # operand: index into Program.codes and Program.function_caches
+
+_OPCODE_NAMES = {
+    PUSH_CONSTANT: "PUSH_CONSTANT",
+    CALL_BUILTIN: "CALL_BUILTIN",
+    CALL_FUNCTION: "CALL_FUNCTION",
+    CALL_CACHED_FUNCTION: "CALL_CACHED_FUNCTION",
+}
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Code:
+  instructions: array.array[int]
+  constants: tuple[Value, ...]
+
+  def disassemble(self) -> list[str]:
+    lines = []
+    for pc in range(0, len(self.instructions), 2):
+      opcode, operand = self.instructions[pc], self.instructions[pc + 1]
+      if opcode == PUSH_CONSTANT:
+        argument = joy_runtime_module.format_value(self.constants[operand])
+      elif opcode == CALL_BUILTIN:
+        argument = joy_runtime_module.BUILTINS[operand].name
+      else:
+        argument = str(operand)
+      lines.append(f"{pc // 2:4} {_OPCODE_NAMES[opcode]} {argument}")
+    return lines
+
+
+# A set of functions compiled to bytecode and linked together: every word is resolved, at compile
+# time, to the index of either a function in this program or a built-in, so that no names are
+# looked up when the code runs. Words defined by the program take precedence over built-ins.
+#
+# The functions' annotations are applied first (see function_annotations.apply()): calls to @inline
+# functions are compiled as their bodies, and calls to @pure and @memoize functions go through the
+# function's cache.
+class Program:
+
+  def __init__(self, functions: Iterable[parser_module.JoyFunction]) -> None:
+    functions = tuple(functions)
+    self.function_indices: dict[str, int] = {}
+    for function in functions:
+      if function.name in self.function_indices:
+        raise self.LinkError(f"function defined more than once: {function.name}")
+      self.function_indices[function.name] = len(self.function_indices)
+
+    self.functions = functions
+    annotated_functions = function_annotations_module.apply(functions)
+    self.function_caches: dict[int, function_annotations_module.FunctionCache] = {
+        self.function_indices[name]: function_annotations_module.FunctionCache(name, stack_effect)
+        for name, stack_effect in annotated_functions.cached_stack_effects.items()
+    }
+    self.codes: list[Code] = []
+    for function in annotated_functions.functions:
+      try:
+        self.codes.append(self._compile_terms(function.body))
+      except self.LinkError as e:
+        raise self.LinkError(f"in function {function.name}: {e}") from None
+
+  def code_for_quotation(self, quotation: Quotation) -> Code:
+    # Quotations that appear in the source are compiled along with the function that contains
+    # them; quotations constructed at runtime (e.g. by cons) are compiled on first execution.
+    compiled = quotation.compiled
+    if type(compiled) is _CompiledQuotation and compiled.program is self:
+      return compiled.code
+    code = self._compile_values(quotation.items)
+    quotation.compiled = _CompiledQuotation(program=self, code=code)
+    return code
+
+  def _compile_terms(self, terms: Iterable[parser_module.Term]) -> Code:
+    return self._compile_values(joy_runtime_module.value_from_term(term) for term in terms)
+
+  def _compile_values(self, values: Iterable[Value]) -> Code:
+    instructions = array.array("l")
+    constants: list[Value] = []
+    constant_indices: dict[tuple[type, Value], int] = {}
+
+    for value in values:
+      if isinstance(value, parser_module.Word):
+        function_index = self.function_indices.get(value.name)
+        if function_index is not None:
+          if function_index in self.function_caches:
+            instructions.extend((CALL_CACHED_FUNCTION, function_index))
+          else:
+            instructions.extend((CALL_FUNCTION, function_index))
+          continue
+        builtin_index = joy_runtime_module.BUILTIN_INDICES.get(value.name)
+        if builtin_index is not None:
+          instructions.extend((CALL_BUILTIN, builtin_index))
+          continue
+        raise self.LinkError(f"undefined word: {value.name}")
+
+      if isinstance(value, Quotation):
+        try:
+          self.code_for_quotation(value)
+        except self.LinkError:
+          # The quotation may only ever be used as data (e.g. a list of symbols), so report its
+          # undefined words only if it is executed.
+          pass
+        constant_index = len(constants)
+        constants.append(value)
+      else:
+        # Deduplicate constants by type as well as value, since Python considers True == 1.
+        constant_index = constant_indices.setdefault((type(value), value), len(constants))
+        if constant_index == len(constants):
+          constants.append(value)
+      instructions.extend((PUSH_CONSTANT, constant_index))
+
+    return Code(instructions=instructions, constants=tuple(constants))
+
+  class LinkError(Exception):
+    pass
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class _CompiledQuotation:
+  program: Program
+  code: Code
+
+
+class VirtualMachine:
+
+  def __init__(self, program: Program, stack: Iterable[Value] = ()) -> None:
+    self.program = program
+    self.stack: list[Value] = list(stack)
+    # The dispatch table for CALL_BUILTIN, indexed by operand.
+    self._builtin_functions = tuple(builtin.function for builtin in joy_runtime_module.BUILTINS)
+
+  def run(self, function_name: str) -> list[Value]:
+    function_index = self.program.function_indices.get(function_name)
+    if function_index is None:
+      raise joy_runtime_module.JoyRuntimeError(f"undefined function: {function_name}")
+    if function_index in self.program.function_caches:
+      self._call_cached_function(function_index)
+    else:
+      self._run(self.program.codes[function_index])
+    return self.stack
+
+  def execute(self, quotation: Quotation) -> None:
+    self._run(self.program.code_for_quotation(quotation))
+
+  def _run(self, code: Code) -> None:
+    instructions = code.instructions
+    constants = code.constants
+    stack = self.stack
+    builtin_functions = self._builtin_functions
+    codes = self.program.codes
+
+    pc = 0
+    instruction_count = len(instructions)
+    while pc < instruction_count:
+      opcode = instructions[pc]
+      operand = instructions[pc + 1]
+      pc += 2
+      if opcode == CALL_BUILTIN:
+        builtin_functions[operand](self)
+      elif opcode == PUSH_CONSTANT:
+        stack.append(constants[operand])
+      elif opcode == CALL_FUNCTION:
+        self._run(codes[operand])
+      else:
+        self._call_cached_function(operand)
+
+  def _call_cached_function(self, function_index: int) -> None:
+    code = self.program.codes[function_index]
+    self.program.function_caches[function_index].call(self, lambda machine: self._run(code))
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import io
+import timeit
+
+import bytecode as bytecode_module
+import parser as parser_module
+import python_backend as python_backend_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+# Classic Joy programs, used to measure the speed of the execution backends.
+BENCHMARK_SOURCE = """
+  function factorial { [0 =] [pop 1] [dup 1 - factorial *] ifte }
+  function factorial_linrec { [null] [succ] [dup pred] [*] linrec }
+  function factorial_primrec { [1] [*] primrec }
+  function fib { [2 <] [] [dup 1 - fib swap 2 - fib +] ifte }
+  function fib_binrec { [small] [] [pred dup pred] [+] binrec }
+  function range { [0 =] [pop []] [dup 1 - range swap [] cons concat] ifte }
+  function squares { range [dup *] map }
+  function sum { range 0 [+] fold }
+  function sum_of_even_squares { range [2 rem 0 =] filter [dup *] map 0 [+] fold }
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkCase:
+  function_name: str
+  argument: int
+  expected_result: object
+
+
+BENCHMARK_CASES = (
+    BenchmarkCase("factorial", 20, 2432902008176640000),
+    BenchmarkCase("factorial_linrec", 20, 2432902008176640000),
+    BenchmarkCase("factorial_primrec", 20, 2432902008176640000),
+    BenchmarkCase("fib", 15, 610),
+    BenchmarkCase("fib_binrec", 15, 610),
+    BenchmarkCase("squares", 200, None),
+    BenchmarkCase("sum", 200, 20100),
+    BenchmarkCase("sum_of_even_squares", 200, 1353400),
+)
+
+
+def parse_benchmark_functions() -> list[parser_module.JoyFunction]:
+  parser = parser_module.Parser(
+      tokenizer_module.Tokenizer(source_reader_module.SourceReader(io.StringIO(BENCHMARK_SOURCE)))
+  )
+  parser.parse()
+  return parser.functions
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description="Measures the speed of the execution backends on classic Joy programs."
+  )
+  arg_parser.add_argument("--repeat", type=int, default=5)
+  arg_parser.add_argument("--number", type=int, default=20)
+  args = arg_parser.parse_args()
+
+  functions = parse_benchmark_functions()
+  bytecode_program = bytecode_module.Program(functions)
+  python_program = python_backend_module.Program(functions)
+
+  print(f"{'':28} {'bytecode':>15} {'python':>15}")
+  for case in BENCHMARK_CASES:
+
+    def run_bytecode() -> list[bytecode_module.Value]:
+      return bytecode_module.VirtualMachine(bytecode_program, [case.argument]).run(
+          case.function_name
+      )
+
+    def run_python() -> list[bytecode_module.Value]:
+      return python_backend_module.PythonMachine(python_program, [case.argument]).run(
+          case.function_name
+      )
+
+    timings = []
+    for run_case in (run_bytecode, run_python):
+      result = run_case()
+      if case.expected_result is not None and result != [case.expected_result]:
+        raise AssertionError(f"{case.function_name}: expected {case.expected_result} got {result}")
+      seconds = min(timeit.repeat(run_case, repeat=args.repeat, number=args.number)) / args.number
+      timings.append(f"{seconds * 1e6:12.1f} us")
+    print(f"{case.function_name + f'({case.argument})':28} {' '.join(timings)}")
+
+
+if __name__ == "__main__":
+  main()
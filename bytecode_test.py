@@ -0,0 +1,181 @@
+from absl.testing import absltest
+
+import bytecode as bytecode_module
+import bytecode_benchmark
+import joy_runtime as joy_runtime_module
+import parser as parser_module
+
+Program = bytecode_module.Program
+Quotation = joy_runtime_module.Quotation
+VirtualMachine = bytecode_module.VirtualMachine
+
+
+def create_program(text: str) -> Program:
+  return Program(parser_module.parse_text(text))
+
+
+class ProgramTest(absltest.TestCase):
+
+  def test_compile_resolves_words_to_indices(self):
+    program = create_program("function aaa { 1 bbb dup } function bbb { aaa }")
+
+    self.assertEqual({"aaa": 0, "bbb": 1}, program.function_indices)
+    self.assertEqual(
+        [
+            bytecode_module.PUSH_CONSTANT,
+            0,
+            bytecode_module.CALL_FUNCTION,
+            1,
+            bytecode_module.CALL_BUILTIN,
+            joy_runtime_module.BUILTIN_INDICES["dup"],
+        ],
+        list(program.codes[0].instructions),
+    )
+    self.assertEqual((1,), program.codes[0].constants)
+
+  def test_compile_deduplicates_constants(self):
+    program = create_program('function aaa { 1 "a" 1 true "a" }')
+
+    self.assertEqual((1, "a", True), program.codes[0].constants)
+
+  def test_compile_precompiles_quotations(self):
+    program = create_program("function aaa { [1 [dup]] }")
+
+    quotation = program.codes[0].constants[0]
+    assert isinstance(quotation, Quotation)
+    inner_quotation = quotation.items[1]
+    assert isinstance(inner_quotation, Quotation)
+    self.assertIsNotNone(quotation.compiled)
+    self.assertIsNotNone(inner_quotation.compiled)
+
+  def test_function_shadows_builtin(self):
+    program = create_program("function dup { 42 } function aaa { dup }")
+
+    self.assertEqual([42], VirtualMachine(program).run("aaa"))
+
+  def test_compile_raises_on_undefined_word(self):
+    with self.assertRaises(Program.LinkError) as assert_raises_context:
+      create_program("function aaa { 1 bbb }")
+
+    self.assertIn("aaa", str(assert_raises_context.exception))
+    self.assertIn("bbb", str(assert_raises_context.exception))
+
+  def test_compile_raises_on_duplicate_function(self):
+    functions = [
+        parser_module.JoyFunction(name="aaa", annotations=()),
+        parser_module.JoyFunction(name="aaa", annotations=()),
+    ]
+
+    with self.assertRaises(Program.LinkError):
+      Program(functions)
+
+  def test_compile_allows_undefined_words_in_quotations(self):
+    program = create_program("function aaa { [bbb ccc] size }")
+
+    self.assertEqual([2], VirtualMachine(program).run("aaa"))
+
+  def test_compile_inlines_inline_functions(self):
+    program = create_program("@inline function square { dup * } function aaa { square }")
+
+    self.assertEqual(
+        [
+            bytecode_module.CALL_BUILTIN,
+            joy_runtime_module.BUILTIN_INDICES["dup"],
+            bytecode_module.CALL_BUILTIN,
+            joy_runtime_module.BUILTIN_INDICES["*"],
+        ],
+        list(program.codes[1].instructions),
+    )
+
+  def test_compile_calls_memoized_functions_through_cache(self):
+    program = create_program("@memoize function square { dup * } function aaa { square }")
+
+    self.assertEqual([bytecode_module.CALL_CACHED_FUNCTION, 0], list(program.codes[1].instructions))
+    self.assertEqual([0], list(program.function_caches))
+
+  def test_disassemble(self):
+    program = create_program("function aaa { 1 [x] bbb dup } function bbb")
+
+    self.assertEqual(
+        [
+            "   0 PUSH_CONSTANT 1",
+            "   1 PUSH_CONSTANT [x]",
+            "   2 CALL_FUNCTION 1",
+            "   3 CALL_BUILTIN dup",
+        ],
+        program.codes[0].disassemble(),
+    )
+
+
+class VirtualMachineTest(absltest.TestCase):
+
+  def test_run(self):
+    program = create_program("function square { dup * } function main { 3 square square }")
+
+    self.assertEqual([81], VirtualMachine(program).run("main"))
+
+  def test_run_with_initial_stack(self):
+    program = create_program("function add { + }")
+
+    self.assertEqual([5], VirtualMachine(program, [2, 3]).run("add"))
+
+  def test_run_function_without_body(self):
+    program = create_program("function nothing")
+
+    self.assertEqual([1], VirtualMachine(program, [1]).run("nothing"))
+
+  def test_run_undefined_function_raises(self):
+    program = create_program("function aaa")
+
+    with self.assertRaises(joy_runtime_module.JoyRuntimeError):
+      VirtualMachine(program).run("bbb")
+
+  def test_execute_runtime_constructed_quotation(self):
+    program = create_program("function double { 2 * } function main { 5 [double] [1 +] concat i }")
+
+    self.assertEqual([11], VirtualMachine(program).run("main"))
+
+  def test_execute_runtime_quotation_with_undefined_word_raises(self):
+    program = create_program("function main { [1 undefined] i }")
+
+    with self.assertRaises(Program.LinkError):
+      VirtualMachine(program).run("main")
+
+  def test_quotations_as_data(self):
+    program = create_program("function main { [dup *] first [1 2] rest }")
+
+    self.assertEqual(
+        [parser_module.Word("dup"), Quotation([2])], VirtualMachine(program).run("main")
+    )
+
+  def test_stack_underflow_raises(self):
+    program = create_program("function main { 1 + }")
+
+    with self.assertRaises(joy_runtime_module.StackUnderflowError):
+      VirtualMachine(program).run("main")
+
+  def test_run_memoized_function(self):
+    program = create_program("@memoize function fib { [2 <] [] [dup 1 - fib swap 2 - fib +] ifte }")
+
+    self.assertEqual([23416728348467685], VirtualMachine(program, [80]).run("fib"))
+    self.assertEqual(81, program.function_caches[0].misses)
+    self.assertEqual([23416728348467685], VirtualMachine(program, [80]).run("fib"))
+    self.assertEqual(81, program.function_caches[0].misses)
+
+  def test_benchmark_programs(self):
+    program = Program(bytecode_benchmark.parse_benchmark_functions())
+
+    for case in bytecode_benchmark.BENCHMARK_CASES:
+      with self.subTest(function_name=case.function_name):
+        result = VirtualMachine(program, [case.argument]).run(case.function_name)
+        if case.expected_result is not None:
+          self.assertEqual([case.expected_result], result)
+
+  def test_squares(self):
+    program = Program(bytecode_benchmark.parse_benchmark_functions())
+
+    self.assertEqual([Quotation([1, 4, 9, 16])], VirtualMachine(program, [4]).run("squares"))
+
+
+if __name__ == "__main__":
+  absltest.main()
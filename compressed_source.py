@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import bz2
+import enum
+import gzip
+import io
+import lzma
+import os
+from typing import TextIO, cast
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# The errors raised when a compressed source is corrupt or truncated, in addition to the
+# UnicodeDecodeError of any source that is not valid text.
+DECOMPRESSION_ERRORS = (OSError, EOFError, lzma.LZMAError)
+
+
+@enum.unique
+class Compression(enum.Enum):
+  GZIP = "gzip"
+  BZIP2 = "bzip2"
+  XZ = "xz"
+
+
+_MAGIC_NUMBERS = (
+    (b"\x1f\x8b", Compression.GZIP),
+    (b"BZh", Compression.BZIP2),
+    (b"\xfd7zXZ\x00", Compression.XZ),
+)
+_MAGIC_NUMBER_LENGTH = max(len(magic_number) for magic_number, _ in _MAGIC_NUMBERS)
+
+
+# Returns the compression of a file that starts with prefix, or None if it is not compressed.
+def detect_compression(prefix: bytes) -> Compression | None:
+  for magic_number, compression in _MAGIC_NUMBERS:
+    if prefix.startswith(magic_number):
+      return compression
+  return None
+
+
+# Opens a Joy source file for a SourceReader, decompressing it on the fly if it is gzip-, bzip2- or
+# xz-compressed, as detected from its first bytes rather than its name. The decompressed text is
+# never held in memory or on disk as a whole: each read by the reader decompresses about
+# chunk_size more bytes. Newlines are not translated, so that the byte offsets of spans match the
+# decompressed source.
+def open_source(
+    path: str | os.PathLike[str], encoding: str = "utf-8", chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> TextIO:
+  if chunk_size <= 0:
+    raise ValueError(f"invalid chunk size: {chunk_size}")
+
+  with open(path, "rb") as f:
+    compression = detect_compression(f.read(_MAGIC_NUMBER_LENGTH))
+  if compression is None:
+    return open(path, "rt", encoding=encoding, newline="", buffering=chunk_size)
+
+  # The decompressor is read through a buffer of chunk_size bytes: TextIOWrapper asks for only 8 KiB
+  # at a time, and larger chunks amortize the per-call overhead of the decompressor.
+  binary_stream = io.BufferedReader(
+      cast(io.RawIOBase, _open_decompressor(path, compression)), buffer_size=chunk_size
+  )
+  return io.TextIOWrapper(binary_stream, encoding=encoding, newline="")
+
+
+def _open_decompressor(path: str | os.PathLike[str], compression: Compression) -> io.BufferedIOBase:
+  if compression == Compression.GZIP:
+    return gzip.GzipFile(path, "rb")
+  elif compression == Compression.BZIP2:
+    return bz2.BZ2File(path, "rb")
+  else:
+    return lzma.LZMAFile(path, "rb")
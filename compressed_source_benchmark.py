@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import argparse
+import bz2
+from collections.abc import Callable
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+import timeit
+from typing import BinaryIO
+
+import compressed_source as compressed_source_module
+import corpus_generator as corpus_generator_module
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+_BUFFER_SIZE = 65536
+
+_COMPRESSORS: dict[str, Callable[[str], BinaryIO]] = {
+    "gzip": lambda path: gzip.open(path, "wb"),
+    "bzip2": lambda path: bz2.open(path, "wb"),
+    "xz": lambda path: lzma.open(path, "wb"),
+}
+_DECOMPRESSORS: dict[str, Callable[[str], BinaryIO]] = {
+    "gzip": lambda path: gzip.open(path, "rb"),
+    "bzip2": lambda path: bz2.open(path, "rb"),
+    "xz": lambda path: lzma.open(path, "rb"),
+}
+
+
+def _parse_file(path: str, chunk_size: int) -> int:
+  with compressed_source_module.open_source(path, chunk_size=chunk_size) as f:
+    parser = parser_module.Parser(
+        tokenizer_module.Tokenizer(source_reader_module.SourceReader(f, buffer_size=_BUFFER_SIZE))
+    )
+    parser.parse()
+  return len(parser.functions)
+
+
+# The approach that open_source() replaces: decompress the whole source to a temporary file, then
+# parse that.
+def _decompress_then_parse(
+    path: str, decompress: Callable[[str], BinaryIO], chunk_size: int
+) -> int:
+  with tempfile.TemporaryDirectory() as directory:
+    temporary_path = os.path.join(directory, "source.joy")
+    with decompress(path) as f, open(temporary_path, "wb") as temporary_file:
+      shutil.copyfileobj(f, temporary_file, chunk_size)
+    return _parse_file(temporary_path, chunk_size)
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description=(
+          "Compares parsing compressed sources directly with decompressing them to a temporary"
+          " file first."
+      )
+  )
+  arg_parser.add_argument(
+      "--size",
+      type=corpus_generator_module._parse_size,
+      default=8 << 20,
+      help="the size of the uncompressed corpus, e.g. 8M",
+  )
+  arg_parser.add_argument("--repeat", type=int, default=3)
+  arg_parser.add_argument(
+      "--chunk-size", type=int, default=compressed_source_module.DEFAULT_CHUNK_SIZE
+  )
+  args = arg_parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as directory:
+    source_path = os.path.join(directory, "corpus.joy")
+    with open(source_path, "wb") as f:
+      size = corpus_generator_module.write(f, corpus_generator_module.CorpusOptions(size=args.size))
+
+    def measure(function: Callable[[], int]) -> float:
+      return min(timeit.repeat(function, repeat=args.repeat, number=1))
+
+    print(f"{size / 1e6:.1f} MB of source")
+    print(f"{'':8} {'compressed MB':>14} {'direct MB/s':>12} {'via file MB/s':>14}")
+    seconds = measure(lambda: _parse_file(source_path, args.chunk_size))
+    print(f"{'none':8} {size / 1e6:14.1f} {size / seconds / 1e6:12.2f} {'':>14}")
+
+    for name, compress in _COMPRESSORS.items():
+      compressed_path = f"{source_path}.{name}"
+      with open(source_path, "rb") as source_file, compress(compressed_path) as compressed_file:
+        shutil.copyfileobj(source_file, compressed_file)
+
+      direct_seconds = measure(lambda: _parse_file(compressed_path, args.chunk_size))
+      via_file_seconds = measure(
+          lambda: _decompress_then_parse(compressed_path, _DECOMPRESSORS[name], args.chunk_size)
+      )
+      print(
+          f"{name:8} {os.path.getsize(compressed_path) / 1e6:14.1f}"
+          f" {size / direct_seconds / 1e6:12.2f} {size / via_file_seconds / 1e6:14.2f}"
+      )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,113 @@
+import bz2
+from collections.abc import Callable
+import gzip
+import lzma
+import os
+import tempfile
+
+from absl.testing import absltest
+import parameterized
+
+import compressed_source as compressed_source_module
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+Compression = compressed_source_module.Compression
+
+_COMPRESSORS: list[tuple[str, Callable[[bytes], bytes]]] = [
+    ("uncompressed", lambda data: data),
+    ("gzip", gzip.compress),
+    ("bzip2", bz2.compress),
+    ("xz", lzma.compress),
+]
+
+
+def parse(
+    path: str, chunk_size: int = compressed_source_module.DEFAULT_CHUNK_SIZE
+) -> list[parser_module.JoyFunction]:
+  with compressed_source_module.open_source(path, chunk_size=chunk_size) as f:
+    parser = parser_module.Parser(
+        tokenizer_module.Tokenizer(source_reader_module.SourceReader(f, buffer_size=16))
+    )
+    parser.parse()
+  return parser.functions
+
+
+class CompressedSourceTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.directory = self.enter_context(tempfile.TemporaryDirectory())
+
+  @parameterized.parameterized.expand(_COMPRESSORS)
+  def test_parse(self, _, compress: Callable[[bytes], bytes]):
+    text = "".join(f'@main function f{i} {{ "é\\n中" {i} }}\r\n' for i in range(1000))
+    path = self.write_file("source", compress(text.encode("utf-8")))
+
+    # A small chunk size splits multibyte characters between chunks.
+    functions = parse(path, chunk_size=7)
+
+    self.assertEqual(
+        [
+            parser_module.JoyFunction(
+                name=f"f{i}",
+                annotations=("main",),
+                body=(parser_module.StringLiteral("é\n中"), parser_module.IntegerLiteral(i)),
+            )
+            for i in range(1000)
+        ],
+        functions,
+    )
+    # Spans are offsets into the decompressed source, whose newlines are not translated.
+    last_span = functions[-1].span
+    self.assertEqual(text.rindex("function"), last_span.start)
+    self.assertEqual(len(text[: last_span.start].encode("utf-8")), last_span.start_byte)
+
+  @parameterized.parameterized.expand(_COMPRESSORS)
+  def test_empty_source(self, _, compress: Callable[[bytes], bytes]):
+    path = self.write_file("source", compress(b""))
+
+    self.assertEqual([], parse(path))
+
+  @parameterized.parameterized.expand(_COMPRESSORS[1:])
+  def test_truncated_source(self, _, compress: Callable[[bytes], bytes]):
+    data = compress(b"function aaa { 1 }" * 100)
+    path = self.write_file("source", data[: len(data) // 2])
+
+    with self.assertRaises(compressed_source_module.DECOMPRESSION_ERRORS):
+      parse(path)
+
+  def test_detect_compression(self):
+    self.assertEqual(
+        Compression.GZIP, compressed_source_module.detect_compression(gzip.compress(b""))
+    )
+    self.assertEqual(
+        Compression.BZIP2, compressed_source_module.detect_compression(bz2.compress(b""))
+    )
+    self.assertEqual(
+        Compression.XZ, compressed_source_module.detect_compression(lzma.compress(b""))
+    )
+    self.assertIsNone(compressed_source_module.detect_compression(b"function BZh"))
+    self.assertIsNone(compressed_source_module.detect_compression(b""))
+
+  def test_compression_is_detected_from_content_not_name(self):
+    path = self.write_file("source.gz", b"function aaa")
+
+    self.assertEqual([parser_module.JoyFunction(name="aaa", annotations=())], parse(path))
+
+  def test_invalid_chunk_size(self):
+    path = self.write_file("source", b"")
+
+    with self.assertRaises(ValueError):
+      compressed_source_module.open_source(path, chunk_size=0)
+
+  def write_file(self, name: str, data: bytes) -> str:
+    path = os.path.join(self.directory, name)
+    with open(path, "wb") as f:
+      f.write(data)
+    return path
+
+
+if __name__ == "__main__":
+  absltest.main()
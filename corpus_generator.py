@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Iterator
+import dataclasses
+import random
+from typing import BinaryIO
+
+import tokenizer as tokenizer_module
+
+# The tokenizer rejects longer identifiers, so a valid corpus never contains them.
+MAX_IDENTIFIER_LENGTH = tokenizer_module._MAX_IDENTIFIER_LENGTH
+
+_IDENTIFIER_START_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_"
+_IDENTIFIER_SUBSEQUENT_CHARS = _IDENTIFIER_START_CHARS + "0123456789"
+# The characters of function names that are too short for a suffixed index: an uppercase letter,
+# then letters and digits. These names contain no "_", unlike suffixed names, and are never
+# reserved identifiers, which are lowercase.
+_SHORT_NAME_START_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_SHORT_NAME_SUBSEQUENT_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+_RESERVED_IDENTIFIERS = frozenset(("function", "true", "false"))
+_OPERATORS = ("+", "-", "*", "/", "%", "<", ">", "=", "<=", ">=", "!=", "==")
+_COMMON_WORDS = ("dup", "pop", "swap", "i", "dip", "ifte", "map", "x", "rem")
+_STRING_CONTENTS = ("", "a string", 'a \\"quoted\\" string', "tab\\tnew\\nline", "back\\\\slash")
+# Non-ASCII text appears only in comments and strings, where the tokenizer accepts it.
+_COMMENT_WORDS = ("a", "comment", "the", "stack", "quotation", "*", "/", "é", "中")
+_SIZE_SUFFIXES = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+# The knobs that control the shape of a generated corpus. Generation stops once function_count
+# functions or size bytes have been generated, whichever comes first.
+@dataclasses.dataclass(frozen=True)
+class CorpusOptions:
+  seed: int = 0
+  # The number of functions to generate, or None for no limit.
+  function_count: int | None = None
+  # The number of bytes of UTF-8 to generate, or None for no limit. The last function may end
+  # past this size.
+  size: int | None = None
+  # Each function has between 0 and max_annotations annotations.
+  max_annotations: int = 3
+  # Identifier lengths are exponentially distributed with this mean, and truncated to
+  # max_identifier_length.
+  mean_identifier_length: float = 8.0
+  max_identifier_length: int = MAX_IDENTIFIER_LENGTH
+  # The probability that a comment appears between any two tokens.
+  comment_density: float = 0.1
+  # Each comment contains between 0 and comment_nesting comment starters (`//` and `/*`), which
+  # do not nest in Joy but must be skipped as ordinary comment text.
+  comment_nesting: int = 2
+  # Each function body has between 0 and max_body_length terms, and quotations nest up to
+  # max_quotation_depth deep.
+  max_body_length: int = 16
+  max_quotation_depth: int = 3
+  # The probability that a function contains a syntax error. A corpus with no invalid functions
+  # parses without errors.
+  invalid_fraction: float = 0.0
+
+
+# Generates the corpus described by options, one function (with its leading annotations, comments,
+# and whitespace) at a time, so that arbitrarily large corpora can be generated in constant memory.
+# The same options always generate the same corpus.
+def generate(options: CorpusOptions) -> Iterator[str]:
+  if options.function_count is None and options.size is None:
+    raise ValueError("at least one of function_count and size is required")
+  if not 1 <= options.max_identifier_length <= MAX_IDENTIFIER_LENGTH:
+    raise ValueError(f"invalid max_identifier_length: {options.max_identifier_length}")
+  if options.mean_identifier_length < 1:
+    raise ValueError(f"invalid mean_identifier_length: {options.mean_identifier_length}")
+  for name in ("comment_density", "invalid_fraction"):
+    if not 0 <= getattr(options, name) <= 1:
+      raise ValueError(f"invalid {name}: {getattr(options, name)}")
+
+  generator = _Generator(options)
+  size = 0
+  index = 0
+  while (options.function_count is None or index < options.function_count) and (
+      options.size is None or size < options.size
+  ):
+    text = generator.function(index)
+    size += _utf8_length(text)
+    index += 1
+    yield text
+
+
+# Writes the corpus described by options to f, returning the number of bytes written.
+def write(f: BinaryIO, options: CorpusOptions) -> int:
+  size = 0
+  for text in generate(options):
+    data = text.encode("utf-8")
+    f.write(data)
+    size += len(data)
+  return size
+
+
+# Returns the index-th of the names made of _SHORT_NAME_START_CHARS and
+# _SHORT_NAME_SUBSEQUENT_CHARS, shortest first, raising ValueError if it is longer than max_length.
+def _short_function_name(index: int, max_length: int) -> str:
+  length = 1
+  count = len(_SHORT_NAME_START_CHARS)
+  while index >= count:
+    index -= count
+    length += 1
+    count *= len(_SHORT_NAME_SUBSEQUENT_CHARS)
+  if length > max_length:
+    raise ValueError(f"max_identifier_length {max_length} is too short for this many functions")
+  characters = []
+  for _ in range(length - 1):
+    index, digit = divmod(index, len(_SHORT_NAME_SUBSEQUENT_CHARS))
+    characters.append(_SHORT_NAME_SUBSEQUENT_CHARS[digit])
+  characters.append(_SHORT_NAME_START_CHARS[index])
+  return "".join(reversed(characters))
+
+
+def _utf8_length(text: str) -> int:
+  return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+class _Generator:
+
+  def __init__(self, options: CorpusOptions) -> None:
+    self._options = options
+    self._rng = random.Random(options.seed)
+    self._previous_function_name: str | None = None
+
+  def function(self, index: int) -> str:
+    rng = self._rng
+    parts: list[str] = []
+    invalid_kind = (
+        rng.choice(_INVALID_KINDS) if rng.random() < self._options.invalid_fraction else None
+    )
+
+    for _ in range(rng.randint(0, self._options.max_annotations)):
+      parts.append("@" + self._identifier())
+      parts.append(self._trivia(required=True))
+    if invalid_kind == "annotation":
+      parts.append("@1")
+      parts.append(self._trivia(required=True))
+
+    parts.append("function")
+    parts.append(self._trivia(required=True))
+    if invalid_kind == "duplicate_name" and self._previous_function_name is not None:
+      name = self._previous_function_name
+    else:
+      name = self._function_name(index)
+    parts.append(name)
+    self._previous_function_name = name
+
+    # Most functions have a body; those that do not are followed directly by the next function.
+    if rng.random() < 0.9 or invalid_kind is not None:
+      parts.append(self._trivia())
+      parts.append("{")
+      parts.extend(self._terms(depth=0))
+      if invalid_kind is not None and invalid_kind not in ("annotation", "duplicate_name"):
+        parts.append(self._trivia(required=True))
+        parts.append(self._invalid_terms(invalid_kind))
+      parts.append(self._trivia())
+      parts.append("}")
+    parts.append(self._trivia(required=True))
+    return "".join(parts)
+
+  def _function_name(self, index: int) -> str:
+    # Make every name unique by suffixing the function's index, so that a valid corpus has no
+    # duplicate functions; a name too short for the suffix is made from the index alone.
+    max_length = self._options.max_identifier_length
+    suffix = f"_{index:x}"
+    if len(suffix) < max_length:
+      return self._identifier()[: max_length - len(suffix)] + suffix
+    return _short_function_name(index, max_length)
+
+  def _identifier(self, length: int | None = None) -> str:
+    rng = self._rng
+    if length is None:
+      length = int(rng.expovariate(1 / self._options.mean_identifier_length)) + 1
+      length = min(length, self._options.max_identifier_length)
+    while True:
+      identifier = rng.choice(_IDENTIFIER_START_CHARS) + "".join(
+          rng.choices(_IDENTIFIER_SUBSEQUENT_CHARS, k=length - 1)
+      )
+      if identifier not in _RESERVED_IDENTIFIERS:
+        return identifier
+
+  def _terms(self, depth: int) -> list[str]:
+    rng = self._rng
+    parts: list[str] = []
+    for _ in range(rng.randint(0, self._options.max_body_length >> depth)):
+      parts.append(self._trivia(required=len(parts) > 0))
+      kind = rng.random()
+      if kind < 0.15:
+        parts.append(str(rng.choice((0, 1, 2, 123, -45, rng.randrange(-(10**20), 10**20)))))
+      elif kind < 0.2:
+        parts.append(f'"{rng.choice(_STRING_CONTENTS)}"')
+      elif kind < 0.25:
+        parts.append(rng.choice(("true", "false")))
+      elif kind < 0.4:
+        parts.append(rng.choice(_OPERATORS))
+      elif kind < 0.6:
+        parts.append(rng.choice(_COMMON_WORDS))
+      elif kind < 0.85 or depth >= self._options.max_quotation_depth:
+        parts.append(self._identifier())
+      else:
+        parts.append("[")
+        parts.extend(self._terms(depth + 1))
+        parts.append(self._trivia())
+        parts.append("]")
+    return parts
+
+  def _invalid_terms(self, kind: str) -> str:
+    if kind == "unmatched_bracket":
+      return "1 ]"
+    elif kind == "unclosed_quotation":
+      return "[1 2"
+    elif kind == "function_keyword":
+      return "1 function"
+    elif kind == "unexpected_character":
+      return "1 # 2"
+    elif kind == "long_identifier":
+      return self._identifier(length=MAX_IDENTIFIER_LENGTH + 1)
+    elif kind == "unterminated_string":
+      return '"abc\n'
+    elif kind == "invalid_escape":
+      return '"\\q"'
+    assert kind == "unterminated_comment"
+    return "/* never closed"
+
+  # Whitespace and comments between two tokens. Some tokens (e.g. `{` and `}`) need no separator
+  # at all, as in "function tight{1}"; the rest need at least one whitespace character. Comments
+  # are always preceded by whitespace, since an operator such as `-` would otherwise absorb the
+  # `/` that starts them.
+  def _trivia(self, required: bool = False) -> str:
+    rng = self._rng
+    parts: list[str] = []
+    while rng.random() < self._options.comment_density:
+      parts.append(self._whitespace())
+      parts.append(self._comment())
+    if required or len(parts) > 0 or rng.random() < 0.8:
+      parts.append(self._whitespace())
+    return "".join(parts)
+
+  def _whitespace(self) -> str:
+    rng = self._rng
+    if rng.random() < 0.9:
+      return rng.choice((" ", " ", " ", "\n", "\n  "))
+    return "".join(rng.choices(" \n\r\t", k=rng.randint(1, 64)))
+
+  def _comment(self) -> str:
+    rng = self._rng
+    words = rng.choices(_COMMENT_WORDS, k=rng.randint(0, 24))
+    for _ in range(rng.randint(0, self._options.comment_nesting)):
+      words.insert(rng.randint(0, len(words)), rng.choice(("//", "/*")))
+    if rng.random() < 0.5:
+      return "// " + " ".join(words) + "\n"
+    return "/* " + rng.choice((" ", "\n", "\r\n")).join(words) + " */"
+
+
+# The syntax errors that a function may contain, modelled on the invalid inputs of the tokenizer
+# and parser tests.
+_INVALID_KINDS = (
+    "annotation",
+    "duplicate_name",
+    "unmatched_bracket",
+    "unclosed_quotation",
+    "function_keyword",
+    "unexpected_character",
+    "long_identifier",
+    "unterminated_string",
+    "invalid_escape",
+    "unterminated_comment",
+)
+
+
+def _parse_size(text: str) -> int:
+  # Accepts sizes such as "65536", "512K", "100M", or "2G".
+  text = text.strip().upper()
+  suffix = text[-1:] if text[-1:] in _SIZE_SUFFIXES else ""
+  try:
+    return int(text[: len(text) - len(suffix)]) * _SIZE_SUFFIXES[suffix]
+  except ValueError:
+    raise argparse.ArgumentTypeError(f"invalid size: {text}")
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description="Generates a reproducible corpus of Joy source for scale testing."
+  )
+  arg_parser.add_argument("output", help="the file to write the corpus to")
+  arg_parser.add_argument("--seed", type=int, default=0)
+  arg_parser.add_argument("--functions", type=int, help="the number of functions to generate")
+  arg_parser.add_argument(
+      "--size", type=_parse_size, help="the number of bytes to generate, e.g. 100M or 2G"
+  )
+  arg_parser.add_argument("--max-annotations", type=int, default=CorpusOptions.max_annotations)
+  arg_parser.add_argument(
+      "--mean-identifier-length", type=float, default=CorpusOptions.mean_identifier_length
+  )
+  arg_parser.add_argument(
+      "--max-identifier-length", type=int, default=CorpusOptions.max_identifier_length
+  )
+  arg_parser.add_argument("--comment-density", type=float, default=CorpusOptions.comment_density)
+  arg_parser.add_argument("--comment-nesting", type=int, default=CorpusOptions.comment_nesting)
+  arg_parser.add_argument("--max-body-length", type=int, default=CorpusOptions.max_body_length)
+  arg_parser.add_argument(
+      "--max-quotation-depth", type=int, default=CorpusOptions.max_quotation_depth
+  )
+  arg_parser.add_argument("--invalid-fraction", type=float, default=CorpusOptions.invalid_fraction)
+  args = arg_parser.parse_args()
+
+  options = CorpusOptions(
+      seed=args.seed,
+      function_count=args.functions,
+      size=args.size,
+      max_annotations=args.max_annotations,
+      mean_identifier_length=args.mean_identifier_length,
+      max_identifier_length=args.max_identifier_length,
+      comment_density=args.comment_density,
+      comment_nesting=args.comment_nesting,
+      max_body_length=args.max_body_length,
+      max_quotation_depth=args.max_quotation_depth,
+      invalid_fraction=args.invalid_fraction,
+  )
+  try:
+    with open(args.output, "wb") as f:
+      size = write(f, options)
+  except ValueError as e:
+    arg_parser.error(str(e))
+  print(f"wrote {size} bytes to {args.output}")
+
+
+if __name__ == "__main__":
+  main()
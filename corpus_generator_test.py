@@ -0,0 +1,121 @@
+import dataclasses
+import os
+import tempfile
+
+from absl.testing import absltest
+import parameterized
+
+import corpus_generator as corpus_generator_module
+import parser as parser_module
+import tokenizer as tokenizer_module
+
+CorpusOptions = corpus_generator_module.CorpusOptions
+Parser = parser_module.Parser
+Tokenizer = tokenizer_module.Tokenizer
+
+
+def generate_text(options: CorpusOptions) -> str:
+  return "".join(corpus_generator_module.generate(options))
+
+
+class CorpusGeneratorTest(absltest.TestCase):
+
+  def test_generate_is_reproducible(self):
+    options = CorpusOptions(seed=7, function_count=50)
+
+    self.assertEqual(generate_text(options), generate_text(options))
+    self.assertNotEqual(
+        generate_text(options), generate_text(CorpusOptions(seed=8, function_count=50))
+    )
+
+  @parameterized.parameterized.expand([
+      ("defaults", CorpusOptions(function_count=100)),
+      ("dense_comments", CorpusOptions(function_count=20, comment_density=0.5, comment_nesting=5)),
+      ("no_comments", CorpusOptions(function_count=100, comment_density=0.0)),
+      ("many_annotations", CorpusOptions(function_count=100, max_annotations=50)),
+      (
+          "long_identifiers",
+          CorpusOptions(function_count=100, mean_identifier_length=200.0),
+      ),
+      # As many functions as there are names of this length.
+      ("one_character_identifiers", CorpusOptions(function_count=26, max_identifier_length=1)),
+      ("two_character_identifiers", CorpusOptions(function_count=100, max_identifier_length=2)),
+      ("three_character_identifiers", CorpusOptions(function_count=5000, max_identifier_length=3)),
+      ("deep_quotations", CorpusOptions(function_count=100, max_quotation_depth=10)),
+  ])
+  def test_generate_valid_corpus(self, _, options: CorpusOptions):
+    for seed in range(5):
+      with self.subTest(seed=seed):
+        options = dataclasses.replace(options, seed=seed)
+
+        functions = parser_module.parse_text(generate_text(options))
+
+        self.assertLen(functions, options.function_count)
+        for function in functions:
+          self.assertLessEqual(len(function.name), options.max_identifier_length)
+          self.assertLessEqual(len(function.annotations), options.max_annotations)
+          for annotation in function.annotations:
+            self.assertLessEqual(len(annotation), options.max_identifier_length)
+
+  def test_generate_long_identifiers_reach_limit(self):
+    functions = parser_module.parse_text(
+        generate_text(CorpusOptions(function_count=100, mean_identifier_length=1000.0))
+    )
+
+    self.assertIn(
+        corpus_generator_module.MAX_IDENTIFIER_LENGTH,
+        [len(annotation) for function in functions for annotation in function.annotations],
+    )
+
+  def test_generate_one_character_function_names(self):
+    functions = parser_module.parse_text(
+        generate_text(CorpusOptions(function_count=26, max_identifier_length=1))
+    )
+
+    self.assertCountEqual("ABCDEFGHIJKLMNOPQRSTUVWXYZ", [function.name for function in functions])
+
+  def test_generate_raises_if_function_names_run_out(self):
+    with self.assertRaisesRegex(ValueError, "max_identifier_length 1 is too short"):
+      generate_text(CorpusOptions(function_count=27, max_identifier_length=1))
+
+  def test_generate_invalid_corpus(self):
+    for seed in range(50):
+      with self.subTest(seed=seed):
+        text = generate_text(CorpusOptions(seed=seed, function_count=2, invalid_fraction=1.0))
+
+        with self.assertRaises((Parser.ParseError, Tokenizer.ParseError)):
+          parser_module.parse_text(text)
+
+  def test_generate_stops_at_size(self):
+    chunks = list(corpus_generator_module.generate(CorpusOptions(size=10000)))
+    size = sum(len(chunk.encode("utf-8")) for chunk in chunks)
+
+    self.assertGreaterEqual(size, 10000)
+    self.assertLess(size - len(chunks[-1].encode("utf-8")), 10000)
+
+  @parameterized.parameterized.expand([
+      ("no_limit", CorpusOptions()),
+      ("identifier_too_long", CorpusOptions(function_count=1, max_identifier_length=257)),
+      ("empty_identifiers", CorpusOptions(function_count=1, max_identifier_length=0)),
+      ("invalid_density", CorpusOptions(function_count=1, comment_density=1.5)),
+      ("invalid_fraction", CorpusOptions(function_count=1, invalid_fraction=-0.1)),
+  ])
+  def test_generate_rejects_invalid_options(self, _, options: CorpusOptions):
+    with self.assertRaises(ValueError):
+      generate_text(options)
+
+  def test_write(self):
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+    path = os.path.join(directory, "corpus.joy")
+    options = CorpusOptions(seed=3, size=50000, comment_density=0.5)
+
+    with open(path, "wb") as f:
+      size = corpus_generator_module.write(f, options)
+
+    self.assertEqual(os.path.getsize(path), size)
+    with open(path, "rt", encoding="utf-8", newline="") as f:
+      self.assertEqual(generate_text(options), f.read())
+
+
+if __name__ == "__main__":
+  absltest.main()
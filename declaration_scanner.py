@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import dataclasses
+import re
+from typing import TextIO
+
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+# Finds the functions of a source and their annotations without parsing function bodies, for tools
+# that only need to know what is declared (e.g. every @main function). A few compiled regular
+# expressions, which follow the tokenizer's rules for whitespace, comments, identifiers, and
+# strings, match each declaration and skip its body in one step.
+#
+# For input that the parser accepts, the declarations are exactly those of Parser.functions. The
+# scanner checks declarations as strictly as the parser, and falls back to the parser to report any
+# error it finds, but only checks a body's characters, strings, and comments: the terms of a body
+# are not checked, so input that the parser rejects (e.g. for an unbalanced `[` or an overlong
+# identifier in a body) may still scan.
+
+# Every repetition below can match its input in only one way (runs end with a lookahead rather
+# than a possessive quantifier, which needs Python 3.11), so that a failed match backtracks in
+# linear time and never finds a match inside a comment or string.
+#
+# As in the tokenizer, which searches for `*/` from the `/` of `/*`, the `*` of the opener may also
+# start the closer, so `/*/` is a complete comment.
+_MULTILINE_COMMENT = r"/(?=\*)(?:[^*]+(?![^*])|\*(?!/))*\*/"
+_INLINE_COMMENT = r"//[^\r\n]*(?![^\r\n])"
+_WHITESPACE = r"[ \t\r\n]+(?![ \t\r\n])"
+_TRIVIA = rf"(?:{_WHITESPACE}|{_INLINE_COMMENT}|{_MULTILINE_COMMENT})"
+_IDENTIFIER = rf"[A-Za-z_][A-Za-z0-9_]{{0,{tokenizer_module._MAX_IDENTIFIER_LENGTH - 1}}}(?!\w)"
+# A function body, from `{` to the first `}` outside a string or comment. Operators are matched
+# like the tokenizer reads them (two characters if there are two), so that e.g. the `/*` in `+/*`
+# is not taken for the start of a comment.
+_BODY = (
+    r"\{(?:[ \t\r\n\w\[\]]+(?![ \t\r\n\w\[\]])"
+    rf"|{_INLINE_COMMENT}"
+    rf"|{_MULTILINE_COMMENT}"
+    r'|"(?:[^"\\\r\n]+(?![^"\\\r\n])|\\["\\nrt])*"'
+    r"|(?!//|/\*)[-+*/%<>=!](?:[-+*/%<>=!]|(?![-+*/%<>=!]))"
+    r")*\}"
+)
+_DECLARATION = re.compile(
+    rf"(?P<prefix>(?:{_TRIVIA}|@{_IDENTIFIER})*)"
+    rf"function(?!\w){_TRIVIA}*(?P<name>{_IDENTIFIER})(?:{_TRIVIA}*{_BODY})?",
+    re.ASCII,
+)
+_TRAILING_TRIVIA = re.compile(rf"{_TRIVIA}*", re.ASCII)
+_ANNOTATION = re.compile(r"@(\w+)", re.ASCII)
+_COMMENT = re.compile(rf"{_INLINE_COMMENT}|{_MULTILINE_COMMENT}")
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Declaration:
+  annotations: tuple[str, ...]
+  name: str
+  # The offset in characters of the `function` keyword, which equals the start of the function's
+  # span.
+  offset: int
+
+
+def scan(text: str) -> list[Declaration]:
+  declarations: list[Declaration] = []
+  names: set[str] = set()
+  position = 0
+  while True:
+    match = _DECLARATION.match(text, position)
+    if match is None:
+      break
+    name = match.group("name")
+    if name in names or text.find("function", match.end("name"), match.end()) >= 0:
+      # Let the parser report the duplicate, or decide whether `function` in the body is a
+      # misplaced keyword (an error) or part of a word, string, or comment.
+      return _parse(text)
+    names.add(name)
+
+    prefix = match.group("prefix")
+    if "@" not in prefix:
+      annotations: tuple[str, ...] = ()
+    else:
+      if "/" in prefix:
+        # A comment may contain text that looks like an annotation.
+        prefix = _COMMENT.sub(" ", prefix)
+      annotations = tuple(_ANNOTATION.findall(prefix))
+    declarations.append(Declaration(annotations=annotations, name=name, offset=match.end("prefix")))
+    position = match.end()
+
+  if _TRAILING_TRIVIA.fullmatch(text, position) is None:
+    # Let the parser report the error.
+    return _parse(text)
+  return declarations
+
+
+def scan_source(f: TextIO) -> list[Declaration]:
+  return scan(f.read())
+
+
+def _parse(text: str) -> list[Declaration]:
+  parser = parser_module.Parser(tokenizer_module.Tokenizer(source_reader_module.SourceReader(text)))
+  parser.parse()
+  return [
+      Declaration(
+          annotations=function.annotations,
+          name=function.name,
+          offset=function.span.start if function.span is not None else 0,
+      )
+      for function in parser.functions
+  ]
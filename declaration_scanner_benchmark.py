@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+import timeit
+
+import corpus_generator as corpus_generator_module
+import declaration_scanner as declaration_scanner_module
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+
+def _parse(text: str) -> int:
+  parser = parser_module.Parser(tokenizer_module.Tokenizer(source_reader_module.SourceReader(text)))
+  parser.parse()
+  return len(parser.functions)
+
+
+def _scan(text: str) -> int:
+  return len(declaration_scanner_module.scan(text))
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description="Compares finding declarations with the scanner and with the full parser."
+  )
+  arg_parser.add_argument(
+      "--size",
+      type=corpus_generator_module._parse_size,
+      default=1 << 20,
+      help="the size of the corpus, e.g. 1M",
+  )
+  arg_parser.add_argument("--repeat", type=int, default=3)
+  args = arg_parser.parse_args()
+
+  text = "".join(
+      corpus_generator_module.generate(corpus_generator_module.CorpusOptions(size=args.size))
+  )
+  benchmarks: dict[str, Callable[[str], int]] = {"Parser": _parse, "declaration_scanner": _scan}
+
+  print(f"{len(text) / 1e6:.1f} M characters")
+  print(f"{'':20} {'functions':>10} {'MB/s':>10}")
+  for name, benchmark in benchmarks.items():
+    function_count = benchmark(text)
+    seconds = min(timeit.repeat(lambda: benchmark(text), repeat=args.repeat, number=1))
+    print(f"{name:20} {function_count:10} {len(text) / seconds / 1e6:10.2f}")
+
+
+if __name__ == "__main__":
+  main()
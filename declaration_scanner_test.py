@@ -0,0 +1,126 @@
+import io
+
+from absl.testing import absltest
+import parameterized
+
+import corpus_generator as corpus_generator_module
+import declaration_scanner as declaration_scanner_module
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+Declaration = declaration_scanner_module.Declaration
+
+
+def parse(text: str) -> list[Declaration]:
+  parser = parser_module.Parser(tokenizer_module.Tokenizer(source_reader_module.SourceReader(text)))
+  parser.parse()
+  return [
+      Declaration(annotations=function.annotations, name=function.name, offset=function.span.start)
+      for function in parser.functions
+      if function.span is not None
+  ]
+
+
+class DeclarationScannerTest(absltest.TestCase):
+
+  def test_scan(self):
+    text = '@main @test function aaa { 1 "}" [ b ] } function b\n@x function c{}'
+
+    self.assertEqual(
+        [
+            Declaration(annotations=("main", "test"), name="aaa", offset=12),
+            Declaration(annotations=(), name="b", offset=41),
+            Declaration(annotations=("x",), name="c", offset=55),
+        ],
+        declaration_scanner_module.scan(text),
+    )
+
+  @parameterized.parameterized.expand([
+      ("empty", ""),
+      ("trivia_only", " // comment\n/* comment */\t"),
+      ("no_body", "function aaa"),
+      ("no_separators", "function a{1}function b@x@y function c"),
+      ("name_is_keyword", "function function { }"),
+      ("comments", "/* @x */ @a // @y\n /*}*/ @b function /* { */ aaa /* } */ { /* } */ }"),
+      ("comment_after_name", "function aaa// {\n{ 1 }"),
+      ("strings", 'function aaa { "}" "\\"}" "\\\\" "// /* " } function b'),
+      ("operators", "function aaa { 1 +/* } function b { -/ 2 }"),
+      ("negative_integer", "function aaa { 1 -2 - 3 -- 4 }"),
+      ("function_in_body", 'function aaa { functions "function" /* function */ }'),
+      ("non_ascii", '@a function aaa { "é中" /* é */ } function b'),
+      ("crlf", "@a\r\nfunction aaa\r\n{\r\n1\r\n}\r\n"),
+      ("shortest_comment", "/*/ function a /* x */ function b"),
+      ("shortest_comment_after_annotation", "@x/*/ function a /* */ function b"),
+      ("shortest_comment_in_body", "function a { 1 /*/ 2 } function b"),
+      ("comment_stars", "/**/ /***/ /* ** */ function a { /**/ } /*** x ***/ function b"),
+  ])
+  def test_matches_parser(self, _, text: str):
+    self.assertEqual(parse(text), declaration_scanner_module.scan(text))
+
+  def test_matches_parser_on_corpus(self):
+    for seed in range(8):
+      text = "".join(
+          corpus_generator_module.generate(
+              corpus_generator_module.CorpusOptions(
+                  seed=seed, function_count=50, comment_density=0.3, comment_nesting=4
+              )
+          )
+      )
+      with self.subTest(seed=seed):
+        self.assertEqual(parse(text), declaration_scanner_module.scan(text))
+
+  @parameterized.parameterized.expand([
+      ("invalid_annotation", "@1 function aaa", tokenizer_module.Tokenizer.ParseError),
+      ("space_in_annotation", "@ main function aaa", tokenizer_module.Tokenizer.ParseError),
+      ("missing_keyword", "aaa { }", parser_module.Parser.ParseError),
+      ("keyword_prefix", "functionaaa { }", parser_module.Parser.ParseError),
+      ("missing_name", "function { }", parser_module.Parser.ParseError),
+      ("trailing_annotation", "function aaa @main", parser_module.Parser.ParseError),
+      (
+          "duplicate_name",
+          "function aaa { 1 } function aaa",
+          parser_module.Parser.DuplicateFunctionError,
+      ),
+      (
+          "long_name",
+          "function " + "a" * 257,
+          tokenizer_module.Tokenizer.IdentifierTooLongError,
+      ),
+      ("unexpected_character", "function aaa { 1 # 2 }", parser_module.Parser.ParseError),
+      ("function_in_body", "function aaa { 1 function }", parser_module.Parser.ParseError),
+      ("unclosed_body", "function aaa { 1", parser_module.Parser.ParseError),
+      (
+          "unterminated_string",
+          'function aaa { "}\n }',
+          tokenizer_module.Tokenizer.UnterminatedStringLiteralError,
+      ),
+      ("invalid_escape", 'function aaa { "\\q" }', tokenizer_module.Tokenizer.ParseError),
+      (
+          "unterminated_comment",
+          "function aaa { /* }",
+          parser_module.Parser.ParseError,
+      ),
+  ])
+  def test_error(self, _, text: str, error: type[Exception]):
+    with self.assertRaises(error):
+      parse(text)
+    with self.assertRaises(error):
+      declaration_scanner_module.scan(text)
+
+  def test_body_terms_are_not_checked(self):
+    text = "function aaa { [ 1 } function b"
+
+    with self.assertRaises(parser_module.Parser.ParseError):
+      parse(text)
+    self.assertEqual(["aaa", "b"], [d.name for d in declaration_scanner_module.scan(text)])
+
+  def test_scan_source(self):
+    self.assertEqual(
+        [Declaration(annotations=("main",), name="aaa", offset=6)],
+        declaration_scanner_module.scan_source(io.StringIO("@main function aaa { 1 }")),
+    )
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import collections
+from collections.abc import Callable, Iterable
+import dataclasses
+import threading
+
+import joy_runtime as joy_runtime_module
+import parser as parser_module
+import stack_effects as stack_effects_module
+
+StackEffect = joy_runtime_module.StackEffect
+Value = joy_runtime_module.Value
+
+# The annotations that change how a function is executed. Other annotations are left to the tools
+# that define them.
+INLINE = "inline"  # Splice the function's body into its callers.
+PURE = "pure"  # The function's results depend only on its arguments, so cache them.
+MEMOIZE = "memoize"  # Cache the function's results, keyed on its arguments.
+
+# The longest body, in terms, of a function that may be annotated @inline.
+MAX_INLINE_BODY_LENGTH = 16
+
+# The number of results cached for each @pure or @memoize function.
+DEFAULT_CACHE_SIZE = 1024
+
+# The combinators that execute quotations given as literals, by the number of quotations each
+# takes from the top of the stack. Calls inside these quotations are inlined; calls inside other
+# quotations are not, since the quotation may be used as data (e.g. "[square] first").
+_COMBINATOR_QUOTATION_COUNTS = {
+    "i": 1,
+    "dip": 1,
+    "branch": 2,
+    "ifte": 3,
+    "times": 1,
+    "step": 1,
+    "map": 1,
+    "filter": 1,
+    "fold": 1,
+    "linrec": 4,
+    "binrec": 4,
+    "primrec": 2,
+}
+
+
+# The functions of a program as they should be executed, after applying their annotations.
+@dataclasses.dataclass(frozen=True)
+class AnnotatedFunctions:
+  # The functions, with calls to @inline functions replaced by their bodies.
+  functions: tuple[parser_module.JoyFunction, ...]
+  # The stack effects of the @pure and @memoize functions, whose results should be cached.
+  cached_stack_effects: dict[str, StackEffect]
+
+
+# Checks that the annotations of the given functions can be honoured and applies them, raising
+# AnnotationError if they cannot:
+#
+#   @inline functions must not be recursive, even indirectly through other @inline functions, and
+#   must be no longer than MAX_INLINE_BODY_LENGTH terms. They cannot also be @pure or @memoize,
+#   since inlined calls bypass the cache.
+#
+#   @pure and @memoize functions must have a fixed stack effect, from which the number of
+#   arguments that the results are keyed on is taken; see stack_effects.infer().
+def apply(functions: Iterable[parser_module.JoyFunction]) -> AnnotatedFunctions:
+  functions = tuple(functions)
+
+  inline_functions: dict[str, parser_module.JoyFunction] = {}
+  cached_function_names: list[str] = []
+  for function in functions:
+    is_inline = INLINE in function.annotations
+    is_cached = PURE in function.annotations or MEMOIZE in function.annotations
+    if is_inline and is_cached:
+      raise AnnotationError(
+          function.name,
+          f"function {function.name} cannot be both @{INLINE} and @{PURE} or @{MEMOIZE}",
+      )
+    if is_inline:
+      if len(function.body) > MAX_INLINE_BODY_LENGTH:
+        raise AnnotationError(
+            function.name,
+            f"@{INLINE} function {function.name} is too long to inline: {len(function.body)} terms "
+            f"(at most {MAX_INLINE_BODY_LENGTH} allowed)",
+        )
+      inline_functions[function.name] = function
+    if is_cached:
+      cached_function_names.append(function.name)
+
+  inliner = _Inliner(inline_functions)
+  functions = tuple(
+      dataclasses.replace(function, body=inliner.inline(function.name, function.body))
+      for function in functions
+  )
+
+  cached_stack_effects: dict[str, StackEffect] = {}
+  if len(cached_function_names) > 0:
+    effects = stack_effects_module.infer(functions)
+    for name in cached_function_names:
+      effect = effects[name]
+      if effect is None:
+        raise AnnotationError(
+            name, f"results of function {name} cannot be cached: its stack effect is not fixed"
+        )
+      cached_stack_effects[name] = effect
+
+  return AnnotatedFunctions(functions=functions, cached_stack_effects=cached_stack_effects)
+
+
+class AnnotationError(Exception):
+
+  def __init__(self, function_name: str, message: str) -> None:
+    super().__init__(message)
+    self.function_name = function_name
+
+
+class _Inliner:
+
+  def __init__(self, inline_functions: dict[str, parser_module.JoyFunction]) -> None:
+    self._inline_functions = inline_functions
+    self._inlined_bodies: dict[str, tuple[parser_module.Term, ...]] = {}
+    # The @inline functions whose bodies are being inlined, to detect recursion.
+    self._active_names: list[str] = []
+
+  def inline(
+      self, function_name: str, terms: tuple[parser_module.Term, ...]
+  ) -> tuple[parser_module.Term, ...]:
+    if function_name in self._inline_functions:
+      return self._inlined_body(function_name)
+    return self._inline_terms(terms)
+
+  def _inlined_body(self, name: str) -> tuple[parser_module.Term, ...]:
+    body = self._inlined_bodies.get(name)
+    if body is not None:
+      return body
+    if name in self._active_names:
+      cycle = " -> ".join(self._active_names[self._active_names.index(name) :] + [name])
+      raise AnnotationError(name, f"@{INLINE} function {name} is recursive: {cycle}")
+
+    self._active_names.append(name)
+    body = self._inline_terms(self._inline_functions[name].body)
+    self._active_names.pop()
+    self._inlined_bodies[name] = body
+    return body
+
+  def _inline_terms(self, terms: tuple[parser_module.Term, ...]) -> tuple[parser_module.Term, ...]:
+    # Find the quotations that are executed by the combinator that follows them.
+    executed_quotation_indices: set[int] = set()
+    for i, term in enumerate(terms):
+      if isinstance(term, parser_module.Word):
+        quotation_count = _COMBINATOR_QUOTATION_COUNTS.get(term.name, 0)
+        for j in range(i - 1, max(i - 1 - quotation_count, -1), -1):
+          if not isinstance(terms[j], parser_module.Quotation):
+            break
+          executed_quotation_indices.add(j)
+
+    result: list[parser_module.Term] = []
+    for i, term in enumerate(terms):
+      if isinstance(term, parser_module.Word) and term.name in self._inline_functions:
+        result.extend(self._inlined_body(term.name))
+      elif isinstance(term, parser_module.Quotation) and i in executed_quotation_indices:
+        result.append(parser_module.Quotation(self._inline_terms(term.terms)))
+      else:
+        result.append(term)
+    return tuple(result)
+
+
+# A bounded LRU cache of the results of a @pure or @memoize function, keyed on the values of its
+# arguments, i.e. the top stack_effect.inputs values of the stack.
+class FunctionCache:
+
+  def __init__(
+      self, function_name: str, stack_effect: StackEffect, maxsize: int = DEFAULT_CACHE_SIZE
+  ) -> None:
+    if maxsize <= 0:
+      raise ValueError(f"invalid maxsize: {maxsize}")
+    self.function_name = function_name
+    self.stack_effect = stack_effect
+    self.maxsize = maxsize
+    self.hits = 0
+    self.misses = 0
+    self._results: collections.OrderedDict[
+        tuple[object, ...], tuple[Value, ...]
+    ] = collections.OrderedDict()
+    self._lock = threading.Lock()
+
+  def call(
+      self,
+      machine: joy_runtime_module.Machine,
+      function: Callable[[joy_runtime_module.Machine], None],
+  ) -> None:
+    stack = machine.stack
+    inputs = self.stack_effect.inputs
+    base = len(stack) - inputs
+    if base < 0:
+      raise joy_runtime_module.StackUnderflowError(
+          f"{self.function_name} requires {inputs} values on the stack but found {len(stack)}"
+      )
+    # Key on the types as well as the values, since Python considers True == 1.
+    key = tuple((type(value), value) for value in stack[base:])
+
+    with self._lock:
+      results = self._results.get(key)
+      if results is not None:
+        self._results.move_to_end(key)
+        self.hits += 1
+    if results is not None:
+      del stack[base:]
+      stack.extend(results)
+      return
+
+    function(machine)
+    if len(stack) != base + self.stack_effect.outputs:
+      raise joy_runtime_module.JoyRuntimeError(
+          f"{self.function_name} left {len(stack) - base} results but its stack effect has "
+          f"{self.stack_effect.outputs}"
+      )
+    results = tuple(stack[base:])
+    with self._lock:
+      self.misses += 1
+      self._results[key] = results
+      while len(self._results) > self.maxsize:
+        self._results.popitem(last=False)
+
+  def clear(self) -> None:
+    with self._lock:
+      self._results.clear()
+      self.hits = 0
+      self.misses = 0
+
+  def __len__(self) -> int:
+    return len(self._results)
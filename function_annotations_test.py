@@ -0,0 +1,166 @@
+from absl.testing import absltest
+import parameterized
+
+import function_annotations as function_annotations_module
+import joy_runtime as joy_runtime_module
+import parser as parser_module
+
+AnnotationError = function_annotations_module.AnnotationError
+FunctionCache = function_annotations_module.FunctionCache
+Quotation = parser_module.Quotation
+StackEffect = joy_runtime_module.StackEffect
+Word = parser_module.Word
+
+
+class ApplyTest(absltest.TestCase):
+
+  def test_apply_without_annotations(self):
+    functions = parser_module.parse_text("@main function aaa { 1 bbb } function bbb { dup }")
+
+    annotated_functions = function_annotations_module.apply(functions)
+
+    self.assertEqual(tuple(functions), annotated_functions.functions)
+    self.assertEqual({}, annotated_functions.cached_stack_effects)
+
+  def test_apply_inlines_calls(self):
+    functions = parser_module.parse_text(
+        "@inline function square { dup * } @inline function fourth { square square }"
+        " function aaa { fourth 1 + }"
+    )
+
+    annotated_functions = function_annotations_module.apply(functions)
+
+    self.assertEqual(
+        (
+            Word("dup"),
+            Word("*"),
+            Word("dup"),
+            Word("*"),
+            parser_module.IntegerLiteral(1),
+            Word("+"),
+        ),
+        annotated_functions.functions[2].body,
+    )
+
+  def test_apply_inlines_calls_in_executed_quotations_only(self):
+    functions = parser_module.parse_text(
+        "@inline function square { dup * } function aaa { [square] [square] map }"
+    )
+
+    annotated_functions = function_annotations_module.apply(functions)
+
+    self.assertEqual(
+        (Quotation((Word("square"),)), Quotation((Word("dup"), Word("*"))), Word("map")),
+        annotated_functions.functions[1].body,
+    )
+
+  def test_apply_infers_cached_stack_effects(self):
+    functions = parser_module.parse_text(
+        "@memoize function fib { [2 <] [] [dup 1 - fib swap 2 - fib +] ifte }"
+        " @pure function add { + }"
+    )
+
+    annotated_functions = function_annotations_module.apply(functions)
+
+    self.assertEqual(
+        {"fib": StackEffect(1, 1), "add": StackEffect(2, 1)},
+        annotated_functions.cached_stack_effects,
+    )
+
+  @parameterized.parameterized.expand([
+      ("inline_and_memoize", "@inline @memoize function aaa { 1 }", "aaa"),
+      ("recursive_inline", "@inline function aaa { [0 =] [] [1 - aaa] ifte }", "aaa"),
+      (
+          "mutually_recursive_inline",
+          "@inline function aaa { bbb } @inline function bbb { aaa } function ccc { aaa }",
+          "aaa",
+      ),
+      ("long_inline", "@inline function aaa { 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15 16 17 }", "aaa"),
+      ("memoize_without_fixed_effect", "@memoize function aaa { [1] map }", "aaa"),
+      ("pure_without_fixed_effect", "function bbb { i } @pure function aaa { bbb }", "aaa"),
+  ])
+  def test_apply_rejects_annotations(self, _, text: str, function_name: str):
+    with self.assertRaises(AnnotationError) as assert_raises_context:
+      function_annotations_module.apply(parser_module.parse_text(text))
+
+    self.assertEqual(function_name, assert_raises_context.exception.function_name)
+    self.assertIn(function_name, str(assert_raises_context.exception))
+
+
+class FunctionCacheTest(absltest.TestCase):
+
+  def test_call_caches_results(self):
+    cache = FunctionCache("add", StackEffect(2, 1))
+    calls = []
+
+    def add(machine: joy_runtime_module.Machine) -> None:
+      calls.append(list(machine.stack))
+      y = machine.stack.pop()
+      x = machine.stack.pop()
+      assert isinstance(x, int) and isinstance(y, int)
+      machine.stack.append(x + y)
+
+    machine = _TestMachine([9, 1, 2])
+    cache.call(machine, add)
+    machine.stack.extend([1, 2])
+    cache.call(machine, add)
+
+    self.assertEqual([9, 3, 3], machine.stack)
+    self.assertEqual([[9, 1, 2]], calls)
+    self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+  def test_call_distinguishes_types(self):
+    cache = FunctionCache("identity", StackEffect(1, 1))
+    machine = _TestMachine([1])
+
+    cache.call(machine, lambda machine: None)
+    machine.stack[:] = [True]
+    cache.call(machine, lambda machine: None)
+
+    self.assertEqual((0, 2), (cache.hits, cache.misses))
+    self.assertIs(True, machine.stack[0])
+
+  def test_call_evicts_least_recently_used(self):
+    cache = FunctionCache("identity", StackEffect(1, 1), maxsize=2)
+    machine = _TestMachine()
+
+    for value in (1, 2, 1, 3, 1, 2):
+      machine.stack[:] = [value]
+      cache.call(machine, lambda machine: None)
+
+    self.assertLen(cache, 2)
+    self.assertEqual((2, 4), (cache.hits, cache.misses))
+
+  def test_call_raises_on_underflow(self):
+    cache = FunctionCache("add", StackEffect(2, 1))
+
+    with self.assertRaises(joy_runtime_module.StackUnderflowError):
+      cache.call(_TestMachine([1]), lambda machine: None)
+
+  def test_call_raises_on_wrong_stack_effect(self):
+    cache = FunctionCache("aaa", StackEffect(1, 1))
+
+    with self.assertRaises(joy_runtime_module.JoyRuntimeError):
+      cache.call(_TestMachine([1]), lambda machine: machine.stack.append(2))
+
+  def test_clear(self):
+    cache = FunctionCache("identity", StackEffect(1, 1))
+    cache.call(_TestMachine([1]), lambda machine: None)
+
+    cache.clear()
+
+    self.assertLen(cache, 0)
+    self.assertEqual((0, 0), (cache.hits, cache.misses))
+
+
+class _TestMachine:
+
+  def __init__(self, stack: list[joy_runtime_module.Value] | None = None) -> None:
+    self.stack: list[joy_runtime_module.Value] = [] if stack is None else stack
+
+  def execute(self, quotation: joy_runtime_module.Quotation) -> None:
+    raise NotImplementedError()
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping, Sequence
+import bisect
+import dataclasses
+import hashlib
+from typing import TextIO
+
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+# Content hashes of functions, files, and projects, for deciding what changed between two
+# revisions without comparing (or even keeping) their parse results.
+#
+# A function's hash covers its normalized tokens: its name, its annotations, and the terms of its
+# body, but not its location, whitespace, or comments, so a function that is moved or reformatted
+# keeps its hash. A file's hash is a Merkle hash of the hashes of its functions in order, and a
+# project's hash a Merkle hash of the hashes of its files by path, so equal hashes at any level
+# mean that everything below is unchanged. Hashes are stable across processes and Python versions;
+# HASH_VERSION changes whenever they change.
+
+HASH_VERSION = 1
+DIGEST_SIZE = 16
+
+_FUNCTION_PERSON = b"joy-function-%d" % HASH_VERSION
+_FILE_PERSON = b"joy-file-%d" % HASH_VERSION
+_PROJECT_PERSON = b"joy-project-%d" % HASH_VERSION
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class FunctionHash:
+  name: str
+  digest: bytes
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class FileHash:
+  # The hashes of the file's functions, in the order in which they are defined.
+  functions: tuple[FunctionHash, ...]
+  digest: bytes
+
+  @classmethod
+  def from_function_hashes(cls, function_hashes: Iterable[FunctionHash]) -> FileHash:
+    function_hashes = tuple(function_hashes)
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE, person=_FILE_PERSON)
+    hasher.update(len(function_hashes).to_bytes(8, "little"))
+    for function_hash in function_hashes:
+      hasher.update(function_hash.digest)
+    return cls(functions=function_hashes, digest=hasher.digest())
+
+  @classmethod
+  def from_functions(cls, functions: Iterable[parser_module.JoyFunction]) -> FileHash:
+    return cls.from_function_hashes(
+        FunctionHash(name=function.name, digest=hash_function(function)) for function in functions
+    )
+
+
+# The functions that differ between two revisions, identified by name (which is unique within a
+# project). A function is moved if its contents are unchanged but it is in another file, or has
+# been reordered relative to the other unchanged functions of its file.
+@dataclasses.dataclass(frozen=True)
+class Diff:
+  added: tuple[str, ...] = ()
+  removed: tuple[str, ...] = ()
+  changed: tuple[str, ...] = ()
+  moved: tuple[str, ...] = ()
+
+  def __bool__(self) -> bool:
+    return (
+        len(self.added) > 0 or len(self.removed) > 0 or len(self.changed) > 0 or len(self.moved) > 0
+    )
+
+
+def hash_function(function: parser_module.JoyFunction) -> bytes:
+  hasher = hashlib.blake2b(digest_size=DIGEST_SIZE, person=_FUNCTION_PERSON)
+  _update_string(hasher, function.name)
+  _update_count(hasher, len(function.annotations))
+  for annotation in function.annotations:
+    _update_string(hasher, annotation)
+  _update_terms(hasher, function.body)
+  return hasher.digest()
+
+
+# Parses f and hashes each function as soon as it is parsed, without keeping the functions, so that
+# memory use depends only on the number of functions. Raises Parser.DuplicateFunctionError if a
+# function is defined more than once, like Parser.parse().
+def hash_source(f: TextIO, buffer_size: int | None = None, encoding: str = "utf-8") -> FileHash:
+  parser = parser_module.Parser(
+      tokenizer_module.Tokenizer(
+          source_reader_module.SourceReader(f, buffer_size=buffer_size, encoding=encoding)
+      )
+  )
+  function_hashes: list[FunctionHash] = []
+  names: set[str] = set()
+  for function in parser.iter_functions():
+    if function.name in names:
+      raise parser_module.Parser.DuplicateFunctionError(
+          function_name=function.name,
+          message=f"function defined more than once: {function.name}",
+      )
+    names.add(function.name)
+    function_hashes.append(FunctionHash(name=function.name, digest=hash_function(function)))
+  return FileHash.from_function_hashes(function_hashes)
+
+
+def hash_project(files: Mapping[str, FileHash]) -> bytes:
+  hasher = hashlib.blake2b(digest_size=DIGEST_SIZE, person=_PROJECT_PERSON)
+  _update_count(hasher, len(files))
+  for path in sorted(files):
+    _update_string(hasher, path)
+    hasher.update(files[path].digest)
+  return hasher.digest()
+
+
+def diff_files(old: FileHash, new: FileHash) -> Diff:
+  return diff_projects({"": old}, {"": new})
+
+
+# Compares two revisions of a project, each a mapping from path to FileHash. Files whose hashes are
+# equal are skipped without looking at their functions: a function cannot have been added to,
+# removed from, changed in, or moved into or out of such a file.
+def diff_projects(old: Mapping[str, FileHash], new: Mapping[str, FileHash]) -> Diff:
+  changed_paths = [
+      path
+      for path in old.keys() | new.keys()
+      if path not in old or path not in new or old[path].digest != new[path].digest
+  ]
+  old_functions = _index_functions(old, changed_paths)
+  new_functions = _index_functions(new, changed_paths)
+
+  added = new_functions.keys() - old_functions.keys()
+  removed = old_functions.keys() - new_functions.keys()
+  changed: list[str] = []
+  moved: list[str] = []
+  # The unchanged functions that stayed in each file, as (new position, old position) pairs.
+  kept_positions: dict[str, list[tuple[int, int, str]]] = {}
+  for name in old_functions.keys() & new_functions.keys():
+    old_path, old_position, old_digest = old_functions[name]
+    new_path, new_position, new_digest = new_functions[name]
+    if old_digest != new_digest:
+      changed.append(name)
+    elif old_path != new_path:
+      moved.append(name)
+    else:
+      kept_positions.setdefault(new_path, []).append((new_position, old_position, name))
+
+  for positions in kept_positions.values():
+    positions.sort()
+    moved.extend(_reordered_names(positions))
+
+  return Diff(
+      added=tuple(sorted(added)),
+      removed=tuple(sorted(removed)),
+      changed=tuple(sorted(changed)),
+      moved=tuple(sorted(moved)),
+  )
+
+
+def _index_functions(
+    files: Mapping[str, FileHash], paths: Iterable[str]
+) -> dict[str, tuple[str, int, bytes]]:
+  functions: dict[str, tuple[str, int, bytes]] = {}
+  for path in paths:
+    file_hash = files.get(path)
+    if file_hash is None:
+      continue
+    for position, function_hash in enumerate(file_hash.functions):
+      functions[function_hash.name] = (path, position, function_hash.digest)
+  return functions
+
+
+def _reordered_names(positions: Sequence[tuple[int, int, str]]) -> list[str]:
+  # Given the functions of a file in their new order with their old positions, keeps the longest
+  # run whose old positions increase (i.e. that kept their relative order) and returns the names of
+  # the rest, which are the fewest functions that must have moved.
+  tails: list[int] = []
+  tail_indices: list[int] = []
+  predecessors: list[int] = [-1] * len(positions)
+  for i, (_, old_position, _) in enumerate(positions):
+    j = bisect.bisect_left(tails, old_position)
+    if j > 0:
+      predecessors[i] = tail_indices[j - 1]
+    if j == len(tails):
+      tails.append(old_position)
+      tail_indices.append(i)
+    else:
+      tails[j] = old_position
+      tail_indices[j] = i
+
+  in_order = set()
+  i = tail_indices[-1] if len(tail_indices) > 0 else -1
+  while i >= 0:
+    in_order.add(i)
+    i = predecessors[i]
+  return [name for i, (_, _, name) in enumerate(positions) if i not in in_order]
+
+
+def _update_count(hasher: hashlib._Hash, count: int) -> None:
+  hasher.update(count.to_bytes(8, "little"))
+
+
+def _update_string(hasher: hashlib._Hash, s: str) -> None:
+  data = s.encode("utf-8", errors="surrogatepass")
+  _update_count(hasher, len(data))
+  hasher.update(data)
+
+
+def _update_terms(hasher: hashlib._Hash, terms: tuple[parser_module.Term, ...]) -> None:
+  # Each term is a one-byte tag followed by its length-prefixed contents, so that no two different
+  # sequences of terms hash the same bytes.
+  _update_count(hasher, len(terms))
+  for term in terms:
+    if isinstance(term, parser_module.Word):
+      hasher.update(b"w")
+      _update_string(hasher, term.name)
+    elif isinstance(term, parser_module.IntegerLiteral):
+      hasher.update(b"i")
+      _update_string(hasher, str(term.value))
+    elif isinstance(term, parser_module.StringLiteral):
+      hasher.update(b"s")
+      _update_string(hasher, term.value)
+    elif isinstance(term, parser_module.BooleanLiteral):
+      hasher.update(b"t" if term.value else b"f")
+    else:
+      hasher.update(b"q")
+      _update_terms(hasher, term.terms)
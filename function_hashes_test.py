@@ -0,0 +1,142 @@
+import io
+
+from absl.testing import absltest
+import parameterized
+
+import function_hashes as function_hashes_module
+import parser as parser_module
+
+Diff = function_hashes_module.Diff
+FileHash = function_hashes_module.FileHash
+
+
+def hash_text(text: str) -> FileHash:
+  return function_hashes_module.hash_source(io.StringIO(text), buffer_size=16)
+
+
+class FunctionHashesTest(absltest.TestCase):
+
+  def test_hash_source_matches_parse(self):
+    text = '@main function aaa { 1 "a" [ b true ] } function b { }'
+
+    file_hash = hash_text(text)
+
+    self.assertEqual(FileHash.from_functions(parser_module.parse_text(text)), file_hash)
+    self.assertEqual(["aaa", "b"], [function.name for function in file_hash.functions])
+
+  def test_hash_ignores_layout_and_comments(self):
+    self.assertEqual(
+        hash_text("@main function aaa { 1 [ b ] }"),
+        hash_text("// comment\n@main\nfunction   aaa {\n  1 /* one */\n  [b]\n}\n"),
+    )
+
+  @parameterized.parameterized.expand([
+      ("name", "function aab { 1 }"),
+      ("annotation", "@main function aaa { 1 }"),
+      ("integer", "function aaa { 2 }"),
+      ("integer_string", 'function aaa { "1" }'),
+      ("integer_word", "function aaa { a1 }"),
+      ("quotation", "function aaa { [ 1 ] }"),
+      ("empty_quotation", "function aaa { 1 [ ] }"),
+      ("empty_body", "function aaa { }"),
+  ])
+  def test_hash_depends_on_content(self, _, text: str):
+    self.assertNotEqual(
+        function_hashes_module.hash_function(parser_module.parse_text("function aaa { 1 }")[0]),
+        function_hashes_module.hash_function(parser_module.parse_text(text)[0]),
+    )
+
+  def test_hash_is_stable(self):
+    # Hashes are persisted and compared across processes, so they must not change without a change
+    # to HASH_VERSION.
+    self.assertEqual(
+        "70b0594f9272adf46ee9f61465828981",
+        function_hashes_module.hash_function(
+            parser_module.parse_text('@main function aaa { 1 "a" [ b true ] }')[0]
+        ).hex(),
+    )
+
+  def test_file_hash_depends_on_order(self):
+    self.assertNotEqual(
+        hash_text("function aaa { } function b { }").digest,
+        hash_text("function b { } function aaa { }").digest,
+    )
+
+  def test_hash_source_duplicate_function(self):
+    with self.assertRaises(parser_module.Parser.DuplicateFunctionError):
+      hash_text("function aaa { 1 } function aaa { 2 }")
+
+  def test_hash_project(self):
+    project = {"a.joy": hash_text("function aaa { }"), "b.joy": hash_text("function b { }")}
+
+    self.assertEqual(
+        function_hashes_module.hash_project(project),
+        function_hashes_module.hash_project(dict(reversed(project.items()))),
+    )
+    self.assertNotEqual(
+        function_hashes_module.hash_project(project),
+        function_hashes_module.hash_project({**project, "b.joy": hash_text("function b { 1 }")}),
+    )
+    self.assertNotEqual(
+        function_hashes_module.hash_project(project),
+        function_hashes_module.hash_project({"a.joy": project["a.joy"], "c.joy": project["b.joy"]}),
+    )
+
+  def test_diff_files(self):
+    old = hash_text("function aaa { } function b { } function c { } function d { 1 }")
+    new = hash_text(
+        "function c { } function aaa { } function b { } function d { 2 } function e { }"
+    )
+
+    self.assertEqual(
+        Diff(added=("e",), changed=("d",), moved=("c",)),
+        function_hashes_module.diff_files(old, new),
+    )
+
+  def test_diff_files_removed(self):
+    self.assertEqual(
+        Diff(removed=("b",)),
+        function_hashes_module.diff_files(
+            hash_text("function aaa { } function b { } function c { }"),
+            hash_text("function aaa { } function c { }"),
+        ),
+    )
+
+  def test_diff_files_unchanged(self):
+    diff = function_hashes_module.diff_files(
+        hash_text("function aaa { 1 }"), hash_text("function aaa {\n  1\n}")
+    )
+
+    self.assertEqual(Diff(), diff)
+    self.assertFalse(diff)
+
+  def test_diff_projects(self):
+    old = {
+        "a.joy": hash_text("function aaa { } function b { }"),
+        "b.joy": hash_text("function c { } function d { }"),
+        "c.joy": hash_text("function e { }"),
+    }
+    new = {
+        "a.joy": hash_text("function aaa { }"),
+        "b.joy": hash_text("function b { } function c { } function d { 1 }"),
+        "d.joy": hash_text("function f { }"),
+    }
+
+    self.assertEqual(
+        Diff(added=("f",), removed=("e",), changed=("d",), moved=("b",)),
+        function_hashes_module.diff_projects(old, new),
+    )
+
+  def test_diff_projects_skips_unchanged_files(self):
+    unchanged = hash_text("function aaa { }")
+    # A file whose hash is unchanged is not looked at, so a function list that disagrees with its
+    # hash goes unnoticed.
+    tampered = FileHash(functions=(), digest=unchanged.digest)
+
+    self.assertEqual(
+        Diff(), function_hashes_module.diff_projects({"a.joy": unchanged}, {"a.joy": tampered})
+    )
+
+
+if __name__ == "__main__":
+  absltest.main()
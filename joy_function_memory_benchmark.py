@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+import dataclasses
+import gc
+import tracemalloc
+
+import corpus_generator as corpus_generator_module
+import parser as parser_module
+import source_reader as source_reader_module
+import source_span as source_span_module
+import tokenizer as tokenizer_module
+
+_ANNOTATION_COMBINATIONS = (
+    (),
+    ("main",),
+    ("test",),
+    ("inline", "pure"),
+    ("deprecated", "test"),
+)
+
+
+# A replica of the original JoyFunction layout (not slotted, and with an annotation tuple per
+# function), with the fields that JoyFunction has since gained, used as the baseline.
+@dataclasses.dataclass(frozen=True)
+class _UnslottedJoyFunction:
+  name: str
+  annotations: tuple[str, ...]
+  body: tuple[parser_module.Term, ...] = ()
+  span: source_span_module.SourceSpan | None = None
+  annotation_spans: tuple[source_span_module.SourceSpan, ...] = ()
+  body_span: source_span_module.SourceSpan | None = None
+
+
+def _keep(function: parser_module.JoyFunction) -> object:
+  return function
+
+
+def _to_unslotted(function: parser_module.JoyFunction) -> object:
+  # The parser builds a new annotation tuple for each function, which the original layout kept.
+  return _UnslottedJoyFunction(
+      name=function.name,
+      annotations=tuple(list(function.annotations)),
+      body=function.body,
+      span=function.span,
+      annotation_spans=function.annotation_spans,
+      body_span=function.body_span,
+  )
+
+
+# Generated functions with a few common combinations of annotations, as in a real project.
+def generate_source(count: int, max_body_length: int) -> str:
+  functions = corpus_generator_module.generate(
+      corpus_generator_module.CorpusOptions(
+          function_count=count, max_annotations=0, max_body_length=max_body_length
+      )
+  )
+  return "".join(
+      "".join(f"@{a} " for a in _ANNOTATION_COMBINATIONS[i % len(_ANNOTATION_COMBINATIONS)]) + text
+      for i, text in enumerate(functions)
+  )
+
+
+# Parses text and returns the number of functions and the memory still allocated for them, each
+# converted by convert, once the parse is over; the bodies and spans are those the parser built in
+# both cases. The flyweight table is counted only if keep_flyweights is true.
+def measure_memory(
+    text: str, convert: Callable[[parser_module.JoyFunction], object], keep_flyweights: bool
+) -> tuple[int, int]:
+  parser_module._annotations_flyweights.clear()
+  gc.collect()
+  tracemalloc.start()
+  try:
+    parser = parser_module.Parser(
+        tokenizer_module.Tokenizer(source_reader_module.SourceReader(text))
+    )
+    functions = [convert(function) for function in parser.iter_functions()]
+    del parser
+    if not keep_flyweights:
+      parser_module._annotations_flyweights.clear()
+    gc.collect()
+    memory_used, _ = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+  return len(functions), memory_used
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description="Measures the memory used by parsed JoyFunction objects compared to the "
+      "original non-slotted dataclass layout."
+  )
+  arg_parser.add_argument("--count", type=int, default=20_000)
+  arg_parser.add_argument(
+      "--max-body-length",
+      type=int,
+      default=corpus_generator_module.CorpusOptions.max_body_length,
+      help="the maximum number of terms in a generated function body; 0 for declarations only",
+  )
+  args = arg_parser.parse_args()
+
+  text = generate_source(args.count, args.max_body_length)
+  count, baseline_bytes = measure_memory(text, _to_unslotted, keep_flyweights=False)
+  _, slotted_bytes = measure_memory(text, _keep, keep_flyweights=True)
+
+  print(f"functions:          {count}")
+  print(f"unslotted:          {baseline_bytes:>14,} bytes ({baseline_bytes / count:.1f}/fn)")
+  print(f"slotted+flyweight:  {slotted_bytes:>14,} bytes ({slotted_bytes / count:.1f}/fn)")
+  print(f"savings:            {1 - slotted_bytes / baseline_bytes:.1%}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,631 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+import dataclasses
+from typing import Protocol
+
+import parser as parser_module
+
+
+class Quotation:
+  __slots__ = ("items", "compiled")
+
+  def __init__(self, items: Iterable[Value]) -> None:
+    self.items: tuple[Value, ...] = tuple(items)
+    # A cache for the compiled form of this quotation, owned by whichever backend executes it.
+    self.compiled: object = None
+
+  @classmethod
+  def from_terms(cls, terms: Iterable[parser_module.Term]) -> Quotation:
+    return cls(value_from_term(term) for term in terms)
+
+  def __eq__(self, other: object) -> bool:
+    if not isinstance(other, Quotation):
+      return NotImplemented
+    return _items_equal(self.items, other.items)
+
+  def __hash__(self) -> int:
+    return hash(self.items)
+
+  def __repr__(self) -> str:
+    return f"[{' '.join(format_value(item) for item in self.items)}]"
+
+
+# The runtime representation of Joy values: integers, strings, and booleans are represented by the
+# corresponding Python types, quotations (which double as lists) by Quotation, and words that
+# appear inside quotations by parser.Word.
+Value = int | str | bool | parser_module.Word | Quotation
+
+
+def value_from_term(term: parser_module.Term) -> Value:
+  if isinstance(term, parser_module.Quotation):
+    return Quotation.from_terms(term.terms)
+  elif isinstance(term, parser_module.Word):
+    return term
+  else:
+    return term.value
+
+
+def format_value(value: Value) -> str:
+  if isinstance(value, bool):
+    return "true" if value else "false"
+  elif isinstance(value, str):
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    escaped = escaped.replace("\r", "\\r").replace("\t", "\\t")
+    return f'"{escaped}"'
+  elif isinstance(value, parser_module.Word):
+    return value.name
+  else:
+    return repr(value)
+
+
+def values_equal(value1: Value, value2: Value) -> bool:
+  # Python considers True == 1, but Joy does not.
+  return type(value1) is type(value2) and value1 == value2
+
+
+def _items_equal(items1: tuple[Value, ...], items2: tuple[Value, ...]) -> bool:
+  return len(items1) == len(items2) and all(
+      values_equal(item1, item2) for item1, item2 in zip(items1, items2)
+  )
+
+
+# The interface through which built-in words manipulate the stack and execute quotations; it is
+# implemented by each of the execution backends.
+class Machine(Protocol):
+  stack: list[Value]
+
+  def execute(self, quotation: Quotation) -> None:
+    ...
+
+
+# The number of values a built-in pops from the stack and the number it then pushes. Built-ins whose
+# effect depends on the values they are given, such as most combinators, have no StackEffect.
+@dataclasses.dataclass(frozen=True, slots=True)
+class StackEffect:
+  inputs: int
+  outputs: int
+
+
+@dataclasses.dataclass(frozen=True)
+class Builtin:
+  name: str
+  function: Callable[[Machine], None]
+  stack_effect: StackEffect | None = None
+
+
+class JoyRuntimeError(Exception):
+  pass
+
+
+class StackUnderflowError(JoyRuntimeError):
+  pass
+
+
+class JoyTypeError(JoyRuntimeError):
+  pass
+
+
+def _require_depth(machine: Machine, depth: int, word: str) -> None:
+  if len(machine.stack) < depth:
+    raise StackUnderflowError(
+        f"{word} requires {depth} values on the stack but found {len(machine.stack)}"
+    )
+
+
+def _pop_int(machine: Machine, word: str) -> int:
+  _require_depth(machine, 1, word)
+  value = machine.stack.pop()
+  if type(value) is not int:
+    raise JoyTypeError(f"{word} requires an integer but got {format_value(value)}")
+  return value
+
+
+def _pop_bool(machine: Machine, word: str) -> bool:
+  _require_depth(machine, 1, word)
+  value = machine.stack.pop()
+  if type(value) is not bool:
+    raise JoyTypeError(f"{word} requires a boolean but got {format_value(value)}")
+  return value
+
+
+def _pop_quotation(machine: Machine, word: str) -> Quotation:
+  _require_depth(machine, 1, word)
+  value = machine.stack.pop()
+  if not isinstance(value, Quotation):
+    raise JoyTypeError(f"{word} requires a quotation but got {format_value(value)}")
+  return value
+
+
+def _pop_aggregate(machine: Machine, word: str) -> Quotation | str:
+  _require_depth(machine, 1, word)
+  value = machine.stack.pop()
+  if not isinstance(value, (Quotation, str)):
+    raise JoyTypeError(f"{word} requires a quotation or string but got {format_value(value)}")
+  return value
+
+
+def _test(machine: Machine, quotation: Quotation, word: str) -> bool:
+  # Joy's conditional combinators evaluate their condition on a copy of the stack, so that the
+  # condition's effect on the stack is discarded.
+  saved_stack = machine.stack[:]
+  machine.execute(quotation)
+  result = _pop_bool(machine, word)
+  machine.stack[:] = saved_stack
+  return result
+
+
+# Stack manipulation
+
+
+def _id(machine: Machine) -> None:
+  pass
+
+
+def _dup(machine: Machine) -> None:
+  _require_depth(machine, 1, "dup")
+  machine.stack.append(machine.stack[-1])
+
+
+def _pop(machine: Machine) -> None:
+  _require_depth(machine, 1, "pop")
+  machine.stack.pop()
+
+
+def _swap(machine: Machine) -> None:
+  _require_depth(machine, 2, "swap")
+  stack = machine.stack
+  stack[-1], stack[-2] = stack[-2], stack[-1]
+
+
+def _over(machine: Machine) -> None:
+  _require_depth(machine, 2, "over")
+  machine.stack.append(machine.stack[-2])
+
+
+def _rot(machine: Machine) -> None:
+  # X Y Z -> Y Z X
+  _require_depth(machine, 3, "rot")
+  machine.stack.append(machine.stack.pop(-3))
+
+
+def _dupd(machine: Machine) -> None:
+  _require_depth(machine, 2, "dupd")
+  machine.stack.insert(-1, machine.stack[-2])
+
+
+def _popd(machine: Machine) -> None:
+  _require_depth(machine, 2, "popd")
+  del machine.stack[-2]
+
+
+def _swapd(machine: Machine) -> None:
+  _require_depth(machine, 3, "swapd")
+  stack = machine.stack
+  stack[-2], stack[-3] = stack[-3], stack[-2]
+
+
+# Arithmetic
+
+
+def _add(machine: Machine) -> None:
+  y = _pop_int(machine, "+")
+  x = _pop_int(machine, "+")
+  machine.stack.append(x + y)
+
+
+def _subtract(machine: Machine) -> None:
+  y = _pop_int(machine, "-")
+  x = _pop_int(machine, "-")
+  machine.stack.append(x - y)
+
+
+def _multiply(machine: Machine) -> None:
+  y = _pop_int(machine, "*")
+  x = _pop_int(machine, "*")
+  machine.stack.append(x * y)
+
+
+def truncating_divide(x: int, y: int, word: str) -> int:
+  if y == 0:
+    raise JoyRuntimeError(f"{word}: division by zero")
+  quotient = abs(x) // abs(y)
+  return quotient if (x < 0) == (y < 0) else -quotient
+
+
+def _divide(machine: Machine) -> None:
+  y = _pop_int(machine, "/")
+  x = _pop_int(machine, "/")
+  machine.stack.append(truncating_divide(x, y, "/"))
+
+
+def _remainder(machine: Machine) -> None:
+  y = _pop_int(machine, "rem")
+  x = _pop_int(machine, "rem")
+  machine.stack.append(x - y * truncating_divide(x, y, "rem"))
+
+
+def _negate(machine: Machine) -> None:
+  machine.stack.append(-_pop_int(machine, "neg"))
+
+
+def _abs(machine: Machine) -> None:
+  machine.stack.append(abs(_pop_int(machine, "abs")))
+
+
+def _succ(machine: Machine) -> None:
+  machine.stack.append(_pop_int(machine, "succ") + 1)
+
+
+def _pred(machine: Machine) -> None:
+  machine.stack.append(_pop_int(machine, "pred") - 1)
+
+
+def _max(machine: Machine) -> None:
+  y = _pop_int(machine, "max")
+  x = _pop_int(machine, "max")
+  machine.stack.append(max(x, y))
+
+
+def _min(machine: Machine) -> None:
+  y = _pop_int(machine, "min")
+  x = _pop_int(machine, "min")
+  machine.stack.append(min(x, y))
+
+
+# Comparison and logic
+
+
+def _equal(machine: Machine) -> None:
+  _require_depth(machine, 2, "=")
+  y = machine.stack.pop()
+  x = machine.stack.pop()
+  machine.stack.append(values_equal(x, y))
+
+
+def _not_equal(machine: Machine) -> None:
+  _require_depth(machine, 2, "!=")
+  y = machine.stack.pop()
+  x = machine.stack.pop()
+  machine.stack.append(not values_equal(x, y))
+
+
+def _less_than(machine: Machine) -> None:
+  y = _pop_int(machine, "<")
+  x = _pop_int(machine, "<")
+  machine.stack.append(x < y)
+
+
+def _greater_than(machine: Machine) -> None:
+  y = _pop_int(machine, ">")
+  x = _pop_int(machine, ">")
+  machine.stack.append(x > y)
+
+
+def _less_than_or_equal(machine: Machine) -> None:
+  y = _pop_int(machine, "<=")
+  x = _pop_int(machine, "<=")
+  machine.stack.append(x <= y)
+
+
+def _greater_than_or_equal(machine: Machine) -> None:
+  y = _pop_int(machine, ">=")
+  x = _pop_int(machine, ">=")
+  machine.stack.append(x >= y)
+
+
+def _and(machine: Machine) -> None:
+  y = _pop_bool(machine, "and")
+  x = _pop_bool(machine, "and")
+  machine.stack.append(x and y)
+
+
+def _or(machine: Machine) -> None:
+  y = _pop_bool(machine, "or")
+  x = _pop_bool(machine, "or")
+  machine.stack.append(x or y)
+
+
+def _not(machine: Machine) -> None:
+  machine.stack.append(not _pop_bool(machine, "not"))
+
+
+def _pop_size(machine: Machine, word: str) -> int:
+  # The "size" of an integer, as far as null and small are concerned, is its value.
+  _require_depth(machine, 1, word)
+  value = machine.stack.pop()
+  if type(value) is int:
+    return value
+  elif isinstance(value, str):
+    return len(value)
+  elif isinstance(value, Quotation):
+    return len(value.items)
+  raise JoyTypeError(f"{word} requires an integer or aggregate but got {format_value(value)}")
+
+
+def _null(machine: Machine) -> None:
+  machine.stack.append(_pop_size(machine, "null") == 0)
+
+
+def _small(machine: Machine) -> None:
+  machine.stack.append(_pop_size(machine, "small") < 2)
+
+
+# Aggregates
+
+
+def _cons(machine: Machine) -> None:
+  quotation = _pop_quotation(machine, "cons")
+  _require_depth(machine, 1, "cons")
+  machine.stack.append(Quotation((machine.stack.pop(),) + quotation.items))
+
+
+def _swons(machine: Machine) -> None:
+  _require_depth(machine, 2, "swons")
+  _swap(machine)
+  _cons(machine)
+
+
+def _first(machine: Machine) -> None:
+  aggregate = _pop_aggregate(machine, "first")
+  items = aggregate if isinstance(aggregate, str) else aggregate.items
+  if len(items) == 0:
+    raise JoyRuntimeError("first: empty aggregate")
+  machine.stack.append(items[0])
+
+
+def _rest(machine: Machine) -> None:
+  aggregate = _pop_aggregate(machine, "rest")
+  if isinstance(aggregate, str):
+    if len(aggregate) == 0:
+      raise JoyRuntimeError("rest: empty aggregate")
+    machine.stack.append(aggregate[1:])
+  else:
+    if len(aggregate.items) == 0:
+      raise JoyRuntimeError("rest: empty aggregate")
+    machine.stack.append(Quotation(aggregate.items[1:]))
+
+
+def _uncons(machine: Machine) -> None:
+  _require_depth(machine, 1, "uncons")
+  _dup(machine)
+  _first(machine)
+  _swap(machine)
+  _rest(machine)
+
+
+def _size(machine: Machine) -> None:
+  aggregate = _pop_aggregate(machine, "size")
+  machine.stack.append(len(aggregate) if isinstance(aggregate, str) else len(aggregate.items))
+
+
+def _concat(machine: Machine) -> None:
+  y = _pop_aggregate(machine, "concat")
+  x = _pop_aggregate(machine, "concat")
+  if isinstance(x, str) and isinstance(y, str):
+    machine.stack.append(x + y)
+  elif isinstance(x, Quotation) and isinstance(y, Quotation):
+    machine.stack.append(Quotation(x.items + y.items))
+  else:
+    raise JoyTypeError("concat requires two quotations or two strings")
+
+
+def _reverse(machine: Machine) -> None:
+  aggregate = _pop_aggregate(machine, "reverse")
+  if isinstance(aggregate, str):
+    machine.stack.append(aggregate[::-1])
+  else:
+    machine.stack.append(Quotation(aggregate.items[::-1]))
+
+
+# Combinators
+
+
+def _i(machine: Machine) -> None:
+  machine.execute(_pop_quotation(machine, "i"))
+
+
+def _x(machine: Machine) -> None:
+  _require_depth(machine, 1, "x")
+  quotation = machine.stack[-1]
+  if not isinstance(quotation, Quotation):
+    raise JoyTypeError(f"x requires a quotation but got {format_value(quotation)}")
+  machine.execute(quotation)
+
+
+def _dip(machine: Machine) -> None:
+  quotation = _pop_quotation(machine, "dip")
+  _require_depth(machine, 1, "dip")
+  value = machine.stack.pop()
+  machine.execute(quotation)
+  machine.stack.append(value)
+
+
+def _ifte(machine: Machine) -> None:
+  else_quotation = _pop_quotation(machine, "ifte")
+  then_quotation = _pop_quotation(machine, "ifte")
+  if_quotation = _pop_quotation(machine, "ifte")
+  if _test(machine, if_quotation, "ifte"):
+    machine.execute(then_quotation)
+  else:
+    machine.execute(else_quotation)
+
+
+def _branch(machine: Machine) -> None:
+  else_quotation = _pop_quotation(machine, "branch")
+  then_quotation = _pop_quotation(machine, "branch")
+  if _pop_bool(machine, "branch"):
+    machine.execute(then_quotation)
+  else:
+    machine.execute(else_quotation)
+
+
+def _times(machine: Machine) -> None:
+  quotation = _pop_quotation(machine, "times")
+  for _ in range(_pop_int(machine, "times")):
+    machine.execute(quotation)
+
+
+def _step(machine: Machine) -> None:
+  quotation = _pop_quotation(machine, "step")
+  aggregate = _pop_quotation(machine, "step")
+  for item in aggregate.items:
+    machine.stack.append(item)
+    machine.execute(quotation)
+
+
+def _map(machine: Machine) -> None:
+  quotation = _pop_quotation(machine, "map")
+  aggregate = _pop_quotation(machine, "map")
+  saved_stack = machine.stack[:]
+  results = []
+  for item in aggregate.items:
+    machine.stack.append(item)
+    machine.execute(quotation)
+    _require_depth(machine, 1, "map")
+    results.append(machine.stack.pop())
+    machine.stack[:] = saved_stack
+  machine.stack.append(Quotation(results))
+
+
+def _filter(machine: Machine) -> None:
+  quotation = _pop_quotation(machine, "filter")
+  aggregate = _pop_quotation(machine, "filter")
+  saved_stack = machine.stack[:]
+  results = []
+  for item in aggregate.items:
+    machine.stack.append(item)
+    machine.execute(quotation)
+    if _pop_bool(machine, "filter"):
+      results.append(item)
+    machine.stack[:] = saved_stack
+  machine.stack.append(Quotation(results))
+
+
+def _fold(machine: Machine) -> None:
+  quotation = _pop_quotation(machine, "fold")
+  _require_depth(machine, 2, "fold")
+  initial_value = machine.stack.pop()
+  aggregate = _pop_quotation(machine, "fold")
+  machine.stack.append(initial_value)
+  for item in aggregate.items:
+    machine.stack.append(item)
+    machine.execute(quotation)
+
+
+def _linrec(machine: Machine) -> None:
+  recurse2_quotation = _pop_quotation(machine, "linrec")
+  recurse1_quotation = _pop_quotation(machine, "linrec")
+  then_quotation = _pop_quotation(machine, "linrec")
+  if_quotation = _pop_quotation(machine, "linrec")
+
+  def linrec() -> None:
+    if _test(machine, if_quotation, "linrec"):
+      machine.execute(then_quotation)
+    else:
+      machine.execute(recurse1_quotation)
+      linrec()
+      machine.execute(recurse2_quotation)
+
+  linrec()
+
+
+def _binrec(machine: Machine) -> None:
+  recurse2_quotation = _pop_quotation(machine, "binrec")
+  recurse1_quotation = _pop_quotation(machine, "binrec")
+  then_quotation = _pop_quotation(machine, "binrec")
+  if_quotation = _pop_quotation(machine, "binrec")
+
+  def binrec() -> None:
+    if _test(machine, if_quotation, "binrec"):
+      machine.execute(then_quotation)
+    else:
+      machine.execute(recurse1_quotation)
+      _require_depth(machine, 2, "binrec")
+      second_value = machine.stack.pop()
+      binrec()
+      machine.stack.append(second_value)
+      binrec()
+      machine.execute(recurse2_quotation)
+
+  binrec()
+
+
+def _primrec(machine: Machine) -> None:
+  combine_quotation = _pop_quotation(machine, "primrec")
+  initial_quotation = _pop_quotation(machine, "primrec")
+  _require_depth(machine, 1, "primrec")
+  value = machine.stack.pop()
+
+  if type(value) is int:
+    members: list[Value] = list(range(value, 0, -1))
+  elif isinstance(value, Quotation):
+    members = list(value.items)
+  else:
+    raise JoyTypeError(f"primrec requires an integer or quotation but got {format_value(value)}")
+
+  machine.stack.extend(members)
+  machine.execute(initial_quotation)
+  for _ in members:
+    machine.execute(combine_quotation)
+
+
+# The built-in words. The index of each built-in in this tuple is its identity in compiled code, so
+# new built-ins must only ever be appended.
+BUILTINS: tuple[Builtin, ...] = (
+    Builtin("id", _id, StackEffect(0, 0)),
+    Builtin("dup", _dup, StackEffect(1, 2)),
+    Builtin("pop", _pop, StackEffect(1, 0)),
+    Builtin("swap", _swap, StackEffect(2, 2)),
+    Builtin("over", _over, StackEffect(2, 3)),
+    Builtin("rot", _rot, StackEffect(3, 3)),
+    Builtin("dupd", _dupd, StackEffect(2, 3)),
+    Builtin("popd", _popd, StackEffect(2, 1)),
+    Builtin("swapd", _swapd, StackEffect(3, 3)),
+    Builtin("+", _add, StackEffect(2, 1)),
+    Builtin("-", _subtract, StackEffect(2, 1)),
+    Builtin("*", _multiply, StackEffect(2, 1)),
+    Builtin("/", _divide, StackEffect(2, 1)),
+    Builtin("rem", _remainder, StackEffect(2, 1)),
+    Builtin("%", _remainder, StackEffect(2, 1)),
+    Builtin("neg", _negate, StackEffect(1, 1)),
+    Builtin("abs", _abs, StackEffect(1, 1)),
+    Builtin("succ", _succ, StackEffect(1, 1)),
+    Builtin("pred", _pred, StackEffect(1, 1)),
+    Builtin("max", _max, StackEffect(2, 1)),
+    Builtin("min", _min, StackEffect(2, 1)),
+    Builtin("=", _equal, StackEffect(2, 1)),
+    Builtin("!=", _not_equal, StackEffect(2, 1)),
+    Builtin("<", _less_than, StackEffect(2, 1)),
+    Builtin(">", _greater_than, StackEffect(2, 1)),
+    Builtin("<=", _less_than_or_equal, StackEffect(2, 1)),
+    Builtin(">=", _greater_than_or_equal, StackEffect(2, 1)),
+    Builtin("and", _and, StackEffect(2, 1)),
+    Builtin("or", _or, StackEffect(2, 1)),
+    Builtin("not", _not, StackEffect(1, 1)),
+    Builtin("null", _null, StackEffect(1, 1)),
+    Builtin("small", _small, StackEffect(1, 1)),
+    Builtin("cons", _cons, StackEffect(2, 1)),
+    Builtin("swons", _swons, StackEffect(2, 1)),
+    Builtin("first", _first, StackEffect(1, 1)),
+    Builtin("rest", _rest, StackEffect(1, 1)),
+    Builtin("uncons", _uncons, StackEffect(1, 2)),
+    Builtin("size", _size, StackEffect(1, 1)),
+    Builtin("concat", _concat, StackEffect(2, 1)),
+    Builtin("reverse", _reverse, StackEffect(1, 1)),
+    Builtin("i", _i),
+    Builtin("x", _x),
+    Builtin("dip", _dip),
+    Builtin("ifte", _ifte),
+    Builtin("branch", _branch),
+    Builtin("times", _times),
+    Builtin("step", _step),
+    Builtin("map", _map),
+    Builtin("filter", _filter),
+    Builtin("fold", _fold),
+    Builtin("linrec", _linrec),
+    Builtin("binrec", _binrec),
+    Builtin("primrec", _primrec),
+)
+
+BUILTIN_INDICES: dict[str, int] = {builtin.name: i for i, builtin in enumerate(BUILTINS)}
@@ -0,0 +1,244 @@
+from absl.testing import absltest
+import parameterized
+
+import joy_runtime as joy_runtime_module
+import parser as parser_module
+
+JoyRuntimeError = joy_runtime_module.JoyRuntimeError
+JoyTypeError = joy_runtime_module.JoyTypeError
+Quotation = joy_runtime_module.Quotation
+StackUnderflowError = joy_runtime_module.StackUnderflowError
+Value = joy_runtime_module.Value
+Word = parser_module.Word
+
+
+class QuotationTest(absltest.TestCase):
+
+  def test_equality(self):
+    self.assertEqual(Quotation([1, "a", Word("dup")]), Quotation((1, "a", Word("dup"))))
+    self.assertEqual(Quotation([Quotation([1])]), Quotation([Quotation([1])]))
+    self.assertNotEqual(Quotation([1]), Quotation([2]))
+    self.assertNotEqual(Quotation([1]), Quotation([1, 1]))
+    self.assertNotEqual(Quotation([1]), Quotation([True]))
+    self.assertNotEqual(Quotation([1]), (1,))
+
+  def test_hash(self):
+    self.assertEqual(hash(Quotation([1, 2])), hash(Quotation([1, 2])))
+
+  def test_repr(self):
+    self.assertEqual(
+        '[1 "a\\"b" true [dup] +]',
+        repr(Quotation([1, 'a"b', True, Quotation([Word("dup")]), Word("+")])),
+    )
+
+  def test_from_terms(self):
+    terms = (
+        parser_module.IntegerLiteral(1),
+        parser_module.StringLiteral("a"),
+        parser_module.BooleanLiteral(False),
+        parser_module.Word("dup"),
+        parser_module.Quotation((parser_module.IntegerLiteral(2),)),
+    )
+
+    quotation = Quotation.from_terms(terms)
+
+    self.assertEqual(Quotation([1, "a", False, Word("dup"), Quotation([2])]), quotation)
+
+
+class BuiltinsTest(absltest.TestCase):
+
+  @parameterized.parameterized.expand([
+      ("id", [1], "id", [1]),
+      ("dup", [1, 2], "dup", [1, 2, 2]),
+      ("pop", [1, 2], "pop", [1]),
+      ("swap", [1, 2], "swap", [2, 1]),
+      ("over", [1, 2], "over", [1, 2, 1]),
+      ("rot", [1, 2, 3], "rot", [2, 3, 1]),
+      ("dupd", [1, 2], "dupd", [1, 1, 2]),
+      ("popd", [1, 2], "popd", [2]),
+      ("swapd", [1, 2, 3], "swapd", [2, 1, 3]),
+      ("add", [2, 3], "+", [5]),
+      ("subtract", [2, 3], "-", [-1]),
+      ("multiply", [2, 3], "*", [6]),
+      ("divide", [7, 2], "/", [3]),
+      ("divide_negative", [-7, 2], "/", [-3]),
+      ("rem", [7, 2], "rem", [1]),
+      ("rem_negative", [-7, 2], "rem", [-1]),
+      ("percent", [7, 3], "%", [1]),
+      ("neg", [3], "neg", [-3]),
+      ("abs", [-3], "abs", [3]),
+      ("succ", [3], "succ", [4]),
+      ("pred", [3], "pred", [2]),
+      ("max", [3, 5], "max", [5]),
+      ("min", [3, 5], "min", [3]),
+      ("equal", [3, 3], "=", [True]),
+      ("equal_different_types", [1, True], "=", [False]),
+      ("not_equal", [3, 4], "!=", [True]),
+      ("less_than", [3, 4], "<", [True]),
+      ("greater_than", [3, 4], ">", [False]),
+      ("less_than_or_equal", [4, 4], "<=", [True]),
+      ("greater_than_or_equal", [3, 4], ">=", [False]),
+      ("and", [True, False], "and", [False]),
+      ("or", [True, False], "or", [True]),
+      ("not", [True], "not", [False]),
+      ("null_int", [0], "null", [True]),
+      ("null_list", [Quotation([1])], "null", [False]),
+      ("null_string", [""], "null", [True]),
+      ("small_int", [1], "small", [True]),
+      ("small_list", [Quotation([1, 2])], "small", [False]),
+      ("cons", [1, Quotation([2])], "cons", [Quotation([1, 2])]),
+      ("swons", [Quotation([2]), 1], "swons", [Quotation([1, 2])]),
+      ("first", [Quotation([1, 2])], "first", [1]),
+      ("first_string", ["ab"], "first", ["a"]),
+      ("rest", [Quotation([1, 2])], "rest", [Quotation([2])]),
+      ("rest_string", ["ab"], "rest", ["b"]),
+      ("uncons", [Quotation([1, 2])], "uncons", [1, Quotation([2])]),
+      ("size", [Quotation([1, 2])], "size", [2]),
+      ("size_string", ["abc"], "size", [3]),
+      ("concat", [Quotation([1]), Quotation([2])], "concat", [Quotation([1, 2])]),
+      ("concat_string", ["a", "b"], "concat", ["ab"]),
+      ("reverse", [Quotation([1, 2])], "reverse", [Quotation([2, 1])]),
+  ])
+  def test_simple_builtin(self, _, stack: list[Value], word: str, expected_stack: list[Value]):
+    self.assertStackEqual(expected_stack, self.run_word(stack, word))
+
+  @parameterized.parameterized.expand([
+      ("i", [1, Quotation([Word("dup")])], "i", [1, 1]),
+      ("x", [Quotation([Word("size")])], "x", [1]),
+      ("dip", [1, 2, Quotation([Word("dup")])], "dip", [1, 1, 2]),
+      (
+          "ifte_true",
+          [5, Quotation([0, Word(">")]), Quotation(["pos"]), Quotation(["neg"])],
+          "ifte",
+          [5, "pos"],
+      ),
+      (
+          "ifte_false",
+          [-5, Quotation([0, Word(">")]), Quotation(["pos"]), Quotation(["neg"])],
+          "ifte",
+          [-5, "neg"],
+      ),
+      ("branch", [False, Quotation([1]), Quotation([2])], "branch", [2]),
+      ("times", [1, 3, Quotation([2, Word("*")])], "times", [8]),
+      ("step", [0, Quotation([1, 2, 3]), Quotation([Word("+")])], "step", [6]),
+      (
+          "map",
+          [9, Quotation([1, 2, 3]), Quotation([Word("dup"), Word("*")])],
+          "map",
+          [9, Quotation([1, 4, 9])],
+      ),
+      (
+          "map_discards_stack_effects",
+          [9, Quotation([1, 2]), Quotation([Word("pop"), Word("pop"), 0])],
+          "map",
+          [9, Quotation([0, 0])],
+      ),
+      (
+          "filter",
+          [Quotation([1, 2, 3, 4]), Quotation([2, Word("rem"), 0, Word("=")])],
+          "filter",
+          [Quotation([2, 4])],
+      ),
+      ("fold", [Quotation([1, 2, 3]), 10, Quotation([Word("+")])], "fold", [16]),
+      (
+          "linrec",
+          [
+              5,
+              Quotation([Word("null")]),
+              Quotation([Word("succ")]),
+              Quotation([Word("dup"), Word("pred")]),
+              Quotation([Word("*")]),
+          ],
+          "linrec",
+          [120],
+      ),
+      (
+          "binrec",
+          [
+              10,
+              Quotation([Word("small")]),
+              Quotation([]),
+              Quotation([Word("pred"), Word("dup"), Word("pred")]),
+              Quotation([Word("+")]),
+          ],
+          "binrec",
+          [55],
+      ),
+      ("primrec_int", [5, Quotation([1]), Quotation([Word("*")])], "primrec", [120]),
+      (
+          "primrec_list",
+          [Quotation([1, 2, 3]), Quotation([0]), Quotation([Word("+")])],
+          "primrec",
+          [6],
+      ),
+  ])
+  def test_combinator(self, _, stack: list[Value], word: str, expected_stack: list[Value]):
+    self.assertStackEqual(expected_stack, self.run_word(stack, word))
+
+  @parameterized.parameterized.expand([
+      ("dup", [], "dup"),
+      ("swap", [1], "swap"),
+      ("add", [1], "+"),
+      ("rot", [1, 2], "rot"),
+      ("cons", [Quotation([])], "cons"),
+  ])
+  def test_stack_underflow(self, _, stack: list[Value], word: str):
+    with self.assertRaises(StackUnderflowError):
+      self.run_word(stack, word)
+
+  @parameterized.parameterized.expand([
+      ("add_string", [1, "a"], "+"),
+      ("add_bool", [1, True], "+"),
+      ("not_int", [1], "not"),
+      ("i_int", [1], "i"),
+      ("first_int", [1], "first"),
+      ("concat_mixed", ["a", Quotation([])], "concat"),
+      ("ifte_non_boolean_condition", [Quotation([1]), Quotation([]), Quotation([])], "ifte"),
+  ])
+  def test_type_error(self, _, stack: list[Value], word: str):
+    with self.assertRaises(JoyTypeError):
+      self.run_word(stack, word)
+
+  @parameterized.parameterized.expand([
+      ("divide_by_zero", [1, 0], "/"),
+      ("rem_by_zero", [1, 0], "rem"),
+      ("first_empty", [Quotation([])], "first"),
+      ("rest_empty", [""], "rest"),
+  ])
+  def test_runtime_error(self, _, stack: list[Value], word: str):
+    with self.assertRaises(JoyRuntimeError):
+      self.run_word(stack, word)
+
+  def test_builtin_names_are_unique(self):
+    names = [builtin.name for builtin in joy_runtime_module.BUILTINS]
+    self.assertEqual(len(names), len(set(names)))
+    self.assertEqual(len(names), len(joy_runtime_module.BUILTIN_INDICES))
+
+  def run_word(self, stack: list[Value], word: str) -> list[Value]:
+    machine = _TestMachine(stack)
+    machine.execute(Quotation([Word(word)]))
+    return machine.stack
+
+  def assertStackEqual(self, expected_stack: list[Value], actual_stack: list[Value]) -> None:
+    self.assertEqual(expected_stack, actual_stack)
+    self.assertEqual([type(value) for value in expected_stack], [type(v) for v in actual_stack])
+
+
+# A minimal machine that interprets quotations directly, so that the built-ins can be tested
+# independently of the execution backends.
+class _TestMachine:
+
+  def __init__(self, stack: list[Value]) -> None:
+    self.stack = list(stack)
+
+  def execute(self, quotation: Quotation) -> None:
+    for item in quotation.items:
+      if isinstance(item, Word):
+        builtin_index = joy_runtime_module.BUILTIN_INDICES[item.name]
+        joy_runtime_module.BUILTINS[builtin_index].function(self)
+      else:
+        self.stack.append(item)
+
+
+if __name__ == "__main__":
+  absltest.main()
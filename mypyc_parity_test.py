@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import glob
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import subprocess
+import sys
+import types
+import unittest
+
+from absl.testing import absltest
+
+# The modules that build_mypyc.sh compiles.
+COMPILED_MODULES = ("source_reader", "tokenizer")
+
+_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def is_compiled(module: types.ModuleType) -> bool:
+  return module.__file__ is not None and module.__file__.endswith(
+      tuple(importlib.machinery.EXTENSION_SUFFIXES)
+  )
+
+
+def has_compiled_build() -> bool:
+  for name in COMPILED_MODULES:
+    spec = importlib.machinery.PathFinder.find_spec(name, [_DIRECTORY])
+    if spec is None or spec.origin is None:
+      return False
+    if not spec.origin.endswith(tuple(importlib.machinery.EXTENSION_SUFFIXES)):
+      return False
+  return True
+
+
+# Imports the pure-Python source of the compiled modules even where a compiled build exists, which
+# Python would otherwise import in preference to it.
+class _PurePythonFinder(importlib.abc.MetaPathFinder):
+
+  def find_spec(
+      self, fullname: str, path: object, target: types.ModuleType | None = None
+  ) -> importlib.machinery.ModuleSpec | None:
+    if fullname not in COMPILED_MODULES:
+      return None
+    return importlib.util.spec_from_file_location(
+        fullname, os.path.join(_DIRECTORY, f"{fullname}.py")
+    )
+
+
+# Runs the given test modules with either the compiled or the pure-Python modules, exiting with
+# a nonzero status if any test fails; run in a subprocess by MypycParityTest.
+def run_tests(test_module_names: list[str], pure_python: bool) -> None:
+  if pure_python:
+    sys.meta_path.insert(0, _PurePythonFinder())
+  for name in COMPILED_MODULES:
+    module = importlib.import_module(name)
+    if is_compiled(module) == pure_python:
+      raise AssertionError(f"{name} was imported from {module.__file__}")
+  unittest.main(module=None, argv=["unittest", *test_module_names])
+
+
+# If build_mypyc.sh has been run, runs every other *_test.py against both the compiled and the
+# pure-Python modules, so that the two cannot diverge.
+class MypycParityTest(absltest.TestCase):
+
+  def test_pure_python(self):
+    if not has_compiled_build():
+      self.skipTest("without a compiled build, the other tests already run against pure Python")
+    self.assertTestsPass(pure_python=True)
+
+  def test_compiled(self):
+    if not has_compiled_build():
+      self.skipTest("there is no compiled build; run build_mypyc.sh")
+    self.assertTestsPass(pure_python=False)
+
+  def assertTestsPass(self, pure_python: bool) -> None:
+    test_module_names = sorted(
+        os.path.basename(path)[: -len(".py")]
+        for path in glob.glob(os.path.join(_DIRECTORY, "*_test.py"))
+        if os.path.basename(path) != os.path.basename(__file__)
+    )
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import mypyc_parity_test; mypyc_parity_test.run_tests({test_module_names!r}, "
+            f"pure_python={pure_python!r})",
+        ],
+        cwd=_DIRECTORY,
+        capture_output=True,
+        text=True,
+    )
+
+    self.assertEqual(0, result.returncode, msg=result.stderr[-10000:])
+
+
+if __name__ == "__main__":
+  absltest.main()
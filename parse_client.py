@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+import os
+import socket
+import threading
+
+import parse_protocol as parse_protocol_module
+
+ParseInput = parse_protocol_module.ParseInput
+ParseResult = parse_protocol_module.ParseResult
+PathInput = parse_protocol_module.PathInput
+TextInput = parse_protocol_module.TextInput
+
+
+# A connection to a ParseServer. Requests on one client are sent one at a time; open several
+# clients to have the server parse concurrently.
+class ParseClient:
+
+  def __init__(self, socket_path: str, timeout: float | None = None) -> None:
+    self.socket_path = socket_path
+    self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self._lock = threading.Lock()
+    try:
+      self._socket.settimeout(timeout)
+      self._socket.connect(socket_path)
+    except BaseException:
+      self._socket.close()
+      raise
+
+  # Parses a batch of inputs, returning their results in the same order. Relative paths are
+  # resolved against the client's working directory. Raises ParseServerError if the server could
+  # not process the batch; an input that fails to parse is reported in its result instead.
+  def parse(self, inputs: Sequence[ParseInput]) -> list[ParseResult]:
+    inputs = [
+        PathInput(os.path.abspath(parse_input.path))
+        if isinstance(parse_input, PathInput)
+        else parse_input
+        for parse_input in inputs
+    ]
+    with self._lock:
+      parse_protocol_module.write_frame(self._socket, parse_protocol_module.encode_request(inputs))
+      payload = parse_protocol_module.read_frame(self._socket)
+    if payload is None:
+      raise parse_protocol_module.ProtocolError("the server closed the connection")
+
+    results = parse_protocol_module.decode_response(payload)
+    if len(results) != len(inputs):
+      raise parse_protocol_module.ProtocolError(
+          f"expected {len(inputs)} results but received {len(results)}"
+      )
+    return results
+
+  def parse_paths(self, paths: Iterable[str | os.PathLike[str]]) -> list[ParseResult]:
+    return self.parse([PathInput(os.fspath(path)) for path in paths])
+
+  def parse_text(self, text: str, name: str = "<text>") -> ParseResult:
+    return self.parse([TextInput(text, name)])[0]
+
+  def close(self) -> None:
+    self._socket.close()
+
+  def __enter__(self) -> ParseClient:
+    return self
+
+  def __exit__(self, *exc_info: object) -> None:
+    self.close()
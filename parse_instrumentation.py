@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import dataclasses
+import enum
+import json
+import os
+import threading
+import time
+from typing import Protocol, TextIO
+
+
+# The phases of a parse that are timed. Phases may nest: an ANNOTATION contains the IDENTIFIER that
+# names it, and a FUNCTION contains the phases that parse it, so the time of a phase includes that
+# of the phases nested within it.
+@enum.unique
+class Phase(enum.Enum):
+  # Reading more input into the source reader's buffer.
+  REFILL = "refill"
+  # Skipping whitespace, an inline comment, or a multiline comment.
+  TRIVIA = "trivia"
+  # Reading an annotation, e.g. "@main".
+  ANNOTATION = "annotation"
+  # Reading an identifier, e.g. a function name or word.
+  IDENTIFIER = "identifier"
+  # Parsing a function, from its `function` keyword until the function is complete.
+  FUNCTION = "function"
+
+
+# The interface through which the source reader, tokenizer, and parser report the phases of a
+# parse. An instrumentation is given to the SourceReader, and the Tokenizer and Parser built on it
+# use the same one; without one, the only cost is a check for None.
+class Instrumentation(Protocol):
+
+  # Called when a phase ends, with the times at which it started and ended as measured by
+  # time.perf_counter_ns(). Phases that do no work (e.g. looking for trivia where there is none)
+  # are not reported.
+  def record(self, phase: Phase, start_ns: int, end_ns: int) -> None:
+    ...
+
+
+@dataclasses.dataclass
+class PhaseTotal:
+  count: int = 0
+  total_ns: int = 0
+
+
+# Aggregates the number of times each phase occurred and the total time spent in it.
+class PhaseCollector:
+
+  def __init__(self) -> None:
+    self.totals: dict[Phase, PhaseTotal] = {phase: PhaseTotal() for phase in Phase}
+
+  def record(self, phase: Phase, start_ns: int, end_ns: int) -> None:
+    total = self.totals[phase]
+    total.count += 1
+    total.total_ns += end_ns - start_ns
+
+  def clear(self) -> None:
+    for total in self.totals.values():
+      total.count = 0
+      total.total_ns = 0
+
+  def format(self) -> str:
+    lines = [f"{'phase':12} {'count':>12} {'total ms':>12} {'mean ns':>12}"]
+    for phase, total in self.totals.items():
+      mean_ns = total.total_ns / total.count if total.count > 0 else 0.0
+      lines.append(
+          f"{phase.value:12} {total.count:12} {total.total_ns / 1e6:12.3f} {mean_ns:12.0f}"
+      )
+    return "\n".join(lines)
+
+
+# Writes each phase to f as a complete event in the Chrome trace event format, which can be viewed
+# in chrome://tracing or Perfetto. Events are written as they are recorded, so memory use does not
+# grow with the length of the trace; close() must be called to complete the JSON array.
+class ChromeTraceWriter:
+
+  def __init__(self, f: TextIO) -> None:
+    self.f = f
+    # Timestamps are relative to the creation of the writer.
+    self._origin_ns = time.perf_counter_ns()
+    self._pid = os.getpid()
+    self._lock = threading.Lock()
+    self._event_count = 0
+    self._closed = False
+    self.f.write("[")
+
+  def record(self, phase: Phase, start_ns: int, end_ns: int) -> None:
+    event = json.dumps({
+        "name": phase.value,
+        "cat": "parse",
+        "ph": "X",
+        "ts": (start_ns - self._origin_ns) / 1e3,
+        "dur": (end_ns - start_ns) / 1e3,
+        "pid": self._pid,
+        "tid": threading.get_ident(),
+    })
+    with self._lock:
+      if self._closed:
+        raise ValueError("the trace has been closed")
+      self.f.write(",\n" if self._event_count > 0 else "\n")
+      self.f.write(event)
+      self._event_count += 1
+
+  def close(self) -> None:
+    with self._lock:
+      if not self._closed:
+        self.f.write("\n]\n")
+        self._closed = True
+
+  def __enter__(self) -> ChromeTraceWriter:
+    return self
+
+  def __exit__(self, *exc_info: object) -> None:
+    self.close()
+
+
+# Forwards each phase to several instrumentations, e.g. a PhaseCollector and a ChromeTraceWriter.
+class MultiInstrumentation:
+
+  def __init__(self, *instrumentations: Instrumentation) -> None:
+    self.instrumentations = instrumentations
+
+  def record(self, phase: Phase, start_ns: int, end_ns: int) -> None:
+    for instrumentation in self.instrumentations:
+      instrumentation.record(phase, start_ns, end_ns)
@@ -0,0 +1,155 @@
+import io
+import json
+
+from absl.testing import absltest
+
+import parse_instrumentation as parse_instrumentation_module
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+ChromeTraceWriter = parse_instrumentation_module.ChromeTraceWriter
+MultiInstrumentation = parse_instrumentation_module.MultiInstrumentation
+Phase = parse_instrumentation_module.Phase
+PhaseCollector = parse_instrumentation_module.PhaseCollector
+
+
+def parse(
+    text: str, instrumentation: parse_instrumentation_module.Instrumentation, buffer_size: int = 4
+) -> parser_module.Parser:
+  parser = parser_module.Parser(
+      tokenizer_module.Tokenizer(
+          source_reader_module.SourceReader(
+              io.StringIO(text), buffer_size=buffer_size, instrumentation=instrumentation
+          )
+      )
+  )
+  parser.parse()
+  return parser
+
+
+class PhaseRecorder:
+
+  def __init__(self) -> None:
+    self.phases: list[Phase] = []
+
+  def record(self, phase: Phase, start_ns: int, end_ns: int) -> None:
+    assert start_ns <= end_ns
+    self.phases.append(phase)
+
+
+class ParseInstrumentationTest(absltest.TestCase):
+
+  def test_phases_are_recorded(self):
+    recorder = PhaseRecorder()
+
+    parse("@main // comment\nfunction aaa { 1 bbb }", recorder, buffer_size=100)
+
+    self.assertEqual(
+        [
+            Phase.REFILL,
+            Phase.IDENTIFIER,
+            Phase.ANNOTATION,
+            Phase.TRIVIA,
+            Phase.TRIVIA,
+            Phase.TRIVIA,
+            Phase.IDENTIFIER,
+            Phase.TRIVIA,
+            Phase.IDENTIFIER,
+            Phase.TRIVIA,
+            Phase.TRIVIA,
+            Phase.TRIVIA,
+            Phase.IDENTIFIER,
+            Phase.TRIVIA,
+            # Reaching end-of-file after the `}` takes two reads.
+            Phase.REFILL,
+            Phase.REFILL,
+            Phase.FUNCTION,
+            Phase.REFILL,
+            Phase.REFILL,
+        ],
+        recorder.phases,
+    )
+
+  def test_collector(self):
+    collector = PhaseCollector()
+
+    parse("@a @b function aaa /* comment */ function bbb { ccc }", collector)
+
+    counts = {phase: total.count for phase, total in collector.totals.items()}
+    self.assertEqual(
+        {
+            Phase.REFILL: 17,
+            Phase.TRIVIA: 10,
+            Phase.ANNOTATION: 2,
+            Phase.IDENTIFIER: 7,
+            Phase.FUNCTION: 2,
+        },
+        counts,
+    )
+    self.assertGreater(collector.totals[Phase.FUNCTION].total_ns, 0)
+    self.assertIn("annotation", collector.format())
+
+  def test_collector_clear(self):
+    collector = PhaseCollector()
+    parse("function aaa", collector)
+
+    collector.clear()
+
+    self.assertEqual(
+        [(0, 0)] * len(Phase),
+        [(total.count, total.total_ns) for total in collector.totals.values()],
+    )
+
+  def test_chrome_trace_writer(self):
+    f = io.StringIO()
+    with ChromeTraceWriter(f) as trace_writer:
+      parse("@main function aaa { 1 } function bbb", trace_writer)
+
+    events = json.loads(f.getvalue())
+    self.assertEqual(
+        ["function", "function"],
+        [event["name"] for event in events if event["name"] == "function"],
+    )
+    for event in events:
+      self.assertEqual("X", event["ph"])
+      self.assertGreaterEqual(event["ts"], 0)
+      self.assertGreaterEqual(event["dur"], 0)
+
+  def test_chrome_trace_writer_without_events(self):
+    f = io.StringIO()
+
+    ChromeTraceWriter(f).close()
+
+    self.assertEqual([], json.loads(f.getvalue()))
+
+  def test_chrome_trace_writer_rejects_events_after_close(self):
+    trace_writer = ChromeTraceWriter(io.StringIO())
+    trace_writer.close()
+
+    with self.assertRaises(ValueError):
+      trace_writer.record(Phase.REFILL, 0, 1)
+
+  def test_multi_instrumentation(self):
+    recorder1 = PhaseRecorder()
+    recorder2 = PhaseRecorder()
+
+    parse("function aaa", MultiInstrumentation(recorder1, recorder2))
+
+    self.assertIn(Phase.FUNCTION, recorder1.phases)
+    self.assertEqual(recorder1.phases, recorder2.phases)
+
+  def test_failed_phases_are_not_recorded(self):
+    recorder = PhaseRecorder()
+
+    with self.assertRaises(tokenizer_module.Tokenizer.ParseError):
+      parse("@1 function aaa", recorder)
+    with self.assertRaises(parser_module.Parser.ParseError):
+      parse("function aaa { 1", recorder)
+
+    self.assertNotIn(Phase.ANNOTATION, recorder.phases)
+    self.assertNotIn(Phase.FUNCTION, recorder.phases)
+
+
+if __name__ == "__main__":
+  absltest.main()
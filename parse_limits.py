@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import dataclasses
+import time
+
+
+# Limits on the resources that parsing one input may use, for parsing untrusted input; None means
+# unlimited. A ParseLimits is given to the SourceReader, and the Tokenizer and Parser built on it
+# enforce the same one. Limits are checked when the source reader's buffer is refilled and as each
+# annotation, function, and quotation is parsed, so an input that exceeds one is rejected with a
+# LimitExceededError soon after, without reading the rest of it.
+@dataclasses.dataclass(frozen=True)
+class ParseLimits:
+  # The number of characters read from the input.
+  max_input_characters: int | None = None
+  # The number of characters held in the source reader's buffer, which must hold the whole of
+  # the longest lexeme (e.g. a string literal).
+  max_buffered_characters: int | None = None
+  # The number of annotations of a single function, including any that are not followed by one.
+  max_annotations_per_function: int | None = None
+  # The number of functions.
+  max_functions: int | None = None
+  # The number of quotations a term may be nested in. The parser always rejects nesting deeper
+  # than parser.MAX_QUOTATION_DEPTH, so only a lower limit has any effect.
+  max_quotation_depth: int | None = None
+  # The time.monotonic() value by which parsing must finish.
+  deadline: float | None = None
+
+  @classmethod
+  def with_timeout(cls, timeout_seconds: float, **kwargs: int | None) -> ParseLimits:
+    return cls(deadline=time.monotonic() + timeout_seconds, **kwargs)
+
+  def check_deadline(self) -> None:
+    if self.deadline is not None and time.monotonic() > self.deadline:
+      raise DeadlineExceededError("parse deadline exceeded")
+
+
+class LimitExceededError(Exception):
+  pass
+
+
+class InputTooLargeError(LimitExceededError):
+
+  def __init__(self, limit: int, message: str) -> None:
+    super().__init__(message)
+    self.limit = limit
+
+
+class BufferLimitExceededError(LimitExceededError):
+
+  def __init__(self, limit: int, message: str) -> None:
+    super().__init__(message)
+    self.limit = limit
+
+
+class TooManyAnnotationsError(LimitExceededError):
+
+  def __init__(self, limit: int, message: str) -> None:
+    super().__init__(message)
+    self.limit = limit
+
+
+class TooManyFunctionsError(LimitExceededError):
+
+  def __init__(self, limit: int, message: str) -> None:
+    super().__init__(message)
+    self.limit = limit
+
+
+class QuotationTooDeepError(LimitExceededError):
+
+  def __init__(self, limit: int, message: str) -> None:
+    super().__init__(message)
+    self.limit = limit
+
+
+class DeadlineExceededError(LimitExceededError):
+  pass
@@ -0,0 +1,126 @@
+import io
+import time
+
+from absl.testing import absltest
+import parameterized
+
+import parse_limits as parse_limits_module
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+ParseLimits = parse_limits_module.ParseLimits
+
+
+def parse(
+    f: io.StringIO, limits: ParseLimits, buffer_size: int = 16
+) -> list[parser_module.JoyFunction]:
+  parser = parser_module.Parser(
+      tokenizer_module.Tokenizer(
+          source_reader_module.SourceReader(f, buffer_size=buffer_size, limits=limits)
+      )
+  )
+  parser.parse()
+  return parser.functions
+
+
+class ParseLimitsTest(absltest.TestCase):
+
+  def test_within_limits(self):
+    functions = parse(
+        io.StringIO('@a @b function aaa { "xyz" [[1] 2] } function bbb'),
+        ParseLimits.with_timeout(
+            60,
+            max_input_characters=100,
+            max_buffered_characters=32,
+            max_annotations_per_function=2,
+            max_functions=2,
+            max_quotation_depth=2,
+        ),
+    )
+
+    self.assertEqual(["aaa", "bbb"], [function.name for function in functions])
+
+  @parameterized.parameterized.expand([
+      (
+          "input_too_large",
+          ParseLimits(max_input_characters=100),
+          "function aaa" + " " * 100,
+          parse_limits_module.InputTooLargeError,
+      ),
+      (
+          "unclosed_comment",
+          ParseLimits(max_input_characters=100),
+          "/*" + " " * 1000,
+          parse_limits_module.InputTooLargeError,
+      ),
+      (
+          "long_string",
+          ParseLimits(max_buffered_characters=64),
+          'function aaa { "' + "x" * 100 + '" }',
+          parse_limits_module.BufferLimitExceededError,
+      ),
+      (
+          "too_many_annotations",
+          ParseLimits(max_annotations_per_function=2),
+          "@a function aaa @a @b @c function bbb",
+          parse_limits_module.TooManyAnnotationsError,
+      ),
+      (
+          "annotations_without_function",
+          ParseLimits(max_annotations_per_function=100),
+          "@a " * 1000,
+          parse_limits_module.TooManyAnnotationsError,
+      ),
+      (
+          "too_many_functions",
+          ParseLimits(max_functions=2),
+          "function aaa function bbb function ccc",
+          parse_limits_module.TooManyFunctionsError,
+      ),
+      (
+          "quotations_too_deep",
+          ParseLimits(max_quotation_depth=2),
+          "function aaa { [[1]] [[[2]]] }",
+          parse_limits_module.QuotationTooDeepError,
+      ),
+      (
+          "deadline",
+          ParseLimits(deadline=time.monotonic() - 1),
+          "function aaa",
+          parse_limits_module.DeadlineExceededError,
+      ),
+  ])
+  def test_limit_exceeded(
+      self,
+      _,
+      limits: ParseLimits,
+      text: str,
+      error_type: type[parse_limits_module.LimitExceededError],
+  ):
+    with self.assertRaises(error_type):
+      parse(io.StringIO(text), limits)
+
+  def test_limit_stops_reading_early(self):
+    f = io.StringIO("/*" + " " * 100000)
+
+    with self.assertRaises(parse_limits_module.InputTooLargeError) as assert_raises_context:
+      parse(f, ParseLimits(max_input_characters=1000), buffer_size=4096)
+
+    self.assertEqual(1000, assert_raises_context.exception.limit)
+    self.assertEqual(1001, f.tell())
+
+  def test_quotation_depth_limit_reports_position(self):
+    with self.assertRaises(parse_limits_module.QuotationTooDeepError) as assert_raises_context:
+      parse(io.StringIO("function aaa { [[1]] [[[2]]] }"), ParseLimits(max_quotation_depth=2))
+
+    self.assertEqual(2, assert_raises_context.exception.limit)
+    self.assertIn("at position 23", str(assert_raises_context.exception))
+
+  def test_deadline_stops_unclosed_comment(self):
+    with self.assertRaises(parse_limits_module.DeadlineExceededError):
+      parse(io.StringIO("/*" + " " * 100000), ParseLimits.with_timeout(-1), buffer_size=1024)
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import dataclasses
+import sys
+import tracemalloc
+from typing import TextIO
+
+import parse_instrumentation as parse_instrumentation_module
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+Phase = parse_instrumentation_module.Phase
+
+
+# Hard limits on the memory used by a parse; None means unlimited.
+@dataclasses.dataclass(frozen=True)
+class MemoryLimits:
+  # The number of characters held in the source reader's buffer, which grows to hold the longest
+  # lexeme or peek.
+  max_buffer_characters: int | None = None
+  # The length of the lexeme that the buffer retains while it is being read, e.g. a string
+  # literal.
+  max_lexeme_characters: int | None = None
+  # The number of functions parsed, and their estimated total size; see estimate_function_size().
+  max_function_count: int | None = None
+  max_function_bytes: int | None = None
+  # The memory allocated by the process, as traced by tracemalloc; only enforced if the
+  # MemoryTracker traces allocations.
+  max_traced_bytes: int | None = None
+
+
+@dataclasses.dataclass
+class MemoryReport:
+  peak_buffer_characters: int = 0
+  peak_lexeme_characters: int = 0
+  function_count: int = 0
+  function_bytes: int = 0
+  # The peak memory traced by tracemalloc, or None if allocations were not traced.
+  peak_traced_bytes: int | None = None
+  # The traced memory at the end of each phase, at its highest.
+  phase_peak_traced_bytes: dict[Phase, int] = dataclasses.field(default_factory=dict)
+  # A tracemalloc snapshot taken at the end of each phase when its traced memory reached a new
+  # high, by at least MemoryTracker.snapshot_interval_bytes since the last snapshot of that phase.
+  snapshots: dict[Phase, tracemalloc.Snapshot] = dataclasses.field(default_factory=dict)
+
+
+class MemoryLimitExceededError(Exception):
+
+  def __init__(self, limit_name: str, limit: int, value: int, message: str) -> None:
+    super().__init__(message)
+    self.limit_name = limit_name
+    self.limit = limit
+    self.value = value
+
+
+# Accounts for the memory used by a parse and enforces MemoryLimits. A MemoryTracker is an
+# Instrumentation: give it to the SourceReader, then watch() the Parser built on it, as parse()
+# does. The limits are checked at the end of each phase, so the buffer and lexeme limits may be
+# exceeded by up to one refill before the parse stops. Entering the tracker starts tracemalloc if
+# trace_allocations is set, which slows the parse considerably.
+class MemoryTracker:
+
+  def __init__(
+      self,
+      limits: MemoryLimits = MemoryLimits(),
+      trace_allocations: bool = False,
+      snapshot_interval_bytes: int = 1 << 20,
+  ) -> None:
+    self.limits = limits
+    self.trace_allocations = trace_allocations
+    self.snapshot_interval_bytes = snapshot_interval_bytes
+    self.report = MemoryReport(peak_traced_bytes=0 if trace_allocations else None)
+
+    self._parser: parser_module.Parser | None = None
+    self._snapshot_traced_bytes: dict[Phase, int] = {}
+    self._started_tracemalloc = False
+
+  def watch(self, parser: parser_module.Parser) -> None:
+    self._parser = parser
+
+  def __enter__(self) -> MemoryTracker:
+    if self.trace_allocations and not tracemalloc.is_tracing():
+      tracemalloc.start()
+      self._started_tracemalloc = True
+    return self
+
+  def __exit__(self, *exc_info: object) -> None:
+    if self._started_tracemalloc:
+      tracemalloc.stop()
+      self._started_tracemalloc = False
+
+  def record(self, phase: Phase, start_ns: int, end_ns: int) -> None:
+    report = self.report
+    limits = self.limits
+
+    if self._parser is not None:
+      source_reader = self._parser.tokenizer.source_reader
+      report.peak_buffer_characters = max(
+          report.peak_buffer_characters, source_reader.buffered_character_count()
+      )
+      _check_limit(
+          "max_buffer_characters", limits.max_buffer_characters, report.peak_buffer_characters
+      )
+      report.peak_lexeme_characters = max(
+          report.peak_lexeme_characters, source_reader.lexeme_length()
+      )
+      _check_limit(
+          "max_lexeme_characters", limits.max_lexeme_characters, report.peak_lexeme_characters
+      )
+
+      if phase == Phase.FUNCTION:
+        report.function_count += 1
+        report.function_bytes += estimate_function_size(self._parser.functions[-1])
+        _check_limit("max_function_count", limits.max_function_count, report.function_count)
+        _check_limit("max_function_bytes", limits.max_function_bytes, report.function_bytes)
+
+    if self.trace_allocations and tracemalloc.is_tracing():
+      traced_bytes, peak_traced_bytes = tracemalloc.get_traced_memory()
+      report.peak_traced_bytes = max(report.peak_traced_bytes or 0, peak_traced_bytes)
+      if traced_bytes > report.phase_peak_traced_bytes.get(phase, 0):
+        report.phase_peak_traced_bytes[phase] = traced_bytes
+        if traced_bytes >= self._snapshot_traced_bytes.get(phase, 0) + self.snapshot_interval_bytes:
+          report.snapshots[phase] = tracemalloc.take_snapshot()
+          self._snapshot_traced_bytes[phase] = traced_bytes
+      _check_limit("max_traced_bytes", limits.max_traced_bytes, report.peak_traced_bytes)
+
+
+# Parses f while tracking its memory use with tracker, raising MemoryLimitExceededError if a limit
+# is exceeded; the report is then in tracker.report.
+def parse(
+    f: TextIO, tracker: MemoryTracker, buffer_size: int | None = None
+) -> parser_module.Parser:
+  parser = parser_module.Parser(
+      tokenizer_module.Tokenizer(
+          source_reader_module.SourceReader(f, buffer_size=buffer_size, instrumentation=tracker)
+      )
+  )
+  tracker.watch(parser)
+  with tracker:
+    parser.parse()
+  return parser
+
+
+def _check_limit(limit_name: str, limit: int | None, value: int) -> None:
+  if limit is not None and value > limit:
+    raise MemoryLimitExceededError(
+        limit_name=limit_name,
+        limit=limit,
+        value=value,
+        message=f"memory limit exceeded: {limit_name} is {limit} but reached {value}",
+    )
+
+
+# Estimates the bytes used by a function and the objects it alone refers to: its body, spans, and
+# name. Annotation tuples are shared between functions (see JoyFunction), so are not included.
+def estimate_function_size(function: parser_module.JoyFunction) -> int:
+  size = (
+      sys.getsizeof(function) + sys.getsizeof(function.name) + _estimate_terms_size(function.body)
+  )
+  for span in (function.span, function.body_span, *function.annotation_spans):
+    if span is not None:
+      size += sys.getsizeof(span)
+  # The empty tuple is a singleton, so costs nothing.
+  if len(function.annotation_spans) > 0:
+    size += sys.getsizeof(function.annotation_spans)
+  return size
+
+
+def _estimate_terms_size(terms: tuple[parser_module.Term, ...]) -> int:
+  size = sys.getsizeof(terms)
+  for term in terms:
+    size += sys.getsizeof(term)
+    if isinstance(term, parser_module.Quotation):
+      size += _estimate_terms_size(term.terms)
+    elif isinstance(term, parser_module.Word):
+      size += sys.getsizeof(term.name)
+    else:
+      size += sys.getsizeof(term.value)
+  return size
@@ -0,0 +1,111 @@
+import io
+import tracemalloc
+
+from absl.testing import absltest
+import parameterized
+
+import parse_instrumentation as parse_instrumentation_module
+import parse_memory as parse_memory_module
+import parser as parser_module
+
+MemoryLimitExceededError = parse_memory_module.MemoryLimitExceededError
+MemoryLimits = parse_memory_module.MemoryLimits
+MemoryTracker = parse_memory_module.MemoryTracker
+Phase = parse_instrumentation_module.Phase
+
+
+class ParseMemoryTest(absltest.TestCase):
+
+  def test_report(self):
+    tracker = MemoryTracker()
+
+    parser = parse_memory_module.parse(
+        io.StringIO('function aaa { "' + "x" * 100 + '" } @main function bbb { [1 2] }'),
+        tracker,
+        buffer_size=8,
+    )
+
+    report = tracker.report
+    self.assertGreaterEqual(report.peak_buffer_characters, 102)
+    self.assertGreater(report.peak_lexeme_characters, 50)
+    self.assertEqual(2, report.function_count)
+    self.assertEqual(
+        sum(parse_memory_module.estimate_function_size(function) for function in parser.functions),
+        report.function_bytes,
+    )
+    self.assertIsNone(report.peak_traced_bytes)
+    self.assertEqual({}, report.snapshots)
+
+  def test_report_traced_allocations(self):
+    tracker = MemoryTracker(trace_allocations=True, snapshot_interval_bytes=1)
+
+    parse_memory_module.parse(io.StringIO("function aaa { 1 2 3 } function bbb"), tracker)
+
+    report = tracker.report
+    assert report.peak_traced_bytes is not None
+    self.assertGreater(report.peak_traced_bytes, 0)
+    self.assertIn(Phase.FUNCTION, report.phase_peak_traced_bytes)
+    self.assertIsInstance(report.snapshots[Phase.FUNCTION], tracemalloc.Snapshot)
+    self.assertFalse(tracemalloc.is_tracing())
+
+  def test_estimate_function_size(self):
+    small_function = parser_module.JoyFunction(name="aaa", annotations=())
+    large_function = parser_module.JoyFunction(
+        name="aaa",
+        annotations=(),
+        body=(parser_module.Quotation((parser_module.StringLiteral("x" * 1000),)),),
+    )
+
+    self.assertGreater(parse_memory_module.estimate_function_size(small_function), 0)
+    self.assertGreater(
+        parse_memory_module.estimate_function_size(large_function),
+        parse_memory_module.estimate_function_size(small_function) + 1000,
+    )
+
+  @parameterized.parameterized.expand([
+      (
+          "max_buffer_characters",
+          MemoryLimits(max_buffer_characters=64),
+          'function aaa { "' + "x" * 100 + '" }',
+      ),
+      (
+          "max_lexeme_characters",
+          MemoryLimits(max_lexeme_characters=50),
+          'function aaa { "' + "x" * 100 + '" }',
+      ),
+      (
+          "max_function_count",
+          MemoryLimits(max_function_count=2),
+          "function a function b function c",
+      ),
+      ("max_function_bytes", MemoryLimits(max_function_bytes=100), "function a { 1 2 3 }"),
+      ("max_traced_bytes", MemoryLimits(max_traced_bytes=1), "function a"),
+  ])
+  def test_limit_exceeded(self, limit_name: str, limits: MemoryLimits, text: str):
+    tracker = MemoryTracker(limits, trace_allocations=True)
+
+    with self.assertRaises(MemoryLimitExceededError) as assert_raises_context:
+      parse_memory_module.parse(io.StringIO(text), tracker, buffer_size=8)
+
+    self.assertEqual(limit_name, assert_raises_context.exception.limit_name)
+    self.assertIn(limit_name, str(assert_raises_context.exception))
+    self.assertGreater(assert_raises_context.exception.value, assert_raises_context.exception.limit)
+    self.assertFalse(tracemalloc.is_tracing())
+
+  def test_limits_not_exceeded(self):
+    tracker = MemoryTracker(
+        MemoryLimits(
+            max_buffer_characters=1024,
+            max_lexeme_characters=16,
+            max_function_count=3,
+            max_function_bytes=10000,
+        )
+    )
+
+    parser = parse_memory_module.parse(io.StringIO("function a function b function c"), tracker)
+
+    self.assertLen(parser.functions, 3)
+
+
+if __name__ == "__main__":
+  absltest.main()
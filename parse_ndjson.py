@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Sequence
+import codecs
+import concurrent.futures
+import functools
+import io
+import json
+import os
+import sys
+from typing import BinaryIO, TextIO, cast
+
+import compressed_source as compressed_source_module
+import parser as parser_module
+import source_reader as source_reader_module
+import source_span as source_span_module
+import tokenizer as tokenizer_module
+
+# The fields that may be written for each function, in the order in which they are written.
+FIELDS = ("path", "name", "annotations", "body", "span", "annotation_spans", "body_span")
+DEFAULT_FIELDS = ("path", "name", "annotations", "body")
+
+# The path reported for functions read from stdin.
+STDIN_PATH = "<stdin>"
+
+_BUFFER_SIZE = 65536
+_PARSE_ERRORS = (
+    tokenizer_module.Tokenizer.ParseError,
+    parser_module.Parser.ParseError,
+    UnicodeDecodeError,
+)
+
+
+# Converts a term to JSON: integers and booleans as themselves, words as strings, string literals
+# as {"string": value} to distinguish them from words, and quotations as lists.
+def term_to_json(term: parser_module.Term) -> object:
+  if isinstance(term, parser_module.Word):
+    return term.name
+  elif isinstance(term, parser_module.Quotation):
+    return [term_to_json(subterm) for subterm in term.terms]
+  elif isinstance(term, parser_module.StringLiteral):
+    return {"string": term.value}
+  else:
+    return term.value
+
+
+def function_to_json(
+    function: parser_module.JoyFunction, path: str, fields: Sequence[str] = DEFAULT_FIELDS
+) -> dict[str, object]:
+  values: dict[str, object] = {}
+  for field in fields:
+    if field == "path":
+      values[field] = path
+    elif field == "name":
+      values[field] = function.name
+    elif field == "annotations":
+      values[field] = list(function.annotations)
+    elif field == "body":
+      values[field] = [term_to_json(term) for term in function.body]
+    elif field == "span":
+      values[field] = _span_to_json(function.span)
+    elif field == "annotation_spans":
+      values[field] = [_span_to_json(span) for span in function.annotation_spans]
+    elif field == "body_span":
+      values[field] = _span_to_json(function.body_span)
+    else:
+      raise ValueError(f"unknown field: {field}")
+  return values
+
+
+# Parses f, writing one JSON line to out for each function as soon as it is parsed. Functions are
+# not retained after they are written, so memory use does not grow with the length of the input,
+# but duplicate function names are not detected (see Parser.iter_functions()). Raises a parse error
+# after writing the functions that precede it.
+def write_functions(
+    f: TextIO,
+    out: TextIO,
+    path: str,
+    fields: Sequence[str] = DEFAULT_FIELDS,
+    encoding: str = "utf-8",
+    flush: bool = False,
+) -> None:
+  parser = parser_module.Parser(
+      tokenizer_module.Tokenizer(
+          source_reader_module.SourceReader(f, buffer_size=_BUFFER_SIZE, encoding=encoding)
+      )
+  )
+  for function in parser.iter_functions():
+    out.write(json.dumps(function_to_json(function, path, fields), ensure_ascii=False))
+    out.write("\n")
+    if flush:
+      out.flush()
+
+
+# A text stream over a binary stream whose read() returns as soon as any input is available,
+# rather than waiting for the requested number of characters as io.TextIOWrapper does, so that
+# functions arriving on a pipe are written without waiting for the buffer to fill. Newlines are not
+# translated, so that byte offsets match the input.
+class _StreamReader(io.TextIOBase):
+
+  def __init__(self, f: BinaryIO, encoding: str) -> None:
+    self.f = f
+    self._decoder = codecs.getincrementaldecoder(encoding)()
+
+  def readable(self) -> bool:
+    return True
+
+  def read(self, size: int | None = -1) -> str:
+    while True:
+      if size is None or size < 0:
+        data = self.f.read()
+      else:
+        data = self.f.read1(size) if hasattr(self.f, "read1") else self.f.read(size)
+      if len(data) == 0:
+        return self._decoder.decode(b"", final=True)
+      # The data may end in the middle of a character, which is decoded by the next read.
+      text = self._decoder.decode(data)
+      if len(text) > 0:
+        return text
+
+
+def _span_to_json(span: source_span_module.SourceSpan | None) -> dict[str, int] | None:
+  if span is None:
+    return None
+  return {
+      "start": span.start,
+      "end": span.end,
+      "start_byte": span.start_byte,
+      "end_byte": span.end_byte,
+  }
+
+
+def _parse_fields(value: str) -> tuple[str, ...]:
+  fields = tuple(field.strip() for field in value.split(","))
+  unknown_fields = [field for field in fields if field not in FIELDS]
+  if len(unknown_fields) > 0:
+    raise argparse.ArgumentTypeError(
+        f"unknown fields: {', '.join(unknown_fields)} (expected some of {', '.join(FIELDS)})"
+    )
+  return fields
+
+
+# Parses the file at path in a worker process, returning its JSON lines and the error that stopped
+# the parse, if any. The lines of a file are collected so that the output of each file is written
+# in one piece, in the order in which the files were given.
+def _parse_file(path: str, fields: Sequence[str], encoding: str) -> tuple[str, str | None]:
+  out = io.StringIO()
+  error = _write_file_functions(path, out, fields, encoding)
+  return (out.getvalue(), error)
+
+
+def _write_file_functions(
+    path: str, out: TextIO, fields: Sequence[str], encoding: str
+) -> str | None:
+  try:
+    # The file may be compressed; spans are then offsets into the decompressed source.
+    with compressed_source_module.open_source(path, encoding=encoding) as f:
+      write_functions(f, out, path, fields, encoding)
+  except (*_PARSE_ERRORS, *compressed_source_module.DECOMPRESSION_ERRORS) as e:
+    return f"{path}: {e}"
+  return None
+
+
+def _write_stdin_functions(out: TextIO, fields: Sequence[str], encoding: str) -> str | None:
+  try:
+    write_functions(
+        cast(TextIO, _StreamReader(sys.stdin.buffer, encoding)),
+        out,
+        STDIN_PATH,
+        fields,
+        encoding,
+        flush=True,
+    )
+  except _PARSE_ERRORS as e:
+    return f"{STDIN_PATH}: {e}"
+  return None
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description=(
+          "Parses Joy source and writes one JSON object per function, one per line, as each "
+          "function is parsed."
+      )
+  )
+  arg_parser.add_argument(
+      "paths",
+      nargs="*",
+      help=(
+          "the files to parse, which may be gzip-, bzip2- or xz-compressed; reads stdin if none"
+          " are given or for -"
+      ),
+  )
+  arg_parser.add_argument(
+      "--jobs",
+      type=int,
+      default=1,
+      help="the number of files to parse in parallel; ignored when reading stdin",
+  )
+  arg_parser.add_argument(
+      "--fields",
+      type=_parse_fields,
+      default=DEFAULT_FIELDS,
+      help=f"a comma-separated list of the fields to write, from {', '.join(FIELDS)}",
+  )
+  arg_parser.add_argument("--encoding", default="utf-8", help="the encoding of the input")
+  args = arg_parser.parse_args()
+  if args.jobs < 1:
+    arg_parser.error(f"invalid number of jobs: {args.jobs}")
+
+  paths = args.paths if len(args.paths) > 0 else ["-"]
+  out = sys.stdout
+  errors: list[str] = []
+  try:
+    if args.jobs == 1 or "-" in paths:
+      for path in paths:
+        if path == "-":
+          error = _write_stdin_functions(out, args.fields, args.encoding)
+        else:
+          error = _write_file_functions(path, out, args.fields, args.encoding)
+        if error is not None:
+          errors.append(error)
+          print(error, file=sys.stderr)
+    else:
+      with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        parse_file = functools.partial(_parse_file, fields=args.fields, encoding=args.encoding)
+        for lines, error in executor.map(parse_file, paths):
+          out.write(lines)
+          if error is not None:
+            errors.append(error)
+            print(error, file=sys.stderr)
+    out.flush()
+  except BrokenPipeError:
+    # The reader of the output (e.g. `head`) exited; stop quietly, without a second error when the
+    # interpreter flushes stdout at exit.
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    sys.exit(1)
+
+  if len(errors) > 0:
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,177 @@
+import io
+import json
+import lzma
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any
+
+from absl.testing import absltest
+
+import parse_ndjson as parse_ndjson_module
+import parser as parser_module
+
+JoyFunction = parser_module.JoyFunction
+
+_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parse_ndjson.py")
+
+
+def run(*args: str, input_text: str = "", check: bool = True) -> subprocess.CompletedProcess[str]:
+  return subprocess.run(
+      [sys.executable, _SCRIPT, *args],
+      input=input_text,
+      capture_output=True,
+      text=True,
+      encoding="utf-8",
+      check=check,
+  )
+
+
+def write_file(path: str, text: str) -> str:
+  with open(path, "wt", encoding="utf-8") as f:
+    f.write(text)
+  return path
+
+
+def parse_lines(text: str) -> list[Any]:
+  return [json.loads(line) for line in text.splitlines()]
+
+
+class ParseNdjsonTest(absltest.TestCase):
+
+  def test_write_functions(self):
+    out = io.StringIO()
+
+    parse_ndjson_module.write_functions(
+        io.StringIO('@main function aaa { 1 true "é" [dup [+]] } function bbb'), out, "a.joy"
+    )
+
+    self.assertEqual(
+        [
+            {
+                "path": "a.joy",
+                "name": "aaa",
+                "annotations": ["main"],
+                "body": [1, True, {"string": "é"}, ["dup", ["+"]]],
+            },
+            {"path": "a.joy", "name": "bbb", "annotations": [], "body": []},
+        ],
+        parse_lines(out.getvalue()),
+    )
+
+  def test_write_functions_fields(self):
+    out = io.StringIO()
+
+    parse_ndjson_module.write_functions(
+        io.StringIO("@main function aaa { 1 }"),
+        out,
+        "a.joy",
+        fields=("name", "span", "annotation_spans", "body_span"),
+    )
+
+    self.assertEqual(
+        [{
+            "name": "aaa",
+            "span": {"start": 6, "end": 24, "start_byte": 6, "end_byte": 24},
+            "annotation_spans": [{"start": 0, "end": 5, "start_byte": 0, "end_byte": 5}],
+            "body_span": {"start": 19, "end": 24, "start_byte": 19, "end_byte": 24},
+        }],
+        parse_lines(out.getvalue()),
+    )
+
+  def test_write_functions_writes_functions_before_error(self):
+    out = io.StringIO()
+
+    with self.assertRaises(parser_module.Parser.ParseError):
+      parse_ndjson_module.write_functions(io.StringIO("function aaa function bbb {"), out, "a.joy")
+
+    self.assertEqual(["aaa"], [values["name"] for values in parse_lines(out.getvalue())])
+
+  def test_function_to_json_rejects_unknown_field(self):
+    with self.assertRaises(ValueError):
+      parse_ndjson_module.function_to_json(JoyFunction(name="aaa", annotations=()), "", ["size"])
+
+  def test_main_with_files(self):
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+    paths = [
+        write_file(os.path.join(directory, f"{i}.joy"), f"function f{i}a function f{i}b")
+        for i in range(4)
+    ]
+    invalid_path = write_file(os.path.join(directory, "invalid.joy"), "function g function")
+
+    for jobs in ("1", "3"):
+      result = run("--jobs", jobs, "--fields", "path,name", *paths, invalid_path, check=False)
+
+      self.assertEqual(1, result.returncode)
+      self.assertEqual(
+          [
+              {"path": path, "name": f"f{i}{suffix}"}
+              for i, path in enumerate(paths)
+              for suffix in ("a", "b")
+          ]
+          + [{"path": invalid_path, "name": "g"}],
+          parse_lines(result.stdout),
+      )
+      self.assertStartsWith(result.stderr, f"{invalid_path}: ")
+
+  def test_main_with_compressed_file(self):
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+    path = os.path.join(directory, "a.joy.xz")
+    with open(path, "wb") as f:
+      f.write(lzma.compress("function aaa { 1 }".encode("utf-8")))
+
+    result = run("--fields", "name,body", path)
+
+    self.assertEqual([{"name": "aaa", "body": [1]}], parse_lines(result.stdout))
+
+  def test_main_with_stdin(self):
+    result = run("--fields", "name,body", input_text="function aaa { 1 }\nfunction bbb\n")
+
+    self.assertEqual(
+        [{"name": "aaa", "body": [1]}, {"name": "bbb", "body": []}], parse_lines(result.stdout)
+    )
+    self.assertEqual("", result.stderr)
+
+  def test_main_streams_stdin(self):
+    process = subprocess.Popen(
+        [sys.executable, _SCRIPT, "--fields", "name"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+      # The first function is complete once the next token is read, well before the end of the
+      # input and before the reader's buffer is full.
+      process.stdin.write("function aaa { 1 } function")
+      process.stdin.flush()
+
+      self.assertEqual({"name": "aaa"}, json.loads(process.stdout.readline()))
+
+      process.stdin.write(" bbb")
+      process.stdin.close()
+      self.assertEqual([{"name": "bbb"}], parse_lines(process.stdout.read()))
+    finally:
+      process.stdout.close()
+      process.wait()
+
+  def test_main_rejects_unknown_fields(self):
+    result = run("--fields", "name,size", check=False)
+
+    self.assertEqual(2, result.returncode)
+    self.assertIn("unknown fields: size", result.stderr)
+
+  def test_does_not_import_absl(self):
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, parse_ndjson; print('absl' in sys.modules)"],
+        cwd=os.path.dirname(_SCRIPT),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    self.assertEqual("False", result.stdout.strip())
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+import dataclasses
+import json
+import socket
+import struct
+
+import binary_format as binary_format_module
+import parser as parser_module
+
+# The wire protocol between ParseClient and ParseServer over a Unix domain socket. Each message is
+# a frame: a u32 little-endian payload length followed by the payload.
+#
+#   request   UTF-8 JSON: {"inputs": [{"path": "/a.joy"}, {"text": "...", "name": "x"}, ...]}
+#   response  _STATUS_OK, u32 result count, then each result as a u32 length and an encoded
+#             ParseResult, in the order of the inputs; or _STATUS_ERROR and a UTF-8 message
+#   result    u32 name length, UTF-8 name, then _RESULT_OK and the functions in the binary format
+#             (see binary_format), or _RESULT_ERROR and a UTF-8 error message
+#
+# Neither side unpickles data from the other: requests are JSON, and results are decoded by
+# binary_format, which rejects malformed data with InvalidFormatError.
+
+# Frames larger than this are rejected rather than buffered.
+MAX_FRAME_SIZE = 1 << 28
+
+_FRAME_HEADER = struct.Struct("<I")
+_STATUS_OK = b"\x00"
+_STATUS_ERROR = b"\x01"
+_RESULT_OK = b"\x00"
+_RESULT_ERROR = b"\x01"
+
+
+# A file to be parsed by the server, which reads it itself; it may be compressed (see
+# compressed_source.open_source()). The path should be absolute, since the server's working
+# directory is not the client's.
+@dataclasses.dataclass(frozen=True)
+class PathInput:
+  path: str
+
+
+# Text to be parsed by the server; the name identifies its result.
+@dataclasses.dataclass(frozen=True)
+class TextInput:
+  text: str
+  name: str = "<text>"
+
+
+ParseInput = PathInput | TextInput
+
+
+@dataclasses.dataclass(frozen=True)
+class ParseResult:
+  # The path or name of the input.
+  name: str
+  # The functions of the input, or the empty tuple if it failed to parse.
+  functions: tuple[parser_module.JoyFunction, ...] = ()
+  # The message of the error that stopped the parse (e.g. a parse error or a missing file), if any.
+  error: str | None = None
+
+
+# The connection is broken or a message is malformed.
+class ProtocolError(Exception):
+  pass
+
+
+# The server could not process a request at all, as opposed to an input that failed to parse.
+class ParseServerError(Exception):
+  pass
+
+
+def write_frame(sock: socket.socket, payload: bytes | Sequence[bytes]) -> None:
+  chunks = [payload] if isinstance(payload, bytes) else payload
+  size = sum(len(chunk) for chunk in chunks)
+  if size > MAX_FRAME_SIZE:
+    raise ProtocolError(f"frame of {size} bytes exceeds the maximum of {MAX_FRAME_SIZE}")
+  sock.sendall(_FRAME_HEADER.pack(size))
+  for chunk in chunks:
+    sock.sendall(chunk)
+
+
+# Returns the payload of the next frame, or None if the connection was closed between frames.
+def read_frame(sock: socket.socket) -> bytes | None:
+  header = _read_exactly(sock, _FRAME_HEADER.size)
+  if len(header) == 0:
+    return None
+  if len(header) < _FRAME_HEADER.size:
+    raise ProtocolError("connection closed in a frame header")
+  (size,) = _FRAME_HEADER.unpack(header)
+  if size > MAX_FRAME_SIZE:
+    raise ProtocolError(f"frame of {size} bytes exceeds the maximum of {MAX_FRAME_SIZE}")
+  payload = _read_exactly(sock, size)
+  if len(payload) < size:
+    raise ProtocolError("connection closed in a frame")
+  return payload
+
+
+def encode_request(inputs: Sequence[ParseInput]) -> bytes:
+  items: list[dict[str, str]] = []
+  for parse_input in inputs:
+    if isinstance(parse_input, PathInput):
+      items.append({"path": parse_input.path})
+    else:
+      items.append({"text": parse_input.text, "name": parse_input.name})
+  return json.dumps({"inputs": items}, ensure_ascii=False).encode("utf-8")
+
+
+def decode_request(payload: bytes) -> list[ParseInput]:
+  try:
+    request = json.loads(payload.decode("utf-8"))
+  except ValueError as e:
+    raise ProtocolError(f"invalid request: {e}") from e
+  items = request.get("inputs") if isinstance(request, dict) else None
+  if not isinstance(items, list):
+    raise ProtocolError("invalid request: expected an object with a list of inputs")
+
+  inputs: list[ParseInput] = []
+  for item in items:
+    if not isinstance(item, dict):
+      raise ProtocolError(f"invalid input: {item!r}")
+    path = item.get("path")
+    text = item.get("text")
+    name = item.get("name", "<text>")
+    if isinstance(path, str) and text is None:
+      inputs.append(PathInput(path))
+    elif isinstance(text, str) and path is None and isinstance(name, str):
+      inputs.append(TextInput(text, name))
+    else:
+      raise ProtocolError(f"invalid input: {item!r}")
+  return inputs
+
+
+# Encodes a result, including the spans of its functions if they all have them.
+def encode_result(result: ParseResult) -> bytes:
+  name = result.name.encode("utf-8", errors="surrogatepass")
+  chunks = [_FRAME_HEADER.pack(len(name)), name]
+  if result.error is None:
+    include_spans = all(function.span is not None for function in result.functions)
+    chunks.append(_RESULT_OK)
+    chunks.append(binary_format_module.dumps(result.functions, include_spans=include_spans))
+  else:
+    chunks.append(_RESULT_ERROR)
+    chunks.append(result.error.encode("utf-8", errors="surrogatepass"))
+  return b"".join(chunks)
+
+
+# Encodes a response from results that are already encoded (e.g. by worker processes), without
+# copying them into one buffer.
+def encode_response(encoded_results: Sequence[bytes]) -> list[bytes]:
+  chunks = [_STATUS_OK, _FRAME_HEADER.pack(len(encoded_results))]
+  for encoded_result in encoded_results:
+    chunks.append(_FRAME_HEADER.pack(len(encoded_result)))
+    chunks.append(encoded_result)
+  return chunks
+
+
+def encode_error(message: str) -> bytes:
+  return _STATUS_ERROR + message.encode("utf-8")
+
+
+# Decodes a response, raising ParseServerError if the server reported an error.
+def decode_response(payload: bytes) -> list[ParseResult]:
+  status = payload[:1]
+  if status == _STATUS_ERROR:
+    raise ParseServerError(payload[1:].decode("utf-8", errors="replace"))
+  if status != _STATUS_OK:
+    raise ProtocolError("invalid response status")
+
+  view = memoryview(payload)
+  offset = 1
+  (count,) = _unpack_header(view, offset)
+  offset += _FRAME_HEADER.size
+  results: list[ParseResult] = []
+  for _ in range(count):
+    (size,) = _unpack_header(view, offset)
+    offset += _FRAME_HEADER.size
+    if offset + size > len(view):
+      raise ProtocolError("truncated response")
+    results.append(_decode_result(view[offset : offset + size]))
+    offset += size
+  return results
+
+
+def _decode_result(view: memoryview) -> ParseResult:
+  (name_size,) = _unpack_header(view, 0)
+  status_offset = _FRAME_HEADER.size + name_size
+  if status_offset + 1 > len(view):
+    raise ProtocolError("truncated result in response")
+  status = bytes(view[status_offset : status_offset + 1])
+  try:
+    name = bytes(view[_FRAME_HEADER.size : status_offset]).decode("utf-8", errors="surrogatepass")
+    if status == _RESULT_OK:
+      functions = tuple(binary_format_module.loads(view[status_offset + 1 :]))
+      return ParseResult(name=name, functions=functions)
+    if status == _RESULT_ERROR:
+      error = bytes(view[status_offset + 1 :]).decode("utf-8", errors="surrogatepass")
+      return ParseResult(name=name, error=error)
+  except (UnicodeDecodeError, binary_format_module.InvalidFormatError) as e:
+    raise ProtocolError(f"invalid result in response: {e}") from e
+  raise ProtocolError("invalid result status in response")
+
+
+def _unpack_header(view: memoryview, offset: int) -> tuple[int]:
+  if offset + _FRAME_HEADER.size > len(view):
+    raise ProtocolError("truncated response")
+  return _FRAME_HEADER.unpack_from(view, offset)
+
+
+def _read_exactly(sock: socket.socket, size: int) -> bytes:
+  # Returns fewer than size bytes only if the connection is closed first.
+  buffer = bytearray(size)
+  view = memoryview(buffer)
+  received = 0
+  while received < size:
+    n = sock.recv_into(view[received:])
+    if n == 0:
+      break
+    received += n
+  return bytes(view[:received])
@@ -0,0 +1,149 @@
+import pickle
+import socket
+
+from absl.testing import absltest
+
+import parse_protocol as parse_protocol_module
+import parser as parser_module
+import source_span as source_span_module
+
+JoyFunction = parser_module.JoyFunction
+ParseResult = parse_protocol_module.ParseResult
+PathInput = parse_protocol_module.PathInput
+ProtocolError = parse_protocol_module.ProtocolError
+SourceSpan = source_span_module.SourceSpan
+TextInput = parse_protocol_module.TextInput
+
+
+class ParseProtocolTest(absltest.TestCase):
+
+  def test_request_round_trip(self):
+    inputs = [PathInput("/a.joy"), TextInput("function é", name="x"), TextInput("")]
+
+    self.assertEqual(
+        inputs, parse_protocol_module.decode_request(parse_protocol_module.encode_request(inputs))
+    )
+
+  def test_decode_invalid_request(self):
+    for payload in (
+        b"\xff",
+        b"[]",
+        b'{"inputs": {}}',
+        b'{"inputs": [1]}',
+        b'{"inputs": [{"path": "/a.joy", "text": ""}]}',
+        b'{"inputs": [{"text": 1}]}',
+        b'{"inputs": [{"text": "", "name": null}]}',
+    ):
+      with self.subTest(payload=payload):
+        with self.assertRaises(ProtocolError):
+          parse_protocol_module.decode_request(payload)
+
+  def test_response_round_trip(self):
+    results = [
+        ParseResult(
+            name="a",
+            functions=(
+                JoyFunction(name="aaa", annotations=("main",), body=(parser_module.Word("x"),)),
+            ),
+        ),
+        ParseResult(name="b", error="unexpected end of input"),
+    ]
+    chunks = parse_protocol_module.encode_response(
+        [parse_protocol_module.encode_result(result) for result in results]
+    )
+
+    decoded_results = parse_protocol_module.decode_response(b"".join(chunks))
+
+    self.assertEqual(results, decoded_results)
+    self.assertIs(results[0].functions[0].annotations, decoded_results[0].functions[0].annotations)
+
+  def test_response_round_trip_with_spans(self):
+    function = JoyFunction(
+        name="aaa",
+        annotations=("main",),
+        body=(parser_module.Word("x"),),
+        span=SourceSpan(start=6, end=20, start_byte=6, end_byte=20),
+        annotation_spans=(SourceSpan(start=0, end=5, start_byte=0, end_byte=5),),
+        body_span=SourceSpan(start=15, end=20, start_byte=15, end_byte=20),
+    )
+    chunks = parse_protocol_module.encode_response(
+        [parse_protocol_module.encode_result(ParseResult(name="a\udcff", functions=(function,)))]
+    )
+
+    (decoded_result,) = parse_protocol_module.decode_response(b"".join(chunks))
+
+    self.assertEqual("a\udcff", decoded_result.name)
+    (decoded_function,) = decoded_result.functions
+    self.assertEqual(function, decoded_function)
+    self.assertEqual(function.span, decoded_function.span)
+    self.assertEqual(function.annotation_spans, decoded_function.annotation_spans)
+    self.assertEqual(function.body_span, decoded_function.body_span)
+
+  def test_decode_invalid_result(self):
+    encoded_result = parse_protocol_module.encode_result(
+        ParseResult(name="a", functions=(JoyFunction(name="aaa", annotations=()),))
+    )
+
+    for invalid_result in (
+        b"\x05\x00\x00\x00a",
+        b"\x01\x00\x00\x00a\x02",
+        b"\x01\x00\x00\x00\xff\x01error",
+        b"\x01\x00\x00\x00a\x01\xff",
+        encoded_result[:-1],
+        pickle.dumps(ParseResult(name="a")),
+    ):
+      with self.subTest(invalid_result=invalid_result):
+        with self.assertRaises(ProtocolError):
+          parse_protocol_module.decode_response(
+              b"".join(parse_protocol_module.encode_response([invalid_result]))
+          )
+
+  def test_decode_error_response(self):
+    with self.assertRaisesRegex(parse_protocol_module.ParseServerError, "bad request"):
+      parse_protocol_module.decode_response(parse_protocol_module.encode_error("bad request"))
+
+  def test_decode_truncated_response(self):
+    payload = b"".join(
+        parse_protocol_module.encode_response(
+            [parse_protocol_module.encode_result(ParseResult(name="a"))]
+        )
+    )
+
+    for size in (0, 1, 3, 5, len(payload) - 1):
+      with self.subTest(size=size):
+        with self.assertRaises(ProtocolError):
+          parse_protocol_module.decode_response(payload[:size])
+
+  def test_frames(self):
+    sock1, sock2 = socket.socketpair()
+    with sock1, sock2:
+      parse_protocol_module.write_frame(sock1, b"abc")
+      parse_protocol_module.write_frame(sock1, [b"de", b"", b"f"])
+      parse_protocol_module.write_frame(sock1, b"")
+      sock1.shutdown(socket.SHUT_WR)
+
+      self.assertEqual(b"abc", parse_protocol_module.read_frame(sock2))
+      self.assertEqual(b"def", parse_protocol_module.read_frame(sock2))
+      self.assertEqual(b"", parse_protocol_module.read_frame(sock2))
+      self.assertIsNone(parse_protocol_module.read_frame(sock2))
+
+  def test_truncated_frame(self):
+    sock1, sock2 = socket.socketpair()
+    with sock1, sock2:
+      sock1.sendall(b"\x05\x00\x00\x00ab")
+      sock1.shutdown(socket.SHUT_WR)
+
+      with self.assertRaises(ProtocolError):
+        parse_protocol_module.read_frame(sock2)
+
+  def test_oversized_frame(self):
+    sock1, sock2 = socket.socketpair()
+    with sock1, sock2:
+      sock1.sendall(b"\xff\xff\xff\xff")
+
+      with self.assertRaises(ProtocolError):
+        parse_protocol_module.read_frame(sock2)
+
+
+if __name__ == "__main__":
+  absltest.main()
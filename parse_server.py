@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable, Hashable
+import concurrent.futures
+import concurrent.futures.process
+import os
+import signal
+import socket
+import socketserver
+import stat
+import threading
+
+import compressed_source as compressed_source_module
+import parse_protocol as parse_protocol_module
+import parser as parser_module
+import parser_pool as parser_pool_module
+import tokenizer as tokenizer_module
+
+ParseInput = parse_protocol_module.ParseInput
+ParseResult = parse_protocol_module.ParseResult
+PathInput = parse_protocol_module.PathInput
+
+_PARSE_ERRORS = (
+    tokenizer_module.Tokenizer.ParseError,
+    parser_module.Parser.ParseError,
+    UnicodeDecodeError,
+    *compressed_source_module.DECOMPRESSION_ERRORS,
+)
+
+# The parser pool of a worker process, created by _initialize_worker().
+_worker_parser_pool: parser_pool_module.ParserPool | None = None
+_worker_encoding = "utf-8"
+
+
+# Serves parse requests from ParseClients on a Unix domain socket, parsing each input in one of a
+# pool of worker processes that are started (and import the parser) once, up front. Concurrent
+# requests for the same unchanged file share one parse. Each connection is handled by its own
+# thread, and may send any number of requests, one at a time.
+#
+# The server can read any file that its user can, so the socket is made accessible to that user
+# only; it should also be created in a directory that only that user can write to.
+class ParseServer:
+
+  def __init__(
+      self,
+      socket_path: str,
+      workers: int | None = None,
+      buffer_size: int = 65536,
+      encoding: str = "utf-8",
+  ) -> None:
+    if workers is not None and workers <= 0:
+      raise ValueError(f"invalid number of workers: {workers}")
+    self.socket_path = socket_path
+    self.workers = workers if workers is not None else (os.cpu_count() or 1)
+    self.buffer_size = buffer_size
+    self.encoding = encoding
+    # The number of inputs parsed by workers, and the number of requested files that shared a parse
+    # already in progress instead.
+    self.parse_count = 0
+    self.coalesced_count = 0
+
+    self._coalescer = _Coalescer()
+    self._count_lock = threading.Lock()
+    self._executor_lock = threading.Lock()
+    self._executor: concurrent.futures.ProcessPoolExecutor | None = None
+    self._server: _UnixServer | None = None
+    self._serve_thread: threading.Thread | None = None
+
+  # Starts the workers, then listens on the socket and serves requests on a background thread.
+  def start(self) -> None:
+    if self._executor is not None:
+      raise ValueError("the server has already been started")
+
+    # Start every worker before any connection thread exists, so that no worker is forked from a
+    # process with other threads running.
+    self._executor = self._start_executor()
+
+    _remove_stale_socket(self.socket_path)
+    self._server = _UnixServer(self.socket_path, self)
+    self._serve_thread = threading.Thread(
+        target=self._server.serve_forever, name="parse-server", daemon=True
+    )
+    self._serve_thread.start()
+
+  def close(self) -> None:
+    if self._server is not None:
+      self._server.shutdown()
+      self._server.server_close()
+      self._server = None
+      try:
+        os.unlink(self.socket_path)
+      except FileNotFoundError:
+        pass
+    with self._executor_lock:
+      executor = self._executor
+      self._executor = None
+    if executor is not None:
+      executor.shutdown(cancel_futures=True)
+
+  def __enter__(self) -> ParseServer:
+    self.start()
+    return self
+
+  def __exit__(self, *exc_info: object) -> None:
+    self.close()
+
+  # Handles the payload of one request frame, returning the chunks of the response frame.
+  def handle_request(self, payload: bytes) -> list[bytes]:
+    try:
+      inputs = parse_protocol_module.decode_request(payload)
+    except parse_protocol_module.ProtocolError as e:
+      return [parse_protocol_module.encode_error(str(e))]
+
+    executor = self._executor
+    try:
+      futures = [self._submit(parse_input) for parse_input in inputs]
+      return parse_protocol_module.encode_response([future.result() for future in futures])
+    except concurrent.futures.process.BrokenProcessPool as e:
+      # A worker process died (e.g. it was killed), which breaks the whole pool; replace the pool so
+      # that later requests succeed.
+      self._replace_broken_executor(executor)
+      return [parse_protocol_module.encode_error(f"a worker process died: {e}")]
+    except Exception as e:
+      # Report the error rather than dropping the connection.
+      return [parse_protocol_module.encode_error(f"internal error: {e!r}")]
+
+  def _start_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=self.workers,
+        initializer=_initialize_worker,
+        initargs=(self.buffer_size, self.encoding),
+    )
+    for future in [executor.submit(os.getpid) for _ in range(self.workers)]:
+      future.result()
+    return executor
+
+  # Replaces broken_executor with a new pool, unless another request has already replaced it or
+  # the server has been closed.
+  def _replace_broken_executor(
+      self, broken_executor: concurrent.futures.ProcessPoolExecutor | None
+  ) -> None:
+    with self._executor_lock:
+      if broken_executor is None or self._executor is not broken_executor:
+        return
+      self._executor = self._start_executor()
+    broken_executor.shutdown(wait=False, cancel_futures=True)
+
+  def _submit(self, parse_input: ParseInput) -> concurrent.futures.Future[bytes]:
+    executor = self._executor
+    if executor is None:
+      raise ValueError("the server is not running")
+
+    def submit() -> concurrent.futures.Future[bytes]:
+      with self._count_lock:
+        self.parse_count += 1
+      return executor.submit(_parse_input, parse_input)
+
+    if not isinstance(parse_input, PathInput):
+      return submit()
+    try:
+      stat_result = os.stat(parse_input.path)
+    except OSError:
+      # Let the worker report the error.
+      return submit()
+    # The modification time and size identify a version of the file, so that a request made after
+    # the file changed does not share a parse of its old contents.
+    key = (
+        parse_input.path,
+        stat_result.st_dev,
+        stat_result.st_ino,
+        stat_result.st_mtime_ns,
+        stat_result.st_size,
+    )
+    future, coalesced = self._coalescer.submit(key, submit)
+    if coalesced:
+      with self._count_lock:
+        self.coalesced_count += 1
+    return future
+
+
+# Shares the future of a pending task among all of the callers that submit the same key while it
+# is pending; once it is done, the next submission of the key starts a new task.
+class _Coalescer:
+
+  def __init__(self) -> None:
+    self._futures: dict[Hashable, concurrent.futures.Future[bytes]] = {}
+    self._lock = threading.Lock()
+
+  # Returns the future for key, and whether it was already pending.
+  def submit(
+      self, key: Hashable, submit: Callable[[], concurrent.futures.Future[bytes]]
+  ) -> tuple[concurrent.futures.Future[bytes], bool]:
+    with self._lock:
+      future = self._futures.get(key)
+      if future is not None:
+        return (future, True)
+      future = submit()
+      self._futures[key] = future
+    # The callback runs immediately if the future is already done, so it must not hold the lock.
+    future.add_done_callback(lambda done_future: self._remove(key, done_future))
+    return (future, False)
+
+  def pending_count(self) -> int:
+    with self._lock:
+      return len(self._futures)
+
+  def _remove(self, key: Hashable, future: concurrent.futures.Future[bytes]) -> None:
+    with self._lock:
+      if self._futures.get(key) is future:
+        del self._futures[key]
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+  daemon_threads = True
+
+  def __init__(self, socket_path: str, parse_server: ParseServer) -> None:
+    self.parse_server = parse_server
+    super().__init__(socket_path, _RequestHandler)
+
+  def server_bind(self) -> None:
+    # Create the socket with mode 0o600, rather than restricting it after bind(), so that other
+    # users never get a chance to connect. The umask is process-wide, so restore it immediately.
+    previous_umask = os.umask(0o177)
+    try:
+      super().server_bind()
+    finally:
+      os.umask(previous_umask)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+
+  def handle(self) -> None:
+    sock = self.request
+    server = self.server
+    assert isinstance(server, _UnixServer)
+    parse_server = server.parse_server
+    try:
+      while True:
+        payload = parse_protocol_module.read_frame(sock)
+        if payload is None:
+          break
+        parse_protocol_module.write_frame(sock, parse_server.handle_request(payload))
+    except (parse_protocol_module.ProtocolError, ConnectionError):
+      # The client sent a malformed frame or went away; drop the connection.
+      pass
+
+
+def _initialize_worker(buffer_size: int, encoding: str) -> None:
+  global _worker_parser_pool, _worker_encoding
+  _worker_parser_pool = parser_pool_module.ParserPool(
+      max_idle=1, buffer_size=buffer_size, encoding=encoding
+  )
+  _worker_encoding = encoding
+
+
+# Parses an input in a worker process, returning the encoded ParseResult, which the server passes on
+# to the client without decoding it.
+def _parse_input(parse_input: ParseInput) -> bytes:
+  parser_pool = _worker_parser_pool
+  assert parser_pool is not None
+  if isinstance(parse_input, PathInput):
+    name = parse_input.path
+  else:
+    name = parse_input.name
+
+  try:
+    if isinstance(parse_input, PathInput):
+      with compressed_source_module.open_source(parse_input.path, encoding=_worker_encoding) as f:
+        functions = parser_pool.parse(f)
+    else:
+      functions = parser_pool.parse(parse_input.text)
+    result = ParseResult(name=name, functions=tuple(functions))
+  except _PARSE_ERRORS as e:
+    result = ParseResult(name=name, error=str(e))
+  return parse_protocol_module.encode_result(result)
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+  # Removes a socket left behind by a server that exited without closing, but not one that a
+  # running server is listening on, nor a file that is not a socket.
+  try:
+    mode = os.lstat(socket_path).st_mode
+  except FileNotFoundError:
+    return
+  if not stat.S_ISSOCK(mode):
+    raise FileExistsError(f"not a socket: {socket_path}")
+  with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+    try:
+      sock.connect(socket_path)
+    except ConnectionRefusedError:
+      os.unlink(socket_path)
+      return
+  raise FileExistsError(f"a server is already listening on {socket_path}")
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description="Serves parse requests on a Unix domain socket using warm worker processes."
+  )
+  arg_parser.add_argument("socket_path", help="the path of the socket to listen on")
+  arg_parser.add_argument(
+      "--workers", type=int, help="the number of worker processes (default: the number of CPUs)"
+  )
+  arg_parser.add_argument("--buffer-size", type=int, default=65536)
+  arg_parser.add_argument("--encoding", default="utf-8", help="the encoding of parsed files")
+  args = arg_parser.parse_args()
+
+  server = ParseServer(
+      args.socket_path, workers=args.workers, buffer_size=args.buffer_size, encoding=args.encoding
+  )
+  stop_event = threading.Event()
+  signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+  try:
+    server.start()
+    print(f"listening on {args.socket_path} with {server.workers} workers", flush=True)
+    stop_event.wait()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.close()
+
+
+if __name__ == "__main__":
+  main()
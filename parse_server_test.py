@@ -0,0 +1,221 @@
+import concurrent.futures
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+
+from absl.testing import absltest
+
+import parse_client as parse_client_module
+import parse_protocol as parse_protocol_module
+import parse_server as parse_server_module
+import parser as parser_module
+
+IntegerLiteral = parser_module.IntegerLiteral
+JoyFunction = parser_module.JoyFunction
+ParseClient = parse_client_module.ParseClient
+ParseResult = parse_protocol_module.ParseResult
+ParseServer = parse_server_module.ParseServer
+PathInput = parse_protocol_module.PathInput
+TextInput = parse_protocol_module.TextInput
+
+
+class ParseServerTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.directory = self.enter_context(tempfile.TemporaryDirectory())
+    self.socket_path = os.path.join(self.directory, "parse.sock")
+    self.server = self.enter_context(ParseServer(self.socket_path, workers=2))
+
+  def test_parse(self):
+    path = self.write_file("a.joy", "@main function aaa { 1 }")
+    missing_path = os.path.join(self.directory, "missing.joy")
+
+    with ParseClient(self.socket_path) as client:
+      results = client.parse(
+          [PathInput(path), TextInput("function bbb", name="b"), PathInput(missing_path)]
+      )
+
+    self.assertEqual(
+        ParseResult(
+            name=path,
+            functions=(JoyFunction(name="aaa", annotations=("main",), body=(IntegerLiteral(1),)),),
+        ),
+        results[0],
+    )
+    self.assertEqual(ParseResult(name="b", functions=(JoyFunction("bbb", ()),)), results[1])
+    self.assertEqual(missing_path, results[2].name)
+    self.assertEmpty(results[2].functions)
+    self.assertIn("No such file", results[2].error)
+    # Spans are kept.
+    self.assertEqual(6, results[0].functions[0].span.start)
+
+  def test_parse_error(self):
+    with ParseClient(self.socket_path) as client:
+      result = client.parse_text("function aaa {", name="x")
+
+    self.assertEqual("x", result.name)
+    self.assertEmpty(result.functions)
+    self.assertIsNotNone(result.error)
+
+  def test_many_requests_on_one_connection(self):
+    with ParseClient(self.socket_path) as client:
+      for i in range(20):
+        self.assertEqual((JoyFunction(f"f{i}", ()),), client.parse_text(f"function f{i}").functions)
+      self.assertEqual([], client.parse([]))
+
+  def test_relative_paths_are_resolved_by_the_client(self):
+    self.write_file("a.joy", "function aaa")
+    cwd = os.getcwd()
+    os.chdir(self.directory)
+    try:
+      with ParseClient(self.socket_path) as client:
+        (result,) = client.parse_paths(["a.joy"])
+    finally:
+      os.chdir(cwd)
+
+    self.assertEqual(
+        os.path.join(os.path.realpath(self.directory), "a.joy"), os.path.realpath(result.name)
+    )
+    self.assertEqual((JoyFunction("aaa", ()),), result.functions)
+
+  def test_concurrent_clients(self):
+    paths = [self.write_file(f"{i}.joy", f"function f{i}") for i in range(8)]
+
+    def parse(path: str) -> ParseResult:
+      with ParseClient(self.socket_path) as client:
+        return client.parse_paths([path])[0]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+      results = list(executor.map(parse, paths * 4))
+
+    self.assertEqual(
+        [(JoyFunction(f"f{i}", ()),) for i in range(8)] * 4,
+        [result.functions for result in results],
+    )
+
+  def test_requests_for_the_same_file_are_coalesced(self):
+    # A large file, so that its parse is still in progress when it is requested again.
+    path = self.write_file(
+        "a.joy", "".join(f"function f{i} {{ {i} dup * }}\n" for i in range(20000))
+    )
+
+    with ParseClient(self.socket_path) as client:
+      results = client.parse_paths([path, path, path])
+
+    self.assertEqual(1, self.server.parse_count)
+    self.assertEqual(2, self.server.coalesced_count)
+    self.assertLen(results[0].functions, 20000)
+    self.assertEqual(results[0], results[2])
+
+  def test_changed_file_is_parsed_again(self):
+    path = self.write_file("a.joy", "function aaa")
+    with ParseClient(self.socket_path) as client:
+      client.parse_paths([path])
+      self.write_file("a.joy", "function bbbb")
+
+      (result,) = client.parse_paths([path])
+
+    self.assertEqual((JoyFunction("bbbb", ()),), result.functions)
+    self.assertEqual(2, self.server.parse_count)
+
+  def test_invalid_request(self):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+      sock.connect(self.socket_path)
+
+      parse_protocol_module.write_frame(sock, b"not json")
+      payload = parse_protocol_module.read_frame(sock)
+
+    with self.assertRaises(parse_protocol_module.ParseServerError):
+      parse_protocol_module.decode_response(payload)
+
+  def test_worker_process_dying_is_reported_and_the_workers_are_replaced(self):
+    workers = multiprocessing.active_children()
+    self.assertLen(workers, 2)
+
+    with ParseClient(self.socket_path) as client:
+      for worker in workers:
+        os.kill(worker.pid, signal.SIGKILL)
+      with self.assertRaisesRegex(parse_protocol_module.ParseServerError, "worker process died"):
+        client.parse_text("function aaa")
+
+      self.assertEqual((JoyFunction("bbb", ()),), client.parse_text("function bbb").functions)
+
+    self.assertNoCommonElements(
+        [worker.pid for worker in workers],
+        [worker.pid for worker in multiprocessing.active_children()],
+    )
+
+  def test_socket_is_private(self):
+    self.assertEqual(0o600, os.stat(self.socket_path).st_mode & 0o777)
+
+  def test_socket_is_private_regardless_of_umask(self):
+    socket_path = os.path.join(self.directory, "other.sock")
+    previous_umask = os.umask(0)
+    self.addCleanup(os.umask, previous_umask)
+
+    with ParseServer(socket_path, workers=1):
+      self.assertEqual(0o600, os.stat(socket_path).st_mode & 0o777)
+    self.assertEqual(0, os.umask(0))
+
+  def test_socket_in_use(self):
+    with self.assertRaises(FileExistsError):
+      ParseServer(self.socket_path, workers=1).start()
+
+  def test_stale_socket_is_replaced(self):
+    socket_path = os.path.join(self.directory, "stale.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+      sock.bind(socket_path)
+
+    with ParseServer(socket_path, workers=1):
+      with ParseClient(socket_path) as client:
+        self.assertIsNone(client.parse_text("function aaa").error)
+    self.assertFalse(os.path.exists(socket_path))
+
+  def write_file(self, name: str, text: str) -> str:
+    path = os.path.join(self.directory, name)
+    with open(path, "wt", encoding="utf-8") as f:
+      f.write(text)
+    return path
+
+
+class CoalescerTest(absltest.TestCase):
+
+  def test_pending_future_is_shared(self):
+    coalescer = parse_server_module._Coalescer()
+    futures: list[concurrent.futures.Future[bytes]] = []
+
+    def submit() -> concurrent.futures.Future[bytes]:
+      futures.append(concurrent.futures.Future())
+      return futures[-1]
+
+    future1, coalesced1 = coalescer.submit("a", submit)
+    future2, coalesced2 = coalescer.submit("a", submit)
+    future3, coalesced3 = coalescer.submit("b", submit)
+
+    self.assertIs(future1, future2)
+    self.assertIsNot(future1, future3)
+    self.assertEqual((False, True, False), (coalesced1, coalesced2, coalesced3))
+    self.assertEqual(2, coalescer.pending_count())
+
+    future1.set_result(b"")
+    future4, coalesced4 = coalescer.submit("a", submit)
+
+    self.assertIsNot(future1, future4)
+    self.assertFalse(coalesced4)
+    self.assertLen(futures, 3)
+
+  def test_done_future_is_not_kept(self):
+    coalescer = parse_server_module._Coalescer()
+    future: concurrent.futures.Future[bytes] = concurrent.futures.Future()
+    future.set_result(b"")
+
+    coalescer.submit("a", lambda: future)
+
+    self.assertEqual(0, coalescer.pending_count())
+
+
+if __name__ == "__main__":
+  absltest.main()
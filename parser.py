@@ -1,8 +1,15 @@
 from __future__ import annotations
 
-from collections.abc import Generator
+from collections.abc import Generator, Iterable, Iterator
 import dataclasses
+import sys
+import time
+from typing import TextIO
 
+import parse_instrumentation as parse_instrumentation_module
+import parse_limits as parse_limits_module
+import source_reader as source_reader_module
+import source_span as source_span_module
 import tokenizer as tokenizer_module
 
 
@@ -10,50 +17,110 @@ class Parser:
 
   def __init__(self, tokenizer: tokenizer_module.Tokenizer) -> None:
     self.tokenizer = tokenizer
+    self.instrumentation = tokenizer.instrumentation
+    self.limits = tokenizer.limits
     self.functions: list[JoyFunction] = []
+    self.module = JoyModule()
+    self._retain_functions = True
+
+  # Starts parsing new_input with the same tokenizer and source reader, which keep their
+  # configuration; see SourceReader.reset(). The functions and module of the previous parse are
+  # replaced rather than cleared, so a caller may keep them.
+  def reset(self, new_input: TextIO | str) -> None:
+    self.tokenizer.reset(new_input)
+    self.functions = []
+    self.module = JoyModule()
 
   def parse(self) -> None:
+    for _ in self._run(retain_functions=True):
+      pass
+
+  # Parses the input, yielding each function as soon as it is complete instead of keeping it in
+  # module, so that memory use does not grow with the number of functions (e.g. when parsing an
+  # endless stream); functions holds only the functions not yet yielded. Duplicate function names
+  # are not detected, since that would require remembering every name.
+  def iter_functions(self) -> Iterator[JoyFunction]:
+    for _ in self._run(retain_functions=False):
+      functions = self.functions[:]
+      self.functions.clear()
+      yield from functions
+
+  # Drives the parse, pausing whenever functions have been completed unless they are retained.
+  def _run(self, retain_functions: bool) -> Generator[None, None, None]:
+    self._retain_functions = retain_functions
     parser = self._parse()
 
-    while True:
-      if self.tokenizer.eof():
-        break
+    try:
+      while True:
+        if self.tokenizer.eof():
+          break
 
-      if self.tokenizer.skip_whitespace():
-        continue
-      if self.tokenizer.skip_inline_comment():
-        continue
-      if self.tokenizer.skip_multiline_comment():
-        continue
+        if self.tokenizer.skip_whitespace():
+          continue
+        if self.tokenizer.skip_inline_comment():
+          continue
+        if self.tokenizer.skip_multiline_comment():
+          continue
+        # Skipping trivia may have reached end-of-file, since a token that was read with a
+        # maximum length (e.g. a `}`) does not look ahead for end-of-file.
+        if self.tokenizer.eof():
+          break
 
-      parser.send(None)
+        parser.send(None)
+        if not retain_functions and len(self.functions) > 0:
+          yield
+    except BaseException:
+      # Reading trivia failed (e.g. the input could not be decoded, or an instrumentation stopped
+      # the parse) in the middle of a declaration, or the caller stopped iterating; discard the
+      # declaration rather than report it as incomplete.
+      try:
+        parser.close()
+      except self.ParseError:
+        pass
+      raise
 
     parser.close()
+    if not retain_functions and len(self.functions) > 0:
+      yield
 
   def _parse(self) -> Generator[None, None, None]:
     accumulated_annotations: list[str] = []
+    accumulated_annotation_spans: list[source_span_module.SourceSpan] = []
+    # Whether the tokenizer is positioned at a token that has not yet been consumed, which happens
+    # after looking for a function body and finding the start of the next declaration instead.
+    is_token_pending = False
 
     while True:
-      try:
-        yield
-      except GeneratorExit:
-        if len(accumulated_annotations) > 0:
-          raise self.ParseError(
-              "end-of-file reached unexpectedly after annotations: "
-              f"{' ,'.join(accumulated_annotations)}"
-          )
-        raise
+      if not is_token_pending:
+        try:
+          yield
+        except GeneratorExit:
+          if len(accumulated_annotations) > 0:
+            raise self.ParseError(
+                "end-of-file reached unexpectedly after annotations: "
+                f"{' ,'.join(accumulated_annotations)}"
+            )
+          raise
+      is_token_pending = False
 
+      start = self.tokenizer.position()
       annotation = self.tokenizer.read_annotation()
       if annotation is not None:
         accumulated_annotations.append(annotation)
+        accumulated_annotation_spans.append(self._span_ending_here(start))
+        if self.limits is not None:
+          self._check_annotation_limit(self.limits, len(accumulated_annotations))
         continue
 
+      function_start_ns = time.perf_counter_ns() if self.instrumentation is not None else 0
       identifier = self.tokenizer.read_identifier()
       if identifier is None:
         raise self.ParseError("expected function declaration")
       if identifier != "function":
         raise self.ParseError(f"expected `function` but got {identifier}")
+      if self.limits is not None:
+        self._check_function_limit(self.limits)
+      keyword_span = self._span_ending_here(start)
       try:
         yield
         function_name = self.tokenizer.read_identifier()
@@ -62,18 +129,349 @@ class Parser:
       except GeneratorExit:
         raise self.ParseError("end-of-file reached unexpectedly in function definition")
 
-      self.functions.append(
-          JoyFunction(name=function_name, annotations=tuple(accumulated_annotations))
+      if function_name in self.module:
+        raise self.DuplicateFunctionError(
+            function_name=function_name,
+            message=f"function defined more than once: {function_name}",
+        )
+
+      name_span = self._span_ending_here(self.tokenizer.position() - len(function_name))
+      function = JoyFunction(
+          name=function_name,
+          annotations=tuple(accumulated_annotations),
+          span=source_span_module.SourceSpan(
+              start=keyword_span.start,
+              end=name_span.end,
+              start_byte=keyword_span.start_byte,
+              end_byte=name_span.end_byte,
+          ),
+          annotation_spans=tuple(accumulated_annotation_spans),
       )
       accumulated_annotations = []
+      accumulated_annotation_spans = []
+
+      # The function body is optional.
+      try:
+        yield
+      except GeneratorExit:
+        self._add_function(function, function_start_ns)
+        raise
+
+      body_start = self.tokenizer.position()
+      if not self.tokenizer.read_character("{"):
+        self._add_function(function, function_start_ns)
+        is_token_pending = True
+        continue
+
+      body_start_byte = self.tokenizer.byte_position() - 1
+      body = yield from self._parse_terms(closing_character="}")
+      body_span = source_span_module.SourceSpan(
+          start=body_start,
+          end=self.tokenizer.position(),
+          start_byte=body_start_byte,
+          end_byte=self.tokenizer.byte_position(),
+      )
+      self._add_function(
+          dataclasses.replace(
+              function,
+              body=body,
+              span=dataclasses.replace(
+                  function.span, end=body_span.end, end_byte=body_span.end_byte
+              ),
+              body_span=body_span,
+          ),
+          function_start_ns,
+      )
+
+  # Parses terms up to closing_character, where depth is the number of quotations the terms are
+  # nested in.
+  def _parse_terms(
+      self, closing_character: str, depth: int = 0
+  ) -> Generator[None, None, tuple[Term, ...]]:
+    terms: list[Term] = []
+
+    while True:
+      try:
+        yield
+      except GeneratorExit:
+        raise self.ParseError(f"end-of-file reached unexpectedly; expected `{closing_character}`")
+
+      if self.tokenizer.read_character(closing_character):
+        return tuple(terms)
+
+      if self.tokenizer.read_character("["):
+        if self.limits is not None:
+          self._check_quotation_depth_limit(self.limits, depth + 1)
+        if depth >= MAX_QUOTATION_DEPTH:
+          raise self.ParseError(
+              f"quotations nested more than {MAX_QUOTATION_DEPTH} deep at position "
+              f"{self.tokenizer.position() - 1}"
+          )
+        quotation_terms = yield from self._parse_terms(closing_character="]", depth=depth + 1)
+        terms.append(Quotation(terms=quotation_terms))
+        continue
+
+      integer = self.tokenizer.read_integer()
+      if integer is not None:
+        terms.append(IntegerLiteral(value=integer))
+        continue
+
+      string = self.tokenizer.read_string()
+      if string is not None:
+        terms.append(StringLiteral(value=string))
+        continue
+
+      identifier = self.tokenizer.read_identifier()
+      if identifier is not None:
+        if identifier == "function":
+          raise self.ParseError(f"unexpected `function` keyword; expected `{closing_character}`")
+        elif identifier in _BOOLEAN_LITERALS:
+          terms.append(BooleanLiteral(value=_BOOLEAN_LITERALS[identifier]))
+        else:
+          terms.append(Word(name=identifier))
+        continue
+
+      operator = self.tokenizer.read_operator()
+      if operator is not None:
+        terms.append(Word(name=operator))
+        continue
+
+      raise self.ParseError(f"unexpected character: {self.tokenizer.peek_character()}")
+
+  def _add_function(self, function: JoyFunction, start_ns: int) -> None:
+    self.functions.append(function)
+    if self._retain_functions:
+      self.module.add(function)
+    if self.instrumentation is not None:
+      self.instrumentation.record(
+          parse_instrumentation_module.Phase.FUNCTION, start_ns, time.perf_counter_ns()
+      )
+
+  def _check_annotation_limit(
+      self, limits: parse_limits_module.ParseLimits, annotation_count: int
+  ) -> None:
+    if (
+        limits.max_annotations_per_function is not None
+        and annotation_count > limits.max_annotations_per_function
+    ):
+      raise parse_limits_module.TooManyAnnotationsError(
+          limit=limits.max_annotations_per_function,
+          message=(
+              "function has more than the maximum of "
+              f"{limits.max_annotations_per_function} annotations"
+          ),
+      )
+
+  def _check_function_limit(self, limits: parse_limits_module.ParseLimits) -> None:
+    # Called at each `function` keyword, before the function is parsed.
+    limits.check_deadline()
+    if limits.max_functions is not None and len(self.functions) >= limits.max_functions:
+      raise parse_limits_module.TooManyFunctionsError(
+          limit=limits.max_functions,
+          message=f"input defines more than the maximum of {limits.max_functions} functions",
+      )
+
+  def _check_quotation_depth_limit(
+      self, limits: parse_limits_module.ParseLimits, depth: int
+  ) -> None:
+    # Called at each `[`, with the depth of the quotation it starts.
+    if limits.max_quotation_depth is not None and depth > limits.max_quotation_depth:
+      raise parse_limits_module.QuotationTooDeepError(
+          limit=limits.max_quotation_depth,
+          message=(
+              f"quotations nested more than the maximum of {limits.max_quotation_depth} deep at "
+              f"position {self.tokenizer.position() - 1}"
+          ),
+      )
+
+  def _span_ending_here(self, start: int) -> source_span_module.SourceSpan:
+    # Every token spanned by this method (annotations, keywords, and identifiers) consists solely
+    # of ASCII characters and contains no trivia, so its length in bytes equals its length in
+    # characters; this avoids having to calculate the byte position of the start of the token.
+    end = self.tokenizer.position()
+    end_byte = self.tokenizer.byte_position()
+    return source_span_module.SourceSpan(
+        start=start, end=end, start_byte=end_byte - (end - start), end_byte=end_byte
+    )
 
   class ParseError(Exception):
     pass
 
+  class DuplicateFunctionError(ParseError):
+
+    def __init__(self, function_name: str, message: str) -> None:
+      super().__init__(message)
+      self.function_name = function_name
+
 
-@dataclasses.dataclass(frozen=True)
+# Parses text with a new parser stack, returning its functions.
+def parse_text(text: str) -> list[JoyFunction]:
+  parser = Parser(tokenizer_module.Tokenizer(source_reader_module.SourceReader(text)))
+  parser.parse()
+  return parser.functions
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class JoyFunction:
   # The name of the function (e.g. "doSomething", "main").
   name: str
-  # The annotations applied to the function.
+  # The annotations applied to the function; equal annotation tuples are shared between instances.
   annotations: tuple[str, ...]
+  # The terms of the function's body; empty if the function has no body.
+  body: tuple[Term, ...] = ()
+  # The location of the function in the source, from the `function` keyword to the end of the
+  # function's body (or name, if it has no body), or None if unknown. Not considered when comparing
+  # functions.
+  span: source_span_module.SourceSpan | None = dataclasses.field(default=None, compare=False)
+  # The locations of the annotations in the source, parallel to `annotations`, or the empty tuple
+  # if unknown. Not considered when comparing functions.
+  annotation_spans: tuple[source_span_module.SourceSpan, ...] = dataclasses.field(
+      default=(), compare=False
+  )
+  # The location of the function's body in the source, from `{` to `}` inclusive, or None if
+  # unknown or if the function has no body. Not considered when comparing functions.
+  body_span: source_span_module.SourceSpan | None = dataclasses.field(default=None, compare=False)
+
+  def __post_init__(self) -> None:
+    object.__setattr__(self, "name", sys.intern(self.name))
+    object.__setattr__(self, "annotations", _intern_annotations(self.annotations))
+
+  def __reduce__(self) -> tuple[type[JoyFunction], tuple[object, ...]]:
+    # Unpickle via the constructor so that the unpickled instance shares the interned annotations.
+    return (
+        JoyFunction,
+        (
+            self.name,
+            self.annotations,
+            self.body,
+            self.span,
+            self.annotation_spans,
+            self.body_span,
+        ),
+    )
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class IntegerLiteral:
+  value: int
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class StringLiteral:
+  value: str
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class BooleanLiteral:
+  value: bool
+
+
+# A reference to a function or built-in word, e.g. "dup", "+", or "factorial".
+@dataclasses.dataclass(frozen=True, slots=True)
+class Word:
+  name: str
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Quotation:
+  terms: tuple[Term, ...]
+
+
+Term = IntegerLiteral | StringLiteral | BooleanLiteral | Word | Quotation
+
+_BOOLEAN_LITERALS = {"true": True, "false": False}
+
+# The maximum number of quotations a term may be nested in. The parser, and everything that walks
+# the terms it returns, recurses once per level of nesting, so deeper input is rejected rather than
+# left to exhaust the Python stack.
+MAX_QUOTATION_DEPTH = 100
+
+
+# The flyweight table of annotation tuples used by JoyFunction. The number of distinct annotation
+# combinations is typically tiny compared to the number of functions, but a long-running process
+# (e.g. parse_ndjson reading an endless stream) may meet any number of them, so the table is cleared
+# whenever it is full. Tuples already handed out stay valid; equal tuples created afterwards are
+# merely not shared with them.
+_MAX_ANNOTATIONS_FLYWEIGHTS = 4096
+_annotations_flyweights: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+
+def _intern_annotations(annotations: Iterable[str]) -> tuple[str, ...]:
+  annotations = tuple(annotations)
+  flyweight = _annotations_flyweights.get(annotations)
+  if flyweight is None:
+    if len(_annotations_flyweights) >= _MAX_ANNOTATIONS_FLYWEIGHTS:
+      _annotations_flyweights.clear()
+    flyweight = tuple(sys.intern(annotation) for annotation in annotations)
+    flyweight = _annotations_flyweights.setdefault(flyweight, flyweight)
+  return flyweight
+
+
+# An index of functions by name and by annotation; iteration yields the functions in the order in
+# which they were added.
+class JoyModule:
+
+  def __init__(self, functions: Iterable[JoyFunction] = ()) -> None:
+    self._functions_by_name: dict[str, JoyFunction] = {}
+    self._functions_by_annotation: dict[str, list[JoyFunction]] = {}
+    for function in functions:
+      self.add(function)
+
+  @classmethod
+  def merged(cls, modules: Iterable[JoyModule]) -> JoyModule:
+    merged_module = cls()
+    for module in modules:
+      merged_module.merge(module)
+    return merged_module
+
+  def add(self, function: JoyFunction) -> None:
+    if function.name in self._functions_by_name:
+      raise self.DuplicateFunctionError(
+          function_name=function.name,
+          message=f"function defined more than once: {function.name}",
+      )
+
+    self._functions_by_name[function.name] = function
+    # Index each distinct annotation only once so that a function annotated with, for example,
+    # both @main and @main is not reported twice by functions_with_annotation().
+    for annotation in dict.fromkeys(function.annotations):
+      self._functions_by_annotation.setdefault(annotation, []).append(function)
+
+  def merge(self, other: JoyModule) -> None:
+    duplicate_names = self._functions_by_name.keys() & other._functions_by_name.keys()
+    if len(duplicate_names) > 0:
+      sorted_duplicate_names = sorted(duplicate_names)
+      raise self.DuplicateFunctionError(
+          function_name=sorted_duplicate_names[0],
+          message=f"functions defined more than once: {', '.join(sorted_duplicate_names)}",
+      )
+
+    for function in other:
+      self.add(function)
+
+  def get(self, name: str) -> JoyFunction | None:
+    return self._functions_by_name.get(name)
+
+  def functions_with_annotation(self, annotation: str) -> tuple[JoyFunction, ...]:
+    return tuple(self._functions_by_annotation.get(annotation, ()))
+
+  def annotations(self) -> frozenset[str]:
+    return frozenset(self._functions_by_annotation)
+
+  def __getitem__(self, name: str) -> JoyFunction:
+    return self._functions_by_name[name]
+
+  def __contains__(self, name: object) -> bool:
+    return name in self._functions_by_name
+
+  def __iter__(self) -> Iterator[JoyFunction]:
+    return iter(self._functions_by_name.values())
+
+  def __len__(self) -> int:
+    return len(self._functions_by_name)
+
+  class DuplicateFunctionError(ValueError):
+
+    def __init__(self, function_name: str, message: str) -> None:
+      super().__init__(message)
+      self.function_name = function_name
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+import dataclasses
+import io
+import json
+import platform
+import random
+import sys
+import timeit
+
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+ReadMode = source_reader_module.ReadMode
+
+RESULTS_FORMAT_VERSION = 1
+
+_WHITESPACE_CHARS = " \n\r\t"
+_IDENTIFIER_START_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_"
+_IDENTIFIER_SUBSEQUENT_CHARS = _IDENTIFIER_START_CHARS + "0123456789"
+_COMMENT_WORDS = ("the", "stack", "quotation", "pops", "pushes", "returns", "*", "/", "//", "{")
+
+
+# Synthetic inputs, all of them valid Joy, that stress different paths through the parser. Each
+# generator appends whole functions to the output until it is at least size characters long, using
+# only the given random number generator so that the inputs are reproducible.
+def _identifier(rng: random.Random, max_length: int) -> str:
+  length = rng.randint(1, max_length)
+  return rng.choice(_IDENTIFIER_START_CHARS) + "".join(
+      rng.choice(_IDENTIFIER_SUBSEQUENT_CHARS) for _ in range(length - 1)
+  )
+
+
+def _function_name(rng: random.Random, max_length: int, index: int) -> str:
+  # Suffix the function's index so that no two functions have the same name.
+  return f"{_identifier(rng, max_length)}_{index}"
+
+
+def _identifier_heavy_input(size: int, rng: random.Random) -> str:
+  parts = []
+  length = 0
+  while length < size:
+    words = " ".join(_identifier(rng, 64) for _ in range(rng.randint(1, 20)))
+    part = f"function {_function_name(rng, 64, len(parts))} {{ {words} }}\n"
+    parts.append(part)
+    length += len(part)
+  return "".join(parts)
+
+
+def _comment_heavy_input(size: int, rng: random.Random) -> str:
+  parts = []
+  length = 0
+  while length < size:
+    words = " ".join(rng.choice(_COMMENT_WORDS) for _ in range(rng.randint(10, 200)))
+    if rng.random() < 0.5:
+      part = f"// {words}\nfunction {_function_name(rng, 16, len(parts))}\n"
+    else:
+      part = f"/* {words}\n{words} */ function {_function_name(rng, 16, len(parts))}\n"
+    parts.append(part)
+    length += len(part)
+  return "".join(parts)
+
+
+def _whitespace_heavy_input(size: int, rng: random.Random) -> str:
+  def whitespace() -> str:
+    return "".join(rng.choice(_WHITESPACE_CHARS) for _ in range(rng.randint(1, 200)))
+
+  parts = []
+  length = 0
+  while length < size:
+    part = (
+        f"function{whitespace()}{_function_name(rng, 16, len(parts))}{whitespace()}{{{whitespace()}"
+        f"dup{whitespace()}1{whitespace()}+{whitespace()}}}{whitespace()}"
+    )
+    parts.append(part)
+    length += len(part)
+  return "".join(parts)
+
+
+def _annotation_heavy_input(size: int, rng: random.Random) -> str:
+  parts = []
+  length = 0
+  while length < size:
+    annotations = " ".join(f"@{_identifier(rng, 16)}" for _ in range(rng.randint(1, 50)))
+    part = f"{annotations}\nfunction {_function_name(rng, 16, len(parts))}\n"
+    parts.append(part)
+    length += len(part)
+  return "".join(parts)
+
+
+INPUT_SHAPES: dict[str, Callable[[int, random.Random], str]] = {
+    "identifiers": _identifier_heavy_input,
+    "comments": _comment_heavy_input,
+    "whitespace": _whitespace_heavy_input,
+    "annotations": _annotation_heavy_input,
+}
+
+
+def generate_input(shape: str, size: int, seed: int = 0) -> str:
+  return INPUT_SHAPES[shape](size, random.Random(f"{shape}:{seed}"))
+
+
+# The operations that are timed. Each one processes the whole of the given text, so that its speed
+# can be reported in characters per second.
+def _source_reader(text: str) -> source_reader_module.SourceReader:
+  return source_reader_module.SourceReader(io.StringIO(text))
+
+
+def _benchmark_read(text: str) -> None:
+  reader = _source_reader(text)
+  while not reader.eof():
+    reader.read(_WHITESPACE_CHARS, mode=ReadMode.NORMAL, max_lexeme_length=None)
+    reader.read(
+        _WHITESPACE_CHARS,
+        mode=ReadMode.NORMAL,
+        max_lexeme_length=None,
+        invert_accepted_characters=True,
+    )
+
+
+def _benchmark_peek(text: str) -> None:
+  reader = _source_reader(text)
+  while len(reader.peek(2)) > 0:
+    reader.read("", mode=ReadMode.SKIP, max_lexeme_length=16, invert_accepted_characters=True)
+
+
+def _benchmark_read_until_exact_match(text: str) -> None:
+  reader = _source_reader(text)
+  while reader.read_until_exact_match("*/", mode=ReadMode.SKIP):
+    pass
+
+
+def _tokenizer_benchmark(
+    method: Callable[[tokenizer_module.Tokenizer], object]
+) -> Callable[[str], None]:
+  # Calls the method at every position where it does not consume anything, then skips a character.
+  def benchmark(text: str) -> None:
+    tokenizer = tokenizer_module.Tokenizer(_source_reader(text))
+    source_reader = tokenizer.source_reader
+    while not tokenizer.eof():
+      position = source_reader.position()
+      method(tokenizer)
+      if source_reader.position() == position:
+        source_reader.read(
+            "", mode=ReadMode.SKIP, max_lexeme_length=1, invert_accepted_characters=True
+        )
+
+  return benchmark
+
+
+def _benchmark_parse(text: str) -> None:
+  parser_module.Parser(tokenizer_module.Tokenizer(_source_reader(text))).parse()
+
+
+BENCHMARKS: dict[str, Callable[[str], None]] = {
+    "SourceReader.read": _benchmark_read,
+    "SourceReader.peek": _benchmark_peek,
+    "SourceReader.read_until_exact_match": _benchmark_read_until_exact_match,
+    # The cost of the loop that drives the Tokenizer benchmarks, to subtract from their times.
+    "Tokenizer.(driver)": _tokenizer_benchmark(lambda tokenizer: None),
+    "Tokenizer.position": _tokenizer_benchmark(tokenizer_module.Tokenizer.position),
+    "Tokenizer.byte_position": _tokenizer_benchmark(tokenizer_module.Tokenizer.byte_position),
+    "Tokenizer.read_annotation": _tokenizer_benchmark(tokenizer_module.Tokenizer.read_annotation),
+    "Tokenizer.read_identifier": _tokenizer_benchmark(tokenizer_module.Tokenizer.read_identifier),
+    "Tokenizer.read_character": _tokenizer_benchmark(
+        lambda tokenizer: tokenizer.read_character("{")
+    ),
+    "Tokenizer.read_integer": _tokenizer_benchmark(tokenizer_module.Tokenizer.read_integer),
+    "Tokenizer.read_string": _tokenizer_benchmark(tokenizer_module.Tokenizer.read_string),
+    "Tokenizer.read_operator": _tokenizer_benchmark(tokenizer_module.Tokenizer.read_operator),
+    "Tokenizer.peek_character": _tokenizer_benchmark(tokenizer_module.Tokenizer.peek_character),
+    "Tokenizer.skip_whitespace": _tokenizer_benchmark(tokenizer_module.Tokenizer.skip_whitespace),
+    "Tokenizer.skip_inline_comment": _tokenizer_benchmark(
+        tokenizer_module.Tokenizer.skip_inline_comment
+    ),
+    "Tokenizer.skip_multiline_comment": _tokenizer_benchmark(
+        tokenizer_module.Tokenizer.skip_multiline_comment
+    ),
+    "Parser.parse": _benchmark_parse,
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class BenchmarkResult:
+  # The benchmark and input shape, e.g. "Parser.parse/comments".
+  name: str
+  # The fastest time to process the whole input.
+  seconds: float
+  characters_per_second: float
+
+
+def run_benchmarks(
+    size: int,
+    repeat: int,
+    number: int,
+    name_filter: str = "",
+    on_result: Callable[[BenchmarkResult], None] | None = None,
+) -> list[BenchmarkResult]:
+  results = []
+  for shape in INPUT_SHAPES:
+    text = generate_input(shape, size)
+    for benchmark_name, benchmark in BENCHMARKS.items():
+      name = f"{benchmark_name}/{shape}"
+      if name_filter not in name:
+        continue
+      seconds = min(timeit.repeat(lambda: benchmark(text), repeat=repeat, number=number)) / number
+      result = BenchmarkResult(
+          name=name, seconds=seconds, characters_per_second=len(text) / seconds
+      )
+      results.append(result)
+      if on_result is not None:
+        on_result(result)
+  return results
+
+
+def results_to_json(results: list[BenchmarkResult], size: int) -> dict[str, object]:
+  return {
+      "version": RESULTS_FORMAT_VERSION,
+      "python": platform.python_version(),
+      "implementation": platform.python_implementation(),
+      "size": size,
+      "results": {result.name: dataclasses.asdict(result) for result in results},
+  }
+
+
+@dataclasses.dataclass(frozen=True)
+class Comparison:
+  name: str
+  baseline_seconds: float
+  seconds: float
+
+  @property
+  def ratio(self) -> float:
+    return self.seconds / self.baseline_seconds
+
+
+# Compares results to a baseline, as written by results_to_json(), returning the comparisons for
+# the benchmarks present in both. A comparison is a regression if its ratio exceeds 1 + threshold.
+def compare(
+    baseline: dict[str, object], results: list[BenchmarkResult], size: int
+) -> list[Comparison]:
+  if baseline.get("version") != RESULTS_FORMAT_VERSION:
+    raise ValueError(f"unsupported baseline version: {baseline.get('version')}")
+  if baseline.get("size") != size:
+    raise ValueError(f"the baseline was measured with size {baseline.get('size')}, not {size}")
+  baseline_results = baseline["results"]
+  assert isinstance(baseline_results, dict)
+
+  comparisons = []
+  for result in results:
+    baseline_result = baseline_results.get(result.name)
+    if baseline_result is None:
+      continue
+    comparisons.append(
+        Comparison(
+            name=result.name, baseline_seconds=baseline_result["seconds"], seconds=result.seconds
+        )
+    )
+  return comparisons
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description=(
+          "Measures the speed of the source reader, tokenizer, and parser on synthetic inputs."
+      )
+  )
+  arg_parser.add_argument("--size", type=int, default=65536, help="characters per input")
+  arg_parser.add_argument("--repeat", type=int, default=5)
+  arg_parser.add_argument("--number", type=int, default=1)
+  arg_parser.add_argument(
+      "--filter", default="", help="run only benchmarks whose names contain this"
+  )
+  arg_parser.add_argument("--output", help="write the results to this JSON file")
+  arg_parser.add_argument("--baseline", help="compare the results to this JSON file")
+  arg_parser.add_argument(
+      "--threshold",
+      type=float,
+      default=0.1,
+      help="the slowdown relative to the baseline above which a benchmark is a regression",
+  )
+  args = arg_parser.parse_args()
+
+  baseline = None
+  if args.baseline is not None:
+    with open(args.baseline, "rt", encoding="utf-8") as f:
+      baseline = json.load(f)
+
+  def print_result(result: BenchmarkResult) -> None:
+    print(
+        f"{result.name:52} {result.seconds * 1e3:10.2f} ms"
+        f" {result.characters_per_second / 1e6:8.2f} Mchar/s",
+        flush=True,
+    )
+
+  results = run_benchmarks(
+      size=args.size,
+      repeat=args.repeat,
+      number=args.number,
+      name_filter=args.filter,
+      on_result=print_result,
+  )
+
+  if args.output is not None:
+    with open(args.output, "wt", encoding="utf-8") as f:
+      json.dump(results_to_json(results, size=args.size), f, indent=2)
+      f.write("\n")
+
+  if baseline is not None:
+    regression_count = 0
+    print()
+    for comparison in compare(baseline, results, size=args.size):
+      is_regression = comparison.ratio > 1 + args.threshold
+      regression_count += is_regression
+      print(
+          f"{comparison.name:52} {comparison.ratio:6.2f}x"
+          f"{'  REGRESSION' if is_regression else ''}"
+      )
+    if regression_count > 0:
+      print(f"{regression_count} regression(s) above {args.threshold:.0%}")
+      sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,79 @@
+import io
+
+from absl.testing import absltest
+
+import parser as parser_module
+import parser_benchmark
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+BenchmarkResult = parser_benchmark.BenchmarkResult
+
+
+class ParserBenchmarkTest(absltest.TestCase):
+
+  def test_generate_input_is_reproducible(self):
+    for shape in parser_benchmark.INPUT_SHAPES:
+      with self.subTest(shape=shape):
+        self.assertEqual(
+            parser_benchmark.generate_input(shape, 1000),
+            parser_benchmark.generate_input(shape, 1000),
+        )
+        self.assertNotEqual(
+            parser_benchmark.generate_input(shape, 1000),
+            parser_benchmark.generate_input(shape, 1000, seed=1),
+        )
+
+  def test_generate_input_is_valid(self):
+    for shape in parser_benchmark.INPUT_SHAPES:
+      with self.subTest(shape=shape):
+        text = parser_benchmark.generate_input(shape, 100000)
+        parser = parser_module.Parser(
+            tokenizer_module.Tokenizer(source_reader_module.SourceReader(io.StringIO(text)))
+        )
+        parser.parse()
+
+        self.assertGreaterEqual(len(text), 10000)
+        self.assertNotEmpty(parser.functions)
+
+  def test_run_benchmarks(self):
+    results = parser_benchmark.run_benchmarks(size=200, repeat=1, number=1)
+
+    self.assertLen(results, len(parser_benchmark.BENCHMARKS) * len(parser_benchmark.INPUT_SHAPES))
+    self.assertIn("Parser.parse/comments", [result.name for result in results])
+
+  def test_run_benchmarks_with_filter(self):
+    results = parser_benchmark.run_benchmarks(
+        size=200, repeat=1, number=1, name_filter="Parser.parse/"
+    )
+
+    self.assertLen(results, len(parser_benchmark.INPUT_SHAPES))
+
+  def test_compare(self):
+    baseline = parser_benchmark.results_to_json(
+        [
+            BenchmarkResult(name="aaa", seconds=1.0, characters_per_second=100.0),
+            BenchmarkResult(name="bbb", seconds=2.0, characters_per_second=50.0),
+        ],
+        size=100,
+    )
+    results = [
+        BenchmarkResult(name="aaa", seconds=1.5, characters_per_second=66.0),
+        BenchmarkResult(name="ccc", seconds=1.0, characters_per_second=100.0),
+    ]
+
+    comparisons = parser_benchmark.compare(baseline, results, size=100)
+
+    self.assertLen(comparisons, 1)
+    self.assertEqual("aaa", comparisons[0].name)
+    self.assertAlmostEqual(1.5, comparisons[0].ratio)
+
+  def test_compare_rejects_different_size(self):
+    baseline = parser_benchmark.results_to_json([], size=100)
+
+    with self.assertRaises(ValueError):
+      parser_benchmark.compare(baseline, [], size=200)
+
+
+if __name__ == "__main__":
+  absltest.main()
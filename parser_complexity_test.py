@@ -0,0 +1,170 @@
+from collections.abc import Callable
+import io
+import math
+import timeit
+
+from absl.testing import absltest
+import parameterized
+
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+ReadMode = source_reader_module.ReadMode
+SourceReader = source_reader_module.SourceReader
+
+# Each input is processed at sizes of _BASE_SIZE, 2 * _BASE_SIZE, 4 * _BASE_SIZE, ... characters,
+# and the growth exponent k of the fastest time t ~ size^k is fitted to the results. Linear code
+# has k close to 1 and quadratic code close to 2; _MAX_GROWTH_EXPONENT leaves room for timing noise.
+_BASE_SIZE = 1 << 13
+_SIZE_COUNT = 4
+_REPEAT = 3
+_MAX_GROWTH_EXPONENT = 1.5
+
+_MAX_IDENTIFIER_LENGTH = tokenizer_module._MAX_IDENTIFIER_LENGTH
+
+
+def growth_exponent(sizes: list[int], seconds: list[float]) -> float:
+  # The least-squares slope of log(seconds) against log(size).
+  xs = [math.log(size) for size in sizes]
+  ys = [math.log(max(t, 1e-9)) for t in seconds]
+  mean_x = sum(xs) / len(xs)
+  mean_y = sum(ys) / len(ys)
+  return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum(
+      (x - mean_x) ** 2 for x in xs
+  )
+
+
+def parse(text: str) -> list[parser_module.JoyFunction]:
+  parser = parser_module.Parser(
+      tokenizer_module.Tokenizer(SourceReader(io.StringIO(text), buffer_size=1024))
+  )
+  parser.parse()
+  return parser.functions
+
+
+def peek(text: str) -> str:
+  return SourceReader(io.StringIO(text)).peek(len(text))
+
+
+def skip_comment(text: str) -> bool:
+  return SourceReader(io.StringIO(text)).read_until_exact_match("*/", mode=ReadMode.SKIP)
+
+
+def read_lexeme(text: str) -> str:
+  source_reader = SourceReader(io.StringIO(text))
+  source_reader.read(
+      "", mode=ReadMode.NORMAL, max_lexeme_length=None, invert_accepted_characters=True
+  )
+  return source_reader.lexeme()
+
+
+# Reads the text (given directly, so that it is all buffered) a word at a time, asking for the byte
+# position after each word as the parser does after each token.
+def read_byte_positions(text: str) -> int:
+  source_reader = SourceReader(text)
+  byte_position = 0
+  while not source_reader.eof():
+    source_reader.read(" ", mode=ReadMode.SKIP, max_lexeme_length=None)
+    source_reader.read(
+        " ", mode=ReadMode.NORMAL, max_lexeme_length=None, invert_accepted_characters=True
+    )
+    byte_position = source_reader.byte_position()
+  return byte_position
+
+
+# Adversarial inputs of about the given size, each of which drives one part of the source reader,
+# tokenizer, or parser for its whole length.
+def huge_multiline_comment(size: int) -> str:
+  return "/*" + "* / /*\n" * (size // 7) + "*/ function f"
+
+
+def huge_inline_comment(size: int) -> str:
+  return "//" + "/* */ " * (size // 6) + "\nfunction f"
+
+
+def long_whitespace_run(size: int) -> str:
+  return "function f" + " \t\r\n" * (size // 4) + "{}"
+
+
+def identifiers_at_length_limit(size: int) -> str:
+  count = size // (2 * _MAX_IDENTIFIER_LENGTH + 16)
+  return "".join(
+      f"function {_identifier(i)} {{ {_identifier(count + i)} }}\n" for i in range(count)
+  )
+
+
+def stacked_annotations(size: int) -> str:
+  return "@a " * (size // 3) + "function f"
+
+
+def long_string_literal(size: int) -> str:
+  return 'function f { "' + 'a\\"' * (size // 3) + '" }'
+
+
+def long_body(size: int) -> str:
+  return "function f { " + "1 dup [+] " * (size // 10) + "}"
+
+
+def _identifier(index: int) -> str:
+  suffix = str(index)
+  return "a" * (_MAX_IDENTIFIER_LENGTH - len(suffix)) + suffix
+
+
+class ParserComplexityTest(absltest.TestCase):
+
+  @parameterized.parameterized.expand([
+      ("huge_multiline_comment", huge_multiline_comment),
+      ("huge_inline_comment", huge_inline_comment),
+      ("long_whitespace_run", long_whitespace_run),
+      ("identifiers_at_length_limit", identifiers_at_length_limit),
+      ("stacked_annotations", stacked_annotations),
+      ("long_string_literal", long_string_literal),
+      ("long_body", long_body),
+  ])
+  def test_parse_is_linear(self, _, generate_input: Callable[[int], str]):
+    self.assertLinear(parse, generate_input)
+
+  # peek() and read_until_exact_match() are much faster per character than parsing, so they are
+  # given larger inputs.
+  @parameterized.parameterized.expand([
+      ("peek", peek, lambda size: "a" * (size * 16)),
+      ("read_until_exact_match", skip_comment, lambda size: "* /" * (size * 16 // 3) + "*/"),
+      ("read_long_lexeme", read_lexeme, lambda size: "a" * size),
+      ("byte_position", read_byte_positions, lambda size: "é " * (size // 2)),
+  ])
+  def test_source_reader_is_linear(
+      self, _, function: Callable[[str], object], generate_input: Callable[[int], str]
+  ):
+    self.assertLinear(function, generate_input)
+
+  def test_inputs_are_parsed(self):
+    self.assertEqual(["f"], [function.name for function in parse(huge_multiline_comment(100))])
+    self.assertEqual(["f"], [function.name for function in parse(huge_inline_comment(100))])
+    self.assertEqual(["f"], [function.name for function in parse(long_whitespace_run(100))])
+    self.assertEqual(
+        [_MAX_IDENTIFIER_LENGTH] * 3,
+        [len(function.name) for function in parse(identifiers_at_length_limit(2000))],
+    )
+    self.assertLen(parse(stacked_annotations(3000))[0].annotations, 1000)
+    self.assertLen(parse(long_string_literal(300))[0].body, 1)
+    self.assertLen(parse(long_body(100))[0].body, 30)
+
+  def assertLinear(self, function: Callable[[str], object], generate_input: Callable[[int], str]):
+    sizes = [_BASE_SIZE << i for i in range(_SIZE_COUNT)]
+    seconds = []
+    for size in sizes:
+      text = generate_input(size)
+      seconds.append(min(timeit.repeat(lambda: function(text), repeat=_REPEAT, number=1)))
+
+    exponent = growth_exponent(sizes, seconds)
+    self.assertLessEqual(
+        exponent,
+        _MAX_GROWTH_EXPONENT,
+        msg=f"time grows as size^{exponent:.2f}: "
+        + ", ".join(f"{size}: {t * 1e3:.1f} ms" for size, t in zip(sizes, seconds)),
+    )
+
+
+if __name__ == "__main__":
+  absltest.main()
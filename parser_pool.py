@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+import contextlib
+import dataclasses
+import threading
+import time
+from typing import TextIO
+
+import parse_instrumentation as parse_instrumentation_module
+import parse_limits as parse_limits_module
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+DEFAULT_MAX_IDLE = 16
+
+
+# A thread-safe pool of parser stacks (a Parser with its Tokenizer and SourceReader), all with the
+# same configuration, for parsing many small inputs without building a new stack for each. A
+# parser is handed out by acquire() and reset to its input, and is returned to the pool by
+# release(); up to max_idle returned parsers are kept for reuse. A parser must not be used after it
+# is released. The pool's instrumentation is shared by all of its parsers, so it must be
+# thread-safe. Each parse enforces the limits given for it, or else the pool's limits; since a
+# ParseLimits deadline is an absolute time, timeout_seconds gives each parse its own deadline that
+# many seconds after its parser is acquired.
+class ParserPool:
+
+  def __init__(
+      self,
+      max_idle: int = DEFAULT_MAX_IDLE,
+      buffer_size: int | None = None,
+      encoding: str = "utf-8",
+      instrumentation: parse_instrumentation_module.Instrumentation | None = None,
+      limits: parse_limits_module.ParseLimits | None = None,
+      timeout_seconds: float | None = None,
+  ) -> None:
+    if max_idle < 0:
+      raise ValueError(f"invalid max_idle: {max_idle}")
+    if buffer_size is not None and buffer_size <= 0:
+      raise ValueError(f"invalid buffer size: {buffer_size}")
+    if timeout_seconds is not None and timeout_seconds <= 0:
+      raise ValueError(f"invalid timeout: {timeout_seconds}")
+    self.max_idle = max_idle
+    self.buffer_size = buffer_size
+    self.encoding = encoding
+    self.instrumentation = instrumentation
+    self.limits = limits
+    self.timeout_seconds = timeout_seconds
+    self.created = 0
+    self._idle: list[parser_module.Parser] = []
+    self._lock = threading.Lock()
+
+  def acquire(
+      self, new_input: TextIO | str, limits: parse_limits_module.ParseLimits | None = None
+  ) -> parser_module.Parser:
+    limits = self._parse_limits(limits)
+    with self._lock:
+      parser = self._idle.pop() if len(self._idle) > 0 else None
+      if parser is None:
+        self.created += 1
+    if parser is None:
+      return parser_module.Parser(
+          tokenizer_module.Tokenizer(
+              source_reader_module.SourceReader(
+                  new_input,
+                  buffer_size=self.buffer_size,
+                  encoding=self.encoding,
+                  instrumentation=self.instrumentation,
+                  limits=limits,
+              )
+          )
+      )
+    # Set the limits before the reset, which checks them against an input given as text.
+    parser.limits = limits
+    parser.tokenizer.limits = limits
+    parser.tokenizer.source_reader.limits = limits
+    parser.reset(new_input)
+    return parser
+
+  def release(self, parser: parser_module.Parser) -> None:
+    # Drop the references to the last input and its results so that an idle parser holds no more
+    # than an empty stack.
+    parser.reset("")
+    with self._lock:
+      if len(self._idle) < self.max_idle:
+        self._idle.append(parser)
+
+  @contextlib.contextmanager
+  def parser(
+      self, new_input: TextIO | str, limits: parse_limits_module.ParseLimits | None = None
+  ) -> Iterator[parser_module.Parser]:
+    parser = self.acquire(new_input, limits)
+    try:
+      yield parser
+    finally:
+      self.release(parser)
+
+  # Parses new_input with a pooled parser, returning its functions.
+  def parse(
+      self, new_input: TextIO | str, limits: parse_limits_module.ParseLimits | None = None
+  ) -> list[parser_module.JoyFunction]:
+    parser = self.acquire(new_input, limits)
+    try:
+      parser.parse()
+      return parser.functions
+    finally:
+      self.release(parser)
+
+  # Returns the limits to enforce on a parse given the limits passed for it, if any.
+  def _parse_limits(
+      self, limits: parse_limits_module.ParseLimits | None
+  ) -> parse_limits_module.ParseLimits | None:
+    if limits is None:
+      limits = self.limits
+    if self.timeout_seconds is None:
+      return limits
+    deadline = time.monotonic() + self.timeout_seconds
+    if limits is None:
+      return parse_limits_module.ParseLimits(deadline=deadline)
+    if limits.deadline is not None and limits.deadline < deadline:
+      return limits
+    return dataclasses.replace(limits, deadline=deadline)
+
+  def idle_count(self) -> int:
+    with self._lock:
+      return len(self._idle)
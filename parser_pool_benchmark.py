@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+import concurrent.futures
+import io
+import timeit
+
+import parser as parser_module
+import parser_pool as parser_pool_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+
+# Tiny inputs of the kind a request handler parses, each a function or two.
+def generate_snippets(count: int) -> list[str]:
+  return [
+      f"@main function snippet{i} {{ {i} dup [1 +] i }}"
+      if i % 2 == 0
+      else f'function snippet{i} {{ "text" }} function helper{i}'
+      for i in range(count)
+  ]
+
+
+def _parse_with_new_stream(snippets: list[str]) -> None:
+  for snippet in snippets:
+    parser = parser_module.Parser(
+        tokenizer_module.Tokenizer(source_reader_module.SourceReader(io.StringIO(snippet)))
+    )
+    parser.parse()
+
+
+def _parse_with_new_stack(snippets: list[str]) -> None:
+  for snippet in snippets:
+    parser = parser_module.Parser(
+        tokenizer_module.Tokenizer(source_reader_module.SourceReader(snippet))
+    )
+    parser.parse()
+
+
+def _parse_with_reset(snippets: list[str]) -> None:
+  parser = parser_module.Parser(tokenizer_module.Tokenizer(source_reader_module.SourceReader("")))
+  for snippet in snippets:
+    parser.reset(snippet)
+    parser.parse()
+
+
+def _parse_with_pool(snippets: list[str]) -> None:
+  pool = parser_pool_module.ParserPool()
+  for snippet in snippets:
+    pool.parse(snippet)
+
+
+def _pool_benchmark(threads: int) -> Callable[[list[str]], None]:
+  def parse_with_pool_in_threads(snippets: list[str]) -> None:
+    pool = parser_pool_module.ParserPool()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+      for _ in executor.map(pool.parse, snippets, chunksize=256):
+        pass
+
+  return parse_with_pool_in_threads
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description=(
+          "Measures how many tiny inputs per second are parsed by new parser stacks and by reused"
+          " ones."
+      )
+  )
+  arg_parser.add_argument("--count", type=int, default=100000, help="the number of inputs")
+  arg_parser.add_argument("--repeat", type=int, default=3)
+  arg_parser.add_argument(
+      "--threads", type=int, default=4, help="the number of threads sharing one pool"
+  )
+  args = arg_parser.parse_args()
+
+  snippets = generate_snippets(args.count)
+  benchmarks: dict[str, Callable[[list[str]], None]] = {
+      "new stack, StringIO input": _parse_with_new_stream,
+      "new stack, str input": _parse_with_new_stack,
+      "Parser.reset": _parse_with_reset,
+      "ParserPool": _parse_with_pool,
+      f"ParserPool, {args.threads} threads": _pool_benchmark(args.threads),
+  }
+
+  print(f"{'':32} {'inputs/s':>12} {'us/input':>10}")
+  for name, benchmark in benchmarks.items():
+    seconds = min(timeit.repeat(lambda: benchmark(snippets), repeat=args.repeat, number=1))
+    print(f"{name:32} {args.count / seconds:12.0f} {seconds / args.count * 1e6:10.2f}")
+
+
+if __name__ == "__main__":
+  main()
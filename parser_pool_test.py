@@ -0,0 +1,141 @@
+import concurrent.futures
+import io
+import time
+from unittest import mock
+
+from absl.testing import absltest
+
+import parse_limits as parse_limits_module
+import parser as parser_module
+import parser_pool as parser_pool_module
+
+JoyFunction = parser_module.JoyFunction
+ParserPool = parser_pool_module.ParserPool
+
+
+class ParserPoolTest(absltest.TestCase):
+
+  def test_parse(self):
+    pool = ParserPool()
+
+    functions1 = pool.parse("@main function abc")
+    functions2 = pool.parse(io.StringIO("function def"))
+
+    self.assertEqual([JoyFunction(name="abc", annotations=("main",))], functions1)
+    self.assertEqual([JoyFunction(name="def", annotations=())], functions2)
+    self.assertEqual(1, pool.created)
+    self.assertEqual(1, pool.idle_count())
+
+  def test_parser_is_reused(self):
+    pool = ParserPool()
+    with pool.parser("function abc") as parser1:
+      parser1.parse()
+
+    with pool.parser("function def") as parser2:
+      parser2.parse()
+      self.assertIs(parser1, parser2)
+      self.assertEqual(["def"], [function.name for function in parser2.functions])
+
+  def test_concurrent_parsers_are_distinct(self):
+    pool = ParserPool()
+
+    with pool.parser("function abc") as parser1, pool.parser("function def") as parser2:
+      self.assertIsNot(parser1, parser2)
+
+    self.assertEqual(2, pool.created)
+    self.assertEqual(2, pool.idle_count())
+
+  def test_max_idle(self):
+    pool = ParserPool(max_idle=1)
+    parsers = [pool.acquire("") for _ in range(3)]
+
+    for parser in parsers:
+      pool.release(parser)
+
+    self.assertEqual(1, pool.idle_count())
+
+  def test_parser_is_released_after_error(self):
+    pool = ParserPool()
+
+    with self.assertRaises(parser_module.Parser.ParseError):
+      pool.parse("function abc {")
+    functions = pool.parse("function abc")
+
+    self.assertEqual([JoyFunction(name="abc", annotations=())], functions)
+    self.assertEqual(1, pool.created)
+
+  def test_configuration(self):
+    pool = ParserPool(
+        buffer_size=2, limits=parse_limits_module.ParseLimits(max_annotations_per_function=1)
+    )
+    pool.parse(io.StringIO("@a function abc"))
+
+    with self.assertRaises(parse_limits_module.TooManyAnnotationsError):
+      pool.parse("@a @b function abc")
+    with pool.parser("") as parser:
+      self.assertEqual(2, parser.tokenizer.source_reader.buffer_size)
+
+  def test_limits_per_parse(self):
+    pool = ParserPool(limits=parse_limits_module.ParseLimits(max_functions=2))
+
+    with self.assertRaises(parse_limits_module.TooManyFunctionsError):
+      pool.parse("function a function b", limits=parse_limits_module.ParseLimits(max_functions=1))
+    functions = pool.parse("function a function b")
+    with self.assertRaises(parse_limits_module.TooManyFunctionsError):
+      pool.parse("function a function b function c")
+
+    self.assertLen(functions, 2)
+    self.assertEqual(1, pool.created)
+
+  def test_timeout_gives_each_parse_its_own_deadline(self):
+    now = 1000.0
+    self.enter_context(mock.patch.object(time, "monotonic", side_effect=lambda: now))
+    pool = ParserPool(timeout_seconds=10)
+
+    functions1 = pool.parse("function a")
+    now += 60
+    functions2 = pool.parse("function b")
+    with pool.parser("function c") as parser:
+      now += 11
+      with self.assertRaises(parse_limits_module.DeadlineExceededError):
+        parser.parse()
+
+    self.assertEqual([JoyFunction(name="a", annotations=())], functions1)
+    self.assertEqual([JoyFunction(name="b", annotations=())], functions2)
+    self.assertEqual(1, pool.created)
+
+  def test_timeout_keeps_an_earlier_deadline(self):
+    now = 1000.0
+    self.enter_context(mock.patch.object(time, "monotonic", side_effect=lambda: now))
+    pool = ParserPool(timeout_seconds=10)
+
+    with pool.parser("function a", limits=parse_limits_module.ParseLimits(deadline=1005)) as parser:
+      now += 6
+      with self.assertRaises(parse_limits_module.DeadlineExceededError):
+        parser.parse()
+
+  def test_threads(self):
+    pool = ParserPool(max_idle=4)
+    texts = [f"function f{i} {{ {i} }}" for i in range(1000)]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+      results = list(executor.map(pool.parse, texts))
+
+    self.assertEqual(
+        [
+            [JoyFunction(name=f"f{i}", annotations=(), body=(parser_module.IntegerLiteral(i),))]
+            for i in range(1000)
+        ],
+        results,
+    )
+    self.assertLessEqual(pool.idle_count(), 4)
+
+  def test_invalid_arguments(self):
+    with self.assertRaises(ValueError):
+      ParserPool(max_idle=-1)
+    with self.assertRaises(ValueError):
+      ParserPool(buffer_size=0)
+
+
+if __name__ == "__main__":
+  absltest.main()
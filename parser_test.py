@@ -1,14 +1,24 @@
+import dataclasses
 import io
+import pickle
 
 from absl.testing import absltest
 
 import parser as parser_module
 import source_reader as source_reader_module
+import source_span as source_span_module
 import tokenizer as tokenizer_module
 
+BooleanLiteral = parser_module.BooleanLiteral
+IntegerLiteral = parser_module.IntegerLiteral
 JoyFunction = parser_module.JoyFunction
+JoyModule = parser_module.JoyModule
+Quotation = parser_module.Quotation
+StringLiteral = parser_module.StringLiteral
+Word = parser_module.Word
 Parser = parser_module.Parser
 SourceReader = source_reader_module.SourceReader
+SourceSpan = source_span_module.SourceSpan
 Tokenizer = tokenizer_module.Tokenizer
 
 
@@ -62,6 +72,281 @@ class ParserTest(absltest.TestCase):
         parser.functions,
     )
 
+  def test_parse_function_bodies(self):
+    parser = self.create_parser(
+        """
+          function empty {}
+          @main function square { dup * }
+          function literals {
+            0 123 -45 "a string" "" true false
+          }
+          function words { abc - + <= != rem }
+          function quotations { [] [1 [2 [dup]] 3] // a comment
+            /* another comment */ [x] }
+          function no_body
+          function tight{1}function tight2{[1]}
+        """
+    )
+
+    parser.parse()
+
+    self.assertEqual(
+        [
+            JoyFunction(name="empty", annotations=(), body=()),
+            JoyFunction(name="square", annotations=("main",), body=(Word("dup"), Word("*"))),
+            JoyFunction(
+                name="literals",
+                annotations=(),
+                body=(
+                    IntegerLiteral(0),
+                    IntegerLiteral(123),
+                    IntegerLiteral(-45),
+                    StringLiteral("a string"),
+                    StringLiteral(""),
+                    BooleanLiteral(True),
+                    BooleanLiteral(False),
+                ),
+            ),
+            JoyFunction(
+                name="words",
+                annotations=(),
+                body=(Word("abc"), Word("-"), Word("+"), Word("<="), Word("!="), Word("rem")),
+            ),
+            JoyFunction(
+                name="quotations",
+                annotations=(),
+                body=(
+                    Quotation(()),
+                    Quotation((
+                        IntegerLiteral(1),
+                        Quotation((IntegerLiteral(2), Quotation((Word("dup"),)))),
+                        IntegerLiteral(3),
+                    )),
+                    Quotation((Word("x"),)),
+                ),
+            ),
+            JoyFunction(name="no_body", annotations=()),
+            JoyFunction(name="tight", annotations=(), body=(IntegerLiteral(1),)),
+            JoyFunction(name="tight2", annotations=(), body=(Quotation((IntegerLiteral(1),)),)),
+        ],
+        parser.functions,
+    )
+
+  def test_bodies_are_compared(self):
+    self.assertNotEqual(
+        JoyFunction(name="abc", annotations=(), body=(IntegerLiteral(1),)),
+        JoyFunction(name="abc", annotations=(), body=(IntegerLiteral(2),)),
+    )
+    self.assertNotEqual(
+        JoyFunction(name="abc", annotations=(), body=(IntegerLiteral(1),)),
+        JoyFunction(name="abc", annotations=(), body=(BooleanLiteral(True),)),
+    )
+
+  def test_parse_raises_on_invalid_function_bodies(self):
+    for text in (
+        "function abc {",
+        "function abc { [1 2 }",
+        "function abc { 1 2",
+        "function abc { 1 ] }",
+        "function abc { 1 function def }",
+        "function abc { 1 # 2 }",
+        'function abc { "abc }',
+    ):
+      with self.subTest(text=text):
+        parser = self.create_parser(text)
+
+        with self.assertRaises((parser.ParseError, Tokenizer.ParseError)):
+          parser.parse()
+
+  def test_parse_accepts_quotations_nested_up_to_the_maximum_depth(self):
+    depth = parser_module.MAX_QUOTATION_DEPTH
+    parser = self.create_parser("function abc { " + "[" * depth + "1" + "]" * depth + " }")
+
+    parser.parse()
+
+    term = parser.functions[0].body[0]
+    for _ in range(depth - 1):
+      assert isinstance(term, Quotation)
+      (term,) = term.terms
+    self.assertEqual(Quotation((IntegerLiteral(1),)), term)
+
+  def test_parse_raises_on_quotations_nested_too_deeply(self):
+    for depth in (parser_module.MAX_QUOTATION_DEPTH + 1, 1000, 100_000):
+      with self.subTest(depth=depth):
+        parser = self.create_parser("function abc { " + "[" * depth + "]" * depth + " }")
+
+        with self.assertRaisesRegex(
+            Parser.ParseError, f"at position {15 + parser_module.MAX_QUOTATION_DEPTH}$"
+        ):
+          parser.parse()
+
+  def test_parse_records_body_spans(self):
+    parser = self.create_parser("function abc  { 1 /* \u00e9 */ }  function def")
+
+    parser.parse()
+
+    self.assertEqual(
+        [
+            SourceSpan(start=0, end=27, start_byte=0, end_byte=28),
+            SourceSpan(start=29, end=41, start_byte=30, end_byte=42),
+        ],
+        [function.span for function in parser.functions],
+    )
+    self.assertEqual(
+        [SourceSpan(start=14, end=27, start_byte=14, end_byte=28), None],
+        [function.body_span for function in parser.functions],
+    )
+
+  def test_parse_populates_module(self):
+    parser = self.create_parser(
+        """
+          @main @test function aaa
+          @test function bbb
+          function ccc
+        """
+    )
+
+    parser.parse()
+
+    self.assertEqual(parser.functions, list(parser.module))
+    self.assertEqual(JoyFunction(name="bbb", annotations=("test",)), parser.module["bbb"])
+    self.assertEqual(
+        (
+            JoyFunction(name="aaa", annotations=("main", "test")),
+            JoyFunction(name="bbb", annotations=("test",)),
+        ),
+        parser.module.functions_with_annotation("test"),
+    )
+
+  def test_parse_raises_on_duplicate_function_name(self):
+    parser = self.create_parser("function abc function def @main function abc")
+
+    with self.assertRaises(parser.DuplicateFunctionError) as assert_raises_context:
+      parser.parse()
+
+    self.assertEqual("abc", assert_raises_context.exception.function_name)
+    self.assertIn("abc", str(assert_raises_context.exception))
+
+  def test_parse_records_spans(self):
+    parser = self.create_parser("@main /* \u00e9 */ @test\nfunction  // \u00e9\n  abc function def")
+
+    parser.parse()
+
+    self.assertEqual(
+        [
+            SourceSpan(start=20, end=40, start_byte=21, end_byte=42),
+            SourceSpan(start=41, end=53, start_byte=43, end_byte=55),
+        ],
+        [function.span for function in parser.functions],
+    )
+    self.assertEqual(
+        (
+            SourceSpan(start=0, end=5, start_byte=0, end_byte=5),
+            SourceSpan(start=14, end=19, start_byte=15, end_byte=20),
+        ),
+        parser.functions[0].annotation_spans,
+    )
+    self.assertEqual((), parser.functions[1].annotation_spans)
+
+  def test_iter_functions(self):
+    text = "function abc { 1 } @main function def function ghi { [x] } @test function jkl"
+    expected_parser = self.create_parser(text)
+    expected_parser.parse()
+    parser = self.create_parser(text)
+
+    functions = []
+    for function in parser.iter_functions():
+      functions.append(function)
+      self.assertEqual([], parser.functions)
+
+    self.assertEqual(expected_parser.functions, functions)
+    self.assertEmpty(parser.module)
+
+  def test_iter_functions_does_not_detect_duplicate_function_names(self):
+    parser = self.create_parser("function abc { 1 } function abc")
+
+    self.assertEqual(
+        [
+            JoyFunction(name="abc", annotations=(), body=(IntegerLiteral(1),)),
+            JoyFunction(name="abc", annotations=()),
+        ],
+        list(parser.iter_functions()),
+    )
+
+  def test_iter_functions_stops_early(self):
+    parser = self.create_parser("function abc function def { 1 } function ghi {")
+
+    functions = parser.iter_functions()
+
+    self.assertEqual("abc", next(functions).name)
+    self.assertEqual("def", next(functions).name)
+    with self.assertRaises(parser.ParseError):
+      next(functions)
+
+  def test_iter_functions_closes_without_error(self):
+    parser = self.create_parser("function abc function def { 1 2")
+
+    for function in parser.iter_functions():
+      self.assertEqual("abc", function.name)
+      break
+
+  def test_reset(self):
+    parser = self.create_parser("function abc { 1 }")
+    parser.parse()
+    functions = parser.functions
+
+    parser.reset("@main function abc function def { [2] }")
+    parser.parse()
+
+    self.assertEqual(
+        [JoyFunction(name="abc", annotations=(), body=(IntegerLiteral(1),))], functions
+    )
+    self.assertEqual(
+        [
+            JoyFunction(name="abc", annotations=("main",)),
+            JoyFunction(name="def", annotations=(), body=(Quotation((IntegerLiteral(2),)),)),
+        ],
+        parser.functions,
+    )
+    self.assertEqual(["abc", "def"], [function.name for function in parser.module])
+    self.assertEqual(0, parser.functions[0].annotation_spans[0].start)
+
+  def test_reset_after_error(self):
+    parser = self.create_parser("function abc { 1")
+    with self.assertRaises(parser.ParseError):
+      parser.parse()
+
+    parser.reset(io.StringIO("function def"))
+    parser.parse()
+
+    self.assertEqual([JoyFunction(name="def", annotations=())], parser.functions)
+
+  def test_spans_are_not_compared(self):
+    span = SourceSpan(start=1, end=2, start_byte=3, end_byte=4)
+
+    self.assertEqual(
+        JoyFunction(name="abc", annotations=("main",)),
+        JoyFunction(name="abc", annotations=("main",), span=span, annotation_spans=(span,)),
+    )
+
+  def test_parse_text(self):
+    functions = parser_module.parse_text("@main function aaa { 1 [b] } function ccc")
+
+    self.assertEqual(
+        [
+            JoyFunction(
+                name="aaa", annotations=("main",), body=(IntegerLiteral(1), Quotation((Word("b"),)))
+            ),
+            JoyFunction(name="ccc", annotations=()),
+        ],
+        functions,
+    )
+    self.assertEqual(6, functions[0].span.start)
+
+  def test_parse_text_raises_parse_error(self):
+    with self.assertRaises(Parser.ParseError):
+      parser_module.parse_text("function aaa {")
+
   def create_tokenizer(self, text: str) -> Tokenizer:
     return Tokenizer(source_reader=SourceReader(io.StringIO(text)))
 
@@ -69,5 +354,153 @@ class ParserTest(absltest.TestCase):
     return Parser(self.create_tokenizer(text))
 
 
+class JoyModuleTest(absltest.TestCase):
+
+  def test_new_instance_is_empty(self):
+    module = JoyModule()
+
+    self.assertEqual(0, len(module))
+    self.assertEqual([], list(module))
+    self.assertEqual(frozenset(), module.annotations())
+
+  def test_get_and_getitem(self):
+    function = JoyFunction(name="abc", annotations=())
+    module = JoyModule([function])
+
+    self.assertIs(function, module.get("abc"))
+    self.assertIs(function, module["abc"])
+    self.assertIsNone(module.get("def"))
+    with self.assertRaises(KeyError):
+      module["def"]
+
+  def test_contains(self):
+    module = JoyModule([JoyFunction(name="abc", annotations=())])
+
+    self.assertIn("abc", module)
+    self.assertNotIn("def", module)
+
+  def test_iteration_preserves_insertion_order(self):
+    functions = [
+        JoyFunction(name="zzz", annotations=()),
+        JoyFunction(name="aaa", annotations=()),
+        JoyFunction(name="mmm", annotations=()),
+    ]
+
+    self.assertEqual(functions, list(JoyModule(functions)))
+
+  def test_functions_with_annotation(self):
+    aaa = JoyFunction(name="aaa", annotations=("main", "test"))
+    bbb = JoyFunction(name="bbb", annotations=("test",))
+    ccc = JoyFunction(name="ccc", annotations=())
+    module = JoyModule([aaa, bbb, ccc])
+
+    self.assertEqual((aaa,), module.functions_with_annotation("main"))
+    self.assertEqual((aaa, bbb), module.functions_with_annotation("test"))
+    self.assertEqual((), module.functions_with_annotation("zzz"))
+    self.assertEqual(frozenset({"main", "test"}), module.annotations())
+
+  def test_functions_with_annotation_reports_repeated_annotation_once(self):
+    function = JoyFunction(name="aaa", annotations=("main", "main"))
+    module = JoyModule([function])
+
+    self.assertEqual((function,), module.functions_with_annotation("main"))
+
+  def test_add_raises_on_duplicate_name(self):
+    module = JoyModule([JoyFunction(name="abc", annotations=())])
+
+    with self.assertRaises(JoyModule.DuplicateFunctionError) as assert_raises_context:
+      module.add(JoyFunction(name="abc", annotations=("main",)))
+
+    self.assertEqual("abc", assert_raises_context.exception.function_name)
+    self.assertEqual(JoyFunction(name="abc", annotations=()), module["abc"])
+    self.assertEqual((), module.functions_with_annotation("main"))
+
+  def test_merge(self):
+    aaa = JoyFunction(name="aaa", annotations=("main",))
+    bbb = JoyFunction(name="bbb", annotations=("main",))
+    module = JoyModule([aaa])
+
+    module.merge(JoyModule([bbb]))
+
+    self.assertEqual([aaa, bbb], list(module))
+    self.assertEqual((aaa, bbb), module.functions_with_annotation("main"))
+
+  def test_merge_raises_on_duplicate_names_without_modifying_module(self):
+    module = JoyModule([JoyFunction(name="aaa", annotations=())])
+    other = JoyModule(
+        [JoyFunction(name="bbb", annotations=()), JoyFunction(name="aaa", annotations=())]
+    )
+
+    with self.assertRaises(JoyModule.DuplicateFunctionError) as assert_raises_context:
+      module.merge(other)
+
+    self.assertEqual("aaa", assert_raises_context.exception.function_name)
+    self.assertEqual(["aaa"], [function.name for function in module])
+
+  def test_merged(self):
+    aaa = JoyFunction(name="aaa", annotations=())
+    bbb = JoyFunction(name="bbb", annotations=())
+    ccc = JoyFunction(name="ccc", annotations=())
+
+    module = JoyModule.merged([JoyModule([aaa]), JoyModule([bbb, ccc]), JoyModule()])
+
+    self.assertEqual([aaa, bbb, ccc], list(module))
+
+
+class JoyFunctionTest(absltest.TestCase):
+
+  def test_equality_and_hash(self):
+    function1 = JoyFunction(name="abc", annotations=("main", "test"))
+    function2 = JoyFunction(name="abc", annotations=("main", "test"))
+    function3 = JoyFunction(name="abc", annotations=("main",))
+
+    self.assertEqual(function1, function2)
+    self.assertEqual(hash(function1), hash(function2))
+    self.assertNotEqual(function1, function3)
+    self.assertEqual(1, len({function1, function2}))
+
+  def test_has_no_instance_dict(self):
+    function = JoyFunction(name="abc", annotations=())
+
+    self.assertFalse(hasattr(function, "__dict__"))
+
+  def test_is_immutable(self):
+    function = JoyFunction(name="abc", annotations=())
+
+    with self.assertRaises(dataclasses.FrozenInstanceError):
+      function.name = "def"
+
+  def test_equal_annotations_are_shared(self):
+    function1 = JoyFunction(name="abc", annotations=tuple(["main", "test"]))
+    function2 = JoyFunction(name="def", annotations=tuple(["main", "test"]))
+
+    self.assertIs(function1.annotations, function2.annotations)
+
+  def test_annotations_flyweights_are_bounded(self):
+    for i in range(parser_module._MAX_ANNOTATIONS_FLYWEIGHTS * 2):
+      JoyFunction(name="abc", annotations=(f"annotation{i}",))
+
+    self.assertLessEqual(
+        len(parser_module._annotations_flyweights), parser_module._MAX_ANNOTATIONS_FLYWEIGHTS
+    )
+    self.assertIs(
+        JoyFunction(name="abc", annotations=tuple(["main"])).annotations,
+        JoyFunction(name="def", annotations=tuple(["main"])).annotations,
+    )
+
+  def test_pickle_round_trip_shares_annotations(self):
+    span = SourceSpan(start=1, end=2, start_byte=3, end_byte=4)
+    function = JoyFunction(
+        name="abc", annotations=("main", "test"), body=(Word("dup"),), span=span, body_span=span
+    )
+
+    unpickled_function = pickle.loads(pickle.dumps(function))
+
+    self.assertEqual(function, unpickled_function)
+    self.assertEqual(function.span, unpickled_function.span)
+    self.assertEqual(function.body_span, unpickled_function.body_span)
+    self.assertIs(function.annotations, unpickled_function.annotations)
+
+
 if __name__ == "__main__":
   absltest.main()
@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import hashlib
+import os
+import sqlite3
+
+import function_hashes as function_hashes_module
+import parser as parser_module
+import source_reader as source_reader_module
+import source_span as source_span_module
+import tokenizer as tokenizer_module
+import watcher as watcher_module
+
+# A persistent index of the functions of a directory tree in a SQLite database, for answering
+# questions such as where a function is defined or which functions carry an annotation without
+# parsing anything. update() re-parses only the files whose stat signature changed since the last
+# update and whose contents did too (files that were merely touched are not re-parsed), so keeping
+# the index current costs a walk of the tree plus the parses of the changed files. Every query is
+# answered from an index.
+#
+# The database is a cache: one created with another SCHEMA_VERSION is rebuilt from scratch.
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE files (
+  id INTEGER PRIMARY KEY,
+  path TEXT NOT NULL UNIQUE,
+  mtime_ns INTEGER NOT NULL,
+  ctime_ns INTEGER NOT NULL,
+  size INTEGER NOT NULL,
+  inode INTEGER NOT NULL,
+  content_digest BLOB NOT NULL,
+  error TEXT
+);
+CREATE TABLE functions (
+  id INTEGER PRIMARY KEY,
+  file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+  position INTEGER NOT NULL,
+  name TEXT NOT NULL,
+  annotations TEXT NOT NULL,
+  digest BLOB NOT NULL,
+  span_start INTEGER NOT NULL,
+  span_end INTEGER NOT NULL,
+  span_start_byte INTEGER NOT NULL,
+  span_end_byte INTEGER NOT NULL
+);
+CREATE INDEX functions_by_name ON functions (name);
+CREATE INDEX functions_by_file ON functions (file_id, position);
+CREATE TABLE annotations (
+  name TEXT NOT NULL,
+  function_id INTEGER NOT NULL REFERENCES functions (id) ON DELETE CASCADE,
+  PRIMARY KEY (name, function_id)
+) WITHOUT ROWID;
+CREATE INDEX annotations_by_function ON annotations (function_id);
+"""
+
+_SELECT_FUNCTIONS = """
+SELECT files.path, functions.name, functions.annotations, functions.digest, functions.span_start,
+  functions.span_end, functions.span_start_byte, functions.span_end_byte
+FROM functions JOIN files ON files.id = functions.file_id
+"""
+_ORDER_FUNCTIONS = "ORDER BY files.path, functions.position"
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class IndexedFunction:
+  # The path of the file that defines the function.
+  path: str
+  name: str
+  annotations: tuple[str, ...]
+  # The content hash of the function; see function_hashes.hash_function().
+  digest: bytes
+  span: source_span_module.SourceSpan
+
+
+@dataclasses.dataclass(frozen=True)
+class IndexUpdate:
+  # The paths of the files that were added to, re-parsed into, or removed from the index.
+  added: tuple[str, ...] = ()
+  changed: tuple[str, ...] = ()
+  removed: tuple[str, ...] = ()
+
+
+class ProjectIndex:
+
+  def __init__(
+      self,
+      database_path: str | os.PathLike[str],
+      suffixes: tuple[str, ...] = (".joy",),
+      encoding: str = "utf-8",
+  ) -> None:
+    self.suffixes = suffixes
+    self.encoding = encoding
+    self._connection = sqlite3.connect(database_path)
+    try:
+      self._create_schema()
+      self._connection.execute("PRAGMA foreign_keys = ON")
+      # Let queries from other connections proceed during an update.
+      self._connection.execute("PRAGMA journal_mode = WAL")
+    except BaseException:
+      self._connection.close()
+      raise
+
+  # Brings the index up to date with the tree under root, in one transaction. Files indexed from
+  # elsewhere (i.e. by updates with other roots) are kept.
+  def update(self, root: str | os.PathLike[str]) -> IndexUpdate:
+    root = os.path.abspath(root)
+    prefix = os.path.join(root, "")
+    added: list[str] = []
+    changed: list[str] = []
+    with self._connection:
+      indexed_files = {
+          path: (file_id, watcher_module.FileSignature(mtime_ns, ctime_ns, size, inode), digest)
+          for file_id, path, mtime_ns, ctime_ns, size, inode, digest in self._connection.execute(
+              "SELECT id, path, mtime_ns, ctime_ns, size, inode, content_digest FROM files"
+          )
+          if path.startswith(prefix)
+      }
+
+      seen_paths: set[str] = set()
+      for path, signature in watcher_module.iter_source_files(root, self.suffixes):
+        indexed_file = indexed_files.get(path)
+        if indexed_file is not None and indexed_file[1] == signature:
+          seen_paths.add(path)
+          continue
+        try:
+          with open(path, "rb") as f:
+            data = f.read()
+        except FileNotFoundError:
+          # The file was deleted after it was scanned.
+          continue
+        except OSError as e:
+          # The file can't be read, for example because of its permissions. Record the error with a
+          # digest that matches no contents, so that the file is read again once its signature
+          # changes.
+          seen_paths.add(path)
+          self._store_file(path, signature, b"", [], str(e))
+          (added if indexed_file is None else changed).append(path)
+          continue
+        seen_paths.add(path)
+
+        digest = hashlib.blake2b(data, digest_size=function_hashes_module.DIGEST_SIZE).digest()
+        if indexed_file is not None and indexed_file[2] == digest:
+          self._update_signature(indexed_file[0], signature)
+          continue
+        self._index_file(path, signature, digest, data)
+        (added if indexed_file is None else changed).append(path)
+
+      removed = sorted(indexed_files.keys() - seen_paths)
+      self._connection.executemany(
+          "DELETE FROM files WHERE id = ?", [(indexed_files[path][0],) for path in removed]
+      )
+
+    return IndexUpdate(added=tuple(added), changed=tuple(changed), removed=tuple(removed))
+
+  def functions_named(self, name: str) -> list[IndexedFunction]:
+    return self._select_functions(
+        f"{_SELECT_FUNCTIONS} WHERE functions.name = ? {_ORDER_FUNCTIONS}", (name,)
+    )
+
+  def functions_with_annotation(self, annotation: str) -> list[IndexedFunction]:
+    return self._select_functions(
+        f"{_SELECT_FUNCTIONS} JOIN annotations ON annotations.function_id = functions.id"
+        f" WHERE annotations.name = ? {_ORDER_FUNCTIONS}",
+        (annotation,),
+    )
+
+  def functions_in_file(self, path: str | os.PathLike[str]) -> list[IndexedFunction]:
+    return self._select_functions(
+        f"{_SELECT_FUNCTIONS} WHERE files.path = ? {_ORDER_FUNCTIONS}",
+        (os.path.abspath(path),),
+    )
+
+  def annotations(self) -> frozenset[str]:
+    return frozenset(
+        name for (name,) in self._connection.execute("SELECT DISTINCT name FROM annotations")
+    )
+
+  # The indexed files that failed to parse, with their errors; such files contribute no functions.
+  def errors(self) -> dict[str, str]:
+    return dict(
+        self._connection.execute(
+            "SELECT path, error FROM files WHERE error IS NOT NULL ORDER BY path"
+        )
+    )
+
+  def file_count(self) -> int:
+    return self._connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+  def function_count(self) -> int:
+    return self._connection.execute("SELECT COUNT(*) FROM functions").fetchone()[0]
+
+  def close(self) -> None:
+    self._connection.close()
+
+  def __enter__(self) -> ProjectIndex:
+    return self
+
+  def __exit__(self, *args: object) -> None:
+    self.close()
+
+  def _create_schema(self) -> None:
+    (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+    if version == SCHEMA_VERSION:
+      return
+    tables = self._connection.execute(
+        "SELECT name FROM sqlite_schema WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    drop_tables = "".join(f'DROP TABLE "{table}";' for (table,) in tables)
+    self._connection.executescript(
+        f"BEGIN; {drop_tables} {_SCHEMA} PRAGMA user_version = {SCHEMA_VERSION}; COMMIT;"
+    )
+
+  def _update_signature(self, file_id: int, signature: watcher_module.FileSignature) -> None:
+    self._connection.execute(
+        "UPDATE files SET mtime_ns = ?, ctime_ns = ?, size = ?, inode = ? WHERE id = ?",
+        (signature.mtime_ns, signature.ctime_ns, signature.size, signature.inode, file_id),
+    )
+
+  def _index_file(
+      self, path: str, signature: watcher_module.FileSignature, digest: bytes, data: bytes
+  ) -> None:
+    functions: list[parser_module.JoyFunction] = []
+    error: str | None = None
+    try:
+      # Decoding the whole file does not translate newlines, so the byte offsets of the spans
+      # match the file on disk.
+      parser = parser_module.Parser(
+          tokenizer_module.Tokenizer(
+              source_reader_module.SourceReader(data.decode(self.encoding), encoding=self.encoding)
+          )
+      )
+      parser.parse()
+      functions = parser.functions
+    except (
+        tokenizer_module.Tokenizer.ParseError,
+        parser_module.Parser.ParseError,
+        UnicodeDecodeError,
+    ) as e:
+      # A file that fails to parse contributes no functions to the index until it is fixed.
+      error = str(e)
+    self._store_file(path, signature, digest, functions, error)
+
+  def _store_file(
+      self,
+      path: str,
+      signature: watcher_module.FileSignature,
+      digest: bytes,
+      functions: list[parser_module.JoyFunction],
+      error: str | None,
+  ) -> None:
+    (file_id,) = self._connection.execute(
+        """
+        INSERT INTO files (path, mtime_ns, ctime_ns, size, inode, content_digest, error)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (path) DO UPDATE SET
+          mtime_ns = excluded.mtime_ns, ctime_ns = excluded.ctime_ns, size = excluded.size,
+          inode = excluded.inode, content_digest = excluded.content_digest, error = excluded.error
+        RETURNING id
+        """,
+        (
+            path,
+            signature.mtime_ns,
+            signature.ctime_ns,
+            signature.size,
+            signature.inode,
+            digest,
+            error,
+        ),
+    ).fetchone()
+    self._connection.execute("DELETE FROM functions WHERE file_id = ?", (file_id,))
+
+    annotation_rows: list[tuple[str, int]] = []
+    for position, function in enumerate(functions):
+      span = (
+          function.span if function.span is not None else source_span_module.SourceSpan(0, 0, 0, 0)
+      )
+      cursor = self._connection.execute(
+          """
+          INSERT INTO functions (file_id, position, name, annotations, digest, span_start,
+            span_end, span_start_byte, span_end_byte)
+          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+          """,
+          (
+              file_id,
+              position,
+              function.name,
+              " ".join(function.annotations),
+              function_hashes_module.hash_function(function),
+              span.start,
+              span.end,
+              span.start_byte,
+              span.end_byte,
+          ),
+      )
+      # Index each distinct annotation once, as JoyModule does.
+      function_id = cursor.lastrowid
+      annotation_rows.extend(
+          (annotation, function_id) for annotation in dict.fromkeys(function.annotations)
+      )
+    self._connection.executemany(
+        "INSERT INTO annotations (name, function_id) VALUES (?, ?)", annotation_rows
+    )
+
+  def _select_functions(self, query: str, parameters: tuple[object, ...]) -> list[IndexedFunction]:
+    return [
+        IndexedFunction(
+            path=path,
+            name=name,
+            annotations=tuple(annotations.split()),
+            digest=digest,
+            span=source_span_module.SourceSpan(
+                start=start, end=end, start_byte=start_byte, end_byte=end_byte
+            ),
+        )
+        for path, name, annotations, digest, start, end, start_byte, end_byte in (
+            self._connection.execute(query, parameters)
+        )
+    ]
+
+
+def _print_functions(functions: list[IndexedFunction]) -> None:
+  for function in functions:
+    annotations = "".join(f"@{annotation} " for annotation in function.annotations)
+    print(f"{function.path}:{function.span.start}: {annotations}{function.name}")
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description="Maintains and queries a SQLite index of the functions in Joy source trees."
+  )
+  arg_parser.add_argument("database", help="the index database, which is created if necessary")
+  subparsers = arg_parser.add_subparsers(dest="command", required=True)
+  update_parser = subparsers.add_parser("update", help="index the changes to a source tree")
+  update_parser.add_argument("root")
+  name_parser = subparsers.add_parser("name", help="print where a function is defined")
+  name_parser.add_argument("name")
+  annotation_parser = subparsers.add_parser(
+      "annotation", help="print the functions with an annotation"
+  )
+  annotation_parser.add_argument("annotation")
+  args = arg_parser.parse_args()
+
+  with ProjectIndex(args.database) as index:
+    if args.command == "update":
+      update = index.update(args.root)
+      print(
+          f"{len(update.added)} added, {len(update.changed)} changed,"
+          f" {len(update.removed)} removed; {index.file_count()} files,"
+          f" {index.function_count()} functions"
+      )
+      for path, error in index.errors().items():
+        print(f"{path}: {error}")
+    elif args.command == "name":
+      _print_functions(index.functions_named(args.name))
+    else:
+      _print_functions(index.functions_with_annotation(args.annotation))
+
+
+if __name__ == "__main__":
+  main()
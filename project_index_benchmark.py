@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+import os
+import random
+import tempfile
+import time
+import timeit
+
+import corpus_generator as corpus_generator_module
+import declaration_scanner as declaration_scanner_module
+import project_index as project_index_module
+
+
+# Writes a tree of generated sources with the given number of functions in total, returning the
+# names and annotations of the functions.
+def write_tree(
+    root: str, function_count: int, functions_per_file: int
+) -> list[declaration_scanner_module.Declaration]:
+  declarations: list[declaration_scanner_module.Declaration] = []
+  for file_index, first_function in enumerate(range(0, function_count, functions_per_file)):
+    text = "".join(
+        corpus_generator_module.generate(
+            corpus_generator_module.CorpusOptions(
+                seed=file_index,
+                function_count=min(functions_per_file, function_count - first_function),
+                max_body_length=4,
+            )
+        )
+    )
+    path = os.path.join(root, f"{file_index // 100}", f"{file_index}.joy")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wt", encoding="utf-8", newline="") as f:
+      f.write(text)
+    declarations.extend(declaration_scanner_module.scan(text))
+  return declarations
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description="Measures building, updating, and querying a project index."
+  )
+  arg_parser.add_argument("--functions", type=int, default=200000)
+  arg_parser.add_argument("--functions-per-file", type=int, default=200)
+  arg_parser.add_argument("--queries", type=int, default=1000)
+  args = arg_parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as directory:
+    root = os.path.join(directory, "root")
+    declarations = write_tree(root, args.functions, args.functions_per_file)
+    annotations = sorted({a for declaration in declarations for a in declaration.annotations})
+
+    with project_index_module.ProjectIndex(os.path.join(directory, "index.db")) as index:
+
+      def measure_update(name: str) -> None:
+        start = time.perf_counter()
+        update = index.update(root)
+        seconds = time.perf_counter() - start
+        print(f"{name:32} {seconds:10.2f} s  ({len(update.added) + len(update.changed)} parsed)")
+
+      measure_update("initial update")
+      measure_update("update, nothing changed")
+      for path, _ in zip(sorted(os.listdir(os.path.join(root, "0"))), range(10)):
+        os.utime(os.path.join(root, "0", path))
+      measure_update("update, 10 files touched")
+      print(f"{index.function_count()} functions in {index.file_count()} files")
+
+      rng = random.Random(0)
+      queries: dict[str, Callable[[], object]] = {
+          "functions_named": lambda: index.functions_named(rng.choice(declarations).name),
+          "functions_with_annotation": lambda: index.functions_with_annotation(
+              rng.choice(annotations)
+          ),
+          "annotations": index.annotations,
+      }
+      for name, query in queries.items():
+        number = args.queries if name != "annotations" else 10
+        seconds = timeit.timeit(query, number=number)
+        print(f"{name:32} {seconds / number * 1e3:10.3f} ms")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,234 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+
+import function_hashes as function_hashes_module
+import parser as parser_module
+import project_index as project_index_module
+import source_span as source_span_module
+import watcher as watcher_module
+
+IndexedFunction = project_index_module.IndexedFunction
+IndexUpdate = project_index_module.IndexUpdate
+ProjectIndex = project_index_module.ProjectIndex
+
+
+class ProjectIndexTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+    self.root = os.path.join(directory, "root")
+    os.mkdir(self.root)
+    self.database_path = os.path.join(directory, "index.db")
+
+  def test_update_indexes_functions(self):
+    path = self.write_file("a.joy", "@main @test function aaa { 1 }\nfunction bbb")
+    index = self.open_index()
+
+    self.assertEqual(IndexUpdate(added=(path,)), index.update(self.root))
+    self.assertEqual(
+        [
+            IndexedFunction(
+                path=path,
+                name="aaa",
+                annotations=("main", "test"),
+                digest=function_hashes_module.hash_function(
+                    parser_module.JoyFunction(
+                        name="aaa",
+                        annotations=("main", "test"),
+                        body=(parser_module.IntegerLiteral(1),),
+                    )
+                ),
+                span=source_span_module.SourceSpan(start=12, end=30, start_byte=12, end_byte=30),
+            )
+        ],
+        index.functions_named("aaa"),
+    )
+    self.assertEqual(["aaa", "bbb"], self.names(index.functions_in_file(path)))
+    self.assertEqual(1, index.file_count())
+    self.assertEqual(2, index.function_count())
+
+  def test_spans_are_byte_offsets_into_the_file(self):
+    path = self.write_file("a.joy", '/* é */\r\nfunction aaa { "中" }')
+    index = self.open_index()
+    index.update(self.root)
+
+    (function,) = index.functions_named("aaa")
+    with source_span_module.SourceText(path) as source_text:
+      self.assertEqual('function aaa { "中" }', source_text.text(function.span))
+
+  def test_functions_with_annotation(self):
+    self.write_file("b.joy", "@main function bbb @main @main function ccc")
+    self.write_file(os.path.join("sub", "a.joy"), "@test function aaa @main function ddd")
+    index = self.open_index()
+    index.update(self.root)
+
+    self.assertEqual(["bbb", "ccc", "ddd"], self.names(index.functions_with_annotation("main")))
+    self.assertEqual(["aaa"], self.names(index.functions_with_annotation("test")))
+    self.assertEqual([], index.functions_with_annotation("missing"))
+    self.assertEqual(frozenset(("main", "test")), index.annotations())
+
+  def test_functions_named_in_several_files(self):
+    self.write_file("a.joy", "function aaa")
+    self.write_file("b.joy", "function aaa")
+    index = self.open_index()
+    index.update(self.root)
+
+    self.assertEqual(
+        [os.path.join(self.root, "a.joy"), os.path.join(self.root, "b.joy")],
+        [function.path for function in index.functions_named("aaa")],
+    )
+
+  def test_update_reparses_changed_files_only(self):
+    path = self.write_file("a.joy", "function aaa")
+    self.write_file("b.joy", "function bbb")
+    index = self.open_index()
+    index.update(self.root)
+
+    self.write_file("a.joy", "@main function aaa function zzz")
+    self.bump_mtime(path)
+
+    self.assertEqual(IndexUpdate(changed=(path,)), index.update(self.root))
+    self.assertEqual(["aaa", "zzz"], self.names(index.functions_in_file(path)))
+    self.assertEqual(["aaa"], self.names(index.functions_with_annotation("main")))
+    self.assertEqual(IndexUpdate(), index.update(self.root))
+
+  def test_update_skips_touched_files_with_unchanged_contents(self):
+    path = self.write_file("a.joy", "function aaa")
+    index = self.open_index()
+    index.update(self.root)
+
+    self.bump_mtime(path)
+
+    self.assertEqual(IndexUpdate(), index.update(self.root))
+    self.assertEqual(["aaa"], self.names(index.functions_in_file(path)))
+
+  def test_update_removes_deleted_files(self):
+    path = self.write_file(os.path.join("sub", "a.joy"), "@main function aaa")
+    index = self.open_index()
+    index.update(self.root)
+
+    os.remove(path)
+
+    self.assertEqual(IndexUpdate(removed=(path,)), index.update(self.root))
+    self.assertEqual([], index.functions_named("aaa"))
+    self.assertEqual(frozenset(), index.annotations())
+    self.assertEqual(0, index.function_count())
+
+  def test_update_keeps_files_outside_root(self):
+    other_root = os.path.join(self.root, "..", "other")
+    os.mkdir(other_root)
+    with open(os.path.join(other_root, "b.joy"), "wt", encoding="utf-8") as f:
+      f.write("function bbb")
+    self.write_file("a.joy", "function aaa")
+    index = self.open_index()
+    index.update(other_root)
+
+    index.update(self.root)
+
+    self.assertEqual(2, index.function_count())
+
+  def test_update_records_parse_errors(self):
+    path = self.write_file("a.joy", "function aaa @main")
+    index = self.open_index()
+
+    self.assertEqual(IndexUpdate(added=(path,)), index.update(self.root))
+    self.assertEqual([path], list(index.errors()))
+    self.assertEqual([], index.functions_named("aaa"))
+
+    self.write_file("a.joy", "function aaa")
+    self.bump_mtime(path)
+    index.update(self.root)
+
+    self.assertEqual({}, index.errors())
+    self.assertEqual(["aaa"], self.names(index.functions_named("aaa")))
+
+  def test_update_records_deeply_nested_file_as_error(self):
+    self.write_file("a.joy", "function aaa")
+    path = self.write_file("b.joy", "function bbb { " + "[" * 100_000 + "]" * 100_000 + " }")
+    self.write_file("c.joy", "function ccc")
+    index = self.open_index()
+
+    index.update(self.root)
+
+    self.assertEqual([path], list(index.errors()))
+    self.assertEqual(2, index.function_count())
+    self.assertEqual(IndexUpdate(), index.update(self.root))
+
+    self.write_file("b.joy", "function bbb { [[1]] }")
+    self.bump_mtime(path)
+
+    self.assertEqual(IndexUpdate(changed=(path,)), index.update(self.root))
+    self.assertEqual({}, index.errors())
+    self.assertEqual(3, index.function_count())
+
+  def test_update_records_unreadable_file_as_error(self):
+    self.write_file("a.joy", "function aaa")
+    path = os.path.join(self.root, "b.joy")
+    # A directory with a matching name cannot be read, but is not a source file either; make it
+    # look like one to the scan.
+    os.mkdir(path)
+    scan = [
+        (path, watcher_module.FileSignature.from_stat_result(os.stat(path))),
+        *watcher_module.iter_source_files(self.root, (".joy",)),
+    ]
+    index = self.open_index()
+
+    with mock.patch.object(watcher_module, "iter_source_files", lambda root, suffixes: scan):
+      self.assertEqual(
+          IndexUpdate(added=(path, os.path.join(self.root, "a.joy"))), index.update(self.root)
+      )
+
+    self.assertEqual([path], list(index.errors()))
+    self.assertEqual(1, index.function_count())
+
+  def test_index_persists(self):
+    path = self.write_file("a.joy", "@main function aaa")
+    with self.open_index() as index:
+      index.update(self.root)
+
+    with self.open_index() as index:
+      self.assertEqual(["aaa"], self.names(index.functions_with_annotation("main")))
+      self.assertEqual(IndexUpdate(), index.update(self.root))
+      os.remove(path)
+      self.assertEqual(IndexUpdate(removed=(path,)), index.update(self.root))
+
+  def test_index_of_other_schema_version_is_rebuilt(self):
+    path = self.write_file("a.joy", "function aaa")
+    with self.open_index() as index:
+      index.update(self.root)
+    connection = sqlite3.connect(self.database_path)
+    connection.execute("PRAGMA user_version = 0")
+    connection.close()
+
+    with self.open_index() as index:
+      self.assertEqual(0, index.file_count())
+      self.assertEqual(IndexUpdate(added=(path,)), index.update(self.root))
+
+  def open_index(self) -> ProjectIndex:
+    index = ProjectIndex(self.database_path)
+    self.addCleanup(index.close)
+    return index
+
+  def write_file(self, relative_path: str, text: str) -> str:
+    path = os.path.join(self.root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wt", encoding="utf-8", newline="") as f:
+      f.write(text)
+    return path
+
+  def bump_mtime(self, path: str) -> None:
+    # Make sure that a change is visible even on file systems with a coarse mtime.
+    stat_result = os.stat(path)
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+
+  def names(self, functions: list[IndexedFunction]) -> list[str]:
+    return [function.name for function in functions]
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,676 @@
+from __future__ import annotations
+
+import builtins
+import collections
+from collections.abc import Callable, Iterable
+import dataclasses
+import hashlib
+import marshal
+import os
+import sys
+import threading
+import types
+from typing import Any
+
+import function_annotations as function_annotations_module
+import joy_runtime as joy_runtime_module
+import parser as parser_module
+
+Quotation = joy_runtime_module.Quotation
+Value = joy_runtime_module.Value
+
+# Branching combinators whose quotations are known at compile time are expanded into Python if
+# statements. Python limits how deeply blocks can be nested, so expansion stops at this depth.
+_MAX_INLINE_NESTING = 16
+
+# The number of compiled modules kept in memory, keyed by the hash of their source.
+_CODE_CACHE_SIZE = 64
+
+_code_cache: collections.OrderedDict[str, types.CodeType] = collections.OrderedDict()
+_code_cache_lock = threading.Lock()
+
+
+# A set of functions compiled to Python source, with one Python function per Joy function and per
+# quotation that appears in the source. The source is compiled with compile() and cached by its
+# hash, in memory and optionally in cache_directory, so that loading an unchanged program again
+# does not compile it again.
+#
+# The generated code keeps the top of the Joy stack in Python local variables wherever the effect
+# of each word on the stack is known at compile time, so that e.g. "dup 1 - swap" touches the
+# stack list only where values must be read from or written back to it. Values are written back
+# before any word whose stack effect is unknown: calls to other functions, which are direct calls
+# to the corresponding Python functions, and combinators other than i, dip, branch, and ifte with
+# literal quotations, which are expanded in place.
+#
+# The functions' annotations are applied first (see function_annotations.apply()): calls to @inline
+# functions are compiled as their bodies, and calls to @pure and @memoize functions go through the
+# function's cache.
+class Program:
+
+  def __init__(
+      self,
+      functions: Iterable[parser_module.JoyFunction],
+      cache_directory: str | os.PathLike[str] | None = None,
+  ) -> None:
+    functions = tuple(functions)
+    self.function_indices: dict[str, int] = {}
+    for function in functions:
+      if function.name in self.function_indices:
+        raise self.LinkError(f"function defined more than once: {function.name}")
+      self.function_indices[function.name] = len(self.function_indices)
+
+    self.functions = functions
+    annotated_functions = function_annotations_module.apply(functions)
+    self.function_caches: dict[int, function_annotations_module.FunctionCache] = {
+        self.function_indices[name]: function_annotations_module.FunctionCache(name, stack_effect)
+        for name, stack_effect in annotated_functions.cached_stack_effects.items()
+    }
+    module_generator = _ModuleGenerator(self.function_indices)
+    for i, function in enumerate(annotated_functions.functions):
+      try:
+        module_generator.add_function(
+            f"f_{i}",
+            (joy_runtime_module.value_from_term(term) for term in function.body),
+            comment=f"function {function.name}",
+        )
+      except self.LinkError as e:
+        raise self.LinkError(f"in function {function.name}: {e}") from None
+    self.source = module_generator.source()
+    self.code = _compile_cached(self.source, cache_directory)
+
+    namespace = _namespace()
+    exec(self.code, namespace)
+    # Functions call each other through the module's globals, so replacing a function there routes
+    # every call to it through its cache.
+    for function_index, function_cache in self.function_caches.items():
+      namespace[f"f_{function_index}"] = _cached_function(
+          function_cache, namespace[f"f_{function_index}"]
+      )
+    self.compiled_functions: tuple[Callable[[joy_runtime_module.Machine], None], ...] = tuple(
+        namespace[f"f_{i}"] for i in range(len(functions))
+    )
+    for name in module_generator.quotation_names:
+      quotation = namespace[name]
+      function = namespace.get(f"{name}_code")
+      if function is not None:
+        quotation.compiled = _CompiledQuotation(program=self, function=function)
+
+  def function_for_quotation(
+      self, quotation: Quotation
+  ) -> Callable[[joy_runtime_module.Machine], None]:
+    # Quotations that appear in the source are compiled along with the program; quotations
+    # constructed at runtime (e.g. by cons) are linked on first execution, but not compiled, since
+    # compiling Python source costs far more than executing a typical quotation.
+    compiled = quotation.compiled
+    if type(compiled) is _CompiledQuotation and compiled.program is self:
+      return compiled.function
+    function = self._link_values(quotation.items)
+    quotation.compiled = _CompiledQuotation(program=self, function=function)
+    return function
+
+  def _link_values(self, values: Iterable[Value]) -> Callable[[joy_runtime_module.Machine], None]:
+    steps: list[tuple[Callable[[joy_runtime_module.Machine], None] | None, Value]] = []
+    for value in values:
+      if isinstance(value, parser_module.Word):
+        function_index = self.function_indices.get(value.name)
+        if function_index is not None:
+          steps.append((self.compiled_functions[function_index], value))
+          continue
+        builtin_index = joy_runtime_module.BUILTIN_INDICES.get(value.name)
+        if builtin_index is not None:
+          steps.append((joy_runtime_module.BUILTINS[builtin_index].function, value))
+          continue
+        raise self.LinkError(f"undefined word: {value.name}")
+      steps.append((None, value))
+
+    def run(machine: joy_runtime_module.Machine) -> None:
+      stack = machine.stack
+      for function, value in steps:
+        if function is None:
+          stack.append(value)
+        else:
+          function(machine)
+
+    return run
+
+  class LinkError(Exception):
+    pass
+
+
+class PythonMachine:
+
+  def __init__(self, program: Program, stack: Iterable[Value] = ()) -> None:
+    self.program = program
+    self.stack: list[Value] = list(stack)
+
+  def run(self, function_name: str) -> list[Value]:
+    function_index = self.program.function_indices.get(function_name)
+    if function_index is None:
+      raise joy_runtime_module.JoyRuntimeError(f"undefined function: {function_name}")
+    self.program.compiled_functions[function_index](self)
+    return self.stack
+
+  def execute(self, quotation: Quotation) -> None:
+    self.program.function_for_quotation(quotation)(self)
+
+
+def _cached_function(
+    function_cache: function_annotations_module.FunctionCache,
+    function: Callable[[joy_runtime_module.Machine], None],
+) -> Callable[[joy_runtime_module.Machine], None]:
+  def cached_function(machine: joy_runtime_module.Machine) -> None:
+    function_cache.call(machine, function)
+
+  return cached_function
+
+
+def _compile_cached(source: str, cache_directory: str | os.PathLike[str] | None) -> types.CodeType:
+  source_hash = hashlib.sha256(source.encode("utf-8")).hexdigest()
+  with _code_cache_lock:
+    code = _code_cache.get(source_hash)
+    if code is not None:
+      _code_cache.move_to_end(source_hash)
+      return code
+
+  path = None
+  if cache_directory is not None:
+    # Code objects are specific to the Python version that created them.
+    path = os.path.join(cache_directory, f"{source_hash}.{sys.implementation.cache_tag}.code")
+    try:
+      with open(path, "rb") as f:
+        code = marshal.load(f)
+    except (FileNotFoundError, EOFError, ValueError, TypeError):
+      code = None
+
+  if not isinstance(code, types.CodeType):
+    code = compile(source, f"<joy {source_hash[:12]}>", "exec")
+    if path is not None:
+      # Write to a temporary file first so that concurrent readers never see a partial file.
+      temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+      with open(temporary_path, "wb") as f:
+        marshal.dump(code, f)
+      os.replace(temporary_path, path)
+
+  with _code_cache_lock:
+    _code_cache[source_hash] = code
+    while len(_code_cache) > _CODE_CACHE_SIZE:
+      _code_cache.popitem(last=False)
+  return code
+
+
+def _namespace() -> dict[str, Any]:
+  namespace: dict[str, Any] = {
+      "__builtins__": builtins,
+      "_Quotation": Quotation,
+      "_Word": parser_module.Word,
+      "_values_equal": joy_runtime_module.values_equal,
+      "_truncating_divide": joy_runtime_module.truncating_divide,
+      "_underflow_error": _underflow_error,
+      "_type_error": _type_error,
+  }
+  for i, builtin in enumerate(joy_runtime_module.BUILTINS):
+    namespace[f"b_{i}"] = builtin.function
+  return namespace
+
+
+def _underflow_error(word: str, depth: int, found: int) -> joy_runtime_module.StackUnderflowError:
+  return joy_runtime_module.StackUnderflowError(
+      f"{word} requires {depth} values on the stack but found {found}"
+  )
+
+
+def _type_error(word: str, expected: str, value: Value) -> joy_runtime_module.JoyTypeError:
+  return joy_runtime_module.JoyTypeError(
+      f"{word} requires {expected} but got {joy_runtime_module.format_value(value)}"
+  )
+
+
+# Generates the source of a Python module: the constants (quotations and the words inside them)
+# followed by one function per Joy function and per quotation constant.
+class _ModuleGenerator:
+
+  def __init__(self, function_indices: dict[str, int]) -> None:
+    self.function_indices = function_indices
+    self.quotation_names: list[str] = []
+    self._constant_lines: list[str] = []
+    self._word_constant_names: dict[str, str] = {}
+    self._function_lines: list[str] = []
+    # Keyed by id(); the quotations are kept alive by _pending_quotations and _quotations.
+    self._quotation_names_by_id: dict[int, str] = {}
+    self._quotations: list[Quotation] = []
+    self._pending_quotations: list[tuple[str, Quotation]] = []
+
+  def add_function(self, name: str, values: Iterable[Value], comment: str) -> None:
+    self._function_lines.append(f"# {comment}")
+    self._function_lines.extend(_FunctionGenerator(self, name).generate(values))
+    self._generate_pending_quotations()
+
+  def source(self) -> str:
+    word_lines = [f"{name} = _Word({word!r})" for word, name in self._word_constant_names.items()]
+    return "\n".join(word_lines + self._constant_lines + self._function_lines) + "\n"
+
+  def quotation_constant(self, quotation: Quotation) -> str:
+    name = self._quotation_names_by_id.get(id(quotation))
+    if name is not None:
+      return name
+    # Nested quotations are constants of their own, defined before the quotations containing them.
+    items = ", ".join(self.item_expression(item) for item in quotation.items)
+    name = f"q_{len(self.quotation_names)}"
+    self.quotation_names.append(name)
+    self._quotation_names_by_id[id(quotation)] = name
+    self._quotations.append(quotation)
+    self._constant_lines.append(f"{name} = _Quotation(({items}{',' if items else ''}))")
+    self._pending_quotations.append((name, quotation))
+    return name
+
+  def item_expression(self, value: Value) -> str:
+    if isinstance(value, parser_module.Word):
+      return self._word_constant_names.setdefault(value.name, f"w_{len(self._word_constant_names)}")
+    elif isinstance(value, Quotation):
+      return self.quotation_constant(value)
+    return _literal(value)
+
+  def links(self, values: Iterable[Value]) -> bool:
+    return all(
+        not isinstance(value, parser_module.Word)
+        or value.name in self.function_indices
+        or value.name in joy_runtime_module.BUILTIN_INDICES
+        for value in values
+    )
+
+  def builtin_stack_effect(self, word: str) -> joy_runtime_module.StackEffect | None:
+    if word in self.function_indices:
+      return None
+    builtin_index = joy_runtime_module.BUILTIN_INDICES.get(word)
+    if builtin_index is None:
+      return None
+    return joy_runtime_module.BUILTINS[builtin_index].stack_effect
+
+  def _generate_pending_quotations(self) -> None:
+    while len(self._pending_quotations) > 0:
+      name, quotation = self._pending_quotations.pop()
+      # A quotation with undefined words may only ever be used as data, so leave it uncompiled;
+      # Program reports the undefined words if it is executed.
+      if not self.links(quotation.items):
+        continue
+      self._function_lines.append(f"# {quotation!r}")
+      self._function_lines.extend(
+          _FunctionGenerator(self, f"{name}_code").generate(quotation.items)
+      )
+
+
+# A value on the part of the Joy stack that the generated code keeps in local variables: a Python
+# expression that is either a local variable or a literal, the type of the value if it is known at
+# compile time, and, instead of an expression, the quotation itself if it is a quotation constant.
+@dataclasses.dataclass(frozen=True, slots=True)
+class _Entry:
+  expression: str
+  static_type: type | None
+  quotation: Quotation | None = None
+
+
+class _FunctionGenerator:
+
+  def __init__(self, module_generator: _ModuleGenerator, name: str) -> None:
+    self._module_generator = module_generator
+    self._lines = [f"def {name}(machine):", "  stack = machine.stack"]
+    self._indent = 1
+    # The values that belong on top of the Joy stack but have not been written to it yet.
+    self._entries: list[_Entry] = []
+    # The types of local variables whose type the generated code has already checked.
+    self._checked_types: dict[str, type] = {}
+    self._variable_count = 0
+    # Set while generating the condition of an ifte, whose effect on the stack must be discarded.
+    self._in_condition = False
+
+  def generate(self, values: Iterable[Value]) -> list[str]:
+    self._generate_values(values)
+    self._flush()
+    return self._lines
+
+  def _generate_values(self, values: Iterable[Value]) -> None:
+    for value in values:
+      if isinstance(value, parser_module.Word):
+        self._generate_word(value.name)
+      elif isinstance(value, Quotation):
+        # Quotation constants are defined only if they are written to the stack, not if they are
+        # expanded in place.
+        self._entries.append(_Entry("", Quotation, value))
+      else:
+        self._entries.append(_Entry(_literal(value), type(value)))
+
+  def _generate_word(self, word: str) -> None:
+    function_index = self._module_generator.function_indices.get(word)
+    if function_index is not None:
+      self._flush()
+      self._emit(f"f_{function_index}(machine)")
+      return
+
+    builtin_index = joy_runtime_module.BUILTIN_INDICES.get(word)
+    if builtin_index is None:
+      raise Program.LinkError(f"undefined word: {word}")
+    stack_effect = joy_runtime_module.BUILTINS[builtin_index].stack_effect
+    if stack_effect is not None:
+      self._generate_builtin(word, builtin_index, stack_effect)
+      return
+
+    combinator_generator = _COMBINATOR_GENERATORS.get(word)
+    if combinator_generator is not None and combinator_generator(self):
+      return
+    self._flush()
+    self._emit(f"b_{builtin_index}(machine)")
+
+  def _generate_builtin(
+      self, word: str, builtin_index: int, stack_effect: joy_runtime_module.StackEffect
+  ) -> None:
+    shuffle = _SHUFFLES.get(word)
+    if shuffle is not None:
+      entries = self._take(stack_effect.inputs, word)
+      self._entries.extend(entries[i] for i in shuffle)
+      return
+
+    operation = _OPERATIONS.get(word)
+    if operation is not None:
+      # Take and check the operands one at a time from the top of the stack down, as the built-in
+      # pops them, so that an operand of the wrong type is reported before a missing one.
+      operands = []
+      for _ in range(stack_effect.inputs):
+        (entry,) = self._take(1, operation.word)
+        operands.append(self._checked_expression(entry, operation.operand_type, operation.word))
+      operands.reverse()
+      self._assign(operation.template.format(*operands), operation.result_type)
+      return
+
+    if word in ("=", "!="):
+      self._generate_equality(word)
+      return
+
+    # Any other built-in with a known stack effect only touches the values it is given, so pass
+    # them through the stack and keep the rest of the entries in local variables. The built-in
+    # checks the depth of the stack itself, as it pops and checks each of its operands.
+    entries = self._take_available(stack_effect.inputs)
+    self._write(entries)
+    self._emit(f"b_{builtin_index}(machine)")
+    variables = [self._new_variable() for _ in range(stack_effect.outputs)]
+    for variable in reversed(variables):
+      self._emit(f"{variable} = stack.pop()")
+    self._entries.extend(_Entry(variable, None) for variable in variables)
+
+  def _generate_equality(self, word: str) -> None:
+    x, y = self._take(2, word)
+    x_expression = self._expression(x)
+    y_expression = self._expression(y)
+    x_type = self._static_type(x)
+    y_type = self._static_type(y)
+    if x_type is not None and x_type is y_type and x_type is not Quotation:
+      expression = f"{x_expression} == {y_expression}"
+    elif y_type in (int, str, bool):
+      expression = f"type({x_expression}) is {y_type.__name__} and {x_expression} == {y_expression}"
+    elif x_type in (int, str, bool):
+      expression = f"type({y_expression}) is {x_type.__name__} and {x_expression} == {y_expression}"
+    else:
+      expression = f"_values_equal({x_expression}, {y_expression})"
+    if word == "!=":
+      expression = f"not ({expression})"
+    self._assign(expression, bool)
+
+  def _generate_i(self) -> bool:
+    quotation = self._known_quotation(1)
+    if quotation is None:
+      return False
+    self._take(1, "i")
+    self._generate_values(quotation.items)
+    return True
+
+  def _generate_dip(self) -> bool:
+    quotation = self._known_quotation(1)
+    if quotation is None:
+      return False
+    self._take(1, "dip")
+    (entry,) = self._take(1, "dip")
+    self._generate_values(quotation.items)
+    self._entries.append(entry)
+    return True
+
+  def _generate_branch(self) -> bool:
+    if self._indent > _MAX_INLINE_NESTING:
+      return False
+    else_quotation = self._known_quotation(1)
+    then_quotation = self._known_quotation(2)
+    if else_quotation is None or then_quotation is None:
+      return False
+    self._take(2, "branch")
+    (condition,) = self._take(1, "branch")
+    self._generate_conditional(
+        self._checked_expression(condition, bool, "branch"), then_quotation, else_quotation
+    )
+    return True
+
+  def _generate_ifte(self) -> bool:
+    if self._indent > _MAX_INLINE_NESTING:
+      return False
+    else_quotation = self._known_quotation(1)
+    then_quotation = self._known_quotation(2)
+    if_quotation = self._known_quotation(3)
+    if else_quotation is None or then_quotation is None or if_quotation is None:
+      return False
+    depth = self._condition_depth(if_quotation)
+    if depth is None:
+      return False
+    self._take(3, "ifte")
+
+    # The condition runs on a copy of the stack. Load every value it reads into local variables up
+    # front, so that it never pops the stack itself, and then restore the entries it consumed. If
+    # the stack holds fewer values, the condition is bound to fail: run it on the stack instead, so
+    # that it raises the error of the word that fails, or else it leaves no result to test.
+    underflow_lines = [
+        f"machine.execute({self._module_generator.quotation_constant(if_quotation)})",
+        "raise _underflow_error('ifte', 1, len(stack))",
+    ]
+    if len(self._entries) > 0:
+      entries = ", ".join(self._expression(entry) for entry in self._entries)
+      underflow_lines.insert(0, f"stack.extend(({entries},))")
+    self._load(depth, "ifte", underflow_lines)
+    saved_entries = list(self._entries)
+    self._in_condition = True
+    self._generate_values(if_quotation.items)
+    self._in_condition = False
+    (condition,) = self._take(1, "ifte")
+    self._entries = saved_entries
+
+    self._generate_conditional(
+        self._checked_expression(condition, bool, "ifte"), then_quotation, else_quotation
+    )
+    return True
+
+  def _condition_depth(self, quotation: Quotation) -> int | None:
+    # The number of values the condition reads from below its own values, including the one it
+    # leaves as its result, or None if it contains words whose stack effect is unknown.
+    depth = 0
+    lowest_depth = 0
+    for item in quotation.items:
+      if isinstance(item, parser_module.Word):
+        stack_effect = self._module_generator.builtin_stack_effect(item.name)
+        if stack_effect is None:
+          return None
+        depth -= stack_effect.inputs
+        lowest_depth = min(lowest_depth, depth)
+        depth += stack_effect.outputs
+      else:
+        depth += 1
+    return -min(lowest_depth, depth - 1)
+
+  def _generate_conditional(
+      self, condition: str, then_quotation: Quotation, else_quotation: Quotation
+  ) -> None:
+    saved_entries = self._entries
+    saved_checked_types = self._checked_types
+    for header, quotation in ((f"if {condition}:", then_quotation), ("else:", else_quotation)):
+      self._emit(header)
+      self._indent += 1
+      line_count = len(self._lines)
+      self._entries = list(saved_entries)
+      self._checked_types = dict(saved_checked_types)
+      self._generate_values(quotation.items)
+      # Both branches write their values to the stack, so that they agree on its layout after.
+      self._flush()
+      if len(self._lines) == line_count:
+        self._emit("pass")
+      self._indent -= 1
+    self._entries = []
+    self._checked_types = saved_checked_types
+
+  def _known_quotation(self, depth: int) -> Quotation | None:
+    # The quotation constant at the given depth below the top of the stack, if it is known at
+    # compile time and all of its words are defined.
+    if len(self._entries) < depth:
+      return None
+    quotation = self._entries[-depth].quotation
+    if quotation is None or not self._module_generator.links(quotation.items):
+      return None
+    return quotation
+
+  def _load(self, count: int, word: str, underflow_lines: list[str] | None = None) -> None:
+    # Ensures that the top count values of the stack are held in local variables. If the stack
+    # holds fewer, the generated code raises a stack underflow error for word, or else runs
+    # underflow_lines, which must raise.
+    missing = count - len(self._entries)
+    if missing <= 0:
+      return
+    if self._in_condition:
+      raise AssertionError(f"condition pops the stack at {word}")
+    if underflow_lines is None:
+      underflow_lines = [
+          f"raise _underflow_error({word!r}, {count}, len(stack) + {len(self._entries)})"
+      ]
+    self._emit(f"if len(stack) < {missing}:")
+    for line in underflow_lines:
+      self._emit(f"  {line}")
+    for _ in range(missing):
+      variable = self._new_variable()
+      self._emit(f"{variable} = stack.pop()")
+      self._entries.insert(0, _Entry(variable, None))
+
+  def _take(self, count: int, word: str) -> list[_Entry]:
+    self._load(count, word)
+    return self._take_available(count)
+
+  def _take_available(self, count: int) -> list[_Entry]:
+    # Like _take, but takes only the entries there are rather than popping any from the stack.
+    if count == 0:
+      return []
+    entries = self._entries[-count:]
+    del self._entries[-count:]
+    return entries
+
+  def _flush(self) -> None:
+    self._write(self._entries)
+    self._entries = []
+
+  def _write(self, entries: list[_Entry]) -> None:
+    if len(entries) == 1:
+      self._emit(f"stack.append({self._expression(entries[0])})")
+    elif len(entries) > 1:
+      self._emit(f"stack.extend(({', '.join(self._expression(entry) for entry in entries)}))")
+
+  def _assign(self, expression: str, static_type: type | None) -> None:
+    variable = self._new_variable()
+    self._emit(f"{variable} = {expression}")
+    self._entries.append(_Entry(variable, static_type))
+
+  def _static_type(self, entry: _Entry) -> type | None:
+    if entry.static_type is not None:
+      return entry.static_type
+    return self._checked_types.get(entry.expression)
+
+  def _expression(self, entry: _Entry) -> str:
+    if entry.quotation is not None:
+      return self._module_generator.quotation_constant(entry.quotation)
+    return entry.expression
+
+  def _checked_expression(self, entry: _Entry, required_type: type, word: str) -> str:
+    expression = self._expression(entry)
+    if self._static_type(entry) is not required_type:
+      description = "an integer" if required_type is int else "a boolean"
+      self._emit(
+          f"if type({expression}) is not {required_type.__name__}: "
+          f"raise _type_error({word!r}, {description!r}, {expression})"
+      )
+      if entry.static_type is None:
+        self._checked_types[expression] = required_type
+    return expression
+
+  def _new_variable(self) -> str:
+    self._variable_count += 1
+    return f"v{self._variable_count}"
+
+  def _emit(self, line: str) -> None:
+    self._lines.append("  " * self._indent + line)
+
+
+def _literal(value: Value) -> str:
+  # Parenthesize negative numbers so that they can be substituted into any expression.
+  if type(value) is int and value < 0:
+    return f"({value!r})"
+  return repr(value)
+
+
+# The stack manipulation built-ins, as the positions of their inputs in their outputs.
+_SHUFFLES: dict[str, tuple[int, ...]] = {
+    "id": (),
+    "dup": (0, 0),
+    "pop": (),
+    "swap": (1, 0),
+    "over": (0, 1, 0),
+    "rot": (1, 2, 0),
+    "dupd": (0, 0, 1),
+    "popd": (1,),
+    "swapd": (1, 0, 2),
+}
+
+
+# A built-in that computes a single value from operands of a single type, as a Python expression.
+@dataclasses.dataclass(frozen=True)
+class _Operation:
+  template: str
+  operand_type: type
+  result_type: type
+  # The word to report in type errors.
+  word: str
+
+
+_OPERATIONS: dict[str, _Operation] = {
+    "+": _Operation("{0} + {1}", int, int, "+"),
+    "-": _Operation("{0} - {1}", int, int, "-"),
+    "*": _Operation("{0} * {1}", int, int, "*"),
+    "/": _Operation("_truncating_divide({0}, {1}, '/')", int, int, "/"),
+    "rem": _Operation("{0} - {1} * _truncating_divide({0}, {1}, 'rem')", int, int, "rem"),
+    "%": _Operation("{0} - {1} * _truncating_divide({0}, {1}, 'rem')", int, int, "rem"),
+    "neg": _Operation("-{0}", int, int, "neg"),
+    "abs": _Operation("abs({0})", int, int, "abs"),
+    "succ": _Operation("{0} + 1", int, int, "succ"),
+    "pred": _Operation("{0} - 1", int, int, "pred"),
+    "max": _Operation("max({0}, {1})", int, int, "max"),
+    "min": _Operation("min({0}, {1})", int, int, "min"),
+    "<": _Operation("{0} < {1}", int, bool, "<"),
+    ">": _Operation("{0} > {1}", int, bool, ">"),
+    "<=": _Operation("{0} <= {1}", int, bool, "<="),
+    ">=": _Operation("{0} >= {1}", int, bool, ">="),
+    "and": _Operation("{0} and {1}", bool, bool, "and"),
+    "or": _Operation("{0} or {1}", bool, bool, "or"),
+    "not": _Operation("not {0}", bool, bool, "not"),
+}
+
+_COMBINATOR_GENERATORS: dict[str, Callable[[_FunctionGenerator], bool]] = {
+    "i": _FunctionGenerator._generate_i,
+    "dip": _FunctionGenerator._generate_dip,
+    "branch": _FunctionGenerator._generate_branch,
+    "ifte": _FunctionGenerator._generate_ifte,
+}
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class _CompiledQuotation:
+  # The Program that compiled the quotation, compared by identity only.
+  program: object
+  function: Callable[[joy_runtime_module.Machine], None]
@@ -0,0 +1,232 @@
+import os
+import tempfile
+
+from absl.testing import absltest
+import parameterized
+
+import bytecode as bytecode_module
+import bytecode_benchmark
+import joy_runtime as joy_runtime_module
+import parser as parser_module
+import python_backend as python_backend_module
+
+Program = python_backend_module.Program
+PythonMachine = python_backend_module.PythonMachine
+Quotation = joy_runtime_module.Quotation
+Value = joy_runtime_module.Value
+
+
+class ProgramTest(absltest.TestCase):
+
+  def test_compile_keeps_stack_in_local_variables(self):
+    program = Program(parser_module.parse_text("function aaa { 1 2 + dup * swap - }"))
+
+    # Only the value the function reads and the value it leaves touch the stack.
+    self.assertEqual(1, program.source.count("stack.pop()"))
+    self.assertEqual(1, program.source.count("stack.append("))
+    self.assertNotIn("b_", program.source)
+    self.assertEqual([8], PythonMachine(program, [1]).run("aaa"))
+
+  def test_compile_calls_functions_directly(self):
+    program = Program(parser_module.parse_text("function aaa { bbb } function bbb { 1 }"))
+
+    self.assertIn("f_1(machine)", program.source)
+
+  def test_compile_expands_conditionals(self):
+    program = Program(parser_module.parse_text("function aaa { [0 =] [pop 1] [2] ifte }"))
+
+    self.assertIn("if ", program.source)
+    self.assertNotIn("b_", program.source)
+    self.assertEqual([1], PythonMachine(program, [0]).run("aaa"))
+    self.assertEqual([5, 2], PythonMachine(program, [5]).run("aaa"))
+
+  def test_compile_inlines_inline_functions(self):
+    program = Program(
+        parser_module.parse_text("@inline function square { dup * } function aaa { square square }")
+    )
+
+    self.assertEqual(1, program.source.count("f_1"))
+    self.assertEqual([16], PythonMachine(program, [2]).run("aaa"))
+
+  def test_compile_precompiles_quotations(self):
+    program = Program(parser_module.parse_text("function aaa { [1 [dup]] }"))
+
+    quotation = PythonMachine(program).run("aaa")[0]
+    assert isinstance(quotation, Quotation)
+    inner_quotation = quotation.items[1]
+    assert isinstance(inner_quotation, Quotation)
+    self.assertIsNotNone(quotation.compiled)
+    self.assertIsNotNone(inner_quotation.compiled)
+
+  def test_compile_caches_code_by_source(self):
+    program1 = Program(parser_module.parse_text("function aaa { 1 2 + }"))
+    program2 = Program(parser_module.parse_text("function aaa { 1 2 + }"))
+
+    self.assertIs(program1.code, program2.code)
+
+  def test_compile_caches_code_in_directory(self):
+    cache_directory = self.enter_context(tempfile.TemporaryDirectory())
+    functions = parser_module.parse_text("function aaa { 40 2 + }")
+
+    Program(functions, cache_directory=cache_directory)
+    self.assertLen(os.listdir(cache_directory), 1)
+    python_backend_module._code_cache.clear()
+    program = Program(functions, cache_directory=cache_directory)
+
+    self.assertLen(os.listdir(cache_directory), 1)
+    self.assertEqual([42], PythonMachine(program).run("aaa"))
+
+  def test_function_shadows_builtin(self):
+    program = Program(parser_module.parse_text("function dup { 42 } function aaa { dup }"))
+
+    self.assertEqual([42], PythonMachine(program).run("aaa"))
+
+  def test_compile_raises_on_undefined_word(self):
+    with self.assertRaises(Program.LinkError) as assert_raises_context:
+      Program(parser_module.parse_text("function aaa { 1 bbb }"))
+
+    self.assertIn("aaa", str(assert_raises_context.exception))
+    self.assertIn("bbb", str(assert_raises_context.exception))
+
+  def test_compile_raises_on_duplicate_function(self):
+    functions = [
+        parser_module.JoyFunction(name="aaa", annotations=()),
+        parser_module.JoyFunction(name="aaa", annotations=()),
+    ]
+
+    with self.assertRaises(Program.LinkError):
+      Program(functions)
+
+  def test_compile_allows_undefined_words_in_quotations(self):
+    program = Program(parser_module.parse_text("function aaa { [bbb ccc] size }"))
+
+    self.assertEqual([2], PythonMachine(program).run("aaa"))
+
+
+class PythonMachineTest(absltest.TestCase):
+
+  def test_run(self):
+    program = Program(
+        parser_module.parse_text("function square { dup * } function main { 3 square square }")
+    )
+
+    self.assertEqual([81], PythonMachine(program).run("main"))
+
+  def test_run_function_without_body(self):
+    program = Program(parser_module.parse_text("function nothing"))
+
+    self.assertEqual([1], PythonMachine(program, [1]).run("nothing"))
+
+  def test_run_undefined_function_raises(self):
+    program = Program(parser_module.parse_text("function aaa"))
+
+    with self.assertRaises(joy_runtime_module.JoyRuntimeError):
+      PythonMachine(program).run("bbb")
+
+  def test_execute_runtime_constructed_quotation(self):
+    program = Program(
+        parser_module.parse_text(
+            "function double { 2 * } function main { 5 [double] [1 +] concat i }"
+        )
+    )
+
+    self.assertEqual([11], PythonMachine(program).run("main"))
+
+  def test_execute_runtime_quotation_with_undefined_word_raises(self):
+    program = Program(parser_module.parse_text("function main { [1 undefined] i }"))
+
+    with self.assertRaises(Program.LinkError):
+      PythonMachine(program).run("main")
+
+  @parameterized.parameterized.expand([
+      ("underflow", "1 +", [], joy_runtime_module.StackUnderflowError),
+      ("underflow_in_condition", "[=] [] [] ifte", [1], joy_runtime_module.StackUnderflowError),
+      ("type_error", '"a" 1 +', [], joy_runtime_module.JoyTypeError),
+      ("type_error_from_stack", "1 +", ["a"], joy_runtime_module.JoyTypeError),
+      ("non_boolean_condition", "[1] [] [] ifte", [], joy_runtime_module.JoyTypeError),
+      ("division_by_zero", "0 /", [1], joy_runtime_module.JoyRuntimeError),
+  ])
+  def test_run_raises(self, _, body: str, stack: list[Value], error_type: type[Exception]):
+    program = Program(parser_module.parse_text(f"function main {{ {body} }}"))
+
+    with self.assertRaises(error_type):
+      PythonMachine(program, stack).run("main")
+
+  @parameterized.parameterized.expand([
+      ("shuffles", "1 2 3 rot swapd over dupd popd pop", []),
+      ("arithmetic", "7 -2 / 7 -2 rem 7 neg abs succ pred 3 max 9 min", []),
+      ("equality", '1 true = 1 1 = "a" "a" != [1] [1] = 1 swap =', [1]),
+      ("equality_from_stack", "= 1 =", [True, 1]),
+      ("logic", "true false or true and not", []),
+      ("aggregates", "[1 2] uncons cons reverse [3] concat size", []),
+      ("condition_reads_stack", "[over 0 >] [+] [-] ifte", [5, 3]),
+      ("nested_conditionals", "[0 <] [neg] [[5 >] [pred] [succ] ifte] ifte", [7]),
+      ("branch", "dup 2 rem 0 = [2 /] [3 * 1 +] branch", [7]),
+      ("dip", "[10 *] dip +", [1, 2]),
+      ("i_of_computed_quotation", "[1] [2 +] concat i", []),
+      ("combinators", "[1 2 3] [dup *] map 0 [+] fold 3 [1 +] times", []),
+  ])
+  def test_run_matches_bytecode(self, _, body: str, stack: list[Value]):
+    functions = parser_module.parse_text(f"function main {{ {body} }}")
+
+    expected = bytecode_module.VirtualMachine(bytecode_module.Program(functions), stack).run("main")
+    # Compare as quotations, which unlike lists distinguish True from 1.
+    self.assertEqual(
+        Quotation(expected), Quotation(PythonMachine(Program(functions), stack).run("main"))
+    )
+
+  @parameterized.parameterized.expand([
+      ("aggregate_type_error_before_underflow", "3 concat", []),
+      ("cons_type_error_before_underflow", "3 cons", []),
+      ("boolean_type_error_before_underflow", "or", [1]),
+      ("integer_type_error_before_underflow", "+", ["a"]),
+      ("underflow_of_second_operand", "1 +", []),
+      ("underflow_of_first_operand", "and", []),
+      ("shuffle_underflow", "1 swap", []),
+      ("equality_underflow", "=", [1]),
+      ("ifte_condition_underflow", "[over] [1 2 3] [] ifte", []),
+      ("ifte_condition_equality_underflow", "[=] [] [] ifte", [1]),
+      ("ifte_condition_type_error_before_underflow", "[+] [] [] ifte", ["a"]),
+      ("ifte_condition_underflow_below_entries", "1 [pop pop swap] [] [] ifte", [2]),
+      ("ifte_condition_without_result", "[pop] [] [] ifte", [1]),
+  ])
+  def test_run_raises_like_bytecode(self, _, body: str, stack: list[Value]):
+    functions = parser_module.parse_text(f"function main {{ {body} }}")
+
+    with self.assertRaises(joy_runtime_module.JoyRuntimeError) as expected_context:
+      bytecode_module.VirtualMachine(bytecode_module.Program(functions), stack).run("main")
+    with self.assertRaises(joy_runtime_module.JoyRuntimeError) as actual_context:
+      PythonMachine(Program(functions), stack).run("main")
+
+    self.assertIs(type(expected_context.exception), type(actual_context.exception))
+    self.assertEqual(str(expected_context.exception), str(actual_context.exception))
+
+  def test_run_memoized_function(self):
+    program = Program(
+        parser_module.parse_text(
+            "@memoize function fib { [2 <] [] [dup 1 - fib swap 2 - fib +] ifte }"
+        )
+    )
+
+    self.assertEqual([23416728348467685], PythonMachine(program, [80]).run("fib"))
+    self.assertEqual(81, program.function_caches[0].misses)
+    self.assertEqual([23416728348467685], PythonMachine(program, [80]).run("fib"))
+    self.assertEqual(81, program.function_caches[0].misses)
+
+  def test_benchmark_programs(self):
+    program = Program(bytecode_benchmark.parse_benchmark_functions())
+
+    for case in bytecode_benchmark.BENCHMARK_CASES:
+      with self.subTest(function_name=case.function_name):
+        result = PythonMachine(program, [case.argument]).run(case.function_name)
+        if case.expected_result is not None:
+          self.assertEqual([case.expected_result], result)
+
+  def test_squares(self):
+    program = Program(bytecode_benchmark.parse_benchmark_functions())
+
+    self.assertEqual([Quotation([1, 4, 9, 16])], PythonMachine(program, [4]).run("squares"))
+
+
+if __name__ == "__main__":
+  absltest.main()
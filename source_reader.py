@@ -1,25 +1,78 @@
 from __future__ import annotations
 
 import enum
-from typing import TextIO
+import time
+from typing import Final, TextIO, cast
+
+import parse_instrumentation as parse_instrumentation_module
+import parse_limits as parse_limits_module
+
+_ASCII_CHARS: Final = "".join(chr(i) for i in range(128))
+
+
+# The stream read after the text given to SourceReader.reset(), which is already in the buffer.
+class _EmptyInput:
+
+  def read(self, size: int = -1) -> str:
+    return ""
+
+
+_EMPTY_INPUT: Final = cast(TextIO, _EmptyInput())
 
 
 class SourceReader:
 
-  def __init__(self, f: TextIO, buffer_size: int | None = None) -> None:
+  def __init__(
+      self,
+      f: TextIO | str,
+      buffer_size: int | None = None,
+      encoding: str = "utf-8",
+      instrumentation: parse_instrumentation_module.Instrumentation | None = None,
+      limits: parse_limits_module.ParseLimits | None = None,
+  ) -> None:
     if buffer_size is not None and buffer_size <= 0:
       raise ValueError(f"invalid buffer size: {buffer_size}")
 
-    self.f = f
     self.buffer_size = buffer_size if buffer_size is not None else 1024
-
+    # The encoding used to calculate byte_position(); this must be a stateless encoding (e.g.
+    # "utf-8" or "utf-16-le" but not "utf-16", which emits a byte order mark).
+    self.encoding = encoding
+    self._is_ascii_compatible_encoding = _ASCII_CHARS.encode(encoding) == _ASCII_CHARS.encode(
+        "ascii"
+    )
+    # Reports the phases of the parse of this source; also used by the Tokenizer and Parser.
+    self.instrumentation = instrumentation
+    # The limits on parsing this source; also enforced by the Tokenizer and Parser.
+    self.limits = limits
+    self.reset(f)
+
+  # Starts reading new_input from the beginning, keeping the configuration of this reader so that
+  # one reader can parse many inputs without being rebuilt. new_input may be a stream or the text
+  # itself, which is used as the buffer directly instead of being read in chunks; this is the
+  # cheapest way to read a small snippet.
+  def reset(self, new_input: TextIO | str) -> None:
+    self._input_character_count = 0
     self._position = 0
-    self._buffer = ""
+    # The byte position of the character at _byte_counted_offset in the buffer. byte_position()
+    # counts only the bytes read since it was last called, so that calling it after every token
+    # costs time linear in the input rather than in the buffer size per call.
+    self._byte_counted_offset = 0
+    self._byte_counted_position = 0
     self._read_offset = 0
     self._lexeme_offset = 0
     self._lexeme_length = 0
     self._eof = False
 
+    if isinstance(new_input, str):
+      self.f = _EMPTY_INPUT
+      self._buffer = new_input
+      self._input_character_count = len(new_input)
+      if self.limits is not None:
+        self._check_limits(self.limits)
+    else:
+      self.f = new_input
+      self._buffer = ""
+
   def lexeme(self) -> str:
     return self._buffer[self._lexeme_offset : self._lexeme_offset + self._lexeme_length]
 
@@ -29,9 +82,17 @@ class SourceReader:
   def position(self) -> int:
     return self._position
 
+  def byte_position(self) -> int:
+    self._count_bytes(self._read_offset)
+    return self._byte_counted_position
+
   def eof(self) -> bool:
     return self._eof
 
+  # The number of characters held in memory, including those kept for the current lexeme.
+  def buffered_character_count(self) -> int:
+    return len(self._buffer)
+
   def read(
       self,
       accepted_characters: str,
@@ -85,26 +146,24 @@ class SourceReader:
       self._lexeme_offset = self._read_offset
       self._lexeme_length = 0
 
-    expected_character_list = list(match)
-    actual_character_list = []
+    if self._eof:
+      return False
 
+    # Search the buffer rather than comparing character by character. The last len(match) - 1
+    # characters of the buffer are kept unconsumed until more input arrives, since they may be the
+    # start of a match that is split across reads.
     while True:
-      read_character = self._read()
-      if len(read_character) == 0:
-        return False
-
-      if mode == ReadMode.SKIP:
-        self._lexeme_offset += 1
-      else:
-        self._lexeme_length += 1
-
-      actual_character_list.append(read_character)
-      if len(actual_character_list) > len(expected_character_list):
-        del actual_character_list[0]
-
-      if actual_character_list == expected_character_list:
+      match_offset = self._buffer.find(match, self._read_offset)
+      if match_offset >= 0:
+        self._consume(match_offset + len(match) - self._read_offset, mode)
         return True
 
+      self._consume(max(0, len(self._buffer) - self._read_offset - (len(match) - 1)), mode)
+      if not self._fill(len(self._buffer) - self._read_offset + 1):
+        self._consume(len(self._buffer) - self._read_offset, mode)
+        self._eof = True
+        return False
+
   def peek(self, desired_num_characters: int | None = None) -> str:
     return self._read(advance_read_offset=False, desired_num_characters=desired_num_characters)
 
@@ -121,23 +180,8 @@ class SourceReader:
     if self._eof:
       return ""
 
-    while self._read_offset + desired_num_characters > len(self._buffer):
-      buffer_offset = min(self._read_offset, self._lexeme_offset)
-
-      self._buffer = self._buffer[buffer_offset:]
-      self._read_offset -= buffer_offset
-      self._lexeme_offset -= buffer_offset
-      del buffer_offset
-
-      new_buffer = self.f.read(self.buffer_size)
-      if len(new_buffer) == 0:
-        del new_buffer
-        if advance_read_offset:
-          self._eof = True
-        break
-
-      self._buffer += new_buffer
-      del new_buffer
+    if not self._fill(desired_num_characters) and advance_read_offset:
+      self._eof = True
 
     if self._read_offset == len(self._buffer):
       return ""
@@ -150,6 +194,95 @@ class SourceReader:
 
     return read_characters
 
+  def _consume(self, num_characters: int, mode: ReadMode) -> None:
+    # Consumes characters that are known to be in the buffer.
+    self._read_offset += num_characters
+    self._position += num_characters
+    if mode == ReadMode.SKIP:
+      self._lexeme_offset += num_characters
+    else:
+      self._lexeme_length += num_characters
+
+  def _fill(self, desired_num_characters: int) -> bool:
+    # Reads until the buffer holds desired_num_characters characters after the read offset,
+    # returning False if end-of-file is reached first. Characters before both the read offset and
+    # the lexeme are discarded. Each read is at least as large as the characters kept, so that
+    # the buffer grows geometrically and a long lexeme or peek() costs linear time overall.
+    while self._read_offset + desired_num_characters > len(self._buffer):
+      buffer_offset = min(self._read_offset, self._lexeme_offset)
+      if buffer_offset > 0:
+        self._count_bytes(buffer_offset)
+        self._byte_counted_offset -= buffer_offset
+        self._buffer = self._buffer[buffer_offset:]
+        self._read_offset -= buffer_offset
+        self._lexeme_offset -= buffer_offset
+
+      read_size = max(
+          self.buffer_size,
+          len(self._buffer),
+          self._read_offset + desired_num_characters - len(self._buffer),
+      )
+      if self.limits is not None:
+        read_size = self._limit_read_size(self.limits, read_size)
+
+      instrumentation = self.instrumentation
+      start_ns = time.perf_counter_ns() if instrumentation is not None else 0
+      new_buffer = self.f.read(read_size)
+      if instrumentation is not None:
+        instrumentation.record(
+            parse_instrumentation_module.Phase.REFILL, start_ns, time.perf_counter_ns()
+        )
+      if len(new_buffer) == 0:
+        return False
+      self._buffer += new_buffer
+      self._input_character_count += len(new_buffer)
+
+      if self.limits is not None:
+        self._check_limits(self.limits)
+    return True
+
+  def _limit_read_size(self, limits: parse_limits_module.ParseLimits, read_size: int) -> int:
+    # Read at most one character more than the limits allow, which is enough to tell that they
+    # have been exceeded without reading (and buffering) the rest of an oversized input.
+    limits.check_deadline()
+    if limits.max_input_characters is not None:
+      read_size = min(read_size, limits.max_input_characters - self._input_character_count + 1)
+    if limits.max_buffered_characters is not None:
+      read_size = min(read_size, limits.max_buffered_characters - len(self._buffer) + 1)
+    return max(read_size, 1)
+
+  def _check_limits(self, limits: parse_limits_module.ParseLimits) -> None:
+    if (
+        limits.max_input_characters is not None
+        and self._input_character_count > limits.max_input_characters
+    ):
+      raise parse_limits_module.InputTooLargeError(
+          limit=limits.max_input_characters,
+          message=f"input exceeds maximum length of {limits.max_input_characters} characters",
+      )
+    if (
+        limits.max_buffered_characters is not None
+        and len(self._buffer) > limits.max_buffered_characters
+    ):
+      raise parse_limits_module.BufferLimitExceededError(
+          limit=limits.max_buffered_characters,
+          message=(
+              f"buffered input exceeds maximum of {limits.max_buffered_characters} characters"
+          ),
+      )
+
+  def _count_bytes(self, offset: int) -> None:
+    if offset > self._byte_counted_offset:
+      self._byte_counted_position += self._byte_length(
+          self._buffer[self._byte_counted_offset : offset]
+      )
+      self._byte_counted_offset = offset
+
+  def _byte_length(self, text: str) -> int:
+    if self._is_ascii_compatible_encoding and text.isascii():
+      return len(text)
+    return len(text.encode(self.encoding, errors="surrogateescape"))
+
 
 @enum.unique
 class ReadMode(enum.Enum):
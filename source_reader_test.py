@@ -1,3 +1,4 @@
+from collections.abc import Callable
 import dataclasses
 import io
 
@@ -363,6 +364,31 @@ class SourceReaderTest(absltest.TestCase):
     self.assertFalse(return_value4)
     self.assertSourceReaderState(source_reader, lexeme=expected_lexemes[3], position=27, eof=True)
 
+  @parameterized.parameterized.expand([
+      ("buffer_size_1", 1),
+      ("buffer_size_2", 2),
+      ("buffer_size_3", 3),
+      ("buffer_size_100", 100),
+  ])
+  def test_read_until_exact_match_after_partial_matches(self, _, buffer_size: int):
+    source_reader = SourceReader(io.StringIO("***/**/ /a*/"), buffer_size=buffer_size)
+
+    return_value1 = source_reader.read_until_exact_match("*/", ReadMode.NORMAL)
+    self.assertTrue(return_value1)
+    self.assertSourceReaderState(source_reader, lexeme="***/", position=4, eof=False)
+
+    return_value2 = source_reader.read_until_exact_match("/ /a*/", ReadMode.NORMAL)
+    self.assertTrue(return_value2)
+    self.assertSourceReaderState(source_reader, lexeme="**/ /a*/", position=12, eof=False)
+
+  def test_read_until_exact_match_keeps_byte_position(self):
+    source_reader = SourceReader(io.StringIO("\u00e9\u00e9*\u00e9*/abc"), buffer_size=2)
+
+    source_reader.read_until_exact_match("*/", ReadMode.SKIP)
+
+    self.assertEqual(6, source_reader.position())
+    self.assertEqual(9, source_reader.byte_position())
+
   @parameterized.parameterized.expand([
       ("NORMAL", ReadMode.NORMAL, "abcdefg"),
       ("APPEND", ReadMode.APPEND, "abcdefg"),
@@ -445,6 +471,77 @@ class SourceReaderTest(absltest.TestCase):
     self.assertEqual("", peek_return_value)
     self.assertSourceReaderState(source_reader, lexeme=expected_lexeme, position=4, eof=True)
 
+  def test_byte_position_on_new_instance(self):
+    source_reader = SourceReader(io.StringIO("abc"))
+
+    self.assertEqual(0, source_reader.byte_position())
+
+  @parameterized.parameterized.expand([
+      ("ascii", "utf-8", "aaaXXXbbb", 9),
+      ("utf8", "utf-8", "a\u00e9\u4e2dXXX\U0001f600b", 14),
+      ("utf16", "utf-16-le", "a\u00e9\u4e2dXXX\U0001f600b", 18),
+      ("latin1", "latin-1", "a\u00e9\u00e9XXXb", 7),
+  ])
+  def test_byte_position_across_buffer_refills(self, _, encoding: str, text: str, byte_length: int):
+    source_reader = SourceReader(io.StringIO(text), buffer_size=2, encoding=encoding)
+
+    expected_byte_positions = [len(text[:i].encode(encoding)) for i in range(1, len(text) + 1)]
+    actual_byte_positions = []
+    for _ in range(len(text)):
+      source_reader.read(
+          accepted_characters="",
+          mode=ReadMode.SKIP,
+          max_lexeme_length=1,
+          invert_accepted_characters=True,
+      )
+      actual_byte_positions.append(source_reader.byte_position())
+
+    self.assertEqual(expected_byte_positions, actual_byte_positions)
+    self.assertEqual(byte_length, source_reader.byte_position())
+
+  def test_byte_position_with_lexeme_spanning_buffers(self):
+    source_reader = SourceReader(io.StringIO("\u00e9\u00e9abcdefgh\u00e9"), buffer_size=3)
+    source_reader.read(accepted_characters="\u00e9", mode=ReadMode.SKIP, max_lexeme_length=None)
+
+    source_reader.read(accepted_characters="abcdefgh", mode=ReadMode.NORMAL, max_lexeme_length=None)
+
+    self.assertEqual("abcdefgh", source_reader.lexeme())
+    self.assertEqual(12, source_reader.byte_position())
+
+  @parameterized.parameterized.expand([
+      ("stream", lambda text: io.StringIO(text)),
+      ("text", lambda text: text),
+  ])
+  def test_reset(self, _, create_input: Callable[[str], io.StringIO | str]):
+    source_reader = SourceReader(io.StringIO("\u00e9abc def"), buffer_size=2)
+    source_reader.read(
+        accepted_characters=" ",
+        mode=ReadMode.NORMAL,
+        max_lexeme_length=None,
+        invert_accepted_characters=True,
+    )
+
+    source_reader.reset(create_input("\u00e9gh ij"))
+
+    self.assertSourceReaderState(source_reader, lexeme="", position=0, eof=False)
+    self.assertEqual(0, source_reader.byte_position())
+    source_reader.read(
+        accepted_characters=" ",
+        mode=ReadMode.NORMAL,
+        max_lexeme_length=None,
+        invert_accepted_characters=True,
+    )
+    self.assertSourceReaderState(source_reader, lexeme="\u00e9gh", position=3, eof=False)
+    self.assertEqual(4, source_reader.byte_position())
+    source_reader.read(accepted_characters=" ij", mode=ReadMode.NORMAL, max_lexeme_length=None)
+    self.assertSourceReaderState(source_reader, lexeme=" ij", position=6, eof=True)
+
+  def test_new_instance_with_text(self):
+    source_reader = SourceReader("abc")
+
+    self.assertEqual("abc", source_reader.peek(4))
+    self.assertSourceReaderState(source_reader, lexeme="", position=0, eof=False)
+
   def assertSourceReaderState(
       self,
       source_reader: SourceReader,
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import dataclasses
+import mmap
+import os
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class SourceSpan:
+  # The character offsets of the first character and one past the last character of the span.
+  start: int
+  end: int
+  # The byte offsets of the first byte and one past the last byte of the span in the encoded source.
+  start_byte: int
+  end_byte: int
+
+
+# Loads the text of spans on demand from a source file, without holding the file's contents in
+# memory. The file is memory-mapped on first use. The byte offsets recorded by SourceReader only
+# match the file on disk if newlines were not translated, i.e. if the file was opened with
+# newline="" when it was parsed.
+class SourceText:
+
+  def __init__(self, path: str | os.PathLike[str], encoding: str = "utf-8") -> None:
+    self.path = path
+    self.encoding = encoding
+    self._mmap: mmap.mmap | None = None
+    self._is_empty = False
+
+  def text(self, span: SourceSpan) -> str:
+    return self.bytes(span).decode(self.encoding, errors="surrogateescape")
+
+  def bytes(self, span: SourceSpan) -> bytes:
+    if span.start_byte < 0 or span.end_byte < span.start_byte:
+      raise ValueError(f"invalid span: {span}")
+
+    if self._mmap is None and not self._is_empty:
+      self._open()
+    if self._mmap is None:
+      return b""
+
+    return self._mmap[span.start_byte : span.end_byte]
+
+  def close(self) -> None:
+    if self._mmap is not None:
+      self._mmap.close()
+      self._mmap = None
+    self._is_empty = False
+
+  def __enter__(self) -> SourceText:
+    return self
+
+  def __exit__(self, *args: object) -> None:
+    self.close()
+
+  def _open(self) -> None:
+    with open(self.path, "rb") as f:
+      # Empty files cannot be memory-mapped.
+      if os.fstat(f.fileno()).st_size == 0:
+        self._is_empty = True
+        return
+      self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
@@ -0,0 +1,79 @@
+import os
+import tempfile
+
+from absl.testing import absltest
+
+import source_span as source_span_module
+
+SourceSpan = source_span_module.SourceSpan
+SourceText = source_span_module.SourceText
+
+
+class SourceTextTest(absltest.TestCase):
+
+  def test_text(self):
+    path = self.create_file("abécd中ef".encode("utf-8"))
+
+    with SourceText(path) as source_text:
+      self.assertEqual("ab", source_text.text(SourceSpan(start=0, end=2, start_byte=0, end_byte=2)))
+      self.assertEqual(
+          "écd中", source_text.text(SourceSpan(start=2, end=6, start_byte=2, end_byte=9))
+      )
+      self.assertEqual("", source_text.text(SourceSpan(start=8, end=8, start_byte=11, end_byte=11)))
+
+  def test_text_with_encoding(self):
+    path = self.create_file("abécd".encode("latin-1"))
+
+    with SourceText(path, encoding="latin-1") as source_text:
+      span = SourceSpan(start=2, end=4, start_byte=2, end_byte=4)
+      self.assertEqual("éc", source_text.text(span))
+
+  def test_bytes(self):
+    path = self.create_file(b"abcdef")
+
+    with SourceText(path) as source_text:
+      self.assertEqual(
+          b"cde", source_text.bytes(SourceSpan(start=2, end=5, start_byte=2, end_byte=5))
+      )
+
+  def test_empty_file(self):
+    path = self.create_file(b"")
+
+    with SourceText(path) as source_text:
+      self.assertEqual("", source_text.text(SourceSpan(start=0, end=0, start_byte=0, end_byte=0)))
+
+  def test_file_is_not_opened_until_text_is_requested(self):
+    path = os.path.join(self.enter_context(tempfile.TemporaryDirectory()), "does_not_exist.joy")
+
+    source_text = SourceText(path)
+
+    with self.assertRaises(FileNotFoundError):
+      source_text.text(SourceSpan(start=0, end=1, start_byte=0, end_byte=1))
+
+  def test_invalid_span_should_raise(self):
+    path = self.create_file(b"abcdef")
+
+    with SourceText(path) as source_text:
+      with self.assertRaises(ValueError):
+        source_text.text(SourceSpan(start=2, end=1, start_byte=2, end_byte=1))
+
+  def test_text_after_close_reopens_the_file(self):
+    path = self.create_file(b"abcdef")
+    source_text = SourceText(path)
+    span = SourceSpan(start=0, end=3, start_byte=0, end_byte=3)
+    source_text.text(span)
+
+    source_text.close()
+
+    self.assertEqual("abc", source_text.text(span))
+    source_text.close()
+
+  def create_file(self, contents: bytes) -> str:
+    directory = self.enter_context(tempfile.TemporaryDirectory())
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+      f.write(contents)
+    return f.name
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping, Sequence
+
+import joy_runtime as joy_runtime_module
+import parser as parser_module
+
+StackEffect = joy_runtime_module.StackEffect
+
+# The combinators whose stack effect can be derived from that of their quotations, provided the
+# quotations are literals, by the number of quotations each takes from the top of the stack.
+_COMBINATOR_QUOTATION_COUNTS = {"i": 1, "dip": 1, "branch": 2, "ifte": 3}
+
+
+def compose(first: StackEffect, second: StackEffect) -> StackEffect:
+  # The effect of running first and then second: second consumes first's outputs before reading
+  # any deeper into the stack.
+  return StackEffect(
+      inputs=first.inputs + max(0, second.inputs - first.outputs),
+      outputs=second.outputs + max(0, first.outputs - second.inputs),
+  )
+
+
+# Infers the stack effect of every function that has a fixed one, i.e. that always pops the same
+# number of values and pushes the same number of values, regardless of what the values are. The
+# effect of a function is None if it uses a word whose effect is unknown, such as a combinator
+# applied to a quotation that is not a literal, or if its branches disagree.
+#
+# Recursive functions are handled by assuming, while a function's effect is being inferred, that
+# its conditionals have the effect of whichever branch is known, and then checking that every
+# branch agrees with the effects so inferred.
+def infer(functions: Iterable[parser_module.JoyFunction]) -> dict[str, StackEffect | None]:
+  functions = tuple(functions)
+  effects: dict[str, StackEffect | None] = {function.name: None for function in functions}
+
+  # Effects become known as the effects they depend on do, so this usually reaches a fixed point
+  # within len(functions) rounds; effects that never settle are caught by the check below.
+  for _ in range(len(functions) + 1):
+    changed = False
+    for function in functions:
+      effect = sequence_effect(function.body, effects, assume_known_branch=True)
+      if effect != effects[function.name]:
+        effects[function.name] = effect
+        changed = True
+    if not changed:
+      break
+
+  # Forget the effects that do not hold once every branch is checked, and the effects that depend
+  # on them, until the remaining effects are consistent.
+  changed = True
+  while changed:
+    changed = False
+    for function in functions:
+      if effects[function.name] is None:
+        continue
+      if sequence_effect(function.body, effects) != effects[function.name]:
+        effects[function.name] = None
+        changed = True
+
+  return effects
+
+
+def sequence_effect(
+    terms: Iterable[parser_module.Term],
+    function_effects: Mapping[str, StackEffect | None],
+    assume_known_branch: bool = False,
+) -> StackEffect | None:
+  effect = StackEffect(0, 0)
+  # The literal quotations pushed most recently, which combinators may take as their arguments.
+  trailing_quotations: list[parser_module.Quotation] = []
+
+  for term in terms:
+    if not isinstance(term, parser_module.Word):
+      effect = compose(effect, StackEffect(0, 1))
+      if isinstance(term, parser_module.Quotation):
+        trailing_quotations.append(term)
+      else:
+        trailing_quotations = []
+      continue
+
+    word_effect: StackEffect | None
+    if term.name in function_effects:
+      word_effect = function_effects[term.name]
+    elif term.name in _COMBINATOR_QUOTATION_COUNTS:
+      quotation_count = _COMBINATOR_QUOTATION_COUNTS[term.name]
+      if len(trailing_quotations) < quotation_count:
+        return None
+      # The quotations were the last values pushed, so take them back off.
+      effect = StackEffect(effect.inputs, effect.outputs - quotation_count)
+      word_effect = _combinator_effect(
+          term.name,
+          trailing_quotations[-quotation_count:],
+          function_effects,
+          assume_known_branch,
+      )
+    else:
+      builtin_index = joy_runtime_module.BUILTIN_INDICES.get(term.name)
+      if builtin_index is None:
+        return None
+      word_effect = joy_runtime_module.BUILTINS[builtin_index].stack_effect
+
+    if word_effect is None:
+      return None
+    effect = compose(effect, word_effect)
+    trailing_quotations = []
+
+  return effect
+
+
+def _combinator_effect(
+    word: str,
+    quotations: Sequence[parser_module.Quotation],
+    function_effects: Mapping[str, StackEffect | None],
+    assume_known_branch: bool,
+) -> StackEffect | None:
+  quotation_effects = [
+      sequence_effect(quotation.terms, function_effects, assume_known_branch)
+      for quotation in quotations
+  ]
+
+  if word == "i":
+    return quotation_effects[0]
+
+  elif word == "dip":
+    effect = quotation_effects[0]
+    if effect is None:
+      return None
+    return StackEffect(effect.inputs + 1, effect.outputs + 1)
+
+  elif word == "branch":
+    branch_effect = _merge_branches(quotation_effects[0], quotation_effects[1], assume_known_branch)
+    if branch_effect is None:
+      return None
+    return compose(StackEffect(1, 0), branch_effect)
+
+  # ifte runs its condition on a copy of the stack and then pops the result, so the condition
+  # only contributes the depth it reads to.
+  condition_effect = quotation_effects[0]
+  branch_effect = _merge_branches(quotation_effects[1], quotation_effects[2], assume_known_branch)
+  if condition_effect is None or branch_effect is None:
+    return None
+  condition_depth = condition_effect.inputs + max(0, 1 - condition_effect.outputs)
+  inputs = max(condition_depth, branch_effect.inputs)
+  return StackEffect(inputs, inputs - branch_effect.inputs + branch_effect.outputs)
+
+
+def _merge_branches(
+    effect1: StackEffect | None, effect2: StackEffect | None, assume_known_branch: bool
+) -> StackEffect | None:
+  if effect1 is None or effect2 is None:
+    return effect1 or effect2 if assume_known_branch else None
+  if effect1.outputs - effect1.inputs != effect2.outputs - effect2.inputs:
+    return None
+  inputs = max(effect1.inputs, effect2.inputs)
+  return StackEffect(inputs, inputs + effect1.outputs - effect1.inputs)
@@ -0,0 +1,84 @@
+from absl.testing import absltest
+import parameterized
+
+import joy_runtime as joy_runtime_module
+import parser as parser_module
+import stack_effects as stack_effects_module
+
+StackEffect = joy_runtime_module.StackEffect
+
+
+class StackEffectsTest(absltest.TestCase):
+
+  @parameterized.parameterized.expand([
+      ("nothing_then_nothing", StackEffect(0, 0), StackEffect(0, 0), StackEffect(0, 0)),
+      ("push_then_pop", StackEffect(0, 1), StackEffect(1, 0), StackEffect(0, 0)),
+      ("push_then_add", StackEffect(0, 1), StackEffect(2, 1), StackEffect(1, 1)),
+      ("dup_then_swap", StackEffect(1, 2), StackEffect(2, 2), StackEffect(1, 2)),
+      ("pop_then_push", StackEffect(1, 0), StackEffect(0, 1), StackEffect(1, 1)),
+  ])
+  def test_compose(self, _, first: StackEffect, second: StackEffect, expected_effect: StackEffect):
+    self.assertEqual(expected_effect, stack_effects_module.compose(first, second))
+
+  @parameterized.parameterized.expand([
+      ("empty", "", StackEffect(0, 0)),
+      ("literals", '1 "a" true [x]', StackEffect(0, 4)),
+      ("builtins", "dup * swap -", StackEffect(2, 1)),
+      ("i", "[1 +] i", StackEffect(1, 1)),
+      ("dip", "[pop] dip", StackEffect(2, 1)),
+      ("branch", "[1 +] [pop 0] branch", StackEffect(2, 1)),
+      ("ifte", "[0 =] [pop 1] [1 -] ifte", StackEffect(1, 1)),
+      ("ifte_condition_reads_deeper", "[pop 0 >] [] [] ifte", StackEffect(2, 2)),
+  ])
+  def test_infer_effect(self, _, body: str, expected_effect: StackEffect):
+    effects = stack_effects_module.infer(parser_module.parse_text(f"function aaa {{ {body} }}"))
+
+    self.assertEqual({"aaa": expected_effect}, effects)
+
+  @parameterized.parameterized.expand([
+      ("combinator_of_non_literal", "i"),
+      ("unsupported_combinator", "[1 +] map"),
+      ("branches_disagree", "[0 =] [pop] [] ifte"),
+      ("undefined_word", "bbb"),
+  ])
+  def test_infer_unknown_effect(self, _, body: str):
+    effects = stack_effects_module.infer(parser_module.parse_text(f"function aaa {{ {body} }}"))
+
+    self.assertEqual({"aaa": None}, effects)
+
+  def test_infer_uses_function_effects(self):
+    effects = stack_effects_module.infer(
+        parser_module.parse_text("function aaa { 1 bbb } function bbb { + } function dup { 1 }")
+    )
+
+    self.assertEqual(
+        {"aaa": StackEffect(1, 1), "bbb": StackEffect(2, 1), "dup": StackEffect(0, 1)}, effects
+    )
+
+  def test_infer_recursive_functions(self):
+    effects = stack_effects_module.infer(
+        parser_module.parse_text(
+            """
+            function fib { [2 <] [] [dup 1 - fib swap 2 - fib +] ifte }
+            function even { [0 =] [pop true] [1 - odd] ifte }
+            function odd { [0 =] [pop false] [1 - even] ifte }
+            """
+        )
+    )
+
+    self.assertEqual(
+        {"fib": StackEffect(1, 1), "even": StackEffect(1, 1), "odd": StackEffect(1, 1)}, effects
+    )
+
+  def test_infer_rejects_inconsistent_recursion(self):
+    effects = stack_effects_module.infer(
+        parser_module.parse_text(
+            "function grow { [0 =] [] [dup 1 - grow] ifte } function aaa { grow }"
+        )
+    )
+
+    self.assertEqual({"grow": None, "aaa": None}, effects)
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -1,22 +1,91 @@
 from __future__ import annotations
 
+import time
+from typing import ClassVar, Final, TextIO
+
+import parse_instrumentation as parse_instrumentation_module
 import source_reader as source_reader_module
 
-_WHITESPACE_CHARS = " \n\r\t"
-_IDENTIFIER_START_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_"
-_IDENTIFIER_SUBSEQUENT_CHARS = _IDENTIFIER_START_CHARS + "0123456789"
-_MAX_IDENTIFIER_LENGTH = 256
+Phase = parse_instrumentation_module.Phase
+
+_WHITESPACE_CHARS: Final = " \n\r\t"
+_IDENTIFIER_START_CHARS: Final = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_"
+_IDENTIFIER_SUBSEQUENT_CHARS: Final = _IDENTIFIER_START_CHARS + "0123456789"
+_MAX_IDENTIFIER_LENGTH: Final = 256
+_DIGIT_CHARS: Final = "0123456789"
+_MAX_INTEGER_LITERAL_LENGTH: Final = 256
+_OPERATOR_CHARS: Final = "+-*/%<>=!"
+_MAX_OPERATOR_LENGTH: Final = 2
+_STRING_ESCAPE_SEQUENCES: Final[dict[str, str]] = {
+    '"': '"',
+    "\\": "\\",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class ParseError(Exception):
+  pass
+
+
+class InvalidIdentifierError(ParseError):
+
+  def __init__(self, identifier: str, message: str) -> None:
+    super().__init__(message)
+    self.identifier = identifier
+
+
+class IdentifierTooLongError(ParseError):
+
+  def __init__(self, identifier: str, max_length: int, message: str) -> None:
+    super().__init__(message)
+    self.identifier = identifier
+    self.max_length = max_length
+
+
+class UnterminatedMultiLineCommentError(ParseError):
+  pass
+
+
+class UnterminatedStringLiteralError(ParseError):
+  pass
 
 
 class Tokenizer:
+  # The errors raised by the tokenizer, which are defined at module level (so that the module can
+  # be compiled with mypyc; see build_mypyc.sh) and exposed here as Tokenizer.ParseError etc.
+  ParseError: ClassVar[type[ParseError]] = ParseError
+  InvalidIdentifierError: ClassVar[type[InvalidIdentifierError]] = InvalidIdentifierError
+  IdentifierTooLongError: ClassVar[type[IdentifierTooLongError]] = IdentifierTooLongError
+  UnterminatedMultiLineCommentError: ClassVar[
+      type[UnterminatedMultiLineCommentError]
+  ] = UnterminatedMultiLineCommentError
+  UnterminatedStringLiteralError: ClassVar[
+      type[UnterminatedStringLiteralError]
+  ] = UnterminatedStringLiteralError
 
   def __init__(self, source_reader: source_reader_module.SourceReader) -> None:
     self.source_reader = source_reader
+    self.instrumentation = source_reader.instrumentation
+    self.limits = source_reader.limits
+
+  # Starts tokenizing new_input; see SourceReader.reset().
+  def reset(self, new_input: TextIO | str) -> None:
+    self.source_reader.reset(new_input)
 
   def eof(self) -> bool:
     return self.source_reader.eof()
 
+  def position(self) -> int:
+    return self.source_reader.position()
+
+  def byte_position(self) -> int:
+    return self.source_reader.byte_position()
+
   def read_annotation(self) -> str | None:
+    instrumentation = self.instrumentation
+    start_ns = time.perf_counter_ns() if instrumentation is not None else 0
     self.source_reader.read(
         accepted_characters="@",
         mode=source_reader_module.ReadMode.NORMAL,
@@ -27,9 +96,14 @@ class Tokenizer:
     annotation_name = self.read_identifier()
     if annotation_name is None:
       raise self.ParseError("expected annotation name after @")
+    if instrumentation is not None:
+      instrumentation.record(Phase.ANNOTATION, start_ns, time.perf_counter_ns())
     return annotation_name
 
   def read_identifier(self) -> str | None:
+    instrumentation = self.instrumentation
+    start_ns = time.perf_counter_ns() if instrumentation is not None else 0
+
     # Read the first character(s) of an identifier
     self.source_reader.read(
         accepted_characters=_IDENTIFIER_START_CHARS,
@@ -55,14 +129,105 @@ class Tokenizer:
           message=f"identifier exceeds maximum length of {_MAX_IDENTIFIER_LENGTH}: {identifier}",
       )
 
+    if instrumentation is not None:
+      instrumentation.record(Phase.IDENTIFIER, start_ns, time.perf_counter_ns())
     return identifier
 
+  def read_character(self, character: str) -> bool:
+    character_read_count = self.source_reader.read(
+        accepted_characters=character,
+        mode=source_reader_module.ReadMode.NORMAL,
+        max_lexeme_length=1,
+    )
+    return character_read_count > 0
+
+  def read_integer(self) -> int | None:
+    potential_integer_start = self.source_reader.peek(desired_num_characters=2)
+    if len(potential_integer_start) == 0:
+      return None
+    if potential_integer_start[0] == "-":
+      if len(potential_integer_start) < 2 or potential_integer_start[1] not in _DIGIT_CHARS:
+        return None
+    elif potential_integer_start[0] not in _DIGIT_CHARS:
+      return None
+
+    self.source_reader.read(
+        accepted_characters="-",
+        mode=source_reader_module.ReadMode.NORMAL,
+        max_lexeme_length=1,
+    )
+    self.source_reader.read(
+        accepted_characters=_DIGIT_CHARS,
+        mode=source_reader_module.ReadMode.APPEND,
+        max_lexeme_length=_MAX_INTEGER_LITERAL_LENGTH + 2,
+    )
+
+    integer_literal = self.source_reader.lexeme()
+    if len(integer_literal.lstrip("-")) > _MAX_INTEGER_LITERAL_LENGTH:
+      raise self.ParseError(
+          f"integer literal exceeds maximum length of {_MAX_INTEGER_LITERAL_LENGTH} digits: "
+          f"{integer_literal}"
+      )
+
+    return int(integer_literal)
+
+  def read_string(self) -> str | None:
+    if not self.read_character('"'):
+      return None
+
+    chunks: list[str] = []
+    while True:
+      self.source_reader.read(
+          accepted_characters='"\\\r\n',
+          mode=source_reader_module.ReadMode.NORMAL,
+          max_lexeme_length=None,
+          invert_accepted_characters=True,
+      )
+      chunks.append(self.source_reader.lexeme())
+
+      if self.read_character('"'):
+        return "".join(chunks)
+      if not self.read_character("\\"):
+        raise self.UnterminatedStringLiteralError("unterminated string literal")
+
+      self.source_reader.read(
+          accepted_characters="".join(_STRING_ESCAPE_SEQUENCES),
+          mode=source_reader_module.ReadMode.NORMAL,
+          max_lexeme_length=1,
+      )
+      escaped_character = self.source_reader.lexeme()
+      if len(escaped_character) == 0:
+        if len(self.source_reader.peek(desired_num_characters=1)) == 0:
+          raise self.UnterminatedStringLiteralError("unterminated string literal")
+        raise self.ParseError(
+            "invalid escape sequence in string literal: "
+            f"\\{self.source_reader.peek(desired_num_characters=1)}"
+        )
+      chunks.append(_STRING_ESCAPE_SEQUENCES[escaped_character])
+
+  def read_operator(self) -> str | None:
+    self.source_reader.read(
+        accepted_characters=_OPERATOR_CHARS,
+        mode=source_reader_module.ReadMode.NORMAL,
+        max_lexeme_length=_MAX_OPERATOR_LENGTH,
+    )
+    if self.source_reader.lexeme_length() == 0:
+      return None
+    return self.source_reader.lexeme()
+
+  def peek_character(self) -> str:
+    return self.source_reader.peek(desired_num_characters=1)
+
   def skip_whitespace(self) -> bool:
+    instrumentation = self.instrumentation
+    start_ns = time.perf_counter_ns() if instrumentation is not None else 0
     character_read_count = self.source_reader.read(
         accepted_characters=_WHITESPACE_CHARS,
         mode=source_reader_module.ReadMode.SKIP,
         max_lexeme_length=None,
     )
+    if instrumentation is not None and character_read_count > 0:
+      instrumentation.record(Phase.TRIVIA, start_ns, time.perf_counter_ns())
     return character_read_count > 0
 
   def skip_inline_comment(self) -> bool:
@@ -70,12 +235,16 @@ class Tokenizer:
     if potential_comment_starter != "//":
       return False
 
+    instrumentation = self.instrumentation
+    start_ns = time.perf_counter_ns() if instrumentation is not None else 0
     self.source_reader.read(
         accepted_characters="\r\n",
         mode=source_reader_module.ReadMode.SKIP,
         max_lexeme_length=None,
         invert_accepted_characters=True,
     )
+    if instrumentation is not None:
+      instrumentation.record(Phase.TRIVIA, start_ns, time.perf_counter_ns())
     return True
 
   def skip_multiline_comment(self) -> bool:
@@ -83,24 +252,9 @@ class Tokenizer:
     if potential_comment_starter != "/*":
       return False
 
+    instrumentation = self.instrumentation
+    start_ns = time.perf_counter_ns() if instrumentation is not None else 0
     self.source_reader.read_until_exact_match("*/", mode=source_reader_module.ReadMode.SKIP)
+    if instrumentation is not None:
+      instrumentation.record(Phase.TRIVIA, start_ns, time.perf_counter_ns())
     return True
-
-  class ParseError(Exception):
-    pass
-
-  class InvalidIdentifierError(ParseError):
-
-    def __init__(self, identifier: str, message: str) -> None:
-      super().__init__(message)
-      self.identifier = identifier
-
-  class IdentifierTooLongError(ParseError):
-
-    def __init__(self, identifier: str, max_length: int, message: str) -> None:
-      super().__init__(message)
-      self.identifier = identifier
-      self.max_length = max_length
-
-  class UnterminatedMultiLineCommentError(ParseError):
-    pass
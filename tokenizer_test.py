@@ -261,6 +261,110 @@ class TokenizerTest(absltest.TestCase):
     self.assertIn("expected annotation", exception_message.lower())
     self.assertIn("@", exception_message)
 
+  def test_read_character(self):
+    tokenizer = self.create_tokenizer("{}")
+
+    self.assertFalse(tokenizer.read_character("}"))
+    self.assertTrue(tokenizer.read_character("{"))
+    self.assertTrue(tokenizer.read_character("}"))
+    self.assertFalse(tokenizer.read_character("}"))
+
+  def test_peek_character(self):
+    tokenizer = self.create_tokenizer("ab")
+
+    self.assertEqual("a", tokenizer.peek_character())
+    self.assertEqual("a", tokenizer.read_identifier()[0])
+
+  def test_read_integer(self):
+    tokenizer = self.create_tokenizer("123 -45 0")
+
+    self.assertEqual(123, tokenizer.read_integer())
+    tokenizer.skip_whitespace()
+    self.assertEqual(-45, tokenizer.read_integer())
+    tokenizer.skip_whitespace()
+    self.assertEqual(0, tokenizer.read_integer())
+    self.assertIsNone(tokenizer.read_integer())
+    self.assertTrue(tokenizer.eof())
+
+  def test_read_integer_when_not_at_an_integer(self):
+    for text in ("abc", "-", "- 1", "-abc", ""):
+      with self.subTest(text=text):
+        tokenizer = self.create_tokenizer(text)
+
+        self.assertIsNone(tokenizer.read_integer())
+        self.assertEqual(0, tokenizer.position())
+
+  def test_read_integer_raises_on_integer_too_long(self):
+    tokenizer = self.create_tokenizer("1" * 300)
+
+    with self.assertRaises(tokenizer.ParseError) as assert_raises_context:
+      tokenizer.read_integer()
+
+    self.assertIn("exceeds maximum length", str(assert_raises_context.exception))
+
+  def test_read_string(self):
+    tokenizer = self.create_tokenizer('"abc" "" "a\\"b\\\\c\\n\\t\\r"')
+
+    self.assertEqual("abc", tokenizer.read_string())
+    tokenizer.skip_whitespace()
+    self.assertEqual("", tokenizer.read_string())
+    tokenizer.skip_whitespace()
+    self.assertEqual('a"b\\c\n\t\r', tokenizer.read_string())
+    self.assertIsNone(tokenizer.read_string())
+
+  def test_read_string_when_not_at_a_string(self):
+    tokenizer = self.create_tokenizer("abc")
+
+    self.assertIsNone(tokenizer.read_string())
+    self.assertEqual("abc", tokenizer.read_identifier())
+
+  def test_read_string_spanning_buffers(self):
+    tokenizer = Tokenizer(
+        source_reader=source_reader_module.SourceReader(
+            io.StringIO('"abcdefghij\\"klmnop"'), buffer_size=3
+        )
+    )
+
+    self.assertEqual('abcdefghij"klmnop', tokenizer.read_string())
+
+  def test_read_string_raises_on_unterminated_string(self):
+    for text in ('"abc', '"abc\nxyz"', '"abc\\'):
+      with self.subTest(text=text):
+        tokenizer = self.create_tokenizer(text)
+
+        with self.assertRaises(tokenizer.UnterminatedStringLiteralError):
+          tokenizer.read_string()
+
+  def test_read_string_raises_on_invalid_escape_sequence(self):
+    tokenizer = self.create_tokenizer('"abc\\qdef"')
+
+    with self.assertRaises(tokenizer.ParseError) as assert_raises_context:
+      tokenizer.read_string()
+
+    self.assertIn("\\q", str(assert_raises_context.exception))
+
+  def test_read_operator(self):
+    tokenizer = self.create_tokenizer("+ <= != =a")
+
+    self.assertEqual("+", tokenizer.read_operator())
+    tokenizer.skip_whitespace()
+    self.assertEqual("<=", tokenizer.read_operator())
+    tokenizer.skip_whitespace()
+    self.assertEqual("!=", tokenizer.read_operator())
+    tokenizer.skip_whitespace()
+    self.assertEqual("=", tokenizer.read_operator())
+    self.assertIsNone(tokenizer.read_operator())
+    self.assertEqual("a", tokenizer.read_identifier())
+
+  def test_position_and_byte_position(self):
+    tokenizer = self.create_tokenizer("/* \u00e9 */ abc")
+    self.assertEqual((0, 0), (tokenizer.position(), tokenizer.byte_position()))
+
+    tokenizer.skip_multiline_comment()
+    tokenizer.skip_whitespace()
+
+    self.assertEqual((8, 9), (tokenizer.position(), tokenizer.byte_position()))
+
   def create_tokenizer(self, text: str) -> Tokenizer:
     return Tokenizer(source_reader=source_reader_module.SourceReader(io.StringIO(text)))
 
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable, Iterator, Mapping
+import dataclasses
+import enum
+import os
+import threading
+import types
+
+import parser as parser_module
+import source_reader as source_reader_module
+import tokenizer as tokenizer_module
+
+
+# Watches a directory tree for Joy source files by polling, re-parsing only the files that were
+# added or changed since the previous poll. Each poll() walks the tree with os.scandir() and
+# compares the stat signature of each file to the one recorded when the file was last parsed.
+class DirectoryWatcher:
+
+  def __init__(
+      self,
+      root: str | os.PathLike[str],
+      suffixes: tuple[str, ...] = (".joy",),
+      encoding: str = "utf-8",
+  ) -> None:
+    self.root = os.fspath(root)
+    self.suffixes = suffixes
+    self.encoding = encoding
+
+    self._signatures: dict[str, FileSignature] = {}
+    self._modules: dict[str, parser_module.JoyModule] = {}
+    # The path of the file that defines each function in the index.
+    self._function_paths: dict[str, str] = {}
+    # The modules of the files that parsed but define a function that another file already defines;
+    # each is added to the index once the other definitions are gone.
+    self._conflicting_modules: dict[str, parser_module.JoyModule] = {}
+    # The merged module returned by index(), or None if it must be rebuilt.
+    self._index: parser_module.JoyModule | None = None
+
+  @property
+  def modules(self) -> Mapping[str, parser_module.JoyModule]:
+    return types.MappingProxyType(self._modules)
+
+  # Returns a module with the functions of all files. The module is shared between calls until the
+  # next poll() that reports an update, so it must not be modified.
+  def index(self) -> parser_module.JoyModule:
+    if self._index is None:
+      self._index = parser_module.JoyModule.merged(
+          self._modules[path] for path in sorted(self._modules)
+      )
+    return self._index
+
+  def poll(self) -> list[FileUpdate]:
+    # Keyed by path so that the update of a file whose conflict is resolved later in the same poll
+    # can be replaced.
+    updates: dict[str, FileUpdate] = {}
+    current_signatures: dict[str, FileSignature] = {}
+    changed_paths: list[str] = []
+
+    for path, signature in iter_source_files(self.root, self.suffixes):
+      current_signatures[path] = signature
+      if self._signatures.get(path) != signature:
+        changed_paths.append(path)
+
+    # Parse in path order so that, of two new files that define the same function, the first one
+    # consistently gets it.
+    for path in sorted(changed_paths):
+      update = self._parse(
+          path,
+          current_signatures[path],
+          ChangeKind.CHANGED if path in self._signatures else ChangeKind.ADDED,
+      )
+      if update is None:
+        # The file was deleted after it was scanned.
+        del current_signatures[path]
+        continue
+      updates[path] = update
+
+    for path in sorted(self._signatures.keys() - current_signatures.keys()):
+      self._remove_functions(path)
+      del self._signatures[path]
+      del self._modules[path]
+      updates[path] = FileUpdate(path=path, kind=ChangeKind.REMOVED, functions=(), error=None)
+
+    if len(updates) > 0:
+      self._index = None
+    for path in sorted(self._conflicting_modules):
+      module = self._conflicting_modules[path]
+      if self._add_functions(path, module) is None:
+        del self._conflicting_modules[path]
+        updates[path] = FileUpdate(
+            path=path,
+            kind=updates[path].kind if path in updates else ChangeKind.CHANGED,
+            functions=tuple(module),
+            error=None,
+        )
+
+    return list(updates.values())
+
+  def run(
+      self,
+      on_updates: Callable[[list[FileUpdate]], None],
+      stop_event: threading.Event,
+      interval_seconds: float = 1.0,
+      max_updates_per_batch: int = 100,
+  ) -> None:
+    if max_updates_per_batch <= 0:
+      raise ValueError(f"invalid max_updates_per_batch: {max_updates_per_batch}")
+
+    while True:
+      updates = self.poll()
+      for i in range(0, len(updates), max_updates_per_batch):
+        on_updates(updates[i : i + max_updates_per_batch])
+      if stop_event.wait(interval_seconds):
+        break
+
+  def _parse(self, path: str, signature: FileSignature, kind: ChangeKind) -> FileUpdate | None:
+    try:
+      # Disable newline translation so that the byte offsets of the spans match the file on disk.
+      with open(path, "rt", encoding=self.encoding, newline="") as f:
+        parser = parser_module.Parser(
+            tokenizer_module.Tokenizer(
+                source_reader_module.SourceReader(f, buffer_size=65536, encoding=self.encoding)
+            )
+        )
+        error: Exception | None = None
+        try:
+          parser.parse()
+        except (
+            tokenizer_module.Tokenizer.ParseError,
+            parser_module.Parser.ParseError,
+            UnicodeDecodeError,
+        ) as e:
+          error = e
+    except FileNotFoundError:
+      return None
+    except OSError as e:
+      # The file can't be read, for example because of its permissions; it is parsed again once
+      # its signature changes.
+      error = e
+
+    self._remove_functions(path)
+    self._signatures[path] = signature
+    if error is None:
+      error = self._add_functions(path, parser.module)
+    if error is not None:
+      # A file that fails to parse contributes no functions to the index until it is fixed.
+      self._modules[path] = parser_module.JoyModule()
+      return FileUpdate(path=path, kind=kind, functions=(), error=error)
+    return FileUpdate(path=path, kind=kind, functions=tuple(self._modules[path]), error=None)
+
+  # Adds the functions of the module parsed from path to the index, unless another file already
+  # defines one of them, in which case the module is kept aside and the conflict is returned.
+  def _add_functions(
+      self, path: str, module: parser_module.JoyModule
+  ) -> parser_module.JoyModule.DuplicateFunctionError | None:
+    for function in module:
+      other_path = self._function_paths.get(function.name)
+      if other_path is not None:
+        self._conflicting_modules[path] = module
+        return parser_module.JoyModule.DuplicateFunctionError(
+            function_name=function.name,
+            message=f"function {function.name} is already defined in {other_path}",
+        )
+
+    for function in module:
+      self._function_paths[function.name] = path
+    self._modules[path] = module
+    return None
+
+  def _remove_functions(self, path: str) -> None:
+    self._conflicting_modules.pop(path, None)
+    for function in self._modules.get(path, ()):
+      del self._function_paths[function.name]
+
+
+# Yields the path and stat signature of each file under root whose name ends with one of suffixes,
+# skipping files and directories that are deleted while the tree is walked.
+def iter_source_files(root: str, suffixes: tuple[str, ...]) -> Iterator[tuple[str, FileSignature]]:
+  pending_directories = [root]
+  while len(pending_directories) > 0:
+    directory = pending_directories.pop()
+    try:
+      with os.scandir(directory) as entries:
+        for entry in entries:
+          if entry.is_dir(follow_symlinks=False):
+            pending_directories.append(entry.path)
+          elif entry.name.endswith(suffixes) and entry.is_file():
+            try:
+              stat_result = entry.stat()
+            except FileNotFoundError:
+              continue
+            yield (entry.path, FileSignature.from_stat_result(stat_result))
+    except (FileNotFoundError, NotADirectoryError):
+      # The directory was deleted or replaced after it was scanned.
+      continue
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class FileSignature:
+  mtime_ns: int
+  ctime_ns: int
+  size: int
+  inode: int
+
+  @classmethod
+  def from_stat_result(cls, stat_result: os.stat_result) -> FileSignature:
+    return cls(
+        mtime_ns=stat_result.st_mtime_ns,
+        ctime_ns=stat_result.st_ctime_ns,
+        size=stat_result.st_size,
+        inode=stat_result.st_ino,
+    )
+
+
+@enum.unique
+class ChangeKind(enum.Enum):
+  ADDED = 1
+  CHANGED = 2
+  REMOVED = 3
+
+
+@dataclasses.dataclass(frozen=True)
+class FileUpdate:
+  # The path of the file that was added, changed, or removed.
+  path: str
+  kind: ChangeKind
+  # The functions now defined by the file; empty if the file was removed or failed to parse.
+  functions: tuple[parser_module.JoyFunction, ...]
+  # The error that occurred parsing the file, or None if it was parsed successfully or removed.
+  error: Exception | None
+
+
+def main() -> None:
+  arg_parser = argparse.ArgumentParser(
+      description="Watches a directory for changes to Joy files and prints the changes."
+  )
+  arg_parser.add_argument("root")
+  arg_parser.add_argument("--interval", type=float, default=1.0)
+  args = arg_parser.parse_args()
+
+  def print_updates(updates: list[FileUpdate]) -> None:
+    for update in updates:
+      if update.error is not None:
+        print(f"{update.kind.name} {update.path}: {update.error}", flush=True)
+      else:
+        function_names = " ".join(function.name for function in update.functions)
+        print(f"{update.kind.name} {update.path}: {function_names}", flush=True)
+
+  try:
+    DirectoryWatcher(args.root).run(
+        print_updates, stop_event=threading.Event(), interval_seconds=args.interval
+    )
+  except KeyboardInterrupt:
+    pass
+
+
+if __name__ == "__main__":
+  main()
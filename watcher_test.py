@@ -0,0 +1,321 @@
+from collections.abc import Callable
+import contextlib
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from absl.testing import absltest
+
+import parser as parser_module
+import watcher as watcher_module
+
+ChangeKind = watcher_module.ChangeKind
+DirectoryWatcher = watcher_module.DirectoryWatcher
+FileUpdate = watcher_module.FileUpdate
+JoyFunction = parser_module.JoyFunction
+
+
+class DirectoryWatcherTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.root = self.enter_context(tempfile.TemporaryDirectory())
+
+  def test_poll_on_empty_directory(self):
+    watcher = DirectoryWatcher(self.root)
+
+    self.assertEqual([], watcher.poll())
+    self.assertEqual({}, dict(watcher.modules))
+
+  def test_poll_reports_added_files(self):
+    path1 = self.write_file("a.joy", "@main function aaa")
+    path2 = self.write_file(os.path.join("sub", "dir", "b.joy"), "function bbb function ccc")
+    watcher = DirectoryWatcher(self.root)
+
+    updates = watcher.poll()
+
+    self.assertEqual(
+        [
+            (path1, ChangeKind.ADDED, ("aaa",)),
+            (path2, ChangeKind.ADDED, ("bbb", "ccc")),
+        ],
+        self.summarize(updates),
+    )
+    self.assertEqual(JoyFunction(name="aaa", annotations=("main",)), watcher.modules[path1]["aaa"])
+
+  def test_poll_ignores_files_without_matching_suffix(self):
+    self.write_file("a.txt", "function aaa")
+    self.write_file("b.joy.bak", "function bbb")
+    path = self.write_file("c.jy", "function ccc")
+    watcher = DirectoryWatcher(self.root, suffixes=(".jy",))
+
+    self.assertEqual([(path, ChangeKind.ADDED, ("ccc",))], self.summarize(watcher.poll()))
+
+  def test_poll_reports_nothing_if_nothing_changed(self):
+    self.write_file("a.joy", "function aaa")
+    watcher = DirectoryWatcher(self.root)
+    watcher.poll()
+
+    self.assertEqual([], watcher.poll())
+
+  def test_poll_reports_changed_files_only(self):
+    path1 = self.write_file("a.joy", "function aaa")
+    self.write_file("b.joy", "function bbb")
+    watcher = DirectoryWatcher(self.root)
+    watcher.poll()
+
+    self.write_file("a.joy", "function aaa function zzz")
+
+    self.assertEqual([(path1, ChangeKind.CHANGED, ("aaa", "zzz"))], self.summarize(watcher.poll()))
+    self.assertIn("zzz", watcher.modules[path1])
+
+  def test_poll_detects_change_with_same_size(self):
+    path = self.write_file("a.joy", "function aaa")
+    watcher = DirectoryWatcher(self.root)
+    watcher.poll()
+    stat_result = os.stat(path)
+
+    self.write_file("a.joy", "function bbb")
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+
+    self.assertEqual([(path, ChangeKind.CHANGED, ("bbb",))], self.summarize(watcher.poll()))
+
+  def test_poll_reports_removed_files(self):
+    path1 = self.write_file("a.joy", "function aaa")
+    path2 = self.write_file(os.path.join("sub", "b.joy"), "function bbb")
+    watcher = DirectoryWatcher(self.root)
+    watcher.poll()
+
+    os.remove(path1)
+    os.remove(path2)
+    os.rmdir(os.path.dirname(path2))
+
+    self.assertEqual(
+        [(path1, ChangeKind.REMOVED, ()), (path2, ChangeKind.REMOVED, ())],
+        self.summarize(watcher.poll()),
+    )
+    self.assertEqual({}, dict(watcher.modules))
+
+  def test_poll_reports_parse_errors(self):
+    path = self.write_file("a.joy", "function aaa @main")
+    watcher = DirectoryWatcher(self.root)
+
+    updates = watcher.poll()
+
+    self.assertEqual([(path, ChangeKind.ADDED, ())], self.summarize(updates))
+    self.assertIsInstance(updates[0].error, parser_module.Parser.ParseError)
+    self.assertEqual([], list(watcher.modules[path]))
+
+  def test_poll_reports_deeply_nested_file_next_to_good_ones(self):
+    path1 = self.write_file("a.joy", "function aaa")
+    path2 = self.write_file("b.joy", "function bbb { " + "[" * 100_000 + "]" * 100_000 + " }")
+    path3 = self.write_file("c.joy", "function ccc")
+    watcher = DirectoryWatcher(self.root)
+
+    updates = watcher.poll()
+
+    self.assertEqual(
+        [
+            (path1, ChangeKind.ADDED, ("aaa",)),
+            (path2, ChangeKind.ADDED, ()),
+            (path3, ChangeKind.ADDED, ("ccc",)),
+        ],
+        self.summarize(updates),
+    )
+    errors = {update.path: update.error for update in updates}
+    self.assertIsInstance(errors[path2], parser_module.Parser.ParseError)
+    self.assertIsNone(errors[path1])
+    self.assertEqual(["aaa", "ccc"], [function.name for function in watcher.index()])
+
+  def test_poll_after_fixing_parse_error(self):
+    path = self.write_file("a.joy", "function")
+    watcher = DirectoryWatcher(self.root)
+    watcher.poll()
+
+    self.write_file("a.joy", "function aaa")
+
+    updates = watcher.poll()
+    self.assertEqual([(path, ChangeKind.CHANGED, ("aaa",))], self.summarize(updates))
+    self.assertIsNone(updates[0].error)
+
+  def test_poll_reports_file_deleted_after_scan(self):
+    path1 = self.write_file("a.joy", "function aaa")
+    path2 = self.write_file("b.joy", "function bbb")
+    watcher = DirectoryWatcher(self.root)
+    watcher.poll()
+    self.bump_mtime(path1)
+
+    with self.after_scan({path1: lambda: os.remove(path1)}):
+      self.assertEqual([(path1, ChangeKind.REMOVED, ())], self.summarize(watcher.poll()))
+    self.assertEqual([path2], list(watcher.modules))
+
+  def test_poll_skips_new_file_deleted_after_scan(self):
+    path = self.write_file("a.joy", "function aaa")
+    watcher = DirectoryWatcher(self.root)
+
+    with self.after_scan({path: lambda: os.remove(path)}):
+      self.assertEqual([], watcher.poll())
+    self.assertEqual({}, dict(watcher.modules))
+
+  def test_poll_reports_file_that_cannot_be_read(self):
+    path = self.write_file("a.joy", "function aaa")
+    watcher = DirectoryWatcher(self.root)
+    watcher.poll()
+    self.bump_mtime(path)
+
+    def replace_with_directory() -> None:
+      os.remove(path)
+      os.mkdir(path)
+
+    with self.after_scan({path: replace_with_directory}):
+      updates = watcher.poll()
+
+    self.assertEqual([(path, ChangeKind.CHANGED, ())], self.summarize(updates))
+    self.assertIsInstance(updates[0].error, IsADirectoryError)
+    self.assertEqual([], list(watcher.index()))
+
+  @unittest.skipIf(os.geteuid() == 0, "root can read files without read permission")
+  def test_poll_reports_file_without_read_permission(self):
+    path = self.write_file("a.joy", "function aaa")
+    watcher = DirectoryWatcher(self.root)
+    os.chmod(path, 0)
+
+    updates = watcher.poll()
+
+    self.assertEqual([(path, ChangeKind.ADDED, ())], self.summarize(updates))
+    self.assertIsInstance(updates[0].error, PermissionError)
+
+    os.chmod(path, 0o600)
+
+    self.assertEqual([(path, ChangeKind.CHANGED, ("aaa",))], self.summarize(watcher.poll()))
+
+  def test_poll_reports_function_defined_in_another_file(self):
+    path1 = self.write_file("a.joy", "function aaa")
+    path2 = self.write_file("b.joy", "function bbb function aaa")
+    watcher = DirectoryWatcher(self.root)
+
+    updates = watcher.poll()
+
+    self.assertEqual(
+        [(path1, ChangeKind.ADDED, ("aaa",)), (path2, ChangeKind.ADDED, ())],
+        self.summarize(updates),
+    )
+    error = {update.path: update for update in updates}[path2].error
+    assert isinstance(error, parser_module.JoyModule.DuplicateFunctionError)
+    self.assertEqual("aaa", error.function_name)
+    self.assertEqual(["aaa"], [function.name for function in watcher.index()])
+
+    os.remove(path1)
+
+    updates = watcher.poll()
+    self.assertEqual(
+        [(path1, ChangeKind.REMOVED, ()), (path2, ChangeKind.CHANGED, ("bbb", "aaa"))],
+        self.summarize(updates),
+    )
+    self.assertEqual([None, None], [update.error for update in updates])
+    self.assertEqual(["bbb", "aaa"], [function.name for function in watcher.index()])
+
+  def test_poll_resolves_conflict_with_file_changed_in_same_poll(self):
+    path2 = self.write_file("b.joy", "function aaa")
+    watcher = DirectoryWatcher(self.root)
+    watcher.poll()
+    # a.joy is parsed before the change to b.joy that removes the conflict.
+    path1 = self.write_file("a.joy", "function aaa")
+    self.write_file("b.joy", "function zzz")
+    self.bump_mtime(path2)
+
+    updates = watcher.poll()
+
+    self.assertEqual(
+        [(path1, ChangeKind.ADDED, ("aaa",)), (path2, ChangeKind.CHANGED, ("zzz",))],
+        self.summarize(updates),
+    )
+    self.assertEqual([None, None], [update.error for update in updates])
+
+  def test_index_merges_all_files(self):
+    self.write_file("b.joy", "function bbb")
+    self.write_file("a.joy", "@main function aaa")
+    watcher = DirectoryWatcher(self.root)
+    watcher.poll()
+
+    index = watcher.index()
+
+    self.assertEqual(["aaa", "bbb"], [function.name for function in index])
+    self.assertEqual(("aaa",), tuple(f.name for f in index.functions_with_annotation("main")))
+
+  def test_index_is_reused_until_a_file_changes(self):
+    path = self.write_file("a.joy", "function aaa")
+    watcher = DirectoryWatcher(self.root)
+    watcher.poll()
+
+    index = watcher.index()
+    watcher.poll()
+
+    self.assertIs(index, watcher.index())
+
+    self.write_file("a.joy", "function zzz")
+    self.bump_mtime(path)
+    watcher.poll()
+
+    self.assertEqual(["zzz"], [function.name for function in watcher.index()])
+
+  def test_run_publishes_updates_in_batches_until_stopped(self):
+    for i in range(5):
+      self.write_file(f"{i}.joy", f"function f{i}")
+    watcher = DirectoryWatcher(self.root)
+    stop_event = threading.Event()
+    batches: list[list[FileUpdate]] = []
+
+    def on_updates(updates: list[FileUpdate]) -> None:
+      batches.append(updates)
+      if sum(len(batch) for batch in batches) == 5:
+        stop_event.set()
+
+    watcher.run(on_updates, stop_event, interval_seconds=0, max_updates_per_batch=2)
+
+    self.assertEqual([2, 2, 1], [len(batch) for batch in batches])
+
+  def test_run_with_invalid_batch_size_raises(self):
+    watcher = DirectoryWatcher(self.root)
+
+    with self.assertRaises(ValueError):
+      watcher.run(lambda updates: None, threading.Event(), max_updates_per_batch=0)
+
+  def write_file(self, relative_path: str, text: str) -> str:
+    path = os.path.join(self.root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wt", encoding="utf-8") as f:
+      f.write(text)
+    return path
+
+  def bump_mtime(self, path: str) -> None:
+    # Make sure that a change is visible even on file systems with a coarse mtime.
+    stat_result = os.stat(path)
+    os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+
+  # Patches the watcher so that, after a poll scans one of the paths in actions, it runs the
+  # action for that path before the file is read.
+  def after_scan(
+      self, actions: dict[str, Callable[[], None]]
+  ) -> contextlib.AbstractContextManager[object]:
+    iter_source_files = watcher_module.iter_source_files
+
+    def iter_source_files_with_actions(root, suffixes):
+      for path, signature in iter_source_files(root, suffixes):
+        if path in actions:
+          actions[path]()
+        yield path, signature
+
+    return mock.patch.object(watcher_module, "iter_source_files", iter_source_files_with_actions)
+
+  def summarize(self, updates: list[FileUpdate]) -> list[tuple[str, ChangeKind, tuple[str, ...]]]:
+    return sorted(
+        (update.path, update.kind, tuple(function.name for function in update.functions))
+        for update in updates
+    )
+
+
+if __name__ == "__main__":
+  absltest.main()